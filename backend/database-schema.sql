@@ -8,6 +8,7 @@ USE clinnet_emr;
 -- Users table (migrated from DynamoDB)
 CREATE TABLE users (
     id VARCHAR(36) PRIMARY KEY,
+    username VARCHAR(128) UNIQUE,
     email VARCHAR(255) UNIQUE NOT NULL,
     first_name VARCHAR(100) NOT NULL,
     last_name VARCHAR(100) NOT NULL,
@@ -15,13 +16,15 @@ CREATE TABLE users (
     phone VARCHAR(20),
     profile_image_url VARCHAR(500),
     is_active BOOLEAN DEFAULT TRUE,
+    user_status VARCHAR(32),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     
     INDEX idx_email (email),
     INDEX idx_role (role),
     INDEX idx_active (is_active),
-    INDEX idx_created_at (created_at)
+    INDEX idx_created_at (created_at),
+    INDEX idx_name (last_name, first_name)
 );
 
 -- Patients table (migrated from DynamoDB)
@@ -86,8 +89,13 @@ CREATE TABLE appointments (
     appointment_date DATE NOT NULL,
     appointment_time TIME NOT NULL,
     duration_minutes INT DEFAULT 30,
+    -- Denormalized [start_at, end_at) span kept in step with date/time/duration by the API
+    start_at DATETIME,
+    end_at DATETIME,
     status ENUM('scheduled', 'confirmed', 'in_progress', 'completed', 'cancelled', 'no_show') DEFAULT 'scheduled',
     notes TEXT,
+    -- DynamoDB billing record generated for the appointment, if any
+    billing_id VARCHAR(36),
     created_by VARCHAR(36),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
@@ -97,6 +105,12 @@ CREATE TABLE appointments (
     INDEX idx_service_id (service_id),
     INDEX idx_appointment_date (appointment_date),
     INDEX idx_appointment_datetime (appointment_date, appointment_time),
+    INDEX idx_doctor_span (doctor_id, start_at, end_at, status),
+    INDEX idx_patient_span (patient_id, start_at, end_at, status),
+    INDEX idx_service_span (service_id, start_at),
+    INDEX idx_status_span (status, start_at),
+    INDEX idx_unbilled (status, billing_id, start_at),
+    INDEX idx_start_at (start_at),
     INDEX idx_status (status),
     INDEX idx_created_by (created_by),
     
@@ -106,6 +120,20 @@ CREATE TABLE appointments (
     FOREIGN KEY (created_by) REFERENCES users(id) ON DELETE SET NULL
 );
 
+-- Doctor time reserved by active appointments, one row per 5-minute slot.
+-- The primary key turns a double booking into a duplicate-key error inside the
+-- transaction that writes the appointment.
+CREATE TABLE appointment_slots (
+    doctor_id VARCHAR(36) NOT NULL,
+    slot_start DATETIME NOT NULL,
+    appointment_id VARCHAR(36) NOT NULL,
+    
+    PRIMARY KEY (doctor_id, slot_start),
+    INDEX idx_appointment_id (appointment_id),
+    
+    FOREIGN KEY (appointment_id) REFERENCES appointments(id) ON DELETE CASCADE
+);
+
 -- Medical reports metadata (keep some in RDS for relationships)
 CREATE TABLE medical_reports (
     id VARCHAR(36) PRIMARY KEY,
@@ -0,0 +1,121 @@
+"""
+Per doctor-day agenda cache.
+Holds each doctor-day's appointments with the patient, doctor and service names
+already joined in, pre-serialized to JSON-safe values (dates and decimals as the
+strings build_response would produce).
+Entries are keyed on the doctor-day's version on the cache bus, which the
+appointment create/update/delete handlers bump, so a write is visible on the next
+refresh while unchanged days are served without touching Aurora.
+"""
+import os
+import json
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.rds_utils import get_active_doctor_ids, get_appointments_by_date_range
+from utils.cache import LRUCache, MISSING
+from utils.cache_invalidation import get_version_bus
+from utils.availability import doctor_day_entity
+from utils.appointment_times import to_date
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+AGENDA_TTL_SECONDS = 300
+AGENDA_CACHE = LRUCache(max_entries=4096, max_bytes=16 * 1024 * 1024, name='doctor-agendas')
+# Longest range get_appointments serves from cached agendas
+AGENDA_MAX_DAYS = 7
+
+def _cache_key(doctor_id: str, day: date) -> Tuple[str, str, int]:
+    return doctor_id, day.isoformat(), get_version_bus().current(doctor_day_entity(doctor_id, day))
+
+def _store(key, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    serialized = json.dumps(rows, default=str)
+    # Round-tripped so embedding the rows in a response needs no default=str conversions
+    agenda = json.loads(serialized)
+    AGENDA_CACHE.set(key, agenda, ttl=AGENDA_TTL_SECONDS, size=2 * len(serialized) + 64)
+    return agenda
+
+def get_agenda(doctor_id: str, day) -> List[Dict[str, Any]]:
+    """
+    Return a doctor's appointments for one day, loading them on a miss
+
+    Args:
+        doctor_id: Doctor ID
+        day: Date (or 'YYYY-MM-DD')
+    """
+    day = to_date(day)
+    key = _cache_key(doctor_id, day)
+    agenda = AGENDA_CACHE.get(key)
+    if agenda is MISSING:
+        rows = get_appointments_by_date_range(day.isoformat(), day.isoformat(), doctor_id=doctor_id) or []
+        agenda = _store(key, rows)
+    return agenda
+
+def get_agenda_range(doctor_id: str, start_date, end_date) -> List[Dict[str, Any]]:
+    """Return a doctor's appointments over consecutive days, one cached agenda per day."""
+    day, end_date = to_date(start_date), to_date(end_date)
+    rows = []
+    while day <= end_date:
+        rows.extend(get_agenda(doctor_id, day))
+        day += timedelta(days=1)
+    return rows
+
+def prewarm_agendas(days: Optional[Iterable[date]] = None, doctor_ids: Optional[List[str]] = None) -> int:
+    """
+    Load the agendas of every active doctor for the given days (today and tomorrow
+    by default) with one range query, reading their versions in one batch
+
+    Returns:
+        int: Number of agendas cached
+    """
+    days = sorted(to_date(day) for day in (days or (date.today(), date.today() + timedelta(days=1))))
+    doctor_ids = doctor_ids if doctor_ids is not None else get_active_doctor_ids()
+    if not days or not doctor_ids:
+        return 0
+
+    by_day: Dict[Tuple[str, date], List[Dict[str, Any]]] = {}
+    for row in get_appointments_by_date_range(days[0].isoformat(), days[-1].isoformat(),
+                                              doctor_ids=doctor_ids) or []:
+        by_day.setdefault((row['doctor_id'], to_date(row['appointment_date'])), []).append(row)
+
+    versions = get_version_bus().current_many(
+        doctor_day_entity(doctor_id, day) for doctor_id in doctor_ids for day in days)
+    for doctor_id in doctor_ids:
+        for day in days:
+            key = (doctor_id, day.isoformat(), versions[doctor_day_entity(doctor_id, day)])
+            _store(key, by_day.get((doctor_id, day), []))
+    return len(doctor_ids) * len(days)
+
+_prewarm_lock = threading.Lock()
+_prewarmed = False
+
+def prewarm_once() -> int:
+    """
+    Pre-warm today's and tomorrow's agendas on a container's first request, when
+    AGENDA_PREWARM is 'true' and the database is configured
+
+    Costs one range query and one batched version read, however many doctors.
+
+    Returns:
+        int: Number of agendas cached by this call
+    """
+    global _prewarmed
+    if _prewarmed:
+        return 0
+    with _prewarm_lock:
+        if _prewarmed:
+            return 0
+        _prewarmed = True
+    if not os.environ.get('DB_HOST') or os.environ.get('AGENDA_PREWARM', 'false').lower() != 'true':
+        return 0
+    try:
+        started = datetime.now()
+        count = prewarm_agendas()
+        logger.info(f"Pre-warmed {count} doctor agendas in {(datetime.now() - started).total_seconds():.2f}s")
+        return count
+    except Exception as e:
+        logger.warning(f"Agenda pre-warm failed: {e}")
+        return 0
@@ -0,0 +1,81 @@
+"""
+Date/time helpers shared by the appointment code.
+Appointments are stored as appointment_date + appointment_time + duration_minutes
+and, denormalized for indexing, as a [start_at, end_at) DATETIME span.
+"""
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+from typing import List, Tuple, Union
+
+from dateutil.rrule import rrulestr
+
+DEFAULT_DURATION_MINUTES = 30
+# Appointments in these states do not hold their slot
+INACTIVE_STATUSES = ('cancelled', 'no_show')
+# Granularity of the appointment_slots reservations
+RESERVATION_SLOT_MINUTES = 5
+# Most occurrences a recurrence rule may expand to
+MAX_RECURRENCE_OCCURRENCES = 52
+
+def to_date(value: Union[str, date, datetime]) -> date:
+    """Normalize a DATE column or 'YYYY-MM-DD' string."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value), '%Y-%m-%d').date()
+
+def to_time(value: Union[str, time, timedelta]) -> time:
+    """Normalize a TIME column (pymysql returns timedelta) or 'HH:MM[:SS]' string."""
+    if isinstance(value, time):
+        return value
+    if isinstance(value, timedelta):
+        seconds = int(value.total_seconds()) % (24 * 3600)
+        return time(seconds // 3600, (seconds % 3600) // 60, seconds % 60)
+    return time.fromisoformat(str(value))
+
+def to_datetime(value: Union[str, datetime]) -> datetime:
+    """Normalize a DATETIME column or ISO 'YYYY-MM-DD[ T]HH:MM[:SS]' string."""
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+def appointment_interval(appointment_date, appointment_time, duration_minutes=None) -> Tuple[datetime, datetime]:
+    """Return the [start, end) datetimes an appointment occupies."""
+    start = datetime.combine(to_date(appointment_date), to_time(appointment_time))
+    duration = int(duration_minutes or DEFAULT_DURATION_MINUTES)
+    return start, start + timedelta(minutes=duration)
+
+def format_sql_datetime(value: datetime) -> str:
+    """Format a datetime the way MySQL DATETIME literals are written."""
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+
+def reservation_slots(start: datetime, end: datetime,
+                      slot_minutes: int = RESERVATION_SLOT_MINUTES) -> List[datetime]:
+    """Return the start of every reservation slot the [start, end) span touches."""
+    step = timedelta(minutes=slot_minutes)
+    midnight = datetime.combine(start.date(), time())
+    slot = midnight + ((start - midnight) // step) * step
+    slots = []
+    while slot < end:
+        slots.append(slot)
+        slot += step
+    return slots
+
+def recurrence_dates(rule: str, start_date, max_occurrences: int = MAX_RECURRENCE_OCCURRENCES) -> List[date]:
+    """
+    Expand an RRULE such as 'FREQ=WEEKLY;COUNT=12;BYDAY=MO,TH' starting on start_date
+
+    Raises:
+        ValueError: The rule is invalid, unbounded, or yields more than max_occurrences dates
+    """
+    rule = str(rule).strip()
+    if rule.upper().startswith('RRULE:'):
+        rule = rule[len('RRULE:'):]
+    if 'COUNT=' not in rule.upper() and 'UNTIL=' not in rule.upper():
+        raise ValueError("Recurrence must set COUNT or UNTIL")
+    occurrences = rrulestr(rule, dtstart=datetime.combine(to_date(start_date), time()))
+    dates = [occurrence.date() for occurrence in islice(occurrences, max_occurrences + 1)]
+    if len(dates) > max_occurrences:
+        raise ValueError(f"Recurrence cannot exceed {max_occurrences} occurrences")
+    return dates
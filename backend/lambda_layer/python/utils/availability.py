@@ -0,0 +1,381 @@
+"""
+Appointment availability engine.
+Loads the booked intervals of a doctor and of a patient around a slot with two
+range scans over the (owner, start_at, end_at, status) covering indexes, then
+answers overlap checks in Python against a sorted interval structure.
+"""
+import os
+import bisect
+import heapq
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.rds_utils import execute_query, get_active_doctor_ids, get_appointments_by_date_range
+from utils.cache import LRUCache, MISSING
+from utils.cache_invalidation import get_version_bus
+from utils.appointment_times import (
+    DEFAULT_DURATION_MINUTES, INACTIVE_STATUSES, appointment_interval, format_sql_datetime, to_date, to_datetime
+)
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Longest appointment the overlap query looks back for
+MAX_APPOINTMENT_MINUTES = 24 * 60
+
+# Free-slot search: the working day is swept as a bitmap of SLOT_MINUTES slots
+SLOT_MINUTES = 5
+WORKDAY_START = os.environ.get('WORKDAY_START', '08:00')
+WORKDAY_END = os.environ.get('WORKDAY_END', '18:00')
+
+# Multi-doctor search: longest date window and most results per request
+MAX_SEARCH_DAYS = 31
+MAX_SEARCH_RESULTS = 100
+
+# Per doctor-day bookings, keyed on the doctor-day's version on the cache bus
+DAY_CACHE_TTL_SECONDS = 300
+DAY_CACHE = LRUCache(max_entries=4096, max_bytes=8 * 1024 * 1024, name='doctor-days')
+
+def doctor_day_entity(doctor_id: str, day) -> str:
+    return f"doctor-day:{doctor_id}:{to_date(day).isoformat()}"
+
+def invalidate_doctor_day(doctor_id: str, day) -> None:
+    """Announce a booking change so cached availability for that doctor-day is rebuilt."""
+    if not doctor_id or not day:
+        return
+    get_version_bus().bump(doctor_day_entity(doctor_id, day))
+
+def busy_bitmap(intervals, day_start: datetime, total_slots: int, slot_minutes: int = SLOT_MINUTES) -> int:
+    """
+    Mark every slot touched by a busy interval
+
+    Args:
+        intervals: Iterable of (start, end, payload) datetimes
+        day_start: Datetime of slot 0
+        total_slots: Number of slots in the day
+        slot_minutes: Slot length in minutes
+
+    Returns:
+        int: Bitmap with bit i set when slot i is (partly) booked
+    """
+    busy = 0
+    slot = timedelta(minutes=slot_minutes)
+    for start, end, _ in intervals:
+        first = max(0, (start - day_start) // slot)
+        last = min(total_slots, -((day_start - end) // slot))  # ceil division
+        if last > first:
+            busy |= ((1 << (last - first)) - 1) << first
+    return busy
+
+def fitting_starts(busy: int, total_slots: int, needed_slots: int) -> int:
+    """
+    Return a bitmap with bit i set when slots i .. i + needed_slots - 1 are all free
+    """
+    free = ~busy & ((1 << total_slots) - 1)
+    fits = free
+    for shift in range(1, needed_slots):
+        fits &= free >> shift
+        if not fits:
+            break
+    return fits
+
+def grid_mask(total_slots: int, stride: int) -> int:
+    """Return a bitmap with every stride-th slot set, starting at slot 0."""
+    mask = 0
+    for index in range(0, total_slots, stride):
+        mask |= 1 << index
+    return mask
+
+def lowest_bits(bitmap: int, limit: int) -> List[int]:
+    """Return the indexes of the lowest `limit` set bits of bitmap."""
+    indexes = []
+    while bitmap and len(indexes) < limit:
+        low = bitmap & -bitmap
+        indexes.append(low.bit_length() - 1)
+        bitmap ^= low
+    return indexes
+
+class IntervalSet:
+    """
+    Static set of half-open intervals sorted by start.
+
+    A running maximum of end times lets `overlapping` find the candidates with
+    one bisect and walk back only over intervals that can still overlap.
+    """
+
+    def __init__(self, intervals: Optional[List[Tuple[Any, Any, Any]]] = None):
+        """
+        Args:
+            intervals: Iterable of (start, end, payload) tuples
+        """
+        self._build(intervals or [])
+
+    def _build(self, intervals) -> None:
+        self._items = sorted(intervals, key=lambda item: (item[0], item[1]))
+        self._starts = [item[0] for item in self._items]
+        self._max_ends = []
+        running = None
+        for _, end, _ in self._items:
+            running = end if running is None or end > running else running
+            self._max_ends.append(running)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def add(self, start, end, payload=None) -> None:
+        """Insert an interval (O(n log n); meant for a handful of additions after a bulk build)."""
+        self._build(self._items + [(start, end, payload)])
+
+    def overlapping(self, start, end) -> List[Tuple[Any, Any, Any]]:
+        """Return every interval with item.start < end and item.end > start."""
+        index = bisect.bisect_left(self._starts, end)
+        result = []
+        while index > 0 and self._max_ends[index - 1] > start:
+            index -= 1
+            item = self._items[index]
+            if item[1] > start:
+                result.append(item)
+        result.reverse()
+        return result
+
+    def is_free(self, start, end) -> bool:
+        index = bisect.bisect_left(self._starts, end)
+        return index == 0 or self._max_ends[index - 1] <= start
+
+class AvailabilityEngine:
+    """Conflict checks for booking and rescheduling appointments."""
+
+    def __init__(self, query: Optional[Callable[..., Any]] = None):
+        """
+        Args:
+            query: execute_query-compatible callable (defaults to rds_utils.execute_query)
+        """
+        self._query = query or execute_query
+
+    def load_intervals(self, owner_column: str, owner_id: str, window_start: datetime, window_end: datetime,
+                       exclude_appointment_id: Optional[str] = None) -> IntervalSet:
+        """
+        Load the active appointments of one doctor or patient overlapping a window
+
+        Args:
+            owner_column: 'doctor_id' or 'patient_id'
+            owner_id: Doctor or patient ID
+            window_start: Start of the window
+            window_end: End of the window (exclusive)
+            exclude_appointment_id: Appointment to leave out (the one being rescheduled)
+
+        Returns:
+            IntervalSet of (start, end, appointment_id)
+        """
+        if owner_column not in ('doctor_id', 'patient_id'):
+            raise ValueError(f"Unsupported owner column: {owner_column}")
+
+        # Bounded range on start_at within the owner's index entries; every
+        # selected column is in the index, so no row lookups are needed
+        query = f"""
+            SELECT id, start_at, end_at
+            FROM appointments
+            WHERE {owner_column} = %s
+            AND start_at >= %s AND start_at < %s
+            AND end_at > %s
+            AND status NOT IN ('cancelled', 'no_show')
+        """
+        lookback = window_start - timedelta(minutes=MAX_APPOINTMENT_MINUTES)
+        rows = self._query(query, (
+            owner_id, format_sql_datetime(lookback), format_sql_datetime(window_end), format_sql_datetime(window_start)
+        )) or []
+
+        intervals = []
+        for row in rows:
+            if exclude_appointment_id and row['id'] == exclude_appointment_id:
+                continue
+            intervals.append((to_datetime(row['start_at']), to_datetime(row['end_at']), row['id']))
+        return IntervalSet(intervals)
+
+    def find_conflicts(self, patient_id: str, doctor_id: str, appointment_date, appointment_time,
+                       duration_minutes: int = DEFAULT_DURATION_MINUTES,
+                       exclude_appointment_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Return the existing appointments that overlap the requested slot
+
+        Args:
+            patient_id: Patient being booked
+            doctor_id: Doctor being booked
+            appointment_date: Requested date
+            appointment_time: Requested start time
+            duration_minutes: Requested duration
+            exclude_appointment_id: Appointment being rescheduled, ignored as a conflict
+
+        Returns:
+            list: [{'appointment_id', 'conflicts_with', 'start', 'end'}], empty if the slot is free
+        """
+        start, end = appointment_interval(appointment_date, appointment_time, duration_minutes)
+
+        conflicts = []
+        for column, owner_id in (('doctor_id', doctor_id), ('patient_id', patient_id)):
+            if not owner_id:
+                continue
+            intervals = self.load_intervals(column, owner_id, start, end, exclude_appointment_id)
+            for busy_start, busy_end, appointment_id in intervals.overlapping(start, end):
+                conflicts.append({
+                    'appointment_id': appointment_id,
+                    'conflicts_with': column.replace('_id', ''),
+                    'start': busy_start.isoformat(),
+                    'end': busy_end.isoformat()
+                })
+
+        if conflicts:
+            logger.info(f"Slot {start.isoformat()}-{end.isoformat()} has {len(conflicts)} conflicts")
+        return conflicts
+
+    def is_available(self, patient_id: str, doctor_id: str, appointment_date, appointment_time,
+                     duration_minutes: int = DEFAULT_DURATION_MINUTES,
+                     exclude_appointment_id: Optional[str] = None) -> bool:
+        return not self.find_conflicts(patient_id, doctor_id, appointment_date, appointment_time,
+                                       duration_minutes, exclude_appointment_id)
+
+    def day_bookings(self, doctor_id: str, day, work_start: Optional[time] = None,
+                     work_end: Optional[time] = None) -> IntervalSet:
+        """
+        Return a doctor's active bookings overlapping the working day, cached per
+        doctor-day until a booking change bumps its version
+
+        Args:
+            doctor_id: Doctor ID
+            day: Date (or 'YYYY-MM-DD')
+            work_start: Start of the working day (defaults to WORKDAY_START)
+            work_end: End of the working day (defaults to WORKDAY_END)
+        """
+        day = to_date(day)
+        window_start = datetime.combine(day, work_start or time.fromisoformat(WORKDAY_START))
+        window_end = datetime.combine(day, work_end or time.fromisoformat(WORKDAY_END))
+
+        version = get_version_bus().current(doctor_day_entity(doctor_id, day))
+        cache_key = (doctor_id, window_start, window_end, version)
+        intervals = DAY_CACHE.get(cache_key)
+        if intervals is MISSING:
+            intervals = self.load_intervals('doctor_id', doctor_id, window_start, window_end)
+            DAY_CACHE.set(cache_key, intervals, ttl=DAY_CACHE_TTL_SECONDS, size=64 * (len(intervals) + 1))
+        return intervals
+
+    def free_slots(self, doctor_id: str, day, duration_minutes: int = DEFAULT_DURATION_MINUTES,
+                   step_minutes: int = SLOT_MINUTES, work_start: Optional[time] = None,
+                   work_end: Optional[time] = None) -> List[Dict[str, str]]:
+        """
+        List every start time in the working day where the doctor is free for duration_minutes
+
+        Args:
+            doctor_id: Doctor ID
+            day: Date (or 'YYYY-MM-DD')
+            duration_minutes: Length of the appointment to fit
+            step_minutes: Spacing of the returned start times (multiple of SLOT_MINUTES)
+            work_start: Start of the working day (defaults to WORKDAY_START)
+            work_end: End of the working day (defaults to WORKDAY_END)
+
+        Returns:
+            list: [{'start': 'HH:MM', 'end': 'HH:MM'}] in chronological order
+        """
+        if step_minutes % SLOT_MINUTES or step_minutes <= 0:
+            raise ValueError(f"step_minutes must be a positive multiple of {SLOT_MINUTES}")
+        day = to_date(day)
+        work_start = work_start or time.fromisoformat(WORKDAY_START)
+        work_end = work_end or time.fromisoformat(WORKDAY_END)
+        day_start = datetime.combine(day, work_start)
+        total_slots = int((datetime.combine(day, work_end) - day_start).total_seconds() // 60) // SLOT_MINUTES
+        needed_slots = -(-int(duration_minutes) // SLOT_MINUTES)
+        if total_slots <= 0 or needed_slots > total_slots:
+            return []
+
+        busy = busy_bitmap(self.day_bookings(doctor_id, day, work_start, work_end), day_start, total_slots)
+        fits = fitting_starts(busy, total_slots, needed_slots)
+
+        slots = []
+        stride = step_minutes // SLOT_MINUTES
+        for index in range(0, total_slots, stride):
+            if fits >> index & 1:
+                start = day_start + timedelta(minutes=index * SLOT_MINUTES)
+                end = start + timedelta(minutes=int(duration_minutes))
+                slots.append({'start': start.strftime('%H:%M'), 'end': end.strftime('%H:%M')})
+        return slots
+
+    def earliest_slots(self, start_date, end_date, duration_minutes: int = DEFAULT_DURATION_MINUTES,
+                       doctor_ids: Optional[List[str]] = None, limit: int = 10,
+                       step_minutes: int = SLOT_MINUTES, work_start: Optional[time] = None,
+                       work_end: Optional[time] = None) -> List[Dict[str, str]]:
+        """
+        Find the earliest start times, across several doctors, where a doctor is
+        free for duration_minutes
+
+        All bookings in the window are loaded with one query; each doctor-day is
+        then reduced to a bitmap of fitting start slots, and days are scanned in
+        order until `limit` results are found.
+
+        Args:
+            start_date: First day of the window (date or 'YYYY-MM-DD')
+            end_date: Last day of the window, inclusive
+            duration_minutes: Length of the appointment to fit
+            doctor_ids: Doctors to consider (defaults to every active doctor)
+            limit: Maximum number of results
+            step_minutes: Spacing of candidate start times (multiple of SLOT_MINUTES)
+            work_start: Start of the working day (defaults to WORKDAY_START)
+            work_end: End of the working day (defaults to WORKDAY_END)
+
+        Returns:
+            list: [{'doctor_id', 'date', 'start', 'end'}] ordered by start time, then doctor
+        """
+        if step_minutes % SLOT_MINUTES or step_minutes <= 0:
+            raise ValueError(f"step_minutes must be a positive multiple of {SLOT_MINUTES}")
+        start_date, end_date = to_date(start_date), to_date(end_date)
+        if end_date < start_date:
+            raise ValueError("end_date must not be before start_date")
+        if (end_date - start_date).days >= MAX_SEARCH_DAYS:
+            raise ValueError(f"The search window cannot exceed {MAX_SEARCH_DAYS} days")
+
+        work_start = work_start or time.fromisoformat(WORKDAY_START)
+        work_end = work_end or time.fromisoformat(WORKDAY_END)
+        total_slots = int((datetime.combine(start_date, work_end) -
+                           datetime.combine(start_date, work_start)).total_seconds() // 60) // SLOT_MINUTES
+        needed_slots = -(-int(duration_minutes) // SLOT_MINUTES)
+        if limit <= 0 or total_slots <= 0 or needed_slots > total_slots:
+            return []
+
+        doctor_ids = sorted(set(doctor_ids)) if doctor_ids else get_active_doctor_ids()
+        if not doctor_ids:
+            return []
+
+        # One range query for the whole window, grouped into (doctor, day) buckets
+        bookings: Dict[Tuple[str, date], List[Tuple[datetime, datetime, Any]]] = {}
+        for row in get_appointments_by_date_range(start_date.isoformat(), end_date.isoformat(),
+                                                  doctor_ids=doctor_ids) or []:
+            if row.get('status') in INACTIVE_STATUSES or not row.get('start_at') or not row.get('end_at'):
+                continue
+            start, end = to_datetime(row['start_at']), to_datetime(row['end_at'])
+            bookings.setdefault((row['doctor_id'], start.date()), []).append((start, end, row.get('id')))
+
+        grid = grid_mask(total_slots, step_minutes // SLOT_MINUTES)
+        duration = timedelta(minutes=int(duration_minutes))
+        results = []
+        day = start_date
+        while day <= end_date and len(results) < limit:
+            day_start = datetime.combine(day, work_start)
+            # Per doctor, only the first `remaining` fitting starts can make the cut
+            remaining = limit - len(results)
+            candidates = []
+            for doctor_id in doctor_ids:
+                busy = busy_bitmap(bookings.get((doctor_id, day), ()), day_start, total_slots)
+                fits = fitting_starts(busy, total_slots, needed_slots) & grid
+                candidates.extend((index, doctor_id) for index in lowest_bits(fits, remaining))
+            for index, doctor_id in heapq.nsmallest(remaining, candidates):
+                start = day_start + timedelta(minutes=index * SLOT_MINUTES)
+                results.append({
+                    'doctor_id': doctor_id,
+                    'date': day.isoformat(),
+                    'start': start.strftime('%H:%M'),
+                    'end': (start + duration).strftime('%H:%M')
+                })
+            day += timedelta(days=1)
+        return results
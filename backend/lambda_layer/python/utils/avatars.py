@@ -0,0 +1,62 @@
+"""
+Avatar renditions of profile images.
+Every uploaded profile image is rendered as small square avatars in each of
+AVATAR_SIZES and AVATAR_FORMATS (defined in utils.profile_images), stored
+under keys derived from the image key (profile_images.avatar_key), so lists
+of avatars download a few kilobytes per user instead of the original photo.
+Rendering runs in the S3 trigger on new profile images, off the request path.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import boto3
+from botocore.exceptions import ClientError
+
+from utils.image_optimizer import ImageOptimizer
+from utils.profile_images import AVATAR_FORMATS, AVATAR_SIZES, avatar_key, avatar_keys
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+AVATAR_CONTENT_TYPES = {'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+# Rendition keys are unique per upload, so browsers may keep them indefinitely
+AVATAR_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+def store_avatar_variants(bucket_name: str, key: str, image_data: bytes, s3=None) -> List[int]:
+    """
+    Render and store every avatar rendition of an uploaded image
+
+    Failures are logged, not raised: the original image is still served.
+
+    Returns:
+        list: Sizes stored in every format, empty when rendering failed
+    """
+    try:
+        variants = ImageOptimizer().create_avatar_variants(
+            image_data, AVATAR_SIZES, tuple(image_format.upper() for image_format in AVATAR_FORMATS))
+    except ValueError as e:
+        logger.warning(f"No avatars for {key}: {e}")
+        return []
+
+    s3 = s3 or boto3.client('s3')
+
+    def put(item):
+        (size, image_format), data = item
+        image_format = image_format.lower()
+        s3.put_object(Bucket=bucket_name, Key=avatar_key(key, size, image_format), Body=data,
+                      ContentType=AVATAR_CONTENT_TYPES[image_format], CacheControl=AVATAR_CACHE_CONTROL)
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(variants)) as executor:
+            list(executor.map(put, variants.items()))
+    except ClientError as e:
+        logger.warning(f"Could not store avatars for {key}: {e}")
+        return []
+    return list(AVATAR_SIZES)
+
+def delete_avatar_variants(bucket_name: str, key: str, s3=None) -> None:
+    """Delete every avatar rendition of an image in one request"""
+    s3 = s3 or boto3.client('s3')
+    s3.delete_objects(Bucket=bucket_name, Delete={
+        'Objects': [{'Key': variant_key} for variant_key in avatar_keys(key)], 'Quiet': True})
@@ -0,0 +1,273 @@
+"""
+Batch billing for completed appointments.
+Completed appointments without a billing record are read from Aurora a page at a
+time, priced from the services catalog and written to the billing table with
+BatchWriteItem, several 25-invoice chunks in parallel. Each invoice id is derived
+from its appointment id, so a chunk is idempotent: invoices that already exist are
+never rewritten or counted twice. Once a page's chunks are written, the rollups
+of the new invoices are applied in transactions that also flag each invoice
+rollupsApplied, conditioned on the flag being absent, and the appointments are
+marked billed in Aurora, dropping out of the next run's query (their cached
+agendas are invalidated, as they show billing_id). An interrupted run can be
+restarted over the same range: invoices it finds without rollupsApplied get
+their rollups applied then, and never twice.
+"""
+import time
+import uuid
+import logging
+from datetime import datetime
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from botocore.exceptions import ClientError
+
+from utils.db_utils import get_dynamodb_resource, get_item_by_id, transact_write_items, MAX_TRANSACTION_ITEMS
+from utils.rds_utils import get_unbilled_appointments, mark_appointments_billed
+from utils.billing_rollups import rollup_deltas, merge_rollup_deltas, rollup_update_operations
+from utils.availability import invalidate_doctor_day
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# BatchWriteItem takes at most 25 puts per call
+BATCH_CHUNK_SIZE = 25
+BATCH_PAGE_SIZE = 500
+BATCH_WORKERS = 4
+MAX_BATCH_RETRIES = 5
+# Invoice ids are uuid5(BILLING_ID_NAMESPACE, appointment id)
+BILLING_ID_NAMESPACE = uuid.UUID('6f1d3c52-8a0e-4c1b-9a57-2f4be0c1d9a3')
+
+def billing_id_for(appointment_id: str) -> str:
+    """Deterministic billing record id of an appointment's invoice"""
+    return str(uuid.uuid5(BILLING_ID_NAMESPACE, str(appointment_id)))
+
+def build_invoice(appointment: Dict[str, Any], service: Dict[str, Any], payment_method: str,
+                  timestamp: str) -> Dict[str, Any]:
+    """Build the billing record of a completed appointment, shaped like POST /billing's"""
+    price = Decimal(str(service.get('price') or 0))
+    return {
+        'id': billing_id_for(appointment['id']),
+        'patientId': appointment['patient_id'],
+        'appointmentId': appointment['id'],
+        'items': [{
+            'serviceId': service['id'],
+            'serviceName': service.get('name', 'Unknown Service'),
+            'quantity': 1,
+            'unitPrice': price,
+            'total': price
+        }],
+        'subtotal': price,
+        'tax': Decimal(0),
+        'discount': Decimal(0),
+        'total': price,
+        'paymentMethod': payment_method,
+        'paymentStatus': 'pending',
+        'notes': '',
+        'serviceDate': str(appointment.get('appointment_date')),
+        'source': 'batch',
+        'createdAt': timestamp,
+        'updatedAt': timestamp
+    }
+
+class BatchBillingJob:
+    """Generate invoices for the completed, unbilled appointments of a date range"""
+
+    def __init__(self, billing_table: str, get_service: Callable[[str], Optional[Dict[str, Any]]],
+                 rollups_table: Optional[str] = None, payment_method: str = 'invoice',
+                 workers: int = BATCH_WORKERS, page_size: int = BATCH_PAGE_SIZE,
+                 chunk_size: int = BATCH_CHUNK_SIZE, should_continue: Optional[Callable[[], bool]] = None):
+        """
+        Args:
+            billing_table: Billing table name
+            get_service: Returns a service (with price and name) by id, e.g. from the services catalog
+            rollups_table: Billing rollups table to keep in step, if configured
+            payment_method: paymentMethod of the generated invoices
+            workers: Chunks written in parallel
+            page_size: Appointments read from Aurora per page
+            chunk_size: Invoices per BatchWriteItem call (at most 25)
+            should_continue: Checked between pages; return False to stop early (e.g. near the Lambda timeout)
+        """
+        self.billing_table = billing_table
+        self.get_service = get_service
+        self.rollups_table = rollups_table
+        self.payment_method = payment_method
+        self.workers = workers
+        self.page_size = page_size
+        self.chunk_size = min(chunk_size, BATCH_CHUNK_SIZE)
+        self.should_continue = should_continue or (lambda: True)
+        # Low-level clients are thread-safe, unlike resources
+        self.client = get_dynamodb_resource().meta.client
+
+    def existing_invoices(self, billing_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return the invoices among billing_ids already in the billing table, by id"""
+        found = {}
+        request = {self.billing_table: {'Keys': [{'id': billing_id} for billing_id in billing_ids]}}
+        for attempt in range(MAX_BATCH_RETRIES + 1):
+            response = self.client.batch_get_item(RequestItems=request)
+            found.update((item['id'], item) for item in response.get('Responses', {}).get(self.billing_table, []))
+            request = response.get('UnprocessedKeys') or {}
+            if not request:
+                return found
+            time.sleep(0.05 * 2 ** attempt)
+        raise RuntimeError(f"Billing lookups still unprocessed after {MAX_BATCH_RETRIES} retries")
+
+    def put_invoices(self, invoices: List[Dict[str, Any]]) -> None:
+        """BatchWriteItem the invoices, retrying unprocessed items with backoff"""
+        request = {self.billing_table: [{'PutRequest': {'Item': invoice}} for invoice in invoices]}
+        for attempt in range(MAX_BATCH_RETRIES + 1):
+            response = self.client.batch_write_item(RequestItems=request)
+            request = response.get('UnprocessedItems') or {}
+            if not request:
+                return
+            time.sleep(0.05 * 2 ** attempt)
+        raise RuntimeError(f"Invoice writes still unprocessed after {MAX_BATCH_RETRIES} retries")
+
+    def write_chunk(self, invoices: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Write one chunk of invoices, skipping the ones a previous run already wrote
+
+        Returns:
+            tuple: The invoices this call created, and the already written ones
+                whose rollups were never applied (the run writing them was cut short)
+        """
+        existing = self.existing_invoices([invoice['id'] for invoice in invoices])
+        new_invoices = [invoice for invoice in invoices if invoice['id'] not in existing]
+        if new_invoices:
+            self.put_invoices(new_invoices)
+        unapplied = []
+        if self.rollups_table:
+            unapplied = [invoice for invoice in existing.values() if not invoice.get('rollupsApplied')]
+        return new_invoices, unapplied
+
+    def rollup_groups(self, invoices: List[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        """Split invoices into groups whose flags and merged rollup updates fit in one transaction"""
+        group, keys = [], set()
+        for invoice in invoices:
+            invoice_keys = set(rollup_deltas(invoice))
+            if group and len(group) + 1 + len(keys | invoice_keys) > MAX_TRANSACTION_ITEMS:
+                yield group
+                group, keys = [], set()
+            group.append(invoice)
+            keys |= invoice_keys
+        if group:
+            yield group
+
+    def apply_rollups(self, invoices: List[Dict[str, Any]]) -> None:
+        """
+        Apply the rollups of invoices, flagging each one rollupsApplied in the same transaction
+
+        Each flag is conditioned on being absent, so an invoice whose rollups are
+        already in (a concurrent run, or an update that counted it) cancels the
+        transaction; it is dropped from its group and the rest is retried.
+        """
+        for group in self.rollup_groups(invoices):
+            for attempt in range(MAX_BATCH_RETRIES + 1):
+                operations = [{'Update': {
+                    'TableName': self.billing_table,
+                    'Key': {'id': invoice['id']},
+                    'UpdateExpression': 'SET rollupsApplied = :applied',
+                    'ConditionExpression': 'attribute_exists(id) AND attribute_not_exists(rollupsApplied)',
+                    'ExpressionAttributeValues': {':applied': True}
+                }} for invoice in group]
+                deltas = merge_rollup_deltas(rollup_deltas(invoice, created=True) for invoice in group)
+                operations.extend(rollup_update_operations(deltas, self.rollups_table))
+                try:
+                    transact_write_items(operations)
+                    break
+                except ClientError as e:
+                    if e.response.get('Error', {}).get('Code') != 'TransactionCanceledException':
+                        raise
+                    reasons = e.response.get('CancellationReasons') or []
+                    counted = {invoice['id'] for invoice, reason in zip(group, reasons)
+                               if reason.get('Code') == 'ConditionalCheckFailed'}
+                    if counted:
+                        group = [invoice for invoice in group if invoice['id'] not in counted]
+                        if not group:
+                            break
+                    else:
+                        # Contended by another writer of the same rollup items
+                        time.sleep(0.05 * 2 ** attempt)
+            else:
+                raise RuntimeError(f"Rollup transaction still cancelled after {MAX_BATCH_RETRIES} retries")
+
+    def run(self, start_date: str, end_date: str) -> Dict[str, Any]:
+        """
+        Bill every completed, unbilled appointment starting in [start_date, end_date]
+
+        Returns:
+            dict: Counters, and whether every appointment was processed without failures
+        """
+        stats = {'appointments': 0, 'created': 0, 'already_billed': 0, 'rollups_resumed': 0, 'no_service': 0,
+                 'unknown_service': 0, 'failed': 0, 'pages': 0, 'complete': False}
+        after = None
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                if not self.should_continue():
+                    logger.info(f"Stopping batch billing early: {stats}")
+                    return stats
+
+                rows = get_unbilled_appointments(start_date, end_date, limit=self.page_size, after=after) or []
+                if not rows:
+                    break
+                after = (rows[-1]['start_at'], rows[-1]['id'])
+                stats['pages'] += 1
+                stats['appointments'] += len(rows)
+
+                timestamp = datetime.utcnow().isoformat() + "Z"
+                invoices = []
+                for row in rows:
+                    if not row.get('service_id'):
+                        stats['no_service'] += 1
+                        continue
+                    service = self.get_service(row['service_id'])
+                    if not service:
+                        stats['unknown_service'] += 1
+                        continue
+                    invoices.append(build_invoice(row, service, self.payment_method, timestamp))
+
+                chunks = [invoices[i:i + self.chunk_size] for i in range(0, len(invoices), self.chunk_size)]
+                futures = [(chunk, executor.submit(self.write_chunk, chunk)) for chunk in chunks]
+                billed, created, unapplied = {}, [], []
+                for chunk, future in futures:
+                    try:
+                        new_invoices, chunk_unapplied = future.result()
+                    except Exception as e:
+                        # Left unbilled in Aurora, so the next run retries the chunk
+                        logger.error(f"Failed to write billing chunk of {len(chunk)} invoices: {e}")
+                        stats['failed'] += len(chunk)
+                        continue
+                    created.extend(new_invoices)
+                    unapplied.extend(chunk_unapplied)
+                    stats['created'] += len(new_invoices)
+                    stats['rollups_resumed'] += len(chunk_unapplied)
+                    stats['already_billed'] += len(chunk) - len(new_invoices)
+                    billed.update({invoice['appointmentId']: invoice['id'] for invoice in chunk})
+
+                # Flags and deltas commit together: a run cut short leaves invoices
+                # without the flag and without their counts, and the re-run applies them
+                pending = created + unapplied
+                if pending and self.rollups_table:
+                    self.apply_rollups(pending)
+                # Aurora work stays on this thread; the connection is not shared across threads
+                mark_appointments_billed(billed)
+                # Cached agendas carry billing_id
+                for doctor_id, day in {(row.get('doctor_id'), str(row.get('appointment_date')))
+                                       for row in rows if row['id'] in billed}:
+                    invalidate_doctor_day(doctor_id, day)
+                logger.info(f"Batch billing page {stats['pages']} done: {stats}")
+
+                if len(rows) < self.page_size:
+                    break
+
+        stats['complete'] = stats['failed'] == 0
+        return stats
+
+def catalog_service_lookup(catalog, services_table: str) -> Callable[[str], Optional[Dict[str, Any]]]:
+    """Look services up in a ServicesCatalog, falling back to GetItem when it is too large to cache"""
+    def get_service(service_id: str) -> Optional[Dict[str, Any]]:
+        catalog.ensure_loaded(services_table)
+        if catalog.is_loaded:
+            return catalog.get(service_id)
+        return get_item_by_id(services_table, service_id)
+    return get_service
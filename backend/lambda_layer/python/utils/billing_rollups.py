@@ -0,0 +1,270 @@
+"""
+Incremental revenue rollups for billing records.
+Every billing write also adds its contribution to a handful of counter items in
+the rollups table - one per day, per day and service, and per day and payment
+status - using DynamoDB ADD updates inside the same transaction as the billing
+write. Summaries over a date range then read O(days) rollup items instead of
+scanning every invoice.
+
+Rollup items are keyed PK = 'ROLLUP#YYYY-MM', SK = 'YYYY-MM-DD#TOTAL',
+'YYYY-MM-DD#SERVICE#<serviceId>' or 'YYYY-MM-DD#STATUS#<paymentStatus>', so a
+month of rollups is a single Query partition.
+
+The same table holds one running balance item per patient (PK = 'BALANCE#<patientId>',
+SK = 'BALANCE') with billed, paid and outstanding amounts, maintained by the same
+transactions, so what a patient owes is a single GetItem.
+"""
+import os
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from boto3.dynamodb.conditions import Key
+
+from utils.db_utils import get_dynamodb_resource, DecimalEncoder
+
+# Attributes summed on the daily TOTAL item
+TOTAL_FIELDS = ('invoices', 'subtotal', 'tax', 'discount', 'total')
+# Longest range a summary may cover
+MAX_SUMMARY_DAYS = 366
+# Payment statuses that settle an invoice, and ones that take it off the patient's balance
+PAID_STATUSES = ('paid',)
+VOID_STATUSES = ('cancelled', 'void')
+BALANCE_SORT_KEY = 'BALANCE'
+BALANCE_FIELDS = ('invoices', 'billed', 'paid', 'outstanding')
+
+def get_rollups_table_name():
+    """Return the rollups table name, or None when rollups are not configured"""
+    return os.environ.get('BILLING_ROLLUPS_TABLE')
+
+def _decimal(value):
+    if value is None:
+        return Decimal(0)
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+def rollup_day(billing):
+    """The day a billing record counts towards: the date it was created"""
+    return (billing.get('createdAt') or datetime.utcnow().isoformat())[:10]
+
+def rollup_key(day, dimension, value=None):
+    """Build the PK/SK of a rollup item"""
+    sort_key = f"{day}#{dimension}" if value is None else f"{day}#{dimension}#{value}"
+    return {'PK': f"ROLLUP#{day[:7]}", 'SK': sort_key}
+
+def balance_key(patient_id):
+    """Build the PK/SK of a patient's balance item"""
+    return {'PK': f"BALANCE#{patient_id}", 'SK': BALANCE_SORT_KEY}
+
+def balance_amounts(billing):
+    """What a billing record adds to its patient's balance"""
+    status = (billing.get('paymentStatus') or 'pending').lower()
+    if status in VOID_STATUSES:
+        return {field: Decimal(0) for field in BALANCE_FIELDS}
+    billed = _decimal(billing.get('total'))
+    paid = billed if status in PAID_STATUSES else Decimal(0)
+    return {'invoices': Decimal(1), 'billed': billed, 'paid': paid, 'outstanding': billed - paid}
+
+def rollup_deltas(billing, sign=1, created=False):
+    """
+    Compute the counters a billing record contributes to its rollup and balance items
+
+    Args:
+        billing (dict): Billing record
+        sign (int): 1 to add the record, -1 to take it away
+        created (bool): The record is new, so it becomes the patient's last invoice
+
+    Returns:
+        dict: {item key: {'key': PK/SK dict, 'counters': {attribute: Decimal}, 'labels': {attribute: value}}}
+    """
+    day = rollup_day(billing)
+    deltas = {}
+
+    def add(dimension, value, counters, labels=None):
+        key = rollup_key(day, dimension, value)
+        entry = deltas.setdefault(key['SK'], {'key': key, 'counters': {}, 'labels': {'day': day, 'dimension': dimension.lower()}})
+        for name, amount in counters.items():
+            entry['counters'][name] = entry['counters'].get(name, Decimal(0)) + sign * _decimal(amount)
+        entry['labels'].update(labels or {})
+
+    add('TOTAL', None, {
+        'invoices': 1,
+        'subtotal': billing.get('subtotal'),
+        'tax': billing.get('tax'),
+        'discount': billing.get('discount'),
+        'total': billing.get('total')
+    })
+    status = billing.get('paymentStatus') or 'pending'
+    add('STATUS', status, {'invoices': 1, 'total': billing.get('total')}, {'paymentStatus': status})
+    for item in billing.get('items') or []:
+        service_id = item.get('serviceId')
+        add('SERVICE', service_id, {'quantity': item.get('quantity', 1), 'amount': item.get('total')},
+            {'serviceId': service_id, 'serviceName': item.get('serviceName', 'Unknown Service')})
+
+    patient_id = billing.get('patientId')
+    if patient_id:
+        key = balance_key(patient_id)
+        labels = {'patientId': patient_id, 'dimension': 'balance'}
+        if created:
+            labels['lastInvoiceDate'] = billing.get('createdAt')
+        deltas[f"{key['PK']}#{key['SK']}"] = {
+            'key': key,
+            'counters': {name: sign * amount for name, amount in balance_amounts(billing).items()},
+            'labels': labels
+        }
+    return deltas
+
+def diff_rollup_deltas(old_billing, new_billing):
+    """Counters that move a rollup from old_billing's contribution to new_billing's, without no-op items"""
+    deltas = rollup_deltas(new_billing)
+    for sort_key, entry in rollup_deltas(old_billing, sign=-1).items():
+        target = deltas.setdefault(sort_key, {'key': entry['key'], 'counters': {}, 'labels': entry['labels']})
+        for name, amount in entry['counters'].items():
+            target['counters'][name] = target['counters'].get(name, Decimal(0)) + amount
+
+    changed = {}
+    for sort_key, entry in deltas.items():
+        counters = {name: amount for name, amount in entry['counters'].items() if amount != 0}
+        if counters:
+            changed[sort_key] = dict(entry, counters=counters)
+    return changed
+
+def rollup_update_operations(deltas, table_name=None):
+    """
+    Turn rollup deltas into TransactWriteItems Update operations using ADD counters
+
+    Args:
+        deltas (dict): Output of rollup_deltas or diff_rollup_deltas
+        table_name (str): Rollups table. Defaults to BILLING_ROLLUPS_TABLE.
+
+    Returns:
+        list: Operations for db_utils.transact_write_items
+    """
+    table_name = table_name or get_rollups_table_name()
+    timestamp = datetime.utcnow().isoformat() + "Z"
+    operations = []
+    for entry in deltas.values():
+        names, values, adds, sets = {}, {':updatedAt': timestamp}, [], ['#updatedAt = :updatedAt']
+        names['#updatedAt'] = 'updatedAt'
+        for i, (name, amount) in enumerate(entry['counters'].items()):
+            names[f"#c{i}"] = name
+            values[f":c{i}"] = amount
+            adds.append(f"#c{i} :c{i}")
+        for i, (name, label) in enumerate(entry['labels'].items()):
+            names[f"#l{i}"] = name
+            values[f":l{i}"] = label
+            sets.append(f"#l{i} = :l{i}")
+        operations.append({'Update': {
+            'TableName': table_name,
+            'Key': entry['key'],
+            'UpdateExpression': f"ADD {', '.join(adds)} SET {', '.join(sets)}",
+            'ExpressionAttributeNames': names,
+            'ExpressionAttributeValues': values
+        }})
+    return operations
+
+def merge_rollup_deltas(deltas_list):
+    """Combine the deltas of several billing records into one update per rollup item"""
+    merged = {}
+    for deltas in deltas_list:
+        for item_key, entry in deltas.items():
+            target = merged.setdefault(item_key, {'key': entry['key'], 'counters': {}, 'labels': {}})
+            for name, amount in entry['counters'].items():
+                target['counters'][name] = target['counters'].get(name, Decimal(0)) + amount
+            target['labels'].update(entry['labels'])
+    return merged
+
+def apply_rollup_deltas(deltas, table_name=None):
+    """
+    Apply rollup deltas outside a transaction, one UpdateItem per rollup item
+
+    For bulk writers that cannot put their records and the rollups in one
+    transaction; merge the deltas of a batch first so each item is updated once.
+    """
+    client = get_dynamodb_resource().meta.client
+    for operation in rollup_update_operations(deltas, table_name):
+        client.update_item(**operation['Update'])
+
+def get_patient_balance(patient_id, table_name=None):
+    """
+    Read a patient's running balance with a single GetItem
+
+    Returns:
+        dict: Balance figures (all zero for a patient without invoices)
+    """
+    table = get_dynamodb_resource().Table(table_name or get_rollups_table_name())
+    item = table.get_item(Key=balance_key(patient_id)).get('Item') or {}
+    balance = {'patientId': patient_id, 'lastInvoiceDate': item.get('lastInvoiceDate'), 'updatedAt': item.get('updatedAt')}
+    balance.update({field: item.get(field, Decimal(0)) for field in BALANCE_FIELDS})
+    return json.loads(json.dumps(balance, cls=DecimalEncoder))
+
+def _months(start, end):
+    month = date(start.year, start.month, 1)
+    while month <= end:
+        yield month.strftime('%Y-%m')
+        month = (month + timedelta(days=32)).replace(day=1)
+
+def query_rollups(start, end, table_name=None):
+    """
+    Read every rollup item for the days in [start, end]
+
+    Args:
+        start (date): First day
+        end (date): Last day, inclusive
+
+    Returns:
+        list: Rollup items, in day order
+    """
+    table = get_dynamodb_resource().Table(table_name or get_rollups_table_name())
+    items = []
+    for month in _months(start, end):
+        params = {
+            # '$' sorts after '#', so the upper bound covers every SK of the last day
+            'KeyConditionExpression': Key('PK').eq(f"ROLLUP#{month}") & Key('SK').between(
+                f"{start.isoformat()}#", f"{end.isoformat()}$")
+        }
+        while True:
+            response = table.query(**params)
+            items.extend(response.get('Items', []))
+            if 'LastEvaluatedKey' not in response:
+                break
+            params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return items
+
+def summarize_rollups(items, start, end):
+    """
+    Fold rollup items into a revenue summary
+
+    Returns:
+        dict: Totals, per-day totals, per-service and per-payment-status figures
+    """
+    totals = {field: Decimal(0) for field in TOTAL_FIELDS}
+    days, services, statuses = {}, {}, {}
+
+    for item in items:
+        dimension = item.get('dimension')
+        if dimension == 'total':
+            day = {field: item.get(field, Decimal(0)) for field in TOTAL_FIELDS}
+            days[item['day']] = day
+            for field in TOTAL_FIELDS:
+                totals[field] += day[field]
+        elif dimension == 'service':
+            service = services.setdefault(item['serviceId'], {
+                'serviceId': item['serviceId'], 'serviceName': item.get('serviceName'),
+                'quantity': Decimal(0), 'amount': Decimal(0)})
+            service['quantity'] += item.get('quantity', Decimal(0))
+            service['amount'] += item.get('amount', Decimal(0))
+        elif dimension == 'status':
+            status = statuses.setdefault(item['paymentStatus'], {'invoices': Decimal(0), 'total': Decimal(0)})
+            status['invoices'] += item.get('invoices', Decimal(0))
+            status['total'] += item.get('total', Decimal(0))
+
+    summary = {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'totals': totals,
+        'days': [dict(date=day, **days[day]) for day in sorted(days)],
+        'byService': sorted(services.values(), key=lambda service: service['amount'], reverse=True),
+        'byStatus': statuses
+    }
+    # Drop Decimal types so callers can serialize it with or without DecimalEncoder
+    return json.loads(json.dumps(summary, cls=DecimalEncoder))
@@ -0,0 +1,219 @@
+"""
+Bulk Cognito user administration.
+Creating, enabling, disabling or deleting many users fans the admin calls out
+over a bounded thread pool. Every call first takes a token from the bucket of
+its Cognito quota category, so the pool runs at the quota ceiling instead of
+bursting past it; a TooManyRequestsException empties the bucket (slowing every
+worker, not just the throttled one) and the call is retried with jittered
+exponential backoff. Each user gets its own result, in input order.
+
+Cognito quotas are per account and region, so the bulk function should run
+with a reserved concurrency of 1 and the rates leave headroom for the
+single-user handlers.
+"""
+import os
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from utils.user_directory import normalize_user
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+ACTIONS = ('create', 'enable', 'disable', 'delete')
+MAX_BULK_USERS = 250
+BULK_WORKERS = 8
+MAX_THROTTLE_RETRIES = 5
+THROTTLE_BASE_DELAY = 0.1
+# Default Cognito quotas (requests per second) of the categories the admin calls fall in
+COGNITO_QUOTAS = {
+    'UserCreation': float(os.environ.get('COGNITO_USER_CREATION_RPS', 50)),
+    'UserUpdate': float(os.environ.get('COGNITO_USER_UPDATE_RPS', 25))
+}
+# Share of each quota the bulk operations may use
+QUOTA_SHARE = 0.9
+ALLOWED_ROLES = ('admin', 'doctor', 'frontdesk')
+REQUIRED_CREATE_FIELDS = ('username', 'password', 'firstName', 'lastName', 'role')
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> None:
+        """Take one token, sleeping until one is available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def drain(self) -> None:
+        """Drop every banked token after a throttle so all callers slow down together"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0)
+
+def _default_buckets() -> Dict[str, TokenBucket]:
+    return {category: TokenBucket(rate * QUOTA_SHARE) for category, rate in COGNITO_QUOTAS.items()}
+
+# Shared by every invocation served by this container
+_buckets = _default_buckets()
+
+def _is_throttle(error: Exception) -> bool:
+    return isinstance(error, ClientError) and \
+        error.response.get('Error', {}).get('Code') == 'TooManyRequestsException'
+
+def _error_message(error: Exception) -> str:
+    if isinstance(error, ClientError):
+        details = error.response.get('Error', {})
+        return f"{details.get('Code', 'UnknownError')}: {details.get('Message', str(error))}"
+    return str(error)
+
+def validate_create_spec(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Check a user to create and standardize its role, as POST /users does
+
+    Raises:
+        ValueError: A required field is missing or the role is not allowed
+    """
+    missing = [field for field in REQUIRED_CREATE_FIELDS if not spec.get(field)]
+    if missing:
+        raise ValueError(f"Missing required fields: {', '.join(missing)}")
+    role = 'frontdesk' if spec['role'] == 'receptionist' else spec['role']
+    if role not in ALLOWED_ROLES:
+        raise ValueError(f"Invalid role specified. Allowed roles: {', '.join(ALLOWED_ROLES)}")
+    return dict(spec, role=role)
+
+def user_attributes(spec: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Cognito attributes of a user to create"""
+    attributes = []
+    if spec.get('email'):
+        attributes.append({'Name': 'email', 'Value': spec['email']})
+        attributes.append({'Name': 'email_verified', 'Value': 'true'})
+    for field, name in (('firstName', 'given_name'), ('lastName', 'family_name'), ('phone', 'phone_number')):
+        if spec.get(field):
+            attributes.append({'Name': name, 'Value': spec[field]})
+    attributes.append({'Name': 'custom:role', 'Value': spec['role']})
+    return attributes
+
+class BulkUserAdmin:
+    """Runs one admin action for many users through a rate-limited thread pool."""
+
+    def __init__(self, user_pool_id: str, cognito=None, workers: int = BULK_WORKERS,
+                 buckets: Optional[Dict[str, TokenBucket]] = None,
+                 should_continue: Optional[Callable[[], bool]] = None):
+        """
+        Args:
+            user_pool_id: Cognito user pool
+            cognito: cognito-idp client (its own retries are disabled by default so throttles reach the limiter)
+            workers: Concurrent admin calls
+            buckets: Token bucket per quota category (defaults to the container's shared buckets)
+            should_continue: Callable returning False once no more users should be started
+        """
+        self.user_pool_id = user_pool_id
+        self.cognito = cognito or boto3.client(
+            'cognito-idp', config=Config(retries={'mode': 'standard', 'max_attempts': 1}))
+        self.workers = workers
+        self.buckets = buckets if buckets is not None else _buckets
+        self.should_continue = should_continue or (lambda: True)
+
+    def call(self, category: str, operation: str, **params) -> Dict[str, Any]:
+        """Make one rate-limited Cognito call, retrying throttled attempts with backoff"""
+        bucket = self.buckets[category]
+        for attempt in range(MAX_THROTTLE_RETRIES + 1):
+            bucket.acquire()
+            try:
+                return getattr(self.cognito, operation)(UserPoolId=self.user_pool_id, **params)
+            except ClientError as e:
+                if not _is_throttle(e) or attempt == MAX_THROTTLE_RETRIES:
+                    raise
+                bucket.drain()
+                delay = random.uniform(0, THROTTLE_BASE_DELAY * 2 ** attempt)
+                logger.info(f"{operation} throttled (attempt {attempt + 1}); retrying in {delay:.2f}s")
+                time.sleep(delay)
+
+    def create(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a user with a permanent password; returns the change to publish"""
+        spec = validate_create_spec(spec)
+        result = self.call('UserCreation', 'admin_create_user', Username=spec['username'],
+                           TemporaryPassword=spec['password'], UserAttributes=user_attributes(spec),
+                           MessageAction='SUPPRESS')
+        self.call('UserUpdate', 'admin_set_user_password', Username=spec['username'],
+                  Password=spec['password'], Permanent=True)
+        user = normalize_user(result['User'])
+        user['userStatus'] = 'CONFIRMED'
+        return {'username': user['username'], 'user': user}
+
+    def enable(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        self.call('UserUpdate', 'admin_enable_user', Username=spec['username'])
+        return {'username': spec['username'], 'fields': {'enabled': True}}
+
+    def disable(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        self.call('UserUpdate', 'admin_disable_user', Username=spec['username'])
+        return {'username': spec['username'], 'fields': {'enabled': False}}
+
+    def delete(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        self.call('UserUpdate', 'admin_delete_user', Username=spec['username'])
+        return {'username': spec['username'], 'deleted': True}
+
+    def _run_one(self, action: str, spec: Dict[str, Any]) -> Dict[str, Any]:
+        if not self.should_continue():
+            return {'status': 'skipped', 'error': 'Not attempted: time limit reached; resubmit this user'}
+        try:
+            change = getattr(self, action)(spec)
+            return {'status': 'succeeded', 'change': change}
+        except Exception as e:
+            logger.warning(f"Bulk {action} failed for {spec.get('username')}: {_error_message(e)}")
+            return {'status': 'failed', 'error': _error_message(e)}
+
+    def run(self, action: str, specs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Apply action to every user
+
+        Args:
+            action: One of ACTIONS
+            specs: Users; 'username' for every action, plus the POST /users fields for create
+
+        Returns:
+            dict: Counts, per-user results in input order and the changes to publish
+        """
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown action: {action}")
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            outcomes = list(executor.map(lambda spec: self._run_one(action, spec), specs))
+
+        results, changes = [], []
+        counts = {'succeeded': 0, 'failed': 0, 'skipped': 0}
+        for index, (spec, outcome) in enumerate(zip(specs, outcomes)):
+            counts[outcome['status']] += 1
+            result = {'index': index, 'username': spec.get('username'), 'status': outcome['status']}
+            if 'error' in outcome:
+                result['error'] = outcome['error']
+            if 'change' in outcome:
+                changes.append(outcome['change'])
+                if outcome['change'].get('user'):
+                    result['user'] = outcome['change']['user']
+            results.append(result)
+        return {'action': action, 'requested': len(specs), **counts, 'results': results, 'changes': changes}
@@ -0,0 +1,177 @@
+"""
+In-process caching primitives shared by Lambda handlers.
+Entries live for the lifetime of a warm container, so every cache is bounded
+by entry count, approximate size in bytes and a per-entry TTL.
+"""
+import json
+import time
+import decimal
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+# Sentinel returned by LRUCache.get on a miss, so that None can be cached
+MISSING = object()
+
+def _json_default(o):
+    if isinstance(o, decimal.Decimal):
+        return float(o)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    return str(o)
+
+def estimate_size(value: Any) -> int:
+    """
+    Approximate the in-memory footprint of a cached value
+
+    Args:
+        value: Value to be cached
+
+    Returns:
+        int: Size in bytes of the value's JSON encoding (or raw length for bytes/str)
+    """
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    try:
+        return len(json.dumps(value, default=_json_default))
+    except (TypeError, ValueError):
+        return 256
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with per-entry TTL and entry/byte bounds.
+
+    Hit, miss and eviction counters are kept so handlers can log hit rates.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024,
+                 default_ttl: float = 300, name: str = 'cache'):
+        """
+        Args:
+            max_entries: Maximum number of entries held
+            max_bytes: Maximum approximate total size of the cached values
+            default_ttl: TTL in seconds used when set() is not given one
+            name: Label used in stats/log output
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        # key -> (value, expires_at, size), least recently used first
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, record=False) is not MISSING
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: Hashable, record: bool = True) -> Any:
+        """
+        Return the cached value for key, or MISSING if absent or expired
+
+        Args:
+            key: Cache key
+            record: Whether to count this lookup in the hit/miss statistics
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if record:
+                    self.misses += 1
+                return MISSING
+            value, expires_at, size = entry
+            if expires_at <= now:
+                self._remove(key)
+                self.expirations += 1
+                if record:
+                    self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            if record:
+                self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, size: Optional[int] = None) -> bool:
+        """
+        Store a value, evicting least recently used entries to stay within bounds
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Time to live in seconds (defaults to default_ttl)
+            size: Precomputed size in bytes (estimated when omitted)
+
+        Returns:
+            bool: False if the value alone exceeds max_bytes and was not cached
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return False
+        size = estimate_size(value) if size is None else size
+        if size > self.max_bytes:
+            return False
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.time() + ttl, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def keys(self) -> list:
+        """Snapshot of the current keys, least recently used first."""
+        with self._lock:
+            return list(self._entries)
+
+    def delete(self, key: Hashable) -> bool:
+        """Remove a key. Returns True if it was present."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                return True
+            return False
+
+    def clear(self) -> None:
+        """Drop every entry (statistics are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def reset_stats(self) -> None:
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current occupancy."""
+        lookups = self.hits + self.misses
+        return {
+            'name': self.name,
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
@@ -0,0 +1,340 @@
+"""
+Pluggable cache tier shared by Lambda handlers.
+The default backend is an in-process LRU; setting REDIS_URL switches to a
+Redis/ElastiCache backend shared by every container. Values are stored as
+compact binary (msgpack when available, zlib-compressed JSON otherwise) and
+SharedCache.get_or_load adds stampede protection: a single-flight lock around
+loads and stale-while-revalidate once an entry's fresh period has passed.
+"""
+import os
+import json
+import time
+import uuid
+import zlib
+import struct
+import decimal
+import logging
+import threading
+from datetime import date, datetime
+from typing import Any, Callable, Optional
+
+from utils.cache import LRUCache, MISSING
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; fall back to zlib-compressed JSON
+    msgpack = None
+
+try:
+    import redis
+except ImportError:  # redis is only needed when REDIS_URL is configured
+    redis = None
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_TTL_SECONDS = 300
+DEFAULT_STALE_SECONDS = 60
+LOCK_TTL_SECONDS = 10
+LOCK_WAIT_SECONDS = 2.0
+_LOCAL_LOCK_STRIPES = 64
+# Deletes KEYS[1] only while it still holds ARGV[1], in one atomic step
+_COMPARE_AND_DELETE = (
+    "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+)
+
+# Serialization
+#
+# Wire format: 1 tag byte, 8-byte big-endian float "fresh until" timestamp, payload.
+_TAG_MSGPACK = b'm'
+_TAG_ZLIB_JSON = b'z'
+_HEADER = struct.Struct('>d')
+_DECIMAL_EXT = 1
+
+def _msgpack_default(o):
+    if isinstance(o, decimal.Decimal):
+        return msgpack.ExtType(_DECIMAL_EXT, str(o).encode('ascii'))
+    if isinstance(o, (datetime, date)):
+        return str(o)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    raise TypeError(f"Cannot serialize {type(o).__name__}")
+
+def _msgpack_ext_hook(code, data):
+    if code == _DECIMAL_EXT:
+        return decimal.Decimal(data.decode('ascii'))
+    return msgpack.ExtType(code, data)
+
+def _json_default(o):
+    if isinstance(o, decimal.Decimal):
+        return int(o) if o % 1 == 0 else float(o)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    # datetimes become str(o), matching json.dumps(..., default=str) in the handlers
+    return str(o)
+
+def dumps(value: Any, fresh_until: float = 0.0) -> bytes:
+    """Serialize a value and its fresh-until timestamp into the cache wire format."""
+    header = _HEADER.pack(fresh_until)
+    if msgpack is not None:
+        return _TAG_MSGPACK + header + msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+    payload = json.dumps(value, default=_json_default, separators=(',', ':')).encode('utf-8')
+    return _TAG_ZLIB_JSON + header + zlib.compress(payload)
+
+def loads(data: bytes):
+    """
+    Decode a value written by dumps()
+
+    Returns:
+        tuple: (value, fresh_until)
+    """
+    tag, (fresh_until,), payload = data[:1], _HEADER.unpack(data[1:9]), data[9:]
+    if tag == _TAG_MSGPACK:
+        if msgpack is None:
+            raise ValueError("msgpack-encoded cache entry but msgpack is not installed")
+        return msgpack.unpackb(payload, ext_hook=_msgpack_ext_hook, raw=False), fresh_until
+    if tag == _TAG_ZLIB_JSON:
+        return json.loads(zlib.decompress(payload), parse_float=decimal.Decimal), fresh_until
+    raise ValueError(f"Unknown cache entry encoding: {tag!r}")
+
+# Backends
+
+class CacheBackend:
+    """Minimal byte-oriented key/value interface every cache tier implements."""
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        """Set key only if it does not exist. Returns True if it was set."""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def delete_if_equals(self, key: str, value: bytes) -> None:
+        """Delete key only if it still holds value (used to release locks)."""
+        if self.get(key) == value:
+            self.delete(key)
+
+class LocalCacheBackend(CacheBackend):
+    """In-process backend on top of LRUCache."""
+
+    def __init__(self, cache: Optional[LRUCache] = None):
+        self.cache = cache or LRUCache(name='shared-local')
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self.cache.get(key)
+        return None if value is MISSING else value
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.cache.set(key, value, ttl=ttl, size=len(value))
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        with self._lock:
+            if self.cache.get(key, record=False) is not MISSING:
+                return False
+            self.cache.set(key, value, ttl=ttl, size=len(value))
+            return True
+
+    def delete(self, key: str) -> None:
+        self.cache.delete(key)
+
+    def delete_if_equals(self, key: str, value: bytes) -> None:
+        with self._lock:
+            if self.cache.get(key, record=False) == value:
+                self.cache.delete(key)
+
+class RedisCacheBackend(CacheBackend):
+    """Backend for Redis or ElastiCache (Redis OSS / Valkey)."""
+
+    def __init__(self, client=None, url: Optional[str] = None):
+        """
+        Args:
+            client: Existing redis client (or compatible fake)
+            url: Connection URL used to build a client when none is given
+        """
+        if client is None:
+            if redis is None:
+                raise ImportError("redis package is required for RedisCacheBackend")
+            client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.client = client
+        self._compare_and_delete = client.register_script(_COMPARE_AND_DELETE)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.client.set(key, value, px=max(1, int(ttl * 1000)))
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        return bool(self.client.set(key, value, px=max(1, int(ttl * 1000)), nx=True))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(key)
+
+    def delete_if_equals(self, key: str, value: bytes) -> None:
+        # A GET then DEL could drop a lock that expired and was re-acquired in between
+        self._compare_and_delete(keys=[key], args=[value])
+
+_backend: Optional[CacheBackend] = None
+
+def get_cache_backend() -> CacheBackend:
+    """
+    Return the process-wide backend: Redis when REDIS_URL is set and the redis
+    package is available, the in-process LRU otherwise
+    """
+    global _backend
+    if _backend is None:
+        url = os.environ.get('REDIS_URL')
+        if url and redis is not None:
+            _backend = RedisCacheBackend(url=url)
+        else:
+            if url:
+                logger.warning("REDIS_URL is set but the redis package is not installed; using local cache")
+            _backend = LocalCacheBackend()
+    return _backend
+
+def set_cache_backend(backend: Optional[CacheBackend]) -> None:
+    """Replace the process-wide backend (None resets it to be rebuilt from the environment)."""
+    global _backend
+    _backend = backend
+
+# Stampede-protected read-through cache
+
+class SharedCache:
+    """
+    Namespaced read-through cache over a CacheBackend.
+
+    Entries are fresh for `ttl` seconds and kept `stale_ttl` seconds longer.
+    A stale entry is still returned to everyone except the one caller that wins
+    the refresh lock and reloads it. On a cold miss only the lock holder loads;
+    other callers wait briefly for its result before loading themselves.
+    Backend errors never fail a read: the loader is called directly instead.
+    """
+
+    def __init__(self, namespace: str, backend: Optional[CacheBackend] = None,
+                 ttl: float = DEFAULT_TTL_SECONDS, stale_ttl: float = DEFAULT_STALE_SECONDS):
+        """
+        Args:
+            namespace: Key prefix, e.g. 'services'
+            backend: CacheBackend to use (defaults to get_cache_backend())
+            ttl: Seconds an entry is served as fresh
+            stale_ttl: Extra seconds a stale entry may be served while it is refreshed
+        """
+        self.namespace = namespace
+        self._backend = backend
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._local_locks = [threading.Lock() for _ in range(_LOCAL_LOCK_STRIPES)]
+        self.loads = 0
+
+    @property
+    def backend(self) -> CacheBackend:
+        return self._backend if self._backend is not None else get_cache_backend()
+
+    def _key(self, key: str) -> str:
+        return f"clinnet:{self.namespace}:{key}"
+
+    def _local_lock(self, key: str) -> threading.Lock:
+        return self._local_locks[hash(key) % _LOCAL_LOCK_STRIPES]
+
+    def _read(self, full_key: str):
+        try:
+            data = self.backend.get(full_key)
+            return loads(data) if data is not None else None
+        except Exception as e:
+            logger.warning(f"Cache read failed for {full_key}: {e}")
+            return None
+
+    def _write(self, full_key: str, value: Any, ttl: float) -> None:
+        try:
+            self.backend.set(full_key, dumps(value, time.time() + ttl), ttl + self.stale_ttl)
+        except Exception as e:
+            logger.warning(f"Cache write failed for {full_key}: {e}")
+
+    def _acquire(self, lock_key: str, token: bytes) -> bool:
+        try:
+            return self.backend.add(lock_key, token, LOCK_TTL_SECONDS)
+        except Exception as e:
+            logger.warning(f"Cache lock failed for {lock_key}: {e}")
+            return True
+
+    def _release(self, lock_key: str, token: bytes) -> None:
+        try:
+            self.backend.delete_if_equals(lock_key, token)
+        except Exception as e:
+            logger.warning(f"Cache unlock failed for {lock_key}: {e}")
+
+    def _load(self, full_key: str, loader: Callable[[], Any], ttl: float) -> Any:
+        self.loads += 1
+        value = loader()
+        if value is not None:
+            self._write(full_key, value, ttl)
+        return value
+
+    def get(self, key: str) -> Any:
+        """Return the cached value (fresh or stale) or None."""
+        entry = self._read(self._key(key))
+        return entry[0] if entry is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._write(self._key(key), value, self.ttl if ttl is None else ttl)
+
+    def delete(self, key: str) -> None:
+        try:
+            self.backend.delete(self._key(key))
+        except Exception as e:
+            logger.warning(f"Cache delete failed for {self._key(key)}: {e}")
+
+    def get_or_load(self, key: str, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """
+        Return the cached value for key, calling loader at most once across
+        concurrent callers when it is missing or stale. None results are not cached.
+
+        Args:
+            key: Cache key within the namespace
+            loader: Zero-argument callable producing the value
+            ttl: Fresh period in seconds (defaults to the cache's ttl)
+        """
+        ttl = self.ttl if ttl is None else ttl
+        full_key = self._key(key)
+        lock_key = f"{full_key}:lock"
+
+        entry = self._read(full_key)
+        if entry is not None and entry[1] > time.time():
+            return entry[0]
+
+        token = uuid.uuid4().hex.encode('ascii')
+        with self._local_lock(full_key):
+            # Another thread in this container may have loaded it while we waited
+            entry = self._read(full_key)
+            if entry is not None and entry[1] > time.time():
+                return entry[0]
+
+            if entry is not None:
+                # Stale: one caller refreshes, everyone else keeps serving the old value
+                if not self._acquire(lock_key, token):
+                    return entry[0]
+                try:
+                    return self._load(full_key, loader, ttl)
+                finally:
+                    self._release(lock_key, token)
+
+            deadline = time.time() + LOCK_WAIT_SECONDS
+            while not self._acquire(lock_key, token):
+                time.sleep(0.05)
+                entry = self._read(full_key)
+                if entry is not None:
+                    return entry[0]
+                if time.time() >= deadline:
+                    logger.warning(f"Timed out waiting for {full_key} to be loaded elsewhere")
+                    return loader()
+            try:
+                return self._load(full_key, loader, ttl)
+            finally:
+                self._release(lock_key, token)
@@ -0,0 +1,205 @@
+"""
+Cross-container cache invalidation.
+Every cached entity type (services, a DynamoDB table, ...) has a version counter.
+Writers bump it; readers compare it with the version their cache was built from,
+reading the shared counter at most once per check interval. With the DynamoDB
+store this lets warm Lambda containers notice writes made by other containers
+within seconds, so their caches can use long TTLs.
+"""
+import os
+import time
+import logging
+import threading
+from typing import Dict, Iterable, Optional
+
+import boto3
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_CHECK_INTERVAL = float(os.environ.get('CACHE_VERSION_CHECK_SECONDS', '5'))
+# BatchGetItem reads at most 100 keys per call
+BATCH_GET_KEYS = 100
+MAX_BATCH_RETRIES = 5
+
+class InMemoryVersionStore:
+    """Process-local version store, used in tests and when no shared table is configured."""
+
+    is_shared = False
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, entity: str) -> int:
+        return self._versions.get(entity, 0)
+
+    def get_many(self, entities: Iterable[str]) -> Dict[str, int]:
+        return {entity: self._versions.get(entity, 0) for entity in entities}
+
+    def bump(self, entity: str) -> int:
+        with self._lock:
+            self._versions[entity] = self._versions.get(entity, 0) + 1
+            return self._versions[entity]
+
+class DynamoDBVersionStore:
+    """
+    Version counters stored as one item per entity in a DynamoDB table keyed on `entity`.
+
+    Goes through the resource's low-level client, which unlike the resource
+    itself is safe to share between the threads of a handler's worker pool.
+    """
+
+    is_shared = True
+
+    def __init__(self, table_name: str, dynamodb_resource=None):
+        self.table_name = table_name
+        self._client = (dynamodb_resource or boto3.resource('dynamodb')).meta.client
+
+    def get(self, entity: str) -> int:
+        response = self._client.get_item(TableName=self.table_name, Key={'entity': entity}, ConsistentRead=True)
+        return int(response.get('Item', {}).get('version', 0))
+
+    def get_many(self, entities: Iterable[str]) -> Dict[str, int]:
+        """Read several versions with BatchGetItem (one call per 100 entities)"""
+        entities = list(dict.fromkeys(entities))
+        versions = dict.fromkeys(entities, 0)
+        for start in range(0, len(entities), BATCH_GET_KEYS):
+            request = {self.table_name: {
+                'Keys': [{'entity': entity} for entity in entities[start:start + BATCH_GET_KEYS]],
+                'ConsistentRead': True
+            }}
+            for attempt in range(MAX_BATCH_RETRIES + 1):
+                response = self._client.batch_get_item(RequestItems=request)
+                for item in response.get('Responses', {}).get(self.table_name, []):
+                    versions[item['entity']] = int(item.get('version', 0))
+                request = response.get('UnprocessedKeys') or {}
+                if not request:
+                    break
+                time.sleep(0.05 * 2 ** attempt)
+            else:
+                raise RuntimeError(f"Cache versions still unprocessed after {MAX_BATCH_RETRIES} retries")
+        return versions
+
+    def bump(self, entity: str) -> int:
+        response = self._client.update_item(
+            TableName=self.table_name,
+            Key={'entity': entity},
+            UpdateExpression='ADD #version :one SET #updatedAt = :now',
+            ExpressionAttributeNames={'#version': 'version', '#updatedAt': 'updatedAt'},
+            ExpressionAttributeValues={':one': 1, ':now': int(time.time())},
+            ReturnValues='UPDATED_NEW'
+        )
+        return int(response['Attributes']['version'])
+
+class CacheVersionBus:
+    """
+    Rate-limited view of a version store.
+
+    `current()` returns the memoized version of an entity and only goes back to
+    the store once `check_interval` seconds have passed. If the store cannot be
+    reached the last known version is kept, so caches fall back to their TTLs.
+    """
+
+    def __init__(self, store=None, check_interval: float = DEFAULT_CHECK_INTERVAL):
+        """
+        Args:
+            store: InMemoryVersionStore or DynamoDBVersionStore (defaults to in-memory)
+            check_interval: Minimum seconds between two reads of the same entity
+        """
+        self.store = store or InMemoryVersionStore()
+        self.check_interval = check_interval
+        self._known: Dict[str, int] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def is_shared(self) -> bool:
+        return self.store.is_shared
+
+    def current(self, entity: str, force: bool = False) -> int:
+        """
+        Return the latest known version of entity
+
+        Args:
+            entity: Entity name, e.g. 'services'
+            force: Read the store even if it was checked recently
+        """
+        now = time.time()
+        if not force and now - self._checked_at.get(entity, 0.0) < self.check_interval:
+            return self._known.get(entity, 0)
+        try:
+            version = self.store.get(entity)
+        except ClientError as e:
+            logger.warning(f"Could not read cache version for {entity}: {e}")
+            version = self._known.get(entity, 0)
+        with self._lock:
+            self._known[entity] = max(version, self._known.get(entity, 0))
+            self._checked_at[entity] = now
+            return self._known[entity]
+
+    def current_many(self, entities: Iterable[str], force: bool = False) -> Dict[str, int]:
+        """
+        Return the latest known versions of several entities, reading the ones
+        due for a check from the store in one batch
+
+        Args:
+            entities: Entity names
+            force: Read every entity even if it was checked recently
+        """
+        entities = list(dict.fromkeys(entities))
+        now = time.time()
+        due = [entity for entity in entities
+               if force or now - self._checked_at.get(entity, 0.0) >= self.check_interval]
+        if due:
+            try:
+                read = self.store.get_many(due)
+            except (ClientError, RuntimeError) as e:
+                logger.warning(f"Could not read cache versions of {len(due)} entities: {e}")
+                read = {}
+            with self._lock:
+                for entity in due:
+                    self._known[entity] = max(read.get(entity, 0), self._known.get(entity, 0))
+                    self._checked_at[entity] = now
+        return {entity: self._known.get(entity, 0) for entity in entities}
+
+    def bump(self, entity: str) -> Optional[int]:
+        """
+        Announce a write to entity
+
+        Returns:
+            int: The new version, or None if the store could not be updated
+        """
+        try:
+            version = self.store.bump(entity)
+        except ClientError as e:
+            logger.error(f"Could not bump cache version for {entity}: {e}")
+            return None
+        with self._lock:
+            self._known[entity] = max(version, self._known.get(entity, 0))
+            self._checked_at[entity] = time.time()
+        return version
+
+_bus: Optional[CacheVersionBus] = None
+_bus_lock = threading.Lock()
+
+def get_version_bus() -> CacheVersionBus:
+    """
+    Return the process-wide bus, backed by CACHE_VERSIONS_TABLE when it is set
+    and by an in-memory store otherwise
+    """
+    global _bus
+    if _bus is None:
+        # Handlers may first reach the bus from worker threads
+        with _bus_lock:
+            if _bus is None:
+                table_name = os.environ.get('CACHE_VERSIONS_TABLE')
+                store = DynamoDBVersionStore(table_name) if table_name else InMemoryVersionStore()
+                _bus = CacheVersionBus(store)
+    return _bus
+
+def set_version_bus(bus: Optional[CacheVersionBus]) -> None:
+    """Replace the process-wide bus (None resets it to be rebuilt from the environment)."""
+    global _bus
+    _bus = bus
@@ -8,11 +8,19 @@ import boto3
 import uuid
 import decimal
 import pymysql
+import copy
 import time
+import zlib
+import heapq
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from botocore.exceptions import ClientError
 from typing import Optional, Dict, Any, List
 
+from utils.cache import LRUCache, MISSING
+from utils.cache_invalidation import get_version_bus
+
 # Initialize Logger
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -413,6 +421,111 @@ def scan_table(table_name, **kwargs):
         logger.error(f"Error scanning table {table_name}: {e}", exc_info=True)
         raise
 
+# Read-through item cache
+#
+# Warm containers keep recently read items in a bounded LRU so hot, rarely
+# changing records (services, doctor profiles, report metadata) are not
+# re-fetched on every invocation. Caching is opt-in per table via a TTL policy,
+# misses are cached briefly as well, and put/update/delete through this module
+# invalidate the affected key. Writes also bump the table's version on the
+# cache version bus so other containers drop their copies.
+ITEM_CACHE_MAX_ENTRIES = int(os.environ.get('ITEM_CACHE_MAX_ENTRIES', '2048'))
+ITEM_CACHE_MAX_BYTES = int(os.environ.get('ITEM_CACHE_MAX_BYTES', str(8 * 1024 * 1024)))
+ITEM_CACHE_NEGATIVE_TTL = float(os.environ.get('ITEM_CACHE_NEGATIVE_TTL', '30'))
+
+ITEM_CACHE = LRUCache(
+    max_entries=ITEM_CACHE_MAX_ENTRIES,
+    max_bytes=ITEM_CACHE_MAX_BYTES,
+    name='dynamodb-items'
+)
+NEGATIVE_CACHE_HITS = 0
+_NOT_FOUND = object()  # Cached marker for items that do not exist
+
+def _parse_ttl_policy(raw):
+    """Parse ITEM_CACHE_TABLE_TTLS ('table-a=300,table-b=60') into a dict."""
+    policy = {}
+    for entry in (raw or '').split(','):
+        if '=' not in entry:
+            continue
+        name, ttl = entry.split('=', 1)
+        try:
+            policy[name.strip()] = float(ttl)
+        except ValueError:
+            logger.warning(f"Ignoring invalid item cache TTL entry: {entry}")
+    return policy
+
+ITEM_CACHE_TTLS = _parse_ttl_policy(os.environ.get('ITEM_CACHE_TABLE_TTLS'))
+_ITEM_CACHE_KEY_NAMES = {}  # {table_name: set of primary key names used for cached reads}
+_ITEM_CACHE_VERSIONS = {}  # {table_name: bus version the cached items were read at}
+
+def _item_cache_entity(table_name):
+    return f"items:{table_name}"
+
+def _sync_item_cache_version(table_name):
+    """Drop a table's cached items if another container has written to it since."""
+    version = get_version_bus().current(_item_cache_entity(table_name))
+    seen = _ITEM_CACHE_VERSIONS.get(table_name)
+    if seen is not None and seen != version:
+        logger.info(f"Item cache for {table_name} is stale (v{seen} -> v{version}); invalidating")
+        invalidate_cached_items(table_name)
+    _ITEM_CACHE_VERSIONS[table_name] = version
+
+def _announce_item_write(table_name):
+    """Bump the table's version so other containers invalidate their cached items."""
+    if table_name not in ITEM_CACHE_TTLS:
+        return
+    seen = _ITEM_CACHE_VERSIONS.get(table_name)
+    new_version = get_version_bus().bump(_item_cache_entity(table_name))
+    # Only our own write happened since the last sync; our cache is already patched
+    if new_version is not None and seen is not None and new_version == seen + 1:
+        _ITEM_CACHE_VERSIONS[table_name] = new_version
+
+def set_item_cache_ttl(table_name, ttl_seconds):
+    """
+    Enable (ttl > 0) or disable (ttl <= 0) read-through caching for a table
+
+    Args:
+        table_name (str): DynamoDB table name
+        ttl_seconds (float): How long a cached item stays fresh
+    """
+    if not table_name:
+        return
+    if ttl_seconds and ttl_seconds > 0:
+        ITEM_CACHE_TTLS[table_name] = float(ttl_seconds)
+    else:
+        ITEM_CACHE_TTLS.pop(table_name, None)
+        invalidate_cached_items(table_name)
+
+def invalidate_cached_item(table_name, item_id, p_key='id'):
+    """Drop a single cached item (or cached miss)."""
+    ITEM_CACHE.delete((table_name, p_key, item_id))
+
+def invalidate_cached_items(table_name=None):
+    """Drop every cached item, or only the ones belonging to table_name."""
+    if table_name is None:
+        ITEM_CACHE.clear()
+        return
+    for key in [key for key in ITEM_CACHE.keys() if key[0] == table_name]:
+        ITEM_CACHE.delete(key)
+
+def _invalidate_written_item(table_name, item):
+    """Invalidate the cache entries an item written to table_name may shadow."""
+    for key_name in _ITEM_CACHE_KEY_NAMES.get(table_name, ()):
+        if key_name in item:
+            invalidate_cached_item(table_name, item[key_name], key_name)
+
+def get_item_cache_stats():
+    """
+    Return hit-rate metrics for the item cache
+
+    Returns:
+        dict: Counters from the underlying LRU plus negative hits and active TTL policy
+    """
+    stats = ITEM_CACHE.stats()
+    stats['negative_hits'] = NEGATIVE_CACHE_HITS
+    stats['table_ttls'] = dict(ITEM_CACHE_TTLS)
+    return stats
+
 def get_item_by_id(table_name, item_id, p_key='id'):
     """
     Get item by ID from DynamoDB table
@@ -425,6 +538,19 @@ def get_item_by_id(table_name, item_id, p_key='id'):
     Returns:
         dict: Item data or None if not found
     """
+    global NEGATIVE_CACHE_HITS
+
+    ttl = ITEM_CACHE_TTLS.get(table_name)
+    cache_key = (table_name, p_key, item_id)
+    if ttl:
+        _sync_item_cache_version(table_name)
+        cached = ITEM_CACHE.get(cache_key)
+        if cached is _NOT_FOUND:
+            NEGATIVE_CACHE_HITS += 1
+            return None
+        if cached is not MISSING:
+            return copy.deepcopy(cached)
+
     dynamodb = get_dynamodb_resource()
     table = dynamodb.Table(table_name)
 
@@ -434,18 +560,27 @@ def get_item_by_id(table_name, item_id, p_key='id'):
                 p_key: item_id
             }
         )
-        return response.get('Item')
+        item = response.get('Item')
     except ClientError as e:
         logger.error(f"Error getting item {item_id} from table {table_name}: {e}", exc_info=True)
         raise
 
-def put_item(table_name, item):
+    if ttl:
+        _ITEM_CACHE_KEY_NAMES.setdefault(table_name, set()).add(p_key)
+        if item is None:
+            ITEM_CACHE.set(cache_key, _NOT_FOUND, ttl=min(ttl, ITEM_CACHE_NEGATIVE_TTL), size=0)
+        else:
+            ITEM_CACHE.set(cache_key, copy.deepcopy(item), ttl=ttl)
+    return item
+
+def put_item(table_name, item, condition_expression=None):
     """
     Put item in DynamoDB table (creates or replaces)
 
     Args:
         table_name (str): DynamoDB table name
         item (dict): Item data
+        condition_expression (str): Optional ConditionExpression, e.g. 'attribute_not_exists(id)'
 
     Returns:
         dict: The item that was put
@@ -454,21 +589,28 @@ def put_item(table_name, item):
     table = dynamodb.Table(table_name)
 
     try:
+        with_type_shard(item)
         # Convert floats to Decimals for DynamoDB
         item_decimal = json.loads(json.dumps(item), parse_float=decimal.Decimal)
-        table.put_item(Item=item_decimal)
+        put_params = {'Item': item_decimal}
+        if condition_expression:
+            put_params['ConditionExpression'] = condition_expression
+        table.put_item(**put_params)
+        _invalidate_written_item(table_name, item)
+        _announce_item_write(table_name)
         return item # Return original item before decimal conversion for consistency
     except ClientError as e:
         logger.error(f"Error putting item in table {table_name}: {e}", exc_info=True)
         raise
 
-def create_item(table_name, item):
+def create_item(table_name, item, condition_expression=None):
     """
     Create item in DynamoDB table, adding id and timestamps
 
     Args:
         table_name (str): DynamoDB table name
         item (dict): Item data (without id, createdAt, updatedAt)
+        condition_expression (str): Optional ConditionExpression for the put
 
     Returns:
         dict: Created item with id and timestamps
@@ -483,7 +625,7 @@ def create_item(table_name, item):
     item['updatedAt'] = timestamp
 
     try:
-        return put_item(table_name, item)
+        return put_item(table_name, item, condition_expression)
     except ClientError as e:
         raise e
 
@@ -523,6 +665,8 @@ def update_item(table_name, item_id, updates, p_key='id'):
             **update_params,
             ReturnValues='ALL_NEW'
         )
+        invalidate_cached_item(table_name, item_id, p_key)
+        _announce_item_write(table_name)
         return response.get('Attributes')
     except ClientError as e:
         logger.error(f"Error updating item {item_id} in table {table_name}: {e}", exc_info=True)
@@ -551,12 +695,65 @@ def delete_item(table_name, item_id, p_key='id'):
             },
             ReturnValues='ALL_OLD' # Optionally return the deleted item
         )
+        invalidate_cached_item(table_name, item_id, p_key)
+        _announce_item_write(table_name)
         logger.info(f"Successfully deleted item {item_id} from table {table_name}")
         return response.get('Attributes') # Return the deleted item data if needed
     except ClientError as e:
         logger.error(f"Error deleting item {item_id} from table {table_name}: {e}", exc_info=True)
         raise
 
+# DynamoDB rejects transactions with more actions than this
+MAX_TRANSACTION_ITEMS = 100
+
+def _to_dynamodb_values(values):
+    """Convert the numbers in a dict into the Decimals DynamoDB expects."""
+    return json.loads(json.dumps(values, cls=DecimalEncoder), parse_float=decimal.Decimal)
+
+def transact_write_items(operations):
+    """
+    Apply Put/Update/Delete/ConditionCheck operations in a single DynamoDB transaction
+
+    Operations use the resource-style shape, e.g.
+    {'Update': {'TableName': ..., 'Key': {...}, 'UpdateExpression': ..., 'ExpressionAttributeValues': {...}}},
+    with plain Python values; floats in Item, Key and ExpressionAttributeValues are converted here.
+
+    Args:
+        operations (list): Up to MAX_TRANSACTION_ITEMS operations
+
+    Raises:
+        ValueError: If there are no operations or too many of them
+        ClientError: TransactionCanceledException when a condition fails or an item is contended
+    """
+    if not operations or len(operations) > MAX_TRANSACTION_ITEMS:
+        raise ValueError(f"A transaction takes 1 to {MAX_TRANSACTION_ITEMS} operations, got {len(operations or [])}")
+
+    transact_items = []
+    for operation in operations:
+        (action, params), = operation.items()
+        params = dict(params)
+        for field in ('Item', 'Key', 'ExpressionAttributeValues'):
+            if field in params:
+                params[field] = _to_dynamodb_values(params[field])
+        transact_items.append({action: params})
+
+    try:
+        # The resource's client serializes plain values the same way Table calls do
+        get_dynamodb_resource().meta.client.transact_write_items(TransactItems=transact_items)
+    except ClientError as e:
+        logger.error(f"Transaction of {len(operations)} operations failed: {e}", exc_info=True)
+        raise
+
+    for operation in operations:
+        (action, params), = operation.items()
+        table_name = params['TableName']
+        if action == 'ConditionCheck':
+            continue
+        _invalidate_written_item(table_name, params.get('Item') or params.get('Key') or {})
+        for key_name, key_value in (params.get('Key') or {}).items():
+            invalidate_cached_item(table_name, key_value, key_name)
+        _announce_item_write(table_name)
+
 def generate_response(status_code, body):
     """
     Generate standardized API Gateway proxy response object
@@ -673,4 +870,142 @@ def query_by_type(table_name, type_value, last_evaluated_key=None):
         }
     except ClientError as e:
         logger.error(f"Error querying items by type {type_value} from table {table_name}: {e}", exc_info=True)
-        raise
\ No newline at end of file
+        raise
+
+# Write-sharded type index
+#
+# Every item of a given type shares the same `type-index` partition key, which
+# turns that GSI partition into a hot spot as the table grows. Items written
+# through put_item also carry a `typeShard` attribute ("<type>#<n>") that is the
+# partition key of the `type-shard-index` GSI, spreading a type across N
+# partitions. Readers fan out across the shards and merge the results.
+TYPE_SHARD_INDEX_NAME = 'type-shard-index'
+TYPE_SHARD_ATTRIBUTE = 'typeShard'
+TYPE_SHARD_COUNT = int(os.environ.get('TYPE_INDEX_SHARDS', '0') or 0)
+TYPE_SHARD_QUERY_WORKERS = 8
+
+def type_shard_key(type_value, item_key, shard_count=None):
+    """
+    Build the sharded type-index partition key for an item
+
+    Args:
+        type_value (str): The item type (e.g. 'patient')
+        item_key (str): Stable per-item value used to pick the shard (e.g. PK or id)
+        shard_count (int): Number of shards. Defaults to TYPE_INDEX_SHARDS.
+
+    Returns:
+        str: Partition key value of the form '<type>#<shard>'
+    """
+    shard_count = shard_count or TYPE_SHARD_COUNT or 1
+    shard = zlib.crc32(str(item_key).encode('utf-8')) % shard_count
+    return f"{type_value}#{shard}"
+
+def with_type_shard(item, shard_count=None, key_attribute=None):
+    """
+    Stamp the typeShard attribute on an item that has a 'type'
+
+    Items without a type, or that already carry a shard key, are returned unchanged.
+
+    Args:
+        item (dict): Item to be written
+        shard_count (int): Number of shards. Defaults to TYPE_INDEX_SHARDS.
+        key_attribute (str): Attribute used to pick the shard. Defaults to PK, then id.
+
+    Returns:
+        dict: The same item, with typeShard set when applicable
+    """
+    shard_count = shard_count or TYPE_SHARD_COUNT
+    if not shard_count or 'type' not in item or TYPE_SHARD_ATTRIBUTE in item:
+        return item
+    key_attribute = key_attribute or ('PK' if 'PK' in item else 'id')
+    if key_attribute not in item:
+        return item
+    item[TYPE_SHARD_ATTRIBUTE] = type_shard_key(item['type'], item[key_attribute], shard_count)
+    return item
+
+def _shard_cursor_from_item(item, key_names, sort_key):
+    """Build an ExclusiveStartKey for the shard index from the last consumed item."""
+    cursor = {name: item[name] for name in key_names}
+    cursor[TYPE_SHARD_ATTRIBUTE] = item[TYPE_SHARD_ATTRIBUTE]
+    cursor[sort_key] = item[sort_key]
+    return cursor
+
+def query_by_type_sharded(table_name, type_value, limit=50, cursor=None, shard_count=None,
+                          sort_key='PK', key_names=('PK', 'SK'), index_name=TYPE_SHARD_INDEX_NAME):
+    """
+    Scatter-gather query across all shards of the type-shard-index GSI
+
+    Each shard is queried in parallel for up to `limit` items, and the per-shard
+    results (already ordered by the index sort key) are merged so the page comes
+    back in global sort-key order. The returned cursor records, per shard, where
+    the next page should resume; shards that are exhausted are dropped from it.
+
+    Args:
+        table_name (str): DynamoDB table name
+        type_value (str): The type value to query for
+        limit (int): Maximum number of items to return
+        cursor (dict): Cursor returned by a previous call ({shard: start_key or None})
+        shard_count (int): Number of shards. Defaults to TYPE_INDEX_SHARDS.
+        sort_key (str): Sort key attribute of the shard index
+        key_names (tuple): Primary key attributes of the base table
+        index_name (str): Name of the sharded GSI
+
+    Returns:
+        dict: Query results with Items and LastEvaluatedKey (None when all shards are done)
+    """
+    shard_count = shard_count or TYPE_SHARD_COUNT or 1
+    dynamodb = get_dynamodb_resource()
+    table = dynamodb.Table(table_name)
+
+    if cursor is None:
+        pending = {str(shard): None for shard in range(shard_count)}
+    else:
+        pending = dict(cursor)
+
+    def query_shard(shard):
+        query_params = {
+            'IndexName': index_name,
+            'KeyConditionExpression': '#shard = :shard_val',
+            'ExpressionAttributeNames': {'#shard': TYPE_SHARD_ATTRIBUTE},
+            'ExpressionAttributeValues': {':shard_val': f"{type_value}#{shard}"},
+            'Limit': limit
+        }
+        if pending[shard]:
+            query_params['ExclusiveStartKey'] = pending[shard]
+        response = table.query(**query_params)
+        return shard, response.get('Items', []), response.get('LastEvaluatedKey')
+
+    try:
+        workers = max(1, min(TYPE_SHARD_QUERY_WORKERS, len(pending)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(query_shard, list(pending)))
+    except ClientError as e:
+        logger.error(f"Error querying sharded type {type_value} from table {table_name}: {e}", exc_info=True)
+        raise
+
+    # Merge the already-sorted shard streams and keep the first `limit` items
+    streams = [
+        [(item.get(sort_key), shard, position, item) for position, item in enumerate(items)]
+        for shard, items, _ in results
+    ]
+    merged = list(itertools.islice(heapq.merge(*streams, key=lambda entry: (entry[0], entry[1], entry[2])), limit))
+
+    consumed = {}
+    for _, shard, position, _ in merged:
+        consumed[shard] = position + 1
+
+    next_cursor = {}
+    for shard, items, last_key in results:
+        taken = consumed.get(shard, 0)
+        if taken < len(items):
+            # Resume after the last item we actually returned from this shard
+            next_cursor[shard] = (
+                _shard_cursor_from_item(items[taken - 1], key_names, sort_key) if taken else pending[shard]
+            )
+        elif last_key:
+            next_cursor[shard] = last_key
+
+    return {
+        'Items': [entry[3] for entry in merged],
+        'LastEvaluatedKey': next_cursor or None
+    }
@@ -0,0 +1,119 @@
+"""
+Direct-to-S3 image uploads.
+Instead of posting the image through API Gateway and Lambda, the browser asks
+for a presigned POST, sends the file straight to S3 and then reports the key
+back. The POST policy pins the key, the content type and a size range, so S3
+rejects anything else. Completing the upload checks the stored object (size,
+type and the file's leading bytes) before it is attached to its owner, so a
+Lambda never holds the image in memory.
+"""
+import uuid
+import logging
+from typing import Any, Dict, Optional
+
+import boto3
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Content types accepted for uploaded images, with the extension used in their keys
+IMAGE_CONTENT_TYPES = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/gif': 'gif',
+    'image/webp': 'webp'
+}
+MAX_PROFILE_IMAGE_BYTES = 5 * 1024 * 1024
+MAX_REPORT_IMAGE_BYTES = 20 * 1024 * 1024
+UPLOAD_URL_TTL_SECONDS = 300
+# Leading bytes read to identify the file type
+SNIFF_BYTES = 16
+
+def sniff_image_type(data: bytes) -> Optional[str]:
+    """Content type of an image identified by its leading bytes, None when unknown"""
+    if data.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+def validate_content_type(content_type: Optional[str]) -> str:
+    """
+    Raises:
+        ValueError: The content type is not an accepted image type
+    """
+    content_type = (content_type or '').lower()
+    if content_type == 'image/jpg':
+        content_type = 'image/jpeg'
+    if content_type not in IMAGE_CONTENT_TYPES:
+        raise ValueError(f"contentType must be one of: {', '.join(IMAGE_CONTENT_TYPES)}")
+    return content_type
+
+def create_image_upload(bucket_name: str, key_prefix: str, content_type: str, max_bytes: int,
+                        metadata: Optional[Dict[str, str]] = None, s3=None) -> Dict[str, Any]:
+    """
+    Issue a presigned POST for one image under key_prefix
+
+    Args:
+        bucket_name: Destination bucket
+        key_prefix: Key prefix owned by the uploader, e.g. 'profile-images/<sub>/'
+        content_type: Image content type the upload must declare
+        max_bytes: Largest accepted file
+        metadata: x-amz-meta-* values stored with the object
+        s3: S3 client
+
+    Returns:
+        dict: url and fields for the browser's multipart form POST, plus the key
+
+    Raises:
+        ValueError: The content type is not an accepted image type
+    """
+    content_type = validate_content_type(content_type)
+    key = f"{key_prefix}{uuid.uuid4()}.{IMAGE_CONTENT_TYPES[content_type]}"
+    fields = {'Content-Type': content_type}
+    fields.update({f"x-amz-meta-{name}": value for name, value in (metadata or {}).items()})
+    conditions = [{name: value} for name, value in fields.items()]
+    conditions.append(['content-length-range', 1, max_bytes])
+
+    post = (s3 or boto3.client('s3')).generate_presigned_post(
+        Bucket=bucket_name, Key=key, Fields=fields, Conditions=conditions, ExpiresIn=UPLOAD_URL_TTL_SECONDS)
+    return {'url': post['url'], 'fields': post['fields'], 'key': key, 'contentType': content_type,
+            'maxBytes': max_bytes, 'expiresIn': UPLOAD_URL_TTL_SECONDS}
+
+def verify_image_upload(bucket_name: str, key: str, key_prefix: str, max_bytes: int, s3=None) -> Dict[str, Any]:
+    """
+    Check an object uploaded with create_image_upload before it is used
+
+    An object that fails the checks is deleted.
+
+    Returns:
+        dict: key, contentType and size of the verified image
+
+    Raises:
+        ValueError: The key is not the uploader's, or the object is not an accepted image
+        ClientError: The object does not exist (code 404)
+    """
+    if not key or not key.startswith(key_prefix) or '/' in key[len(key_prefix):] or '..' in key:
+        raise ValueError('Upload key does not belong to this upload target')
+
+    s3 = s3 or boto3.client('s3')
+    head = s3.head_object(Bucket=bucket_name, Key=key)
+    size = head['ContentLength']
+    declared = head.get('ContentType')
+    leading = s3.get_object(Bucket=bucket_name, Key=key, Range=f"bytes=0-{SNIFF_BYTES - 1}")['Body'].read()
+    detected = sniff_image_type(leading)
+
+    problem = None
+    if size > max_bytes:
+        problem = f"Image is larger than {max_bytes} bytes"
+    elif detected is None or detected != declared:
+        problem = 'Uploaded file is not a valid image of the declared type'
+    if problem:
+        logger.warning(f"Rejecting upload {key}: {problem}")
+        s3.delete_object(Bucket=bucket_name, Key=key)
+        raise ValueError(problem)
+    return {'key': key, 'contentType': detected, 'size': size}
@@ -144,6 +144,48 @@ class ImageOptimizer:
         # Default to PNG for other cases
         return 'PNG'
     
+    def create_avatar_variants(self, image_data: bytes, sizes: Tuple[int, ...],
+                               formats: Tuple[str, ...]) -> Dict[Tuple[int, str], bytes]:
+        """
+        Create square avatar renditions of an image.
+        
+        The image is rotated per its EXIF data, flattened onto white and
+        center-cropped to a square before each size is rendered.
+        
+        Args:
+            image_data: Raw image bytes
+            sizes: Edge lengths in pixels
+            formats: Output formats, e.g. ('WEBP', 'JPEG')
+            
+        Returns:
+            Dictionary mapping (size, format) to the encoded image bytes
+        """
+        try:
+            with Image.open(io.BytesIO(image_data)) as img:
+                # Let JPEG decoding scale down on the fly instead of decoding every pixel
+                largest = max(sizes) * 2
+                img.draft('RGB', (largest, largest))
+                img = ImageOps.exif_transpose(img)
+                if img.mode in ('RGBA', 'LA', 'P'):
+                    img = img.convert('RGBA')
+                    background = Image.new('RGB', img.size, (255, 255, 255))
+                    background.paste(img, mask=img.split()[-1])
+                    img = background
+                elif img.mode != 'RGB':
+                    img = img.convert('RGB')
+                
+                variants = {}
+                for size in sizes:
+                    avatar = ImageOps.fit(img, (size, size), Image.Resampling.LANCZOS)
+                    for target_format in formats:
+                        output_buffer = io.BytesIO()
+                        avatar.save(output_buffer, format=target_format,
+                                    **self.SUPPORTED_FORMATS.get(target_format, {}))
+                        variants[(size, target_format)] = output_buffer.getvalue()
+                return variants
+        except Exception as e:
+            raise ValueError(f"Avatar creation failed: {str(e)}")
+    
     def create_multiple_sizes(self, image_data: bytes, filename: str, 
                             sizes: list = None) -> Dict[str, Tuple[bytes, str, Dict[str, Any]]]:
         """
@@ -0,0 +1,233 @@
+"""
+Profile image lookups for avatar rendering.
+Every render used to cost an AdminGetUser, a HeadObject and a fresh presigned
+URL. The username → image record is now kept in the shared cache, read through
+from Cognito on a miss, and each key's presigned URL is reused until it gets
+close to expiry, so repeat renders make no AWS calls and browsers get a stable
+URL they can cache.
+
+Records are keyed on the user's version on the cache version bus. The upload,
+complete and remove handlers bump it (storing the new record under the new
+version), so every container stops serving the old key within the bus's check
+interval even when the cache tier is per-container.
+
+The record is trusted instead of probing S3: the upload handler only writes
+the key to Cognito after the object is stored, and a key whose object has
+gone missing just fails to load in the browser like any broken image.
+
+Square avatar renditions (see utils.avatars) are rendered after each upload
+by an S3 trigger and stored under keys derived from the image key. The record
+lists their sizes so a request for a small avatar is served the matching
+rendition; until the trigger has recorded them, the original is served.
+"""
+import posixpath
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import boto3
+from botocore.exceptions import ClientError
+
+from utils.cache import MISSING, LRUCache
+from utils.cache_backends import SharedCache
+from utils.cache_invalidation import get_version_bus
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+PROFILE_IMAGE_ATTRIBUTE = 'custom:profile_image'
+IMAGE_RECORD_TTL_SECONDS = 600
+PRESIGNED_URL_TTL_SECONDS = 3600
+# A URL is regenerated once less than this is left, so every URL handed out
+# stays valid at least this long
+URL_REFRESH_AHEAD_SECONDS = 900
+MAX_BATCH_USERNAMES = 100
+# Avatar renditions stored next to each image, and the formats they are stored in
+AVATAR_SIZES = (48, 96, 256)
+AVATAR_FORMATS = {'webp': 'webp', 'jpeg': 'jpg'}
+DEFAULT_AVATAR_FORMAT = 'webp'
+LOOKUP_WORKERS = 8
+
+_image_records = SharedCache('profile-images', ttl=IMAGE_RECORD_TTL_SECONDS)
+# Presigned URLs are signed with this container's credentials, so they stay local
+_presigned_urls = LRUCache(max_entries=4096, max_bytes=4 * 1024 * 1024,
+                           default_ttl=PRESIGNED_URL_TTL_SECONDS - URL_REFRESH_AHEAD_SECONDS,
+                           name='presigned-urls')
+_s3 = None
+
+def _s3_client():
+    global _s3
+    if _s3 is None:
+        _s3 = boto3.client('s3')
+    return _s3
+
+def _image_entity(username: str) -> str:
+    return f"profile-image:{username}"
+
+def _record_key(username: str, version: Optional[int] = None) -> str:
+    if version is None:
+        version = get_version_bus().current(_image_entity(username))
+    return f"{username}:v{version}"
+
+def avatar_key(key: str, size: int, image_format: str) -> str:
+    """Deterministic key of an avatar rendition, e.g. profile-images/<sub>/avatars/<name>-96.webp"""
+    directory, filename = posixpath.split(key)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, 'avatars', f"{stem}-{size}.{AVATAR_FORMATS[image_format]}")
+
+def avatar_keys(key: str) -> List[str]:
+    """Keys of every avatar rendition of an image"""
+    return [avatar_key(key, size, image_format) for size in AVATAR_SIZES for image_format in AVATAR_FORMATS]
+
+def stored_avatar_sizes(bucket_name: str, key: str) -> List[int]:
+    """Sizes of the renditions of key stored in every avatar format (one ListObjects call)"""
+    prefix = avatar_key(key, 0, DEFAULT_AVATAR_FORMAT).rsplit('-', 1)[0] + '-'
+    try:
+        result = _s3_client().list_objects_v2(Bucket=bucket_name, Prefix=prefix)
+    except ClientError as e:
+        logger.warning(f"Could not list avatars of {key}; serving the original: {e}")
+        return []
+    stored = {obj['Key'] for obj in result.get('Contents', [])}
+    return [size for size in AVATAR_SIZES
+            if all(avatar_key(key, size, image_format) in stored for image_format in AVATAR_FORMATS)]
+
+def _load_image_record(user_pool_id: str, username: str, bucket_name: Optional[str] = None,
+                       cognito=None) -> Dict[str, Any]:
+    cognito = cognito or boto3.client('cognito-idp')
+    result = cognito.admin_get_user(UserPoolId=user_pool_id, Username=username)
+    key = next((attr['Value'] for attr in result.get('UserAttributes', [])
+                if attr['Name'] == PROFILE_IMAGE_ATTRIBUTE), '')
+    record = {'key': key}
+    # Only a cache fill looks for renditions; uploads record them directly
+    if key and bucket_name:
+        record['avatars'] = stored_avatar_sizes(bucket_name, key)
+    return record
+
+def get_image_record(user_pool_id: str, username: str, cognito=None,
+                     bucket_name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Return the user's image record; 'key' is empty when no image is set
+
+    Args:
+        user_pool_id: Cognito user pool
+        username: Cognito username
+        cognito: cognito-idp client used on a cache miss
+        bucket_name: Bucket of the images, to find the avatar renditions on a cache miss
+
+    Raises:
+        ClientError: UserNotFoundException when the user does not exist
+    """
+    return _get_image_record(_record_key(username), user_pool_id, username, cognito, bucket_name)
+
+def _get_image_record(record_key: str, user_pool_id: str, username: str, cognito=None,
+                      bucket_name: Optional[str] = None) -> Dict[str, Any]:
+    return _image_records.get_or_load(
+        record_key, lambda: _load_image_record(user_pool_id, username, bucket_name, cognito))
+
+def get_image_records(user_pool_id: str, usernames: List[str], cognito=None,
+                      bucket_name: Optional[str] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Return the image record of every username, None for users that do not exist
+
+    The users' versions are read in one batch up front, on this thread, and
+    cache misses are read from Cognito concurrently.
+    """
+    cognito = cognito or boto3.client('cognito-idp')
+    if bucket_name:
+        _s3_client()  # created once here rather than racing in the workers
+    versions = get_version_bus().current_many(_image_entity(username) for username in usernames)
+
+    def lookup(username):
+        try:
+            return _get_image_record(_record_key(username, versions[_image_entity(username)]),
+                                     user_pool_id, username, cognito, bucket_name)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') == 'UserNotFoundException':
+                logger.info(f"No user {username} for profile image lookup")
+                return None
+            raise
+
+    with ThreadPoolExecutor(max_workers=LOOKUP_WORKERS) as executor:
+        return dict(zip(usernames, executor.map(lookup, usernames)))
+
+def record_profile_image(username: str, key: Optional[str] = None, **metadata) -> None:
+    """
+    Publish the user's image record as it is written to Cognito
+
+    Args:
+        username: Cognito username
+        key: S3 key of the new image, None when it was removed
+        **metadata: Details known at upload, e.g. contentType, size and avatars (rendition sizes)
+    """
+    record = {'key': key or ''}
+    if key:
+        record.update(metadata, uploadedAt=datetime.now(timezone.utc).isoformat())
+    version = get_version_bus().bump(_image_entity(username))
+    if version is not None:
+        _image_records.set(f"{username}:v{version}", record)
+
+def invalidate_image_record(username: str) -> None:
+    """Drop the user's cached record everywhere, e.g. once its avatars are stored, so the next read refills it"""
+    get_version_bus().bump(_image_entity(username))
+
+def presigned_image_url(bucket_name: str, key: str, s3=None) -> str:
+    """Return a GET URL for the object valid for at least URL_REFRESH_AHEAD_SECONDS"""
+    url = _presigned_urls.get((bucket_name, key))
+    if url is MISSING:
+        url = (s3 or _s3_client()).generate_presigned_url(
+            'get_object', Params={'Bucket': bucket_name, 'Key': key}, ExpiresIn=PRESIGNED_URL_TTL_SECONDS)
+        _presigned_urls.set((bucket_name, key), url)
+    return url
+
+def discard_image_url(bucket_name: str, key: str) -> None:
+    """Drop the cached URLs of an image that was deleted and of its avatar renditions"""
+    for url_key in [key] + avatar_keys(key):
+        _presigned_urls.delete((bucket_name, url_key))
+
+def pick_avatar_size(available: List[int], requested: int) -> Optional[int]:
+    """Smallest available rendition at least as large as requested, else the largest one"""
+    if not available:
+        return None
+    larger = [size for size in available if size >= requested]
+    return min(larger) if larger else max(available)
+
+def parse_avatar_request(size: Any, image_format: Any) -> Tuple[Optional[int], str]:
+    """
+    Validate the size and format of a request
+
+    Raises:
+        ValueError: size is not a positive integer or format is unknown
+    """
+    image_format = (image_format or DEFAULT_AVATAR_FORMAT).lower()
+    if image_format == 'jpg':
+        image_format = 'jpeg'
+    if image_format not in AVATAR_FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(AVATAR_FORMATS)}")
+    if size in (None, ''):
+        return None, image_format
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise ValueError('size must be a positive integer')
+    if size <= 0:
+        raise ValueError('size must be a positive integer')
+    return size, image_format
+
+def image_response(record: Optional[Dict[str, Any]], bucket_name: str, s3=None, size: Optional[int] = None,
+                   image_format: str = DEFAULT_AVATAR_FORMAT) -> Dict[str, Any]:
+    """
+    The API's view of an image record: hasImage, plus imageUrl and imageKey when set
+
+    With a size the URL is of the closest avatar rendition (avatarSize), or of
+    the original image when the image has none.
+    """
+    if not record or not record.get('key'):
+        return {'hasImage': False}
+    key = record['key']
+    avatar_size = pick_avatar_size(record.get('avatars') or [], size) if size else None
+    url_key = avatar_key(key, avatar_size, image_format) if avatar_size else key
+    response = {'hasImage': True, 'imageUrl': presigned_image_url(bucket_name, url_key, s3), 'imageKey': key}
+    if avatar_size:
+        response['avatarSize'] = avatar_size
+    return response
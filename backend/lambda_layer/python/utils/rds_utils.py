@@ -6,8 +6,12 @@ import os
 import json
 import logging
 import pymysql
+from datetime import timedelta
 from typing import Dict, List, Optional, Any, Tuple
 from contextlib import contextmanager
+from utils.appointment_times import (
+    INACTIVE_STATUSES, appointment_interval, format_sql_datetime, reservation_slots, to_date, to_datetime
+)
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +19,12 @@ logger = logging.getLogger(__name__)
 CONNECTION_POOL = {}
 MAX_CONNECTIONS = 5
 
+# MySQL error code for a duplicate primary/unique key
+ER_DUP_ENTRY = 1062
+
+class SlotUnavailableError(Exception):
+    """Raised when an appointment's slot reservation collides with another appointment"""
+
 class DatabaseConfig:
     """Database configuration from environment variables"""
     
@@ -136,6 +146,47 @@ def execute_transaction(queries: List[Tuple[str, Optional[Tuple]]]) -> bool:
         logger.error(f"Transaction execution error: {str(e)}")
         raise
 
+def execute_reservation(queries: List[Tuple[str, Optional[Tuple]]]) -> bool:
+    """
+    Execute queries that reserve appointment slots in one transaction
+    
+    Args:
+        queries: List of (query, params) tuples
+        
+    Returns:
+        True if successful
+        
+    Raises:
+        SlotUnavailableError: A slot is already held by another appointment
+    """
+    try:
+        return execute_transaction(queries)
+    except pymysql.err.IntegrityError as e:
+        if e.args and e.args[0] == ER_DUP_ENTRY:
+            raise SlotUnavailableError("The requested time slot is already reserved") from e
+        raise
+
+def reserve_slots_query(appointment_id: str, doctor_id: str, start_at, end_at) -> Optional[Tuple[str, Tuple]]:
+    """
+    Build a single INSERT reserving every slot [start_at, end_at) touches for the doctor
+    
+    Returns:
+        (query, params), or None if the span covers no slot
+    """
+    slots = reservation_slots(to_datetime(start_at), to_datetime(end_at))
+    if not slots:
+        return None
+    query = (
+        "INSERT INTO appointment_slots (doctor_id, slot_start, appointment_id) VALUES "
+        + ", ".join(["(%s, %s, %s)"] * len(slots))
+    )
+    params = tuple(value for slot in slots for value in (doctor_id, format_sql_datetime(slot), appointment_id))
+    return query, params
+
+def release_slots_query(appointment_id: str) -> Tuple[str, Tuple]:
+    """Build the DELETE releasing every slot an appointment holds"""
+    return "DELETE FROM appointment_slots WHERE appointment_id = %s", (appointment_id,)
+
 # Specific utility functions for common operations
 
 def get_patient_by_id(patient_id: str) -> Optional[Dict]:
@@ -218,8 +269,30 @@ def create_patient(patient_data: Dict) -> str:
     execute_mutation(query, params)
     return patient_id
 
-def get_appointments_by_date_range(start_date: str, end_date: str, doctor_id: str = None) -> List[Dict]:
-    """Get appointments within date range"""
+def _in_clause(column: str, values: List[Any]) -> str:
+    return f"{column} IN ({', '.join(['%s'] * len(values))})"
+
+def get_appointments_by_date_range(start_date: str, end_date: str, doctor_id: str = None,
+                                   doctor_ids: List[str] = None, patient_id: str = None,
+                                   statuses: List[str] = None, service_id: str = None,
+                                   limit: int = None, after: Tuple[Any, str] = None) -> List[Dict]:
+    """
+    Get appointments within date range, with every filter applied in SQL
+    
+    Args:
+        start_date: First day (YYYY-MM-DD)
+        end_date: Last day, inclusive (YYYY-MM-DD)
+        doctor_id: Only this doctor
+        doctor_ids: Only these doctors (ignored when doctor_id is given)
+        patient_id: Only this patient
+        statuses: Only these statuses
+        service_id: Only this service
+        limit: Maximum number of rows
+        after: Keyset cursor (start_at, id) of the last row of the previous page
+        
+    Returns:
+        list: Appointments ordered by start_at, id
+    """
     base_query = """
         SELECT a.*, 
                CONCAT(p.first_name, ' ', p.last_name) as patient_name,
@@ -229,19 +302,50 @@ def get_appointments_by_date_range(start_date: str, end_date: str, doctor_id: st
         JOIN patients p ON a.patient_id = p.id
         JOIN users u ON a.doctor_id = u.id
         LEFT JOIN services s ON a.service_id = s.id
-        WHERE a.appointment_date BETWEEN %s AND %s
+        WHERE a.start_at >= %s AND a.start_at < %s
     """
     
-    params = [start_date, end_date]
+    # Half-open DATETIME range so the (owner, start_at, ...) span indexes serve it
+    range_end = to_date(end_date) + timedelta(days=1)
+    params = [f"{to_date(start_date).isoformat()} 00:00:00", f"{range_end.isoformat()} 00:00:00"]
     
     if doctor_id:
         base_query += " AND a.doctor_id = %s"
         params.append(doctor_id)
+    elif doctor_ids:
+        base_query += f" AND {_in_clause('a.doctor_id', doctor_ids)}"
+        params.extend(doctor_ids)
     
-    base_query += " ORDER BY a.appointment_date, a.appointment_time"
+    if patient_id:
+        base_query += " AND a.patient_id = %s"
+        params.append(patient_id)
+    
+    if service_id:
+        base_query += " AND a.service_id = %s"
+        params.append(service_id)
+    
+    if statuses:
+        base_query += f" AND {_in_clause('a.status', statuses)}"
+        params.extend(statuses)
+    
+    if after:
+        after_start, after_id = format_sql_datetime(to_datetime(after[0])), after[1]
+        base_query += " AND (a.start_at > %s OR (a.start_at = %s AND a.id > %s))"
+        params.extend([after_start, after_start, after_id])
+    
+    base_query += " ORDER BY a.start_at, a.id"
+    
+    if limit:
+        base_query += " LIMIT %s"
+        params.append(int(limit))
     
     return execute_query(base_query, tuple(params))
 
+def get_active_doctor_ids() -> List[str]:
+    """Get the IDs of all active doctors"""
+    query = "SELECT id FROM users WHERE role = 'doctor' AND is_active = TRUE ORDER BY id"
+    return [row['id'] for row in execute_query(query) or []]
+
 def get_services_active() -> List[Dict]:
     """Get all active services"""
     query = """
@@ -252,35 +356,253 @@ def get_services_active() -> List[Dict]:
     """
     return execute_query(query)
 
-def create_appointment(appointment_data: Dict) -> str:
-    """Create a new appointment"""
+def get_service_duration(service_id: str) -> Optional[int]:
+    """Get the duration_minutes of a service, or None if it does not exist"""
+    service = execute_query("SELECT duration_minutes FROM services WHERE id = %s", (service_id,), fetch_one=True)
+    return service.get('duration_minutes') if service else None
+
+def get_unbilled_appointments(start_date: str, end_date: str, limit: int = None,
+                              after: Tuple[Any, str] = None) -> List[Dict]:
+    """
+    Get completed appointments that have no billing record yet
+
+    Served by idx_unbilled (status, billing_id, start_at).
+
+    Args:
+        start_date: First day (YYYY-MM-DD)
+        end_date: Last day, inclusive (YYYY-MM-DD)
+        limit: Maximum number of rows
+        after: Keyset cursor (start_at, id) of the last row of the previous page
+
+    Returns:
+        list: Appointments ordered by start_at, id
+    """
+    query = """
+        SELECT id, patient_id, doctor_id, service_id, appointment_date, start_at
+        FROM appointments
+        WHERE status = 'completed' AND billing_id IS NULL
+        AND start_at >= %s AND start_at < %s
+    """
+    range_end = to_date(end_date) + timedelta(days=1)
+    params = [f"{to_date(start_date).isoformat()} 00:00:00", f"{range_end.isoformat()} 00:00:00"]
+
+    if after:
+        after_start, after_id = format_sql_datetime(to_datetime(after[0])), after[1]
+        query += " AND (start_at > %s OR (start_at = %s AND id > %s))"
+        params.extend([after_start, after_start, after_id])
+
+    query += " ORDER BY start_at, id"
+
+    if limit:
+        query += " LIMIT %s"
+        params.append(int(limit))
+
+    return execute_query(query, tuple(params))
+
+def mark_appointments_billed(billing_ids: Dict[str, str]) -> int:
+    """
+    Record the billing record of each appointment with one UPDATE
+
+    Appointments that already have a billing_id keep it.
+
+    Args:
+        billing_ids: {appointment_id: billing_id}
+
+    Returns:
+        Number of appointments updated
+    """
+    if not billing_ids:
+        return 0
+    appointment_ids = list(billing_ids)
+    query = (
+        "UPDATE appointments SET billing_id = CASE id "
+        + " ".join(["WHEN %s THEN %s"] * len(appointment_ids))
+        + f" END WHERE {_in_clause('id', appointment_ids)} AND billing_id IS NULL"
+    )
+    params = tuple(value for appointment_id in appointment_ids
+                   for value in (appointment_id, billing_ids[appointment_id]))
+    return execute_mutation(query, params + tuple(appointment_ids))
+
+USER_COLUMNS = (
+    'id', 'username', 'email', 'first_name', 'last_name', 'role', 'phone', 'is_active', 'user_status'
+)
+USER_SORT_COLUMNS = {
+    'username': 'username', 'email': 'email', 'firstName': 'first_name', 'lastName': 'last_name',
+    'role': 'role', 'userStatus': 'user_status', 'userCreateDate': 'created_at',
+    'userLastModifiedDate': 'updated_at'
+}
+
+def upsert_users(users: List[Dict]) -> int:
+    """
+    Insert or update users with one multi-row INSERT ... ON DUPLICATE KEY UPDATE
+
+    Args:
+        users: Rows keyed by USER_COLUMNS
+
+    Returns:
+        Number of affected rows as reported by MySQL (2 per updated row)
+    """
+    if not users:
+        return 0
+    placeholders = "(" + ", ".join(["%s"] * len(USER_COLUMNS)) + ")"
+    query = f"""
+        INSERT INTO users ({', '.join(USER_COLUMNS)})
+        VALUES {', '.join([placeholders] * len(users))}
+        ON DUPLICATE KEY UPDATE
+            {', '.join(f"{column} = VALUES({column})" for column in USER_COLUMNS[1:])}
+    """
+    params = tuple(user.get(column) for user in users for column in USER_COLUMNS)
+    return execute_mutation(query, params)
+
+def update_user_by_username(username: str, fields: Dict[str, Any]) -> int:
+    """Update some USER_COLUMNS of the user with the given Cognito username"""
+    return update_users_by_username([username], fields)
+
+def update_users_by_username(usernames: List[str], fields: Dict[str, Any]) -> int:
+    """Set the same USER_COLUMNS values on every user with one of the given Cognito usernames"""
+    columns = [column for column in fields if column in USER_COLUMNS[1:]]
+    if not columns or not usernames:
+        return 0
+    query = (f"UPDATE users SET {', '.join(f'{column} = %s' for column in columns)} "
+             f"WHERE {_in_clause('username', usernames)}")
+    return execute_mutation(query, tuple(fields[column] for column in columns) + tuple(usernames))
+
+def deactivate_users(user_ids: List[str], user_status: str = 'DELETED') -> int:
+    """
+    Mark users as inactive with one UPDATE
+
+    Rows are kept because appointments and reports reference them.
+    """
+    if not user_ids:
+        return 0
+    query = f"UPDATE users SET is_active = FALSE, user_status = %s WHERE {_in_clause('id', user_ids)}"
+    return execute_mutation(query, (user_status,) + tuple(user_ids))
+
+def get_all_users() -> List[Dict]:
+    """Get the synced columns of every user, for reconciliation"""
+    return execute_query(f"SELECT {', '.join(USER_COLUMNS)} FROM users") or []
+
+def get_users_paginated(limit: int = 50, offset: int = 0, role: str = None, is_active: bool = None,
+                        user_status: str = None, search: str = None, sort_by: str = 'username',
+                        descending: bool = False) -> Tuple[List[Dict], int]:
+    """
+    Get a filtered, sorted page of users
+
+    Args:
+        search: Prefix matched against first name, last name, email and username
+        sort_by: Key of USER_SORT_COLUMNS
+
+    Returns:
+        tuple: (rows, total number of matching users)
+    """
+    conditions, params = [], []
+    if role is not None:
+        conditions.append("role = %s")
+        params.append(role)
+    if is_active is not None:
+        conditions.append("is_active = %s")
+        params.append(bool(is_active))
+    if user_status is not None:
+        conditions.append("user_status = %s")
+        params.append(user_status)
+    if search:
+        conditions.append("(first_name LIKE %s OR last_name LIKE %s OR email LIKE %s OR username LIKE %s)")
+        search_param = f"{search}%"
+        params.extend([search_param] * 4)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    total = execute_query(f"SELECT COUNT(*) AS total FROM users{where}", tuple(params), fetch_one=True)
+    direction = 'DESC' if descending else 'ASC'
+    query = f"""
+        SELECT {', '.join(USER_COLUMNS)}, created_at, updated_at
+        FROM users{where}
+        ORDER BY {USER_SORT_COLUMNS[sort_by]} {direction}, id {direction}
+        LIMIT %s OFFSET %s
+    """
+    rows = execute_query(query, tuple(params) + (int(limit), int(offset)))
+    return rows or [], (total or {}).get('total', 0)
+
+APPOINTMENT_INSERT_COLUMNS = (
+    'id', 'patient_id', 'doctor_id', 'service_id', 'appointment_date',
+    'appointment_time', 'duration_minutes', 'start_at', 'end_at', 'status', 'notes', 'created_by'
+)
+
+def create_appointments(appointments: List[Dict]) -> List[str]:
+    """
+    Create several appointments with one multi-row INSERT, reserving the doctors'
+    slots in the same transaction
+    
+    Args:
+        appointments: Appointment data dictionaries
+        
+    Returns:
+        list: The new appointment IDs, in input order
+        
+    Raises:
+        SlotUnavailableError: A doctor already has an appointment in one of the slots
+    """
     import uuid
-    appointment_id = str(uuid.uuid4())
+    if not appointments:
+        return []
     
-    query = """
-        INSERT INTO appointments (
-            id, patient_id, doctor_id, service_id, appointment_date,
-            appointment_time, duration_minutes, status, notes, created_by
-        ) VALUES (
-            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+    appointment_ids = []
+    rows = []
+    slot_params = []
+    for appointment_data in appointments:
+        appointment_id = str(uuid.uuid4())
+        duration = appointment_data.get('duration_minutes', 30)
+        start_at, end_at = appointment_interval(
+            appointment_data.get('appointment_date'), appointment_data.get('appointment_time'), duration
         )
+        status = appointment_data.get('status', 'scheduled')
+        rows.append((
+            appointment_id,
+            appointment_data.get('patient_id'),
+            appointment_data.get('doctor_id'),
+            appointment_data.get('service_id'),
+            appointment_data.get('appointment_date'),
+            appointment_data.get('appointment_time'),
+            duration,
+            format_sql_datetime(start_at),
+            format_sql_datetime(end_at),
+            status,
+            appointment_data.get('notes'),
+            appointment_data.get('created_by')
+        ))
+        if status not in INACTIVE_STATUSES:
+            reservation = reserve_slots_query(appointment_id, appointment_data.get('doctor_id'), start_at, end_at)
+            if reservation:
+                slot_params.append(reservation[1])
+        appointment_ids.append(appointment_id)
+    
+    placeholders = "(" + ", ".join(["%s"] * len(APPOINTMENT_INSERT_COLUMNS)) + ")"
+    query = f"""
+        INSERT INTO appointments (
+            {', '.join(APPOINTMENT_INSERT_COLUMNS)}
+        ) VALUES {', '.join([placeholders] * len(rows))}
     """
+    queries = [(query, tuple(value for row in rows for value in row))]
     
-    params = (
-        appointment_id,
-        appointment_data.get('patient_id'),
-        appointment_data.get('doctor_id'),
-        appointment_data.get('service_id'),
-        appointment_data.get('appointment_date'),
-        appointment_data.get('appointment_time'),
-        appointment_data.get('duration_minutes', 30),
-        appointment_data.get('status', 'scheduled'),
-        appointment_data.get('notes'),
-        appointment_data.get('created_by')
-    )
+    if slot_params:
+        params = tuple(value for params in slot_params for value in params)
+        slot_count = len(params) // 3
+        queries.append((
+            "INSERT INTO appointment_slots (doctor_id, slot_start, appointment_id) VALUES "
+            + ", ".join(["(%s, %s, %s)"] * slot_count),
+            params
+        ))
     
-    execute_mutation(query, params)
-    return appointment_id
+    execute_reservation(queries)
+    return appointment_ids
+
+def create_appointment(appointment_data: Dict) -> str:
+    """
+    Create a new appointment, reserving the doctor's slots in the same transaction
+    
+    Raises:
+        SlotUnavailableError: The doctor already has an appointment in that slot
+    """
+    return create_appointments([appointment_data])[0]
 
 def build_response(status_code: int, data: Any, message: str = None) -> Dict:
     """Build standardized API response"""
@@ -0,0 +1,139 @@
+"""
+Pre-serialized response cache for read-only GET handlers.
+A cached entry holds the final response body (and an optional gzip variant),
+its ETag and the prebuilt headers, so a warm hit skips serialization entirely.
+"""
+import gzip
+import base64
+import hashlib
+import logging
+import functools
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from utils.cache import LRUCache, MISSING
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_TTL_SECONDS = 60
+# Bodies smaller than this are not worth compressing
+MIN_GZIP_BYTES = 1024
+
+RESPONSE_CACHE = LRUCache(max_entries=256, max_bytes=32 * 1024 * 1024, name='responses')
+
+def _get_header(event: Dict[str, Any], name: str) -> Optional[str]:
+    headers = event.get('headers') or {}
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+def _accepts_gzip(event: Dict[str, Any]) -> bool:
+    return 'gzip' in (_get_header(event, 'Accept-Encoding') or '').lower()
+
+def _etag_matches(event: Dict[str, Any], etag: str) -> bool:
+    if_none_match = _get_header(event, 'If-None-Match')
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+
+class CachedResponse:
+    """Serialized 200 response plus everything needed to answer conditional and gzip requests."""
+
+    __slots__ = ('headers', 'body', 'etag', 'gzip_body')
+
+    def __init__(self, headers: Dict[str, str], body: str, min_gzip_bytes: int = MIN_GZIP_BYTES):
+        raw = body.encode('utf-8')
+        self.etag = f'"{hashlib.sha1(raw).hexdigest()}"'
+        self.body = body
+        self.gzip_body = None
+        if len(raw) >= min_gzip_bytes:
+            self.gzip_body = base64.b64encode(gzip.compress(raw, compresslevel=6)).decode('ascii')
+        self.headers = dict(headers or {})
+        self.headers['ETag'] = self.etag
+        if self.gzip_body is not None:
+            self.headers['Vary'] = 'Accept-Encoding'
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzip_body or '')
+
+    def render(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the API Gateway response for this request."""
+        headers = dict(self.headers)
+        if _etag_matches(event, self.etag):
+            headers.pop('Content-Type', None)
+            return {'statusCode': 304, 'headers': headers, 'body': ''}
+        if self.gzip_body is not None and _accepts_gzip(event):
+            headers['Content-Encoding'] = 'gzip'
+            return {'statusCode': 200, 'headers': headers, 'body': self.gzip_body, 'isBase64Encoded': True}
+        return {'statusCode': 200, 'headers': headers, 'body': self.body}
+
+def _cache_key(name: str, event: Dict[str, Any], version: Any, vary_headers: Iterable[str]) -> tuple:
+    query_params = event.get('queryStringParameters') or {}
+    path_params = event.get('pathParameters') or {}
+    return (
+        name,
+        version,
+        tuple(sorted(path_params.items())),
+        tuple(sorted(query_params.items())),
+        tuple((header, _get_header(event, header)) for header in vary_headers)
+    )
+
+def cached_get_response(ttl: float = DEFAULT_TTL_SECONDS, version: Optional[Callable[[], Any]] = None,
+                        vary_headers: Iterable[str] = (), cache: Optional[LRUCache] = None,
+                        min_gzip_bytes: int = MIN_GZIP_BYTES):
+    """
+    Decorator caching the serialized response of a GET handler
+
+    Only use it on handlers whose response depends solely on their path/query
+    parameters (plus any vary_headers). Non-200 responses are never cached.
+
+    Args:
+        ttl: Seconds an entry is served before the handler runs again
+        version: Callable returning the current data version; part of the key, so
+            bumping the version makes every older entry unreachable
+        vary_headers: Request headers whose values also select the entry
+        cache: LRUCache to store entries in (defaults to RESPONSE_CACHE)
+        min_gzip_bytes: Smallest body for which a gzip variant is kept
+
+    Returns:
+        Decorator for handler(event) -> API Gateway response
+    """
+    vary_headers = tuple(vary_headers)
+
+    def decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(event, *args, **kwargs):
+            if (event.get('httpMethod') or 'GET').upper() != 'GET':
+                return func(event, *args, **kwargs)
+
+            store = cache if cache is not None else RESPONSE_CACHE
+            current_version = version() if version else None
+            key = _cache_key(name, event, current_version, vary_headers)
+
+            entry = store.get(key)
+            if entry is MISSING:
+                response = func(event, *args, **kwargs)
+                if response.get('statusCode') != 200 or not isinstance(response.get('body'), str) \
+                        or response.get('isBase64Encoded'):
+                    return response
+                entry = CachedResponse(response.get('headers'), response['body'], min_gzip_bytes)
+                # The handler may have moved the version forward (e.g. by loading data)
+                if version:
+                    key = _cache_key(name, event, version(), vary_headers)
+                store.set(key, entry, ttl=ttl, size=entry.size)
+
+            return entry.render(event)
+
+        return wrapper
+
+    return decorator
+
+def clear_response_cache() -> None:
+    """Drop every cached response."""
+    RESPONSE_CACHE.clear()
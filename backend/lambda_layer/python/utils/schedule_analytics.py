@@ -0,0 +1,217 @@
+"""
+Schedule analytics over appointment intervals.
+Appointments for a period are loaded with one lean query into NumPy arrays
+(doctor index, start minute, duration, status code) and every metric - occupancy,
+gaps, overlaps, status rates and the weekday/hour heatmap - is computed with
+array operations instead of per-row Python loops.
+"""
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from utils.rds_utils import execute_query
+from utils.appointment_times import format_sql_datetime, to_date, to_time
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+STATUSES = ('scheduled', 'confirmed', 'in_progress', 'completed', 'cancelled', 'no_show')
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+CANCELLED = STATUS_CODES['cancelled']
+NO_SHOW = STATUS_CODES['no_show']
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+MINUTES_PER_DAY = 24 * 60
+
+class ScheduleArrays:
+    """Column arrays of the appointments in a period, sorted by doctor then start."""
+
+    def __init__(self, start_date: date, days: int, doctor_ids: List[str], doctor: np.ndarray,
+                 start: np.ndarray, duration: np.ndarray, status: np.ndarray):
+        """
+        Args:
+            start_date: First day of the period
+            days: Number of days in the period
+            doctor_ids: Doctor ID for each doctor index
+            doctor: Doctor index per appointment
+            start: Start, in minutes since start_date 00:00
+            duration: Duration in minutes
+            status: Status code (see STATUS_CODES)
+        """
+        order = np.lexsort((start, doctor))
+        self.start_date = start_date
+        self.days = days
+        self.doctor_ids = doctor_ids
+        self.doctor = doctor[order]
+        self.start = start[order]
+        self.duration = duration[order]
+        self.status = status[order]
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, Any]], start_date, end_date,
+                  doctor_ids: Optional[List[str]] = None) -> 'ScheduleArrays':
+        """
+        Build the arrays from rows with doctor_id, start_minute, duration_minutes and status
+
+        Args:
+            rows: Query rows
+            start_date: First day of the period
+            end_date: Last day of the period, inclusive
+            doctor_ids: Doctors to report on even without appointments
+        """
+        start_date, end_date = to_date(start_date), to_date(end_date)
+        row_doctors = [row['doctor_id'] for row in rows]
+        names, doctor = np.unique(np.array(row_doctors + list(doctor_ids or []), dtype=object),
+                                  return_inverse=True)
+        return cls(
+            start_date,
+            (end_date - start_date).days + 1,
+            [str(name) for name in names],
+            doctor[:len(rows)].astype(np.int64),
+            np.fromiter((row['start_minute'] for row in rows), dtype=np.int64, count=len(rows)),
+            np.fromiter((row['duration_minutes'] or 0 for row in rows), dtype=np.int64, count=len(rows)),
+            np.fromiter((STATUS_CODES.get(row['status'], 0) for row in rows), dtype=np.int64, count=len(rows))
+        )
+
+def load_schedule(start_date, end_date, doctor_ids: Optional[List[str]] = None,
+                  query: Optional[Callable[..., Any]] = None) -> ScheduleArrays:
+    """
+    Load the appointments starting in [start_date, end_date] into ScheduleArrays
+
+    Minutes and durations are computed by MySQL so no datetime objects are built.
+    """
+    start_date, end_date = to_date(start_date), to_date(end_date)
+    period_start = format_sql_datetime(_midnight(start_date))
+    sql = """
+        SELECT doctor_id,
+               TIMESTAMPDIFF(MINUTE, %s, start_at) AS start_minute,
+               TIMESTAMPDIFF(MINUTE, start_at, end_at) AS duration_minutes,
+               status
+        FROM appointments
+        WHERE start_at >= %s AND start_at < %s
+    """
+    params = [period_start, period_start, format_sql_datetime(_midnight(end_date + timedelta(days=1)))]
+    if doctor_ids:
+        sql += f" AND doctor_id IN ({', '.join(['%s'] * len(doctor_ids))})"
+        params.extend(doctor_ids)
+
+    rows = (query or execute_query)(sql, tuple(params)) or []
+    return ScheduleArrays.from_rows(rows, start_date, end_date, doctor_ids)
+
+def _midnight(day: date) -> datetime:
+    return datetime.combine(day, time())
+
+def _rate(numerator, denominator):
+    return np.divide(numerator, denominator, out=np.zeros(np.shape(numerator), dtype=float),
+                     where=np.asarray(denominator) > 0)
+
+def analyze_schedule(schedule: ScheduleArrays, work_start: str = '08:00', work_end: str = '18:00') -> Dict[str, Any]:
+    """
+    Compute utilization, gaps, overlaps, status rates and the peak-hour heatmap
+
+    Args:
+        schedule: ScheduleArrays for the period
+        work_start: Start of the working day (HH:MM), for utilization
+        work_end: End of the working day (HH:MM), for utilization
+
+    Returns:
+        dict: JSON-ready analytics
+    """
+    start_of_day, end_of_day = to_time(work_start), to_time(work_end)
+    work_start_minute = start_of_day.hour * 60 + start_of_day.minute
+    workday_minutes = max(0, end_of_day.hour * 60 + end_of_day.minute - work_start_minute)
+
+    doctors, days = len(schedule.doctor_ids), schedule.days
+    doctor, start, duration, status = schedule.doctor, schedule.start, schedule.duration, schedule.status
+    day = start // MINUTES_PER_DAY
+
+    # Status counts per doctor
+    status_counts = np.bincount(doctor * len(STATUSES) + status,
+                                minlength=doctors * len(STATUSES)).reshape(doctors, len(STATUSES))
+    totals = status_counts.sum(axis=1)
+
+    # Intervals that hold the doctor's time, still sorted by (doctor, start)
+    held = status != CANCELLED
+    h_doctor, h_start, h_day = doctor[held], start[held], day[held]
+    h_end = h_start + duration[held]
+
+    # Offsetting each doctor past the previous one lets a single running maximum
+    # of end times stand in for a per-doctor one
+    offset = (days + 2) * MINUTES_PER_DAY
+    shifted_start = h_start + h_doctor * offset
+    shifted_end = h_end + h_doctor * offset
+    previous_end = np.empty_like(shifted_end)
+    if len(shifted_end):
+        previous_end[0] = np.iinfo(np.int64).min // 2
+        previous_end[1:] = np.maximum.accumulate(shifted_end)[:-1]
+
+    # Minutes each interval adds to the union of busy time, and the part that overlaps earlier ones
+    covered = np.clip(shifted_end - np.maximum(shifted_start, previous_end), 0, None)
+    overlap = (h_end - h_start) - covered
+    # Idle time since the previous interval of the same doctor on the same day
+    same_day = np.zeros(len(h_start), dtype=bool)
+    same_day[1:] = (h_doctor[1:] == h_doctor[:-1]) & (h_day[1:] == h_day[:-1])
+    gap = np.where(same_day, np.clip(shifted_start - previous_end, 0, None), 0)
+
+    doctor_day = h_doctor * days + np.minimum(h_day, days - 1)
+    busy = np.bincount(doctor_day, weights=covered, minlength=doctors * days).reshape(doctors, days)
+    daily_utilization = busy / workday_minutes if workday_minutes else np.zeros_like(busy)
+    busy_minutes = busy.sum(axis=1)
+    capacity = workday_minutes * days
+    gap_minutes = np.bincount(h_doctor, weights=gap, minlength=doctors)
+    overlap_counts = np.bincount(h_doctor, weights=overlap > 0, minlength=doctors)
+    overlap_minutes = np.bincount(h_doctor, weights=overlap, minlength=doctors)
+
+    # Appointments per weekday and hour, excluding cancellations
+    weekday = (schedule.start_date.weekday() + h_day) % 7
+    hour = (h_start % MINUTES_PER_DAY) // 60
+    heatmap = np.bincount(weekday * 24 + hour, minlength=7 * 24).reshape(7, 24)
+
+    cancelled, no_show = status_counts[:, CANCELLED], status_counts[:, NO_SHOW]
+    attended_or_missed = totals - cancelled
+
+    doctor_reports = []
+    for index, doctor_id in enumerate(schedule.doctor_ids):
+        doctor_reports.append({
+            'doctor_id': doctor_id,
+            'appointments': int(totals[index]),
+            'by_status': {name: int(status_counts[index, code]) for name, code in STATUS_CODES.items()},
+            'booked_minutes': int(busy_minutes[index]),
+            'utilization': round(float(busy_minutes[index] / capacity), 4) if capacity else 0.0,
+            'daily_utilization': [round(float(value), 4) for value in daily_utilization[index]],
+            'gap_minutes': int(gap_minutes[index]),
+            'overlaps': int(overlap_counts[index]),
+            'overlap_minutes': int(overlap_minutes[index]),
+            'no_show_rate': round(float(_rate(no_show[index], attended_or_missed[index])), 4),
+            'cancellation_rate': round(float(_rate(cancelled[index], totals[index])), 4)
+        })
+
+    all_statuses = status_counts.sum(axis=0)
+    total = int(totals.sum())
+    return {
+        'period': {
+            'start_date': schedule.start_date.isoformat(),
+            'end_date': (schedule.start_date + timedelta(days=days - 1)).isoformat(),
+            'days': days
+        },
+        'workday_minutes': workday_minutes,
+        'totals': {
+            'appointments': total,
+            'by_status': {name: int(all_statuses[code]) for name, code in STATUS_CODES.items()},
+            'booked_minutes': int(busy_minutes.sum()),
+            'utilization': round(float(busy_minutes.sum() / (capacity * doctors)), 4) if capacity and doctors else 0.0,
+            'no_show_rate': round(float(_rate(all_statuses[NO_SHOW], total - all_statuses[CANCELLED])), 4),
+            'cancellation_rate': round(float(_rate(all_statuses[CANCELLED], total)), 4),
+            'overlaps': int(overlap_counts.sum())
+        },
+        'doctors': doctor_reports,
+        'heatmap': {
+            'weekdays': list(WEEKDAYS),
+            'hours': list(range(24)),
+            'counts': heatmap.tolist()
+        }
+    }
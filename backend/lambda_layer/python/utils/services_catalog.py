@@ -0,0 +1,280 @@
+"""
+In-memory services catalog for warm Lambda containers.
+Loads the whole services table once, indexes it by id, category, active flag and
+name prefix, and answers every filtered listing from memory. Writes handled by
+the same container are applied to the indexes directly; writes from other
+containers are picked up through the cache version bus, or when the catalog
+expires and is reloaded.
+"""
+import json
+import time
+import decimal
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from utils.db_utils import scan_table
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_TTL_SECONDS = 300
+DEFAULT_MAX_ITEMS = 5000
+
+def _normalize_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Store numbers as Decimal, the way DynamoDB returns them, whatever the caller passed."""
+    return json.loads(json.dumps(item, default=str), parse_float=decimal.Decimal)
+
+def _name_tokens(name: Optional[str]) -> List[str]:
+    return [token for token in (name or '').lower().split() if token]
+
+def _matches(service: Dict[str, Any], category: Optional[str], active: Optional[bool], tokens: List[str]) -> bool:
+    if category is not None and service.get('category') != category:
+        return False
+    if active is not None and bool(service.get('active', True)) != bool(active):
+        return False
+    if tokens:
+        words = _name_tokens(service.get('name'))
+        return all(any(word.startswith(token) for word in words) for token in tokens)
+    return True
+
+class PrefixTrie:
+    """Word-prefix index mapping every prefix of every name token to service ids."""
+
+    def __init__(self):
+        self._root: Dict[str, Any] = {}
+
+    def add(self, text: str, item_id: str) -> None:
+        for token in _name_tokens(text):
+            node = self._root
+            for char in token:
+                node = node.setdefault(char, {})
+                node.setdefault('', set()).add(item_id)
+
+    def remove(self, text: str, item_id: str) -> None:
+        for token in _name_tokens(text):
+            node = self._root
+            for char in token:
+                node = node.get(char)
+                if node is None:
+                    break
+                node.get('', set()).discard(item_id)
+
+    def search(self, prefix: str) -> set:
+        """Ids whose name has a word starting with every word of prefix."""
+        result = None
+        for token in _name_tokens(prefix):
+            node = self._root
+            for char in token:
+                node = node.get(char)
+                if node is None:
+                    return set()
+            ids = node.get('', set())
+            result = set(ids) if result is None else result & ids
+        return result or set()
+
+class ServicesCatalog:
+    """
+    Versioned, size-bounded snapshot of the services table.
+
+    `version` increases every time the snapshot changes (reload or write), so
+    derived caches can key on it instead of tracking invalidations themselves.
+    """
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_items: int = DEFAULT_MAX_ITEMS,
+                 loader: Optional[Callable[[str], Iterable[Dict[str, Any]]]] = None,
+                 bus=None, entity: str = 'services'):
+        """
+        Args:
+            ttl_seconds: How long a loaded snapshot is served before reloading
+            max_items: Catalogs larger than this are not kept in memory
+            loader: Callable returning all services for a table (defaults to scan_table)
+            bus: Optional CacheVersionBus announcing writes made by other containers
+            entity: Entity name the catalog's version is tracked under on the bus
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_items = max_items
+        self._loader = loader or scan_table
+        self._lock = threading.RLock()
+        self.version = 0
+        self.table_name = None
+        self.loaded_at = 0.0
+        self.bus = bus
+        self.entity = entity
+        self._seen_version = None
+        self._reset_indexes()
+
+    def _reset_indexes(self) -> None:
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_category: Dict[str, set] = {}
+        self._by_active: Dict[bool, set] = {True: set(), False: set()}
+        self._trie = PrefixTrie()
+        self._loaded = False
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def is_fresh(self, table_name: str) -> bool:
+        if not (self._loaded and self.table_name == table_name
+                and time.time() - self.loaded_at < self.ttl_seconds):
+            return False
+        return self.bus is None or self.bus.current(self.entity) == self._seen_version
+
+    def _announce_write(self) -> None:
+        """Bump the shared version; keep the snapshot only if no one else wrote in between."""
+        if self.bus is None:
+            return
+        new_version = self.bus.bump(self.entity)
+        if new_version is not None and self._seen_version is not None and new_version == self._seen_version + 1:
+            self._seen_version = new_version
+
+    def invalidate(self) -> None:
+        """Drop the snapshot; the next read reloads it."""
+        with self._lock:
+            self._reset_indexes()
+            self.version += 1
+
+    def ensure_loaded(self, table_name: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Load (or reload) the catalog if it is missing, expired or for another table
+
+        Returns:
+            None when reads can be served from the indexes, otherwise the freshly
+            loaded services of a catalog too large to keep in memory
+        """
+        if self.is_fresh(table_name):
+            return None
+        with self._lock:
+            if self.is_fresh(table_name):
+                return None
+            # Read the version before loading so writes racing the load trigger another one
+            seen_version = self.bus.current(self.entity, force=True) if self.bus is not None else None
+            services = list(self._loader(table_name))
+            self._reset_indexes()
+            self._seen_version = seen_version
+            self.table_name = table_name
+            self.version += 1
+            if len(services) > self.max_items:
+                logger.warning(
+                    f"Services catalog has {len(services)} items (max {self.max_items}); not caching"
+                )
+                return services
+            for service in services:
+                self._index(service)
+            self._loaded = True
+            self.loaded_at = time.time()
+            logger.info(f"Loaded services catalog v{self.version} with {len(services)} services")
+            return None
+
+    def list_services(self, table_name: str, category: Optional[str] = None, active: Optional[bool] = None,
+                      prefix: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Return the services matching the filters, loading the catalog first if needed
+
+        Args:
+            table_name: Services table name
+            category: Exact category match
+            active: Active flag
+            prefix: Name prefix (every word must prefix a word of the name)
+            limit: Maximum number of services to return
+
+        Returns:
+            list: Matching services in catalog order
+        """
+        overflow = self.ensure_loaded(table_name)
+        if overflow is None:
+            return self.query(category=category, active=active, prefix=prefix, limit=limit)
+        tokens = _name_tokens(prefix)
+        result = [service for service in overflow if _matches(service, category, active, tokens)]
+        return result[:limit] if limit else result
+
+    def get_service(self, table_name: str, service_id: str) -> Optional[Dict[str, Any]]:
+        """Look a service up by id in the (freshly loaded) catalog."""
+        if self.ensure_loaded(table_name) is None:
+            return self.get(service_id)
+        return None
+
+    def _index(self, service: Dict[str, Any]) -> None:
+        service_id = service.get('id')
+        if service_id is None:
+            return
+        self._by_id[service_id] = service
+        self._by_category.setdefault(service.get('category'), set()).add(service_id)
+        self._by_active[bool(service.get('active', True))].add(service_id)
+        self._trie.add(service.get('name'), service_id)
+
+    def _unindex(self, service_id: str) -> Optional[Dict[str, Any]]:
+        service = self._by_id.pop(service_id, None)
+        if service is None:
+            return None
+        category_ids = self._by_category.get(service.get('category'))
+        if category_ids is not None:
+            category_ids.discard(service_id)
+            if not category_ids:
+                del self._by_category[service.get('category')]
+        for ids in self._by_active.values():
+            ids.discard(service_id)
+        self._trie.remove(service.get('name'), service_id)
+        return service
+
+    def upsert(self, service: Dict[str, Any]) -> None:
+        """Apply a created or updated service to a loaded catalog."""
+        if not service:
+            return
+        with self._lock:
+            self.version += 1
+            if self._loaded:
+                if len(self._by_id) >= self.max_items and service.get('id') not in self._by_id:
+                    self._reset_indexes()
+                else:
+                    self._unindex(service.get('id'))
+                    self._index(_normalize_item(service))
+            self._announce_write()
+
+    def remove(self, service_id: str) -> None:
+        """Remove a deleted service from a loaded catalog."""
+        with self._lock:
+            self.version += 1
+            if self._loaded:
+                self._unindex(service_id)
+            self._announce_write()
+
+    def get(self, service_id: str) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(service_id)
+
+    def all(self) -> List[Dict[str, Any]]:
+        return list(self._by_id.values())
+
+    def categories(self) -> List[str]:
+        return sorted(category for category in self._by_category if category is not None)
+
+    def query(self, category: Optional[str] = None, active: Optional[bool] = None,
+              prefix: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Filter the loaded catalog using the in-memory indexes
+
+        Args:
+            category: Exact category match
+            active: Active flag
+            prefix: Name prefix (every word must prefix a word of the name)
+            limit: Maximum number of services to return
+
+        Returns:
+            list: Matching services in catalog order
+        """
+        candidate_sets = []
+        if category is not None:
+            candidate_sets.append(self._by_category.get(category, set()))
+        if active is not None:
+            candidate_sets.append(self._by_active[bool(active)])
+        if prefix:
+            candidate_sets.append(self._trie.search(prefix))
+
+        if candidate_sets:
+            matches = set.intersection(*[set(ids) for ids in candidate_sets])
+            services = [service for service_id, service in self._by_id.items() if service_id in matches]
+        else:
+            services = list(self._by_id.values())
+
+        return services[:limit] if limit else services
@@ -0,0 +1,374 @@
+"""
+In-memory directory of the Cognito user pool for warm Lambda containers.
+The whole pool is synced with every ListUsers page once, indexed by username,
+email, role, status and name prefix, and every filtered, sorted listing is
+answered from memory instead of paging Cognito per request.
+
+Changes made by the user admin handlers are published as entries of a change
+log: the 'users' version on the cache bus is bumped and the changed record is
+stored under that version, in the shared cache when REDIS_URL is set and as an
+expiring item of the cache versions table otherwise. Readers that see the
+version move apply the missing entries to their snapshot; if any entry is
+unavailable (expired, or no shared store at all) they resync the pool instead. Snapshots
+older than the TTL are resynced in a background thread while the current one
+keeps being served.
+"""
+import os
+import json
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import boto3
+from botocore.exceptions import ClientError
+
+from utils.cache_invalidation import get_version_bus
+from utils.cache_backends import SharedCache
+from utils.services_catalog import PrefixTrie
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+USERS_ENTITY = 'users'
+DEFAULT_TTL_SECONDS = 900
+# ListUsers returns at most 60 users per page
+LIST_USERS_PAGE_SIZE = 60
+CHANGE_LOG_TTL_SECONDS = 3600
+# Entity prefix of change log items in the cache versions table
+CHANGE_LOG_ENTITY_PREFIX = 'user-changes#'
+SORT_FIELDS = ('username', 'email', 'firstName', 'lastName', 'role', 'userStatus',
+               'userCreateDate', 'userLastModifiedDate')
+
+class VersionTableChangeLog:
+    """
+    Change log entries stored as items of the cache versions table, for
+    deployments without a Redis tier. Items carry an expiresAt epoch, removed
+    by the table's TTL and ignored once past it.
+    """
+
+    def __init__(self, table_name: str, ttl: float = CHANGE_LOG_TTL_SECONDS, dynamodb_resource=None):
+        self.table_name = table_name
+        self.ttl = ttl
+        self._client = (dynamodb_resource or boto3.resource('dynamodb')).meta.client
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            response = self._client.get_item(TableName=self.table_name, ConsistentRead=True,
+                                              Key={'entity': CHANGE_LOG_ENTITY_PREFIX + key})
+        except ClientError as e:
+            logger.warning(f"Could not read user change {key}: {e}")
+            return None
+        item = response.get('Item')
+        if not item or int(item.get('expiresAt', 0)) < time.time():
+            return None
+        return json.loads(item['change'])
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        try:
+            self._client.put_item(TableName=self.table_name, Item={
+                'entity': CHANGE_LOG_ENTITY_PREFIX + key,
+                'change': json.dumps(value, default=str),
+                'expiresAt': int(time.time() + self.ttl)
+            })
+        except ClientError as e:
+            logger.warning(f"Could not write user change {key}: {e}")
+
+_change_log = None
+
+def get_change_log():
+    """
+    Return the user change log: the shared cache when REDIS_URL is set, the
+    cache versions table when only CACHE_VERSIONS_TABLE is, and the
+    process-local cache otherwise
+    """
+    global _change_log
+    if _change_log is None:
+        table_name = os.environ.get('CACHE_VERSIONS_TABLE')
+        if table_name and not os.environ.get('REDIS_URL'):
+            _change_log = VersionTableChangeLog(table_name)
+        else:
+            _change_log = SharedCache('user-changes', ttl=CHANGE_LOG_TTL_SECONDS)
+    return _change_log
+
+def _isoformat(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+def normalize_user(user: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a Cognito ListUsers/AdminGetUser record into the API's user shape"""
+    attributes = {attr['Name']: attr['Value']
+                  for attr in user.get('Attributes') or user.get('UserAttributes') or []}
+    return {
+        'username': user.get('Username'),
+        'enabled': user.get('Enabled'),
+        'userStatus': user.get('UserStatus'),
+        'userCreateDate': _isoformat(user.get('UserCreateDate')),
+        'userLastModifiedDate': _isoformat(user.get('UserLastModifiedDate')),
+        'email': attributes.get('email', ''),
+        'sub': attributes.get('sub', ''),
+        'firstName': attributes.get('given_name', ''),
+        'lastName': attributes.get('family_name', ''),
+        'phone': attributes.get('phone_number', ''),
+        'role': attributes.get('custom:role', 'user')
+    }
+
+def fetch_all_users(user_pool_id: str, cognito=None) -> List[Dict[str, Any]]:
+    """Read every user of the pool, following PaginationToken to the last page"""
+    cognito = cognito or boto3.client('cognito-idp')
+    users = []
+    params = {'UserPoolId': user_pool_id, 'Limit': LIST_USERS_PAGE_SIZE}
+    while True:
+        result = cognito.list_users(**params)
+        users.extend(normalize_user(user) for user in result.get('Users', []))
+        token = result.get('PaginationToken')
+        if not token:
+            return users
+        params['PaginationToken'] = token
+
+def record_user_change(username: str, user: Optional[Dict[str, Any]] = None, deleted: bool = False,
+                       **fields) -> None:
+    """
+    Publish a change made to a user so every container's directory picks it up
+
+    Args:
+        username: Cognito username
+        user: The user's full record (normalize_user shape), when known
+        deleted: The user was deleted
+        **fields: Changed fields, when the full record is not known (e.g. enabled=False)
+    """
+    change = {'username': username, 'user': user, 'deleted': deleted, 'fields': fields}
+    try:
+        version = get_version_bus().bump(USERS_ENTITY)
+        if version is not None:
+            get_change_log().set(str(version), change)
+        # Containers that did not share the cache tier fall back to a resync
+        _directory.apply_change(change, version)
+    except Exception as e:
+        logger.warning(f"Could not publish change to user {username}: {e}")
+
+def record_user_changes(changes: List[Dict[str, Any]]) -> None:
+    """
+    Publish many changes at once, e.g. from a bulk operation
+
+    A single version is bumped without change log entries, so other containers
+    resync once instead of replaying every change. Each change is a dict of
+    record_user_change's arguments.
+    """
+    if not changes:
+        return
+    try:
+        version = get_version_bus().bump(USERS_ENTITY)
+        for change in changes:
+            _directory.apply_change({'username': change['username'], 'user': change.get('user'),
+                                     'deleted': change.get('deleted', False), 'fields': change.get('fields', {})})
+        _directory.mark_seen(version)
+    except Exception as e:
+        logger.warning(f"Could not publish {len(changes)} user changes: {e}")
+
+class UserDirectory:
+    """Snapshot of a user pool with in-memory indexes, kept current through the change log"""
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS, loader=None, bus=None,
+                 change_log=None):
+        """
+        Args:
+            ttl_seconds: Age after which the snapshot is resynced in the background
+            loader: Callable returning all normalized users of a pool (defaults to fetch_all_users)
+            bus: CacheVersionBus the change log versions are read from (defaults to the process bus)
+            change_log: Store of the change entries, with get/set (defaults to get_change_log())
+        """
+        self.ttl_seconds = ttl_seconds
+        self._loader = loader or fetch_all_users
+        self._bus = bus
+        self._change_log = change_log
+        self._lock = threading.RLock()
+        self._refreshing = False
+        self.user_pool_id = None
+        self.loaded_at = 0.0
+        self.syncs = 0
+        self._seen_version = None
+        self._reset_indexes()
+
+    @property
+    def bus(self):
+        return self._bus if self._bus is not None else get_version_bus()
+
+    @property
+    def change_log(self):
+        return self._change_log if self._change_log is not None else get_change_log()
+
+    def _reset_indexes(self) -> None:
+        self._by_username: Dict[str, Dict[str, Any]] = {}
+        self._by_email: Dict[str, str] = {}
+        self._by_role: Dict[str, set] = {}
+        self._by_status: Dict[str, set] = {}
+        self._by_enabled: Dict[bool, set] = {True: set(), False: set()}
+        self._trie = PrefixTrie()
+        self._loaded = False
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    @staticmethod
+    def _search_text(user: Dict[str, Any]) -> str:
+        return ' '.join(str(user.get(field) or '') for field in ('firstName', 'lastName', 'email', 'username'))
+
+    def _index(self, user: Dict[str, Any]) -> None:
+        username = user.get('username')
+        if not username:
+            return
+        self._by_username[username] = user
+        if user.get('email'):
+            self._by_email[user['email'].lower()] = username
+        self._by_role.setdefault(user.get('role'), set()).add(username)
+        self._by_status.setdefault(user.get('userStatus'), set()).add(username)
+        self._by_enabled[bool(user.get('enabled'))].add(username)
+        self._trie.add(self._search_text(user), username)
+
+    def _unindex(self, username: str) -> Optional[Dict[str, Any]]:
+        user = self._by_username.pop(username, None)
+        if user is None:
+            return None
+        if user.get('email') and self._by_email.get(user['email'].lower()) == username:
+            del self._by_email[user['email'].lower()]
+        for index in (self._by_role, self._by_status, self._by_enabled):
+            for usernames in index.values():
+                usernames.discard(username)
+        self._trie.remove(self._search_text(user), username)
+        return user
+
+    def sync(self, user_pool_id: str) -> None:
+        """Replace the snapshot with a full read of the pool"""
+        # Read the version first so changes racing the sync are applied on top of it
+        version = self.bus.current(USERS_ENTITY, force=True)
+        users = self._loader(user_pool_id)
+        with self._lock:
+            self._reset_indexes()
+            for user in users:
+                self._index(user)
+            self.user_pool_id = user_pool_id
+            self._seen_version = version
+            self._loaded = True
+            self.loaded_at = time.time()
+            self.syncs += 1
+        logger.info(f"Synced user directory with {len(users)} users (v{version})")
+
+    def _sync_in_background(self, user_pool_id: str) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.sync(user_pool_id)
+            except Exception as e:
+                logger.warning(f"Background user directory sync failed: {e}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def apply_change(self, change: Dict[str, Any], version: Optional[int] = None) -> None:
+        """Apply one change log entry to a loaded snapshot"""
+        with self._lock:
+            if not self._loaded:
+                return
+            username = change['username']
+            existing = self._unindex(username)
+            if not change.get('deleted'):
+                if change.get('user'):
+                    self._index(dict(change['user']))
+                elif existing is not None:
+                    self._index(dict(existing, **change.get('fields', {})))
+            self.mark_seen(version)
+
+    def mark_seen(self, version: Optional[int]) -> None:
+        """Advance the snapshot's version past a change already applied locally"""
+        with self._lock:
+            if version is not None and self._seen_version is not None and version == self._seen_version + 1:
+                self._seen_version = version
+
+    def _catch_up(self, user_pool_id: str) -> None:
+        """Apply the change log entries written since the snapshot's version, or resync"""
+        version = self.bus.current(USERS_ENTITY)
+        if self._seen_version is None or version <= self._seen_version:
+            return
+        changes = [self.change_log.get(str(v)) for v in range(self._seen_version + 1, version + 1)]
+        if any(change is None for change in changes):
+            logger.info(f"User change log incomplete (v{self._seen_version} -> v{version}); resyncing")
+            self.sync(user_pool_id)
+            return
+        with self._lock:
+            for change in changes:
+                self.apply_change(change)
+            self._seen_version = version
+
+    def ensure_loaded(self, user_pool_id: str) -> None:
+        """Load the pool on first use, catch up with changes and refresh a stale snapshot"""
+        if not self._loaded or self.user_pool_id != user_pool_id:
+            self.sync(user_pool_id)
+            return
+        self._catch_up(user_pool_id)
+        if time.time() - self.loaded_at >= self.ttl_seconds:
+            self._sync_in_background(user_pool_id)
+
+    def get(self, username: str) -> Optional[Dict[str, Any]]:
+        return self._by_username.get(username)
+
+    def get_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        username = self._by_email.get((email or '').lower())
+        return self._by_username.get(username) if username else None
+
+    def query(self, role: Optional[str] = None, enabled: Optional[bool] = None,
+              status: Optional[str] = None, search: Optional[str] = None,
+              sort_by: str = 'username', descending: bool = False,
+              offset: int = 0, limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Filter and sort the snapshot using the in-memory indexes
+
+        Args:
+            role: Exact role (custom:role)
+            enabled: Enabled flag
+            status: Cognito user status, e.g. CONFIRMED
+            search: Prefix of every word searched in names, email and username
+            sort_by: One of SORT_FIELDS
+            descending: Reverse the sort order
+            offset: Matches to skip
+            limit: Maximum number of users to return
+
+        Returns:
+            tuple: (page of users, total number of matches)
+        """
+        with self._lock:
+            candidate_sets = []
+            if role is not None:
+                candidate_sets.append(self._by_role.get(role, set()))
+            if enabled is not None:
+                candidate_sets.append(self._by_enabled[bool(enabled)])
+            if status is not None:
+                candidate_sets.append(self._by_status.get(status, set()))
+            if search:
+                candidate_sets.append(self._trie.search(search))
+
+            if candidate_sets:
+                usernames = set.intersection(*[set(names) for names in candidate_sets])
+                users = [self._by_username[name] for name in usernames]
+            else:
+                users = list(self._by_username.values())
+
+        users.sort(key=lambda user: (str(user.get(sort_by) or '').lower(), user['username']), reverse=descending)
+        page = users[offset:offset + limit] if limit else users[offset:]
+        return [dict(user) for user in page], len(users)
+
+    def list_users(self, user_pool_id: str, **filters) -> Tuple[List[Dict[str, Any]], int]:
+        """Return a filtered, sorted page of the pool's users, loading the directory first if needed"""
+        self.ensure_loaded(user_pool_id)
+        return self.query(**filters)
+
+_directory = UserDirectory()
+
+def get_user_directory() -> UserDirectory:
+    """Return the directory shared by every request served by this container"""
+    return _directory
@@ -0,0 +1,215 @@
+"""
+Keeps the Aurora users table in sync with the Cognito user pool.
+Appointments and patients join users for doctor and creator names, so every
+Cognito write made by the user handlers is mirrored into the table as it
+happens, and a periodic reconciler diffs the whole pool against the table in
+bulk to repair anything that changed outside those handlers.
+
+Users are keyed by their Cognito sub, which is also what handlers record as
+created_by. Users removed from Cognito are deactivated rather than deleted,
+because appointments and reports keep referencing them. Only staff roles fit
+the users.role ENUM: users with any other Cognito role (e.g. 'user') are not
+mirrored, and a row left from an earlier staff role is deactivated.
+"""
+import os
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.rds_utils import (
+    deactivate_users, get_all_users, update_user_by_username, update_users_by_username, upsert_users
+)
+from utils.user_directory import fetch_all_users
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+AURORA_ROLES = ('admin', 'doctor', 'nurse', 'receptionist')
+# Cognito calls the front desk role 'frontdesk'; the users.role ENUM calls it 'receptionist'
+COGNITO_TO_AURORA_ROLE = {'frontdesk': 'receptionist'}
+AURORA_TO_COGNITO_ROLE = {'receptionist': 'frontdesk'}
+DELETED_STATUS = 'DELETED'
+UPSERT_BATCH_SIZE = 200
+# API user fields and the users columns they are stored in
+FIELD_COLUMNS = {
+    'email': 'email', 'firstName': 'first_name', 'lastName': 'last_name', 'role': 'role',
+    'phone': 'phone', 'enabled': 'is_active', 'userStatus': 'user_status'
+}
+SYNCED_COLUMNS = ('username', 'email', 'first_name', 'last_name', 'role', 'phone', 'is_active', 'user_status')
+
+def to_aurora_role(role: Optional[str]) -> Optional[str]:
+    """Map a Cognito role to its users.role value, or None when it is not a staff role"""
+    role = COGNITO_TO_AURORA_ROLE.get((role or '').lower(), (role or '').lower())
+    return role if role in AURORA_ROLES else None
+
+def from_aurora_role(role: Optional[str]) -> Optional[str]:
+    return AURORA_TO_COGNITO_ROLE.get(role, role)
+
+def _column_value(column: str, value: Any) -> Any:
+    if column == 'role':
+        return to_aurora_role(value)
+    if column == 'email':
+        return (value or '').strip().lower()
+    if column == 'is_active':
+        return bool(value)
+    if column in ('first_name', 'last_name'):
+        return (value or '').strip()
+    return value or None
+
+def user_to_row(user: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a user in the API shape (see user_directory.normalize_user) to a users row"""
+    row = {'id': user.get('sub') or user.get('username'), 'username': user.get('username')}
+    for field, column in FIELD_COLUMNS.items():
+        row[column] = _column_value(column, user.get(field))
+    return row
+
+def row_to_user(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a users row to the API user shape"""
+    def isoformat(value):
+        return value.isoformat() if hasattr(value, 'isoformat') else value
+
+    return {
+        'username': row.get('username'),
+        'enabled': bool(row.get('is_active')),
+        'userStatus': row.get('user_status'),
+        'userCreateDate': isoformat(row.get('created_at')),
+        'userLastModifiedDate': isoformat(row.get('updated_at')),
+        'email': row.get('email') or '',
+        'sub': row.get('id'),
+        'firstName': row.get('first_name') or '',
+        'lastName': row.get('last_name') or '',
+        'phone': row.get('phone') or '',
+        'role': from_aurora_role(row.get('role'))
+    }
+
+def sync_user_to_aurora(username: str, user: Optional[Dict[str, Any]] = None, deleted: bool = False,
+                        **fields) -> None:
+    """
+    Mirror a Cognito change to the users table; failures are logged, not raised
+
+    Args:
+        username: Cognito username
+        user: The user's full record (API shape), upserted when given
+        deleted: The user was deleted from Cognito
+        **fields: Changed API fields, when the full record is not known
+    """
+    if not os.environ.get('DB_HOST'):
+        return
+    try:
+        if user and to_aurora_role(user.get('role')) is None:
+            logger.info(f"Not syncing user {username} with non-staff role {user.get('role')!r}; deactivating any row")
+            update_user_by_username(username, {'is_active': False})
+        elif user:
+            upsert_users([user_to_row(user)])
+        else:
+            update_user_by_username(username, _changed_columns(fields, deleted))
+    except Exception as e:
+        logger.warning(f"Could not sync user {username} to Aurora: {e}")
+
+def _changed_columns(fields: Dict[str, Any], deleted: bool = False) -> Dict[str, Any]:
+    if deleted:
+        return {'is_active': False, 'user_status': DELETED_STATUS}
+    columns = {FIELD_COLUMNS[field]: _column_value(FIELD_COLUMNS[field], value)
+               for field, value in fields.items() if field in FIELD_COLUMNS}
+    if 'role' in columns and columns['role'] is None:
+        # Moved to a non-staff role: keep the row's role, take the user out of the staff lists
+        del columns['role']
+        columns['is_active'] = False
+    return columns
+
+def sync_users_to_aurora(changes: List[Dict[str, Any]]) -> None:
+    """
+    Mirror many Cognito changes with as few statements as possible; failures are logged, not raised
+
+    Full records are upserted in batches and users sharing the same field
+    changes (e.g. all disabled) are updated with one UPDATE per batch. Each
+    change is a dict of sync_user_to_aurora's arguments.
+    """
+    if not os.environ.get('DB_HOST') or not changes:
+        return
+    try:
+        staff = [change for change in changes
+                 if change.get('user') and to_aurora_role(change['user'].get('role')) is not None]
+        rows = [user_to_row(change['user']) for change in staff]
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            upsert_users(rows[start:start + UPSERT_BATCH_SIZE])
+
+        groups: Dict[tuple, List[str]] = {}
+        for change in changes:
+            if change.get('user'):
+                if to_aurora_role(change['user'].get('role')) is None:
+                    groups.setdefault((('is_active', False),), []).append(change['username'])
+                continue
+            columns = _changed_columns(change.get('fields', {}), change.get('deleted', False))
+            if columns:
+                groups.setdefault(tuple(columns.items()), []).append(change['username'])
+        for columns, usernames in groups.items():
+            for start in range(0, len(usernames), UPSERT_BATCH_SIZE):
+                update_users_by_username(usernames[start:start + UPSERT_BATCH_SIZE], dict(columns))
+    except Exception as e:
+        logger.warning(f"Could not sync {len(changes)} users to Aurora: {e}")
+
+def _comparable(row: Dict[str, Any]) -> tuple:
+    return tuple(bool(row.get(column)) if column == 'is_active' else (row.get(column) or None)
+                 for column in SYNCED_COLUMNS)
+
+def reconcile_users(user_pool_id: str, loader: Callable[[str], List[Dict[str, Any]]] = None,
+                    dry_run: bool = False) -> Dict[str, int]:
+    """
+    Diff the whole Cognito pool against the users table and repair the differences in bulk
+
+    Rows are matched on id (the Cognito sub), then on email for rows imported
+    before the sync existed. Changed and missing users are upserted in batches;
+    synced rows whose user is gone from Cognito are deactivated with batched UPDATEs.
+    Users without a staff role are skipped, and their existing rows deactivated.
+
+    Args:
+        user_pool_id: Cognito user pool
+        loader: Callable returning all users of the pool in the API shape (defaults to fetch_all_users)
+        dry_run: Only compute the differences
+
+    Returns:
+        dict: Counts of cognito, aurora, inserted, updated, deactivated, unchanged and skipped users
+    """
+    cognito_rows = [user_to_row(user) for user in (loader or fetch_all_users)(user_pool_id)]
+    aurora_rows = get_all_users()
+    by_id = {row['id']: row for row in aurora_rows}
+    by_email = {(row.get('email') or '').lower(): row for row in aurora_rows}
+
+    stats = {'cognito': len(cognito_rows), 'aurora': len(aurora_rows),
+             'inserted': 0, 'updated': 0, 'deactivated': 0, 'unchanged': 0, 'skipped': 0}
+    changed, matched = [], set()
+    for row in cognito_rows:
+        existing = by_id.get(row['id']) or by_email.get(row['email'])
+        if row['role'] is None:
+            stats['skipped'] += 1
+            if existing is None:
+                continue
+            row = dict(row, role=existing.get('role'), is_active=False)
+        if existing is None:
+            stats['inserted'] += 1
+            changed.append(row)
+            continue
+        matched.add(existing['id'])
+        if _comparable(existing) == _comparable(row):
+            stats['unchanged'] += 1
+        else:
+            stats['updated'] += 1
+            # Keep the existing primary key; other tables reference it
+            changed.append(dict(row, id=existing['id']))
+
+    # Only rows that came from Cognito (they have a username) are deactivated
+    gone = [row['id'] for row in aurora_rows
+            if row['id'] not in matched and row.get('username')
+            and (row.get('is_active') or row.get('user_status') != DELETED_STATUS)]
+    stats['deactivated'] = len(gone)
+
+    if not dry_run:
+        for start in range(0, len(changed), UPSERT_BATCH_SIZE):
+            upsert_users(changed[start:start + UPSERT_BATCH_SIZE])
+        for start in range(0, len(gone), UPSERT_BATCH_SIZE):
+            deactivate_users(gone[start:start + UPSERT_BATCH_SIZE], DELETED_STATUS)
+
+    if stats['skipped']:
+        logger.info(f"Skipped {stats['skipped']} users without a staff role")
+    logger.info(f"User reconciliation{' (dry run)' if dry_run else ''}: {stats}")
+    return stats
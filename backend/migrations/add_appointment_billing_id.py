@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Online migration adding appointments.billing_id, which links a completed
+appointment to the DynamoDB billing record generated for it, and the
+idx_unbilled index the batch billing job selects unbilled appointments with.
+The column is added with instant DDL and the index is built without blocking
+writes. Safe to re-run.
+"""
+
+import os
+import sys
+import pymysql
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BILLING_COLUMN = "ADD COLUMN billing_id VARCHAR(36) NULL AFTER notes"
+BILLING_INDEXES = {
+    'idx_unbilled': "(status, billing_id, start_at)"
+}
+
+class AppointmentBillingMigrator:
+    def __init__(self):
+        # Aurora connection parameters
+        self.db_config = {
+            'host': os.environ.get('DB_HOST'),
+            'port': int(os.environ.get('DB_PORT', 3306)),
+            'user': os.environ.get('DB_USERNAME', 'admin'),
+            'password': os.environ.get('DB_PASSWORD'),
+            'database': os.environ.get('DB_NAME', 'clinnet_emr'),
+            'charset': 'utf8mb4',
+            'autocommit': False
+        }
+
+        self.connection = None
+
+    def connect_to_aurora(self) -> bool:
+        """Establish connection to Aurora MySQL database."""
+        try:
+            self.connection = pymysql.connect(**self.db_config)
+            logger.info("Successfully connected to Aurora MySQL")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to connect to Aurora: {e}")
+            return False
+
+    def _existing(self, query: str) -> set:
+        with self.connection.cursor() as cursor:
+            cursor.execute(query, (self.db_config['database'],))
+            return {row[0] for row in cursor.fetchall()}
+
+    def add_column(self) -> None:
+        """Add billing_id if it is missing."""
+        existing = self._existing(
+            "SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'appointments'"
+        )
+        if 'billing_id' in existing:
+            logger.info("billing_id column already present")
+            return
+
+        with self.connection.cursor() as cursor:
+            try:
+                cursor.execute(f"ALTER TABLE appointments {BILLING_COLUMN}, ALGORITHM=INSTANT")
+            except pymysql.err.MySQLError as e:
+                logger.warning(f"Instant ADD COLUMN not available ({e}); falling back to in-place")
+                cursor.execute(f"ALTER TABLE appointments {BILLING_COLUMN}, ALGORITHM=INPLACE, LOCK=NONE")
+        self.connection.commit()
+        logger.info("Added billing_id column")
+
+    def add_indexes(self) -> None:
+        """Build the unbilled-appointments index online."""
+        existing = self._existing(
+            "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'appointments'"
+        )
+        for name, columns in BILLING_INDEXES.items():
+            if name in existing:
+                logger.info(f"Index {name} already present")
+                continue
+            logger.info(f"Creating index {name} {columns}")
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"ALTER TABLE appointments ADD INDEX {name} {columns}, ALGORITHM=INPLACE, LOCK=NONE")
+            self.connection.commit()
+
+    def run(self) -> bool:
+        """Run every step of the migration."""
+        if not self.connect_to_aurora():
+            return False
+        try:
+            self.add_column()
+            self.add_indexes()
+            return True
+        except Exception as e:
+            logger.error(f"Appointment billing migration failed: {e}")
+            self.connection.rollback()
+            return False
+        finally:
+            self.connection.close()
+
+def main():
+    """Main function to run the migration."""
+    required_vars = ['DB_HOST', 'DB_PASSWORD']
+    missing_vars = [var for var in required_vars if not os.environ.get(var)]
+
+    if missing_vars:
+        logger.error(f"Missing required environment variables: {missing_vars}")
+        sys.exit(1)
+
+    if AppointmentBillingMigrator().run():
+        logger.info("Appointment billing migration completed successfully")
+        sys.exit(0)
+    else:
+        logger.error("Appointment billing migration failed")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
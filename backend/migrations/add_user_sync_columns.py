@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Online migration adding the columns the Cognito sync writes to the users
+table: users.username (the Cognito username, unique) and users.user_status
+(the Cognito user status), plus idx_name for listings sorted by name. Columns
+are added with instant DDL and indexes are built without blocking writes.
+Safe to re-run. Run the reconciler afterwards to fill the new columns.
+"""
+
+import os
+import sys
+import pymysql
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+USER_SYNC_COLUMNS = {
+    'username': "ADD COLUMN username VARCHAR(128) NULL AFTER id",
+    'user_status': "ADD COLUMN user_status VARCHAR(32) NULL AFTER is_active"
+}
+USER_SYNC_INDEXES = {
+    'username': "UNIQUE INDEX username (username)",
+    'idx_name': "INDEX idx_name (last_name, first_name)"
+}
+
+class UserSyncColumnsMigrator:
+    def __init__(self):
+        # Aurora connection parameters
+        self.db_config = {
+            'host': os.environ.get('DB_HOST'),
+            'port': int(os.environ.get('DB_PORT', 3306)),
+            'user': os.environ.get('DB_USERNAME', 'admin'),
+            'password': os.environ.get('DB_PASSWORD'),
+            'database': os.environ.get('DB_NAME', 'clinnet_emr'),
+            'charset': 'utf8mb4',
+            'autocommit': False
+        }
+
+        self.connection = None
+
+    def connect_to_aurora(self) -> bool:
+        """Establish connection to Aurora MySQL database."""
+        try:
+            self.connection = pymysql.connect(**self.db_config)
+            logger.info("Successfully connected to Aurora MySQL")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to connect to Aurora: {e}")
+            return False
+
+    def _existing(self, query: str) -> set:
+        with self.connection.cursor() as cursor:
+            cursor.execute(query, (self.db_config['database'],))
+            return {row[0] for row in cursor.fetchall()}
+
+    def add_columns(self) -> None:
+        """Add the sync columns that are missing."""
+        existing = self._existing(
+            "SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'users'"
+        )
+        for name, clause in USER_SYNC_COLUMNS.items():
+            if name in existing:
+                logger.info(f"{name} column already present")
+                continue
+            with self.connection.cursor() as cursor:
+                try:
+                    cursor.execute(f"ALTER TABLE users {clause}, ALGORITHM=INSTANT")
+                except pymysql.err.MySQLError as e:
+                    logger.warning(f"Instant ADD COLUMN not available ({e}); falling back to in-place")
+                    cursor.execute(f"ALTER TABLE users {clause}, ALGORITHM=INPLACE, LOCK=NONE")
+            self.connection.commit()
+            logger.info(f"Added {name} column")
+
+    def add_indexes(self) -> None:
+        """Build the username and name indexes online."""
+        existing = self._existing(
+            "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'users'"
+        )
+        for name, definition in USER_SYNC_INDEXES.items():
+            if name in existing:
+                logger.info(f"Index {name} already present")
+                continue
+            logger.info(f"Creating index {definition}")
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"ALTER TABLE users ADD {definition}, ALGORITHM=INPLACE, LOCK=NONE")
+            self.connection.commit()
+
+    def run(self) -> bool:
+        """Run every step of the migration."""
+        if not self.connect_to_aurora():
+            return False
+        try:
+            self.add_columns()
+            self.add_indexes()
+            return True
+        except Exception as e:
+            logger.error(f"User sync columns migration failed: {e}")
+            self.connection.rollback()
+            return False
+        finally:
+            self.connection.close()
+
+def main():
+    """Main function to run the migration."""
+    required_vars = ['DB_HOST', 'DB_PASSWORD']
+    missing_vars = [var for var in required_vars if not os.environ.get(var)]
+
+    if missing_vars:
+        logger.error(f"Missing required environment variables: {missing_vars}")
+        sys.exit(1)
+
+    if UserSyncColumnsMigrator().run():
+        logger.info("User sync columns migration completed successfully")
+        sys.exit(0)
+    else:
+        logger.error("User sync columns migration failed")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
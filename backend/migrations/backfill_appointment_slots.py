@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Migration creating appointment_slots and reserving the slots of existing active
+appointments. Walks appointments in primary-key chunks (only those that have not
+ended yet unless BACKFILL_PAST is set) and inserts their doctor slots with
+INSERT IGNORE, committing per chunk. Existing double bookings cannot both hold a
+slot; they are logged so they can be resolved by hand. Safe to re-run: run it
+once before deploying the API that reserves slots and once after.
+"""
+
+import os
+import sys
+import time
+import pymysql
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SLOT_MINUTES = 5
+INACTIVE_STATUSES = ('cancelled', 'no_show')
+
+CREATE_TABLE = """
+    CREATE TABLE IF NOT EXISTS appointment_slots (
+        doctor_id VARCHAR(36) NOT NULL,
+        slot_start DATETIME NOT NULL,
+        appointment_id VARCHAR(36) NOT NULL,
+        PRIMARY KEY (doctor_id, slot_start),
+        INDEX idx_appointment_id (appointment_id),
+        FOREIGN KEY (appointment_id) REFERENCES appointments(id) ON DELETE CASCADE
+    )
+"""
+
+def slot_starts(start: datetime, end: datetime) -> List[datetime]:
+    """Start of every slot the [start, end) span touches (mirrors utils.appointment_times)."""
+    step = timedelta(minutes=SLOT_MINUTES)
+    midnight = datetime.combine(start.date(), datetime.min.time())
+    slot = midnight + ((start - midnight) // step) * step
+    slots = []
+    while slot < end:
+        slots.append(slot)
+        slot += step
+    return slots
+
+class AppointmentSlotMigrator:
+    def __init__(self, chunk_size: int = 500, pause_seconds: float = 0.05, include_past: bool = False):
+        self.chunk_size = chunk_size
+        self.pause_seconds = pause_seconds
+        self.include_past = include_past
+
+        # Aurora connection parameters
+        self.db_config = {
+            'host': os.environ.get('DB_HOST'),
+            'port': int(os.environ.get('DB_PORT', 3306)),
+            'user': os.environ.get('DB_USERNAME', 'admin'),
+            'password': os.environ.get('DB_PASSWORD'),
+            'database': os.environ.get('DB_NAME', 'clinnet_emr'),
+            'charset': 'utf8mb4',
+            'autocommit': False
+        }
+
+        self.connection = None
+
+    def connect_to_aurora(self) -> bool:
+        """Establish connection to Aurora MySQL database."""
+        try:
+            self.connection = pymysql.connect(**self.db_config)
+            logger.info("Successfully connected to Aurora MySQL")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to connect to Aurora: {e}")
+            return False
+
+    def create_table(self) -> None:
+        """Create appointment_slots if it does not exist."""
+        with self.connection.cursor() as cursor:
+            cursor.execute(CREATE_TABLE)
+        self.connection.commit()
+        logger.info("appointment_slots table is present")
+
+    def _next_chunk(self, after_id: Optional[str]) -> List[Tuple]:
+        query = f"""
+            SELECT id, doctor_id, start_at, end_at
+            FROM appointments
+            WHERE id > %s
+            AND start_at IS NOT NULL AND end_at IS NOT NULL
+            AND status NOT IN ({', '.join(['%s'] * len(INACTIVE_STATUSES))})
+            {'' if self.include_past else 'AND end_at > NOW()'}
+            ORDER BY id
+            LIMIT %s
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute(query, (after_id or '', *INACTIVE_STATUSES, self.chunk_size))
+            return list(cursor.fetchall())
+
+    def backfill(self) -> Dict[str, int]:
+        """Reserve slots chunk by chunk, committing after each chunk."""
+        stats = {'chunks': 0, 'appointments': 0, 'slots': 0, 'collisions': 0}
+        after_id = None
+
+        while True:
+            rows = self._next_chunk(after_id)
+            if not rows:
+                break
+            with self.connection.cursor() as cursor:
+                for appointment_id, doctor_id, start_at, end_at in rows:
+                    slots = slot_starts(start_at, end_at)
+                    if not slots:
+                        continue
+                    inserted = cursor.executemany(
+                        "INSERT IGNORE INTO appointment_slots (doctor_id, slot_start, appointment_id) "
+                        "VALUES (%s, %s, %s)",
+                        [(doctor_id, slot, appointment_id) for slot in slots]
+                    )
+                    cursor.execute(
+                        "SELECT COUNT(*) FROM appointment_slots WHERE appointment_id = %s", (appointment_id,)
+                    )
+                    if cursor.fetchone()[0] < len(slots):
+                        stats['collisions'] += 1
+                        logger.warning(f"Appointment {appointment_id} overlaps another booking of doctor {doctor_id}")
+                    stats['slots'] += inserted or 0
+            self.connection.commit()
+
+            stats['chunks'] += 1
+            stats['appointments'] += len(rows)
+            after_id = rows[-1][0]
+            if stats['chunks'] % 50 == 0:
+                logger.info(f"Backfill progress: {stats} (last id {after_id})")
+            # Leave room for foreground traffic between chunks
+            time.sleep(self.pause_seconds)
+
+        logger.info(f"Backfill finished: {stats}")
+        return stats
+
+    def run(self) -> bool:
+        """Run every step of the migration."""
+        if not self.connect_to_aurora():
+            return False
+        try:
+            self.create_table()
+            stats = self.backfill()
+            if stats['collisions']:
+                logger.warning(f"{stats['collisions']} appointments overlap an existing booking; review them")
+            return True
+        except Exception as e:
+            logger.error(f"Appointment slot migration failed: {e}")
+            self.connection.rollback()
+            return False
+        finally:
+            self.connection.close()
+
+def main():
+    """Main function to run the migration."""
+    required_vars = ['DB_HOST', 'DB_PASSWORD']
+    missing_vars = [var for var in required_vars if not os.environ.get(var)]
+
+    if missing_vars:
+        logger.error(f"Missing required environment variables: {missing_vars}")
+        sys.exit(1)
+
+    migrator = AppointmentSlotMigrator(
+        chunk_size=int(os.environ.get('CHUNK_SIZE', '500')),
+        pause_seconds=float(os.environ.get('CHUNK_PAUSE_SECONDS', '0.05')),
+        include_past=os.environ.get('BACKFILL_PAST', '').lower() == 'true'
+    )
+
+    if migrator.run():
+        logger.info("Appointment slot migration completed successfully")
+        sys.exit(0)
+    else:
+        logger.error("Appointment slot migration failed")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
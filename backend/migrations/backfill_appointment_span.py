@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Online migration adding the denormalized [start_at, end_at) span to appointments.
+Adds the nullable columns (instant DDL), backfills them in small primary-key
+chunks with a commit per chunk, then builds the covering indexes without
+blocking writes. Safe to re-run: only rows whose span is still NULL are touched,
+so run it once before deploying the API that reads start_at/end_at and once
+after, to pick up rows written by the previous version in between.
+"""
+
+import os
+import sys
+import time
+import pymysql
+from typing import Dict, List, Optional
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SPAN_COLUMNS = {
+    'start_at': "ADD COLUMN start_at DATETIME NULL AFTER duration_minutes",
+    'end_at': "ADD COLUMN end_at DATETIME NULL AFTER start_at"
+}
+
+SPAN_INDEXES = {
+    'idx_doctor_span': "(doctor_id, start_at, end_at, status)",
+    'idx_patient_span': "(patient_id, start_at, end_at, status)",
+    'idx_service_span': "(service_id, start_at)",
+    'idx_status_span': "(status, start_at)",
+    'idx_start_at': "(start_at)"
+}
+
+class AppointmentSpanMigrator:
+    def __init__(self, chunk_size: int = 1000, pause_seconds: float = 0.05):
+        self.chunk_size = chunk_size
+        self.pause_seconds = pause_seconds
+
+        # Aurora connection parameters
+        self.db_config = {
+            'host': os.environ.get('DB_HOST'),
+            'port': int(os.environ.get('DB_PORT', 3306)),
+            'user': os.environ.get('DB_USERNAME', 'admin'),
+            'password': os.environ.get('DB_PASSWORD'),
+            'database': os.environ.get('DB_NAME', 'clinnet_emr'),
+            'charset': 'utf8mb4',
+            'autocommit': False
+        }
+
+        self.connection = None
+
+    def connect_to_aurora(self) -> bool:
+        """Establish connection to Aurora MySQL database."""
+        try:
+            self.connection = pymysql.connect(**self.db_config)
+            logger.info("Successfully connected to Aurora MySQL")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to connect to Aurora: {e}")
+            return False
+
+    def _existing(self, query: str) -> set:
+        with self.connection.cursor() as cursor:
+            cursor.execute(query, (self.db_config['database'],))
+            return {row[0] for row in cursor.fetchall()}
+
+    def add_columns(self) -> None:
+        """Add the span columns if they are missing."""
+        existing = self._existing(
+            "SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'appointments'"
+        )
+        missing = [ddl for column, ddl in SPAN_COLUMNS.items() if column not in existing]
+        if not missing:
+            logger.info("Span columns already present")
+            return
+
+        with self.connection.cursor() as cursor:
+            try:
+                cursor.execute(f"ALTER TABLE appointments {', '.join(missing)}, ALGORITHM=INSTANT")
+            except pymysql.err.MySQLError as e:
+                logger.warning(f"Instant ADD COLUMN not available ({e}); falling back to in-place")
+                cursor.execute(f"ALTER TABLE appointments {', '.join(missing)}, ALGORITHM=INPLACE, LOCK=NONE")
+        self.connection.commit()
+        logger.info(f"Added columns: {[column for column in SPAN_COLUMNS if column not in existing]}")
+
+    def _next_chunk(self, after_id: Optional[str]) -> List[str]:
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT id FROM appointments WHERE id > %s ORDER BY id LIMIT %s",
+                (after_id or '', self.chunk_size)
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def backfill(self) -> Dict[str, int]:
+        """Fill start_at/end_at chunk by chunk, committing after each chunk."""
+        stats = {'chunks': 0, 'updated': 0}
+        after_id = None
+
+        while True:
+            ids = self._next_chunk(after_id)
+            if not ids:
+                break
+            with self.connection.cursor() as cursor:
+                updated = cursor.execute(
+                    """
+                    UPDATE appointments
+                    SET start_at = TIMESTAMP(appointment_date, appointment_time),
+                        end_at = TIMESTAMP(appointment_date, appointment_time)
+                                 + INTERVAL COALESCE(duration_minutes, 30) MINUTE
+                    WHERE id BETWEEN %s AND %s
+                    AND (start_at IS NULL OR end_at IS NULL)
+                    """,
+                    (ids[0], ids[-1])
+                )
+            self.connection.commit()
+
+            stats['chunks'] += 1
+            stats['updated'] += updated
+            after_id = ids[-1]
+            if stats['chunks'] % 50 == 0:
+                logger.info(f"Backfill progress: {stats} (last id {after_id})")
+            # Leave room for foreground traffic between chunks
+            time.sleep(self.pause_seconds)
+
+        logger.info(f"Backfill finished: {stats}")
+        return stats
+
+    def add_indexes(self) -> None:
+        """Build the covering indexes online."""
+        existing = self._existing(
+            "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'appointments'"
+        )
+        for name, columns in SPAN_INDEXES.items():
+            if name in existing:
+                logger.info(f"Index {name} already present")
+                continue
+            logger.info(f"Creating index {name} {columns}")
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"ALTER TABLE appointments ADD INDEX {name} {columns}, ALGORITHM=INPLACE, LOCK=NONE")
+            self.connection.commit()
+
+    def verify(self) -> bool:
+        """Check that no appointment is left without a span."""
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM appointments WHERE start_at IS NULL OR end_at IS NULL")
+            remaining = cursor.fetchone()[0]
+        if remaining:
+            logger.error(f"{remaining} appointments still have no start_at/end_at")
+            return False
+        logger.info("All appointments have a start_at/end_at span")
+        return True
+
+    def run(self) -> bool:
+        """Run every step of the migration."""
+        if not self.connect_to_aurora():
+            return False
+        try:
+            self.add_columns()
+            self.backfill()
+            self.add_indexes()
+            return self.verify()
+        except Exception as e:
+            logger.error(f"Appointment span migration failed: {e}")
+            self.connection.rollback()
+            return False
+        finally:
+            self.connection.close()
+
+def main():
+    """Main function to run the migration."""
+    required_vars = ['DB_HOST', 'DB_PASSWORD']
+    missing_vars = [var for var in required_vars if not os.environ.get(var)]
+
+    if missing_vars:
+        logger.error(f"Missing required environment variables: {missing_vars}")
+        sys.exit(1)
+
+    migrator = AppointmentSpanMigrator(
+        chunk_size=int(os.environ.get('CHUNK_SIZE', '1000')),
+        pause_seconds=float(os.environ.get('CHUNK_PAUSE_SECONDS', '0.05'))
+    )
+
+    if migrator.run():
+        logger.info("Appointment span migration completed successfully")
+        sys.exit(0)
+    else:
+        logger.error("Appointment span migration failed")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Backfill script that stamps the sharded type-index key on existing DynamoDB items.
+Items written before TYPE_INDEX_SHARDS was enabled only carry `type`, so they are
+invisible to the `type-shard-index` GSI until this script sets `typeShard` on them.
+"""
+
+import os
+import sys
+import zlib
+import boto3
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+from typing import Dict, Any
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+TYPE_SHARD_ATTRIBUTE = 'typeShard'
+
+def type_shard_key(type_value: str, item_key: str, shard_count: int) -> str:
+    """Must stay in sync with utils.db_utils.type_shard_key in the Lambda layer."""
+    shard = zlib.crc32(str(item_key).encode('utf-8')) % shard_count
+    return f"{type_value}#{shard}"
+
+class TypeShardBackfiller:
+    def __init__(self, table_name: str, shard_count: int, segments: int = 8,
+                 key_names: tuple = ('PK', 'SK')):
+        self.table_name = table_name
+        self.shard_count = shard_count
+        self.segments = segments
+        self.key_names = key_names
+        self.dynamodb = boto3.resource('dynamodb')
+        self.table = self.dynamodb.Table(table_name)
+
+    def backfill_item(self, item: Dict[str, Any]) -> bool:
+        """Set typeShard on a single item. Returns True if the item was updated."""
+        key_attribute = 'PK' if 'PK' in item else 'id'
+        shard_key = type_shard_key(item['type'], item[key_attribute], self.shard_count)
+        try:
+            self.table.update_item(
+                Key={name: item[name] for name in self.key_names},
+                UpdateExpression='SET #shard = :shard',
+                ConditionExpression='attribute_not_exists(#shard)',
+                ExpressionAttributeNames={'#shard': TYPE_SHARD_ATTRIBUTE},
+                ExpressionAttributeValues={':shard': shard_key}
+            )
+            return True
+        except ClientError as e:
+            # Written concurrently by a handler that already shards; nothing to do
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+
+    def backfill_segment(self, segment: int) -> Dict[str, int]:
+        """Scan one parallel-scan segment and backfill items missing the shard key."""
+        stats = {'scanned': 0, 'updated': 0, 'failed': 0}
+        scan_kwargs = {
+            'Segment': segment,
+            'TotalSegments': self.segments,
+            'FilterExpression': 'attribute_exists(#type) AND attribute_not_exists(#shard)',
+            'ExpressionAttributeNames': {'#type': 'type', '#shard': TYPE_SHARD_ATTRIBUTE}
+        }
+
+        while True:
+            response = self.table.scan(**scan_kwargs)
+            stats['scanned'] += response.get('ScannedCount', 0)
+            for item in response.get('Items', []):
+                try:
+                    if self.backfill_item(item):
+                        stats['updated'] += 1
+                except Exception as e:
+                    logger.error(f"Failed to backfill item {item.get('PK', item.get('id'))}: {e}")
+                    stats['failed'] += 1
+
+            if 'LastEvaluatedKey' not in response:
+                break
+            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+        logger.info(f"Segment {segment}/{self.segments} done: {stats}")
+        return stats
+
+    def run(self) -> bool:
+        """Backfill all segments in parallel."""
+        logger.info(
+            f"Backfilling {TYPE_SHARD_ATTRIBUTE} on {self.table_name} "
+            f"({self.shard_count} shards, {self.segments} scan segments)"
+        )
+        totals = {'scanned': 0, 'updated': 0, 'failed': 0}
+        with ThreadPoolExecutor(max_workers=self.segments) as executor:
+            for stats in executor.map(self.backfill_segment, range(self.segments)):
+                for key, value in stats.items():
+                    totals[key] += value
+
+        logger.info(f"Backfill completed: {totals}")
+        return totals['failed'] == 0
+
+def main():
+    """Main function to run the backfill."""
+    table_name = os.environ.get('PATIENT_RECORDS_TABLE')
+    shard_count = int(os.environ.get('TYPE_INDEX_SHARDS', '0') or 0)
+    segments = int(os.environ.get('SCAN_SEGMENTS', '8'))
+
+    if not table_name or shard_count < 1:
+        logger.error("PATIENT_RECORDS_TABLE and TYPE_INDEX_SHARDS (>= 1) must be set")
+        sys.exit(1)
+
+    backfiller = TypeShardBackfiller(table_name, shard_count, segments)
+
+    if backfiller.run():
+        logger.info("Type shard backfill completed successfully")
+        sys.exit(0)
+    else:
+        logger.error("Type shard backfill finished with failures")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Rebuild the per-patient billing balances and the daily revenue rollups from the billing table.
+Scans the billing table in parallel segments, recomputes billed, paid and
+outstanding amounts per patient and the per-day total, service and payment
+status counters, overwrites those items in the billing rollups table and marks
+every invoice rollupsApplied, so later updates move the rollups by difference.
+Use it to seed rollups for invoices written before rollups were enabled, or to
+repair drift; run it while billing writes are paused, since invoices changed
+during the scan are not reflected.
+"""
+
+import os
+import sys
+import boto3
+from decimal import Decimal
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Must stay in sync with utils.billing_rollups in the Lambda layer
+PAID_STATUSES = ('paid',)
+VOID_STATUSES = ('cancelled', 'void')
+BALANCE_FIELDS = ('invoices', 'billed', 'paid', 'outstanding')
+
+def to_decimal(value) -> Decimal:
+    return Decimal(str(value or 0))
+
+def rollup_key(day: str, dimension: str, value: str = None) -> Dict[str, str]:
+    sort_key = f"{day}#{dimension}" if value is None else f"{day}#{dimension}#{value}"
+    return {'PK': f"ROLLUP#{day[:7]}", 'SK': sort_key}
+
+def rollup_contributions(billing: Dict[str, Any]):
+    """Yield (key, labels, counters) for each rollup item an invoice counts towards."""
+    day = (billing.get('createdAt') or datetime.utcnow().isoformat())[:10]
+    yield rollup_key(day, 'TOTAL'), {'day': day, 'dimension': 'total'}, {
+        'invoices': Decimal(1),
+        'subtotal': to_decimal(billing.get('subtotal')),
+        'tax': to_decimal(billing.get('tax')),
+        'discount': to_decimal(billing.get('discount')),
+        'total': to_decimal(billing.get('total'))
+    }
+    status = billing.get('paymentStatus') or 'pending'
+    yield rollup_key(day, 'STATUS', status), {'day': day, 'dimension': 'status', 'paymentStatus': status}, {
+        'invoices': Decimal(1), 'total': to_decimal(billing.get('total'))
+    }
+    for item in billing.get('items') or []:
+        service_id = item.get('serviceId')
+        labels = {'day': day, 'dimension': 'service', 'serviceId': service_id,
+                  'serviceName': item.get('serviceName', 'Unknown Service')}
+        yield rollup_key(day, 'SERVICE', service_id), labels, {
+            'quantity': to_decimal(item.get('quantity', 1)), 'amount': to_decimal(item.get('total'))
+        }
+
+def add_contribution(rollups: Dict[str, Dict[str, Any]], key: Dict[str, str], labels: Dict[str, Any],
+                     counters: Dict[str, Decimal]) -> None:
+    rollup = rollups.setdefault(f"{key['PK']}#{key['SK']}", {**key, **labels})
+    for name, amount in counters.items():
+        rollup[name] = rollup.get(name, Decimal(0)) + amount
+
+def balance_key(patient_id: str) -> Dict[str, str]:
+    return {'PK': f"BALANCE#{patient_id}", 'SK': 'BALANCE'}
+
+def balance_amounts(billing: Dict[str, Any]) -> Dict[str, Decimal]:
+    status = (billing.get('paymentStatus') or 'pending').lower()
+    if status in VOID_STATUSES:
+        return {field: Decimal(0) for field in BALANCE_FIELDS}
+    billed = Decimal(str(billing.get('total') or 0))
+    paid = billed if status in PAID_STATUSES else Decimal(0)
+    return {'invoices': Decimal(1), 'billed': billed, 'paid': paid, 'outstanding': billed - paid}
+
+class PatientBalanceRebuilder:
+    def __init__(self, billing_table: str, rollups_table: str, segments: int = 8):
+        self.segments = segments
+        self.dynamodb = boto3.resource('dynamodb')
+        self.billing_table = self.dynamodb.Table(billing_table)
+        self.rollups_table = self.dynamodb.Table(rollups_table)
+
+    def scan_segment(self, segment: int):
+        """Sum the balances and rollups of the invoices in one parallel-scan segment."""
+        balances, rollups = {}, {}
+        scanned = 0
+        scan_kwargs = {
+            'Segment': segment,
+            'TotalSegments': self.segments,
+            'ProjectionExpression': 'id, patientId, subtotal, tax, discount, #total, paymentStatus, createdAt, #items, rollupsApplied',
+            'ExpressionAttributeNames': {'#total': 'total', '#items': 'items'}
+        }
+
+        while True:
+            response = self.billing_table.scan(**scan_kwargs)
+            for billing in response.get('Items', []):
+                scanned += 1
+                for key, labels, counters in rollup_contributions(billing):
+                    add_contribution(rollups, key, labels, counters)
+                if not billing.get('rollupsApplied'):
+                    self.mark_rollups_applied(billing['id'])
+                patient_id = billing.get('patientId')
+                if not patient_id:
+                    continue
+                balance = balances.setdefault(patient_id, {field: Decimal(0) for field in BALANCE_FIELDS})
+                for field, amount in balance_amounts(billing).items():
+                    balance[field] += amount
+                created_at = billing.get('createdAt')
+                if created_at and created_at > balance.get('lastInvoiceDate', ''):
+                    balance['lastInvoiceDate'] = created_at
+
+            if 'LastEvaluatedKey' not in response:
+                break
+            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+        logger.info(f"Segment {segment}/{self.segments} done: {scanned} invoices, {len(balances)} patients")
+        return balances, rollups
+
+    def mark_rollups_applied(self, billing_id: str) -> None:
+        """Flag an invoice as counted, so updates move its rollups by difference."""
+        self.billing_table.update_item(
+            Key={'id': billing_id},
+            UpdateExpression='SET rollupsApplied = :applied',
+            ConditionExpression='attribute_exists(id)',
+            ExpressionAttributeValues={':applied': True}
+        )
+
+    def write_balances(self, balances: Dict[str, Dict[str, Any]]) -> None:
+        """Overwrite the balance items, batching the writes."""
+        timestamp = datetime.utcnow().isoformat() + "Z"
+        with self.rollups_table.batch_writer() as batch:
+            for patient_id, balance in balances.items():
+                batch.put_item(Item={
+                    **balance_key(patient_id),
+                    **balance,
+                    'patientId': patient_id,
+                    'dimension': 'balance',
+                    'updatedAt': timestamp
+                })
+
+    def write_rollups(self, rollups: Dict[str, Dict[str, Any]]) -> None:
+        """Overwrite the daily total, service and status rollup items, batching the writes."""
+        timestamp = datetime.utcnow().isoformat() + "Z"
+        with self.rollups_table.batch_writer() as batch:
+            for rollup in rollups.values():
+                batch.put_item(Item={**rollup, 'updatedAt': timestamp})
+
+    def run(self) -> bool:
+        """Scan every segment in parallel, merge the per-segment sums and write them."""
+        logger.info(f"Rebuilding patient balances and revenue rollups from {self.billing_table.name} ({self.segments} scan segments)")
+        try:
+            balances, rollups = {}, {}
+            with ThreadPoolExecutor(max_workers=self.segments) as executor:
+                for segment_balances, segment_rollups in executor.map(self.scan_segment, range(self.segments)):
+                    for rollup in segment_rollups.values():
+                        key = {'PK': rollup['PK'], 'SK': rollup['SK']}
+                        labels = {name: value for name, value in rollup.items() if not isinstance(value, Decimal)}
+                        counters = {name: value for name, value in rollup.items() if isinstance(value, Decimal)}
+                        add_contribution(rollups, key, labels, counters)
+                    for patient_id, partial in segment_balances.items():
+                        balance = balances.setdefault(patient_id, {field: Decimal(0) for field in BALANCE_FIELDS})
+                        for field in BALANCE_FIELDS:
+                            balance[field] += partial[field]
+                        if partial.get('lastInvoiceDate', '') > balance.get('lastInvoiceDate', ''):
+                            balance['lastInvoiceDate'] = partial['lastInvoiceDate']
+
+            self.write_balances(balances)
+            self.write_rollups(rollups)
+            logger.info(f"Rebuilt balances for {len(balances)} patients and {len(rollups)} rollup items")
+            return True
+        except Exception as e:
+            logger.error(f"Patient balance rebuild failed: {e}")
+            return False
+
+def main():
+    """Main function to run the rebuild."""
+    billing_table = os.environ.get('BILLING_TABLE')
+    rollups_table = os.environ.get('BILLING_ROLLUPS_TABLE')
+    segments = int(os.environ.get('SCAN_SEGMENTS', '8'))
+
+    if not billing_table or not rollups_table:
+        logger.error("BILLING_TABLE and BILLING_ROLLUPS_TABLE must be set")
+        sys.exit(1)
+
+    rebuilder = PatientBalanceRebuilder(billing_table, rollups_table, segments)
+
+    if rebuilder.run():
+        logger.info("Patient balance rebuild completed successfully")
+        sys.exit(0)
+    else:
+        logger.error("Patient balance rebuild failed")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
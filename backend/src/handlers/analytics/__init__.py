@@ -0,0 +1 @@
+# Analytics handlers package
\ No newline at end of file
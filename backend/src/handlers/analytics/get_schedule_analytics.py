@@ -0,0 +1,68 @@
+"""
+Lambda function computing schedule utilization and no-show analytics from RDS Aurora
+"""
+import os
+import json
+import logging
+from typing import Dict, Any
+from datetime import datetime, timedelta
+from utils.rds_utils import build_response, build_error_response
+from utils.schedule_analytics import analyze_schedule, load_schedule
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_PERIOD_DAYS = 30
+MAX_PERIOD_DAYS = 366
+
+def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Handle Lambda event for GET /analytics/schedule with RDS backend
+
+    Query Parameters:
+    - start_date: First day (YYYY-MM-DD, default: end_date - 29 days)
+    - end_date: Last day (YYYY-MM-DD, default: today)
+    - doctor_ids: Comma-separated doctors (default: every doctor with appointments)
+
+    Args:
+        event: Lambda event
+        context: Lambda context
+
+    Returns:
+        API Gateway response
+    """
+    logger.info(f"Received event: {json.dumps(event)}")
+
+    try:
+        query_params = event.get('queryStringParameters') or {}
+
+        try:
+            end_date = (datetime.strptime(query_params['end_date'], '%Y-%m-%d').date()
+                        if query_params.get('end_date') else datetime.now().date())
+            start_date = (datetime.strptime(query_params['start_date'], '%Y-%m-%d').date()
+                          if query_params.get('start_date') else end_date - timedelta(days=DEFAULT_PERIOD_DAYS - 1))
+        except ValueError:
+            return build_error_response(400, "Invalid date format. Use YYYY-MM-DD")
+
+        if end_date < start_date:
+            return build_error_response(400, "end_date must be after start_date")
+        if (end_date - start_date).days >= MAX_PERIOD_DAYS:
+            return build_error_response(400, f"The period cannot exceed {MAX_PERIOD_DAYS} days")
+
+        doctor_ids = [d.strip() for d in (query_params.get('doctor_ids') or '').split(',') if d.strip()]
+
+        started = datetime.now()
+        schedule = load_schedule(start_date, end_date, doctor_ids or None)
+        analytics = analyze_schedule(
+            schedule,
+            os.environ.get('WORKDAY_START', '08:00'),
+            os.environ.get('WORKDAY_END', '18:00')
+        )
+
+        logger.info(f"Analyzed {len(schedule)} appointments in "
+                    f"{(datetime.now() - started).total_seconds():.3f}s")
+        return build_response(200, analytics)
+
+    except Exception as e:
+        logger.error(f"Error computing schedule analytics: {str(e)}")
+        return build_error_response(500, "Internal server error", "Failed to compute schedule analytics")
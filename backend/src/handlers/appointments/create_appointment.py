@@ -3,13 +3,27 @@ Lambda function to create an appointment in RDS Aurora
 """
 import json
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List
 from datetime import datetime, time
-from utils.rds_utils import create_appointment, execute_query, build_response, build_error_response
+from utils.rds_utils import (
+    create_appointment, create_appointments, execute_query, build_response, build_error_response,
+    SlotUnavailableError
+)
+from utils.availability import AvailabilityEngine, IntervalSet, invalidate_doctor_day
+from utils.appointment_times import (
+    INACTIVE_STATUSES, MAX_RECURRENCE_OCCURRENCES, appointment_interval, recurrence_dates
+)
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Fields of a bulk request shared by every occurrence unless the occurrence overrides them
+BULK_BASE_FIELDS = (
+    'patient_id', 'doctor_id', 'service_id', 'appointment_date', 'appointment_time',
+    'duration_minutes', 'status', 'notes'
+)
+MAX_BULK_APPOINTMENTS = MAX_RECURRENCE_OCCURRENCES
+
 def validate_appointment_data(data: Dict[str, Any]) -> Dict[str, str]:
     """
     Validate appointment data and return validation errors
@@ -54,30 +68,14 @@ def validate_appointment_data(data: Dict[str, Any]) -> Dict[str, str]:
     
     return errors
 
-def check_availability(patient_id: str, doctor_id: str, appointment_date: str, appointment_time: str, duration: int = 30) -> bool:
-    """
-    Check if the appointment slot is available for both patient and doctor
+def check_patient_availability(patient_id: str, appointment_date: str, appointment_time: str, duration: int = 30) -> bool:
     """
-    # Check for overlapping appointments
-    query = """
-        SELECT COUNT(*) as conflicts
-        FROM appointments 
-        WHERE (patient_id = %s OR doctor_id = %s)
-        AND appointment_date = %s
-        AND status NOT IN ('cancelled', 'no_show')
-        AND (
-            (appointment_time <= %s AND DATE_ADD(STR_TO_DATE(CONCAT(appointment_date, ' ', appointment_time), '%%Y-%%m-%%d %%H:%%i:%%s'), INTERVAL duration_minutes MINUTE) > %s)
-            OR
-            (appointment_time < DATE_ADD(STR_TO_DATE(CONCAT(%s, ' ', %s), '%%Y-%%m-%%d %%H:%%i:%%s'), INTERVAL %s MINUTE) AND appointment_time >= %s)
-        )
+    Check that the patient has no overlapping appointment. The doctor's slots are
+    reserved atomically with the insert, so they need no separate check.
     """
-    
-    result = execute_query(query, (
-        patient_id, doctor_id, appointment_date, appointment_time, appointment_time,
-        appointment_date, appointment_time, duration, appointment_time
-    ), fetch_one=True)
-    
-    return result['conflicts'] == 0
+    return AvailabilityEngine(execute_query).is_available(
+        patient_id, None, appointment_date, appointment_time, duration
+    )
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
@@ -107,11 +105,10 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         if validation_errors:
             return build_error_response(400, "Validation failed", validation_errors)
         
-        # Check availability
+        # Check patient availability
         duration = body.get('duration_minutes', 30)
-        if not check_availability(
+        if not check_patient_availability(
             body['patient_id'], 
-            body['doctor_id'], 
             body['appointment_date'], 
             body['appointment_time'],
             duration
@@ -140,8 +137,13 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         logger.info(f"Creating appointment for patient {body['patient_id']} with doctor {body['doctor_id']}")
         
-        # Create appointment in RDS
-        appointment_id = create_appointment(appointment_data)
+        # Create appointment in RDS; a taken doctor slot fails the insert's transaction
+        try:
+            appointment_id = create_appointment(appointment_data)
+        except SlotUnavailableError:
+            return build_error_response(409, "Time slot not available", 
+                                      "The requested time slot conflicts with an existing appointment")
+        invalidate_doctor_day(body['doctor_id'], body['appointment_date'])
         
         # Return success response
         response_data = {
@@ -154,4 +156,195 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
     except Exception as e:
         logger.error(f"Error creating appointment: {str(e)}")
-        return build_error_response(500, "Internal server error", "Failed to create appointment")
\ No newline at end of file
+        return build_error_response(500, "Internal server error", "Failed to create appointment")
+
+def expand_occurrences(body: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Turn a bulk request into one appointment dictionary per occurrence
+
+    The request either lists `occurrences` (each overriding the shared fields, e.g.
+    its own appointment_date) or gives a `recurrence` RRULE expanded from
+    appointment_date.
+
+    Raises:
+        ValueError: Neither or an invalid form was given
+    """
+    base = {field: body[field] for field in BULK_BASE_FIELDS if field in body}
+
+    if body.get('occurrences') is not None:
+        occurrences = body['occurrences']
+        if not isinstance(occurrences, list) or not all(isinstance(o, dict) for o in occurrences):
+            raise ValueError("occurrences must be a list of objects")
+        return [{**base, **occurrence} for occurrence in occurrences]
+
+    if body.get('recurrence'):
+        if not body.get('appointment_date'):
+            raise ValueError("appointment_date is required with recurrence")
+        dates = recurrence_dates(body['recurrence'], body['appointment_date'], MAX_BULK_APPOINTMENTS)
+        return [{**base, 'appointment_date': day.isoformat()} for day in dates]
+
+    raise ValueError("Either occurrences or recurrence is required")
+
+def find_bulk_conflicts(occurrences: List[Dict[str, Any]]) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Check a batch of new appointments against existing bookings and each other,
+    with one range query per doctor and per patient over the batch's whole span
+
+    Returns:
+        dict: Occurrence index -> conflicts (empty list when free)
+    """
+    engine = AvailabilityEngine(execute_query)
+    spans = [
+        appointment_interval(o['appointment_date'], o['appointment_time'], o.get('duration_minutes', 30))
+        for o in occurrences
+    ]
+    window_start = min(start for start, _ in spans)
+    window_end = max(end for _, end in spans)
+
+    conflicts = {index: [] for index in range(len(occurrences))}
+    for column in ('doctor_id', 'patient_id'):
+        for owner_id in sorted({o[column] for o in occurrences}):
+            booked = engine.load_intervals(column, owner_id, window_start, window_end)
+            batch = IntervalSet()
+            for index, occurrence in enumerate(occurrences):
+                if occurrence[column] != owner_id or occurrence.get('status', 'scheduled') in INACTIVE_STATUSES:
+                    continue
+                start, end = spans[index]
+                for busy_start, busy_end, appointment_id in booked.overlapping(start, end):
+                    conflicts[index].append({
+                        'appointment_id': appointment_id,
+                        'conflicts_with': column.replace('_id', ''),
+                        'start': busy_start.isoformat(),
+                        'end': busy_end.isoformat()
+                    })
+                for busy_start, busy_end, other_index in batch.overlapping(start, end):
+                    conflicts[index].append({
+                        'occurrence': other_index,
+                        'conflicts_with': column.replace('_id', ''),
+                        'start': busy_start.isoformat(),
+                        'end': busy_end.isoformat()
+                    })
+                batch.add(start, end, index)
+    return conflicts
+
+def bulk_lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Handle Lambda event for POST /appointments/bulk with RDS backend
+
+    Request body:
+    - Shared appointment fields (patient_id, doctor_id, appointment_time, ...)
+    - occurrences: List of per-occurrence overrides, e.g. [{"appointment_date": "..."}], or
+    - recurrence: RRULE expanded from appointment_date, e.g. "FREQ=WEEKLY;COUNT=12"
+    - atomic: Create nothing unless every occurrence can be booked (default true)
+
+    Args:
+        event: Lambda event
+        context: Lambda context
+
+    Returns:
+        API Gateway response
+    """
+    logger.info(f"Received event: {json.dumps(event)}")
+
+    try:
+        # Parse request body
+        if not event.get('body'):
+            return build_error_response(400, "Request body is required")
+
+        try:
+            body = json.loads(event['body'])
+        except json.JSONDecodeError:
+            return build_error_response(400, "Invalid JSON in request body")
+
+        try:
+            occurrences = expand_occurrences(body)
+        except ValueError as e:
+            return build_error_response(400, "Invalid occurrences", str(e))
+
+        if not occurrences:
+            return build_error_response(400, "Invalid occurrences", "No appointments to create")
+        if len(occurrences) > MAX_BULK_APPOINTMENTS:
+            return build_error_response(400, "Invalid occurrences",
+                                      f"At most {MAX_BULK_APPOINTMENTS} appointments can be created at once")
+
+        atomic = body.get('atomic', True)
+
+        # Get user ID from JWT token
+        created_by = None
+        auth_context = event.get('requestContext', {}).get('authorizer', {})
+        if auth_context:
+            created_by = auth_context.get('claims', {}).get('sub')
+
+        results = []
+        for index, occurrence in enumerate(occurrences):
+            result = {
+                'index': index,
+                'appointment_date': occurrence.get('appointment_date'),
+                'appointment_time': occurrence.get('appointment_time'),
+                'status': 'pending'
+            }
+            validation_errors = validate_appointment_data(occurrence)
+            if validation_errors:
+                result.update({'status': 'invalid', 'errors': validation_errors})
+            results.append(result)
+
+        valid_indexes = [result['index'] for result in results if result['status'] == 'pending']
+        if valid_indexes:
+            conflicts = find_bulk_conflicts([occurrences[index] for index in valid_indexes])
+            for position, index in enumerate(valid_indexes):
+                if conflicts[position]:
+                    results[index].update({'status': 'conflict', 'conflicts': conflicts[position]})
+
+        bookable = [result['index'] for result in results if result['status'] == 'pending']
+        if atomic and len(bookable) < len(results):
+            invalid = any(result['status'] == 'invalid' for result in results)
+            for index in bookable:
+                results[index]['status'] = 'not_created'
+            return build_error_response(
+                400 if invalid else 409,
+                "Validation failed" if invalid else "Time slot not available",
+                {'appointments': results}
+            )
+
+        appointments = []
+        for index in bookable:
+            occurrence = occurrences[index]
+            appointments.append({
+                'patient_id': occurrence['patient_id'],
+                'doctor_id': occurrence['doctor_id'],
+                'service_id': occurrence.get('service_id'),
+                'appointment_date': occurrence['appointment_date'],
+                'appointment_time': occurrence['appointment_time'],
+                'duration_minutes': occurrence.get('duration_minutes', 30),
+                'status': occurrence.get('status', 'scheduled'),
+                'notes': (occurrence.get('notes') or '').strip() or None,
+                'created_by': created_by
+            })
+
+        logger.info(f"Creating {len(appointments)} of {len(occurrences)} appointments in one transaction")
+
+        # One transaction for every insert and slot reservation; a slot taken since
+        # the conflict check rolls the whole batch back
+        try:
+            appointment_ids = create_appointments(appointments)
+        except SlotUnavailableError:
+            return build_error_response(409, "Time slot not available",
+                                      "A requested time slot was booked concurrently; no appointments were created")
+
+        for index, appointment_id in zip(bookable, appointment_ids):
+            results[index].update({'status': 'created', 'appointment_id': appointment_id})
+        for doctor_id, appointment_date in {(a['doctor_id'], a['appointment_date']) for a in appointments}:
+            invalidate_doctor_day(doctor_id, appointment_date)
+
+        response_data = {
+            'appointments': results,
+            'created': len(appointment_ids),
+            'skipped': len(results) - len(appointment_ids)
+        }
+
+        logger.info(f"Successfully created {len(appointment_ids)} appointments")
+        return build_response(201, response_data)
+
+    except Exception as e:
+        logger.error(f"Error creating appointments: {str(e)}")
+        return build_error_response(500, "Internal server error", "Failed to create appointments")
@@ -5,6 +5,7 @@ import json
 import logging
 from typing import Dict, Any
 from utils.rds_utils import execute_mutation, execute_query, build_response, build_error_response
+from utils.availability import invalidate_doctor_day
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -39,13 +40,14 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         logger.info(f"Deleting appointment {appointment_id}")
         
-        # Delete appointment
+        # Delete appointment; its appointment_slots rows go with it (ON DELETE CASCADE)
         query = "DELETE FROM appointments WHERE id = %s"
         affected_rows = execute_mutation(query, (appointment_id,))
         
         if affected_rows == 0:
             return build_error_response(404, "Appointment not found")
         
+        invalidate_doctor_day(existing_appointment.get('doctor_id'), existing_appointment.get('appointment_date'))
         logger.info(f"Successfully deleted appointment: {appointment_id}")
         return build_response(200, {"appointment_id": appointment_id}, "Appointment deleted successfully")
         
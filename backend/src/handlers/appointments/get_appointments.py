@@ -3,14 +3,74 @@ Lambda function to get appointments from RDS Aurora
 With advanced filtering and scheduling features
 """
 import json
+import base64
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
 from utils.rds_utils import get_appointments_by_date_range, build_response, build_error_response
+from utils.agenda import AGENDA_MAX_DAYS, get_agenda_range, prewarm_once
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Page size when a cursor is passed without a limit; listings are only paged on request
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 1000
+
+# full: appointments plus a copy of each one grouped by date (legacy shape)
+# compact: appointments once; appointments_by_date holds [start, end) index ranges
+# columnar: as compact, with appointments sent as {'columns': [...], 'rows': [[...]]}
+RESPONSE_FORMATS = ('full', 'compact', 'columnar')
+
+def encode_cursor(appointment: Dict[str, Any]) -> str:
+    """Opaque keyset cursor pointing after the given appointment"""
+    raw = json.dumps([str(appointment['start_at']), appointment['id']])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def group_by_date(appointments: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Group appointments by appointment_date, copying each one into its day"""
+    appointments_by_date = {}
+    for appointment in appointments:
+        appointments_by_date.setdefault(str(appointment['appointment_date']), []).append(appointment)
+    return appointments_by_date
+
+def date_index_ranges(appointments: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+    """
+    Map each appointment_date to the [start, end) slice of appointments on that day.
+    Appointments are ordered by start_at, so every day is one contiguous slice.
+    """
+    ranges = {}
+    for index, appointment in enumerate(appointments):
+        date_str = str(appointment['appointment_date'])
+        if date_str in ranges:
+            ranges[date_str][1] = index + 1
+        else:
+            ranges[date_str] = [index, index + 1]
+    return ranges
+
+def to_columns(appointments: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Column-oriented encoding: field names listed once, each appointment as an array"""
+    columns = list(appointments[0].keys()) if appointments else []
+    known = set(columns)
+    for appointment in appointments:
+        for key in appointment:
+            if key not in known:
+                known.add(key)
+                columns.append(key)
+    return {
+        'columns': columns,
+        'rows': [[appointment.get(column) for column in columns] for appointment in appointments]
+    }
+
+def decode_cursor(cursor: str) -> Optional[Tuple[str, str]]:
+    """Decode a cursor from encode_cursor, or return None if it is malformed"""
+    try:
+        start_at, appointment_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        datetime.fromisoformat(start_at)
+        return start_at, appointment_id
+    except (ValueError, TypeError):
+        return None
+
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Handle Lambda event for GET /appointments with RDS backend
@@ -20,7 +80,11 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     - end_date: End date (YYYY-MM-DD, default: start_date + 7 days)
     - doctor_id: Filter by specific doctor
     - patient_id: Filter by specific patient
-    - status: Filter by appointment status
+    - status: Filter by appointment status (comma-separated for several)
+    - service_id: Filter by service
+    - limit: Page size (max 1000); without limit or cursor every match is returned
+    - cursor: next_cursor from the previous page (page size defaults to 500)
+    - format: full (default), compact or columnar, see RESPONSE_FORMATS
     
     Args:
         event: Lambda event
@@ -31,6 +95,10 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     logger.info(f"Received event: {json.dumps(event)}")
     
+    # Doctor dashboards refresh today's and tomorrow's agendas constantly; load
+    # them all once per container (AGENDA_PREWARM)
+    prewarm_once()
+    
     try:
         # Parse query parameters
         query_params = event.get('queryStringParameters') or {}
@@ -62,47 +130,85 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         # Filter parameters
         doctor_id = query_params.get('doctor_id')
         patient_id = query_params.get('patient_id')
+        service_id = query_params.get('service_id')
         status = query_params.get('status')
+        statuses = [s.strip() for s in status.split(',') if s.strip()] if status else None
+        
+        limit = None
+        if query_params.get('limit') or query_params.get('cursor'):
+            try:
+                limit = int(query_params.get('limit') or DEFAULT_LIMIT)
+            except ValueError:
+                return build_error_response(400, "limit must be an integer")
+            if limit <= 0 or limit > MAX_LIMIT:
+                return build_error_response(400, f"limit must be between 1 and {MAX_LIMIT}")
         
-        logger.info(f"Fetching appointments: {start_date} to {end_date}, doctor_id={doctor_id}")
+        response_format = query_params.get('format') or 'full'
+        if response_format not in RESPONSE_FORMATS:
+            return build_error_response(400, f"format must be one of: {', '.join(RESPONSE_FORMATS)}")
         
-        # Get appointments from RDS
-        appointments = get_appointments_by_date_range(
-            start_date=str(start_date),
-            end_date=str(end_date),
-            doctor_id=doctor_id
-        )
+        after = None
+        if query_params.get('cursor'):
+            after = decode_cursor(query_params['cursor'])
+            if after is None:
+                return build_error_response(400, "Invalid cursor")
         
-        # Additional filtering (if needed)
-        if patient_id:
-            appointments = [apt for apt in appointments if apt['patient_id'] == patient_id]
+        logger.info(f"Fetching appointments: {start_date} to {end_date}, doctor_id={doctor_id}, "
+                    f"patient_id={patient_id}, service_id={service_id}, status={statuses}")
         
-        if status:
-            appointments = [apt for apt in appointments if apt['status'] == status]
+        # A doctor's unfiltered agenda over a few days is served from the per
+        # doctor-day cache; anything else goes to the database
+        appointments = None
+        if (doctor_id and not (patient_id or service_id or statuses or after)
+                and (end_date - start_date).days < AGENDA_MAX_DAYS):
+            appointments = get_agenda_range(doctor_id, start_date, end_date)
+            if limit is not None and len(appointments) > limit:
+                appointments = None
         
-        # Group appointments by date for better frontend consumption
-        appointments_by_date = {}
-        for appointment in appointments:
-            date_str = str(appointment['appointment_date'])
-            if date_str not in appointments_by_date:
-                appointments_by_date[date_str] = []
-            appointments_by_date[date_str].append(appointment)
+        # Get appointments from RDS; every filter is applied in the query and one
+        # extra row is fetched to tell whether another page follows
+        if appointments is None:
+            appointments = get_appointments_by_date_range(
+                start_date=str(start_date),
+                end_date=str(end_date),
+                doctor_id=doctor_id,
+                patient_id=patient_id,
+                statuses=statuses,
+                service_id=service_id,
+                limit=limit + 1 if limit is not None else None,
+                after=after
+            )
+        
+        next_cursor = None
+        if limit is not None and len(appointments) > limit:
+            appointments = appointments[:limit]
+            next_cursor = encode_cursor(appointments[-1])
+        
+        # Group appointments by date for better frontend consumption; the compact
+        # formats reference rows by index instead of repeating them
+        if response_format == 'full':
+            appointments_by_date = group_by_date(appointments)
+        else:
+            appointments_by_date = date_index_ranges(appointments)
         
         # Build response
         response_data = {
-            'appointments': appointments,
+            'appointments': to_columns(appointments) if response_format == 'columnar' else appointments,
             'appointments_by_date': appointments_by_date,
+            'format': response_format,
             'filters': {
                 'start_date': str(start_date),
                 'end_date': str(end_date),
                 'doctor_id': doctor_id,
                 'patient_id': patient_id,
+                'service_id': service_id,
                 'status': status
             },
             'summary': {
                 'total_appointments': len(appointments),
                 'date_range_days': (end_date - start_date).days + 1
-            }
+            },
+            'next_cursor': next_cursor
         }
         
         logger.info(f"Successfully fetched {len(appointments)} appointments")
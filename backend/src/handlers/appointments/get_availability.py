@@ -0,0 +1,84 @@
+"""
+Lambda function listing a doctor's free appointment slots for a day
+"""
+import json
+import logging
+from typing import Dict, Any
+from datetime import datetime
+from utils.rds_utils import execute_query, get_service_duration, build_response, build_error_response
+from utils.availability import AvailabilityEngine, SLOT_MINUTES
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_STEP_MINUTES = 15
+MAX_DURATION_MINUTES = 12 * 60
+
+def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Handle Lambda event for GET /appointments/availability with RDS backend
+
+    Query Parameters:
+    - doctor_id: Doctor to search (required)
+    - date: Day to search (YYYY-MM-DD, required)
+    - service_id: Service whose duration_minutes the slots must fit
+    - duration: Duration in minutes (overrides the service duration, default 30)
+    - step: Spacing of returned start times in minutes (multiple of 5, default 15)
+
+    Args:
+        event: Lambda event
+        context: Lambda context
+
+    Returns:
+        API Gateway response
+    """
+    logger.info(f"Received event: {json.dumps(event)}")
+
+    try:
+        query_params = event.get('queryStringParameters') or {}
+
+        doctor_id = query_params.get('doctor_id')
+        if not doctor_id:
+            return build_error_response(400, "doctor_id is required")
+
+        try:
+            day = datetime.strptime(query_params.get('date') or '', '%Y-%m-%d').date()
+        except ValueError:
+            return build_error_response(400, "Invalid date format. Use YYYY-MM-DD")
+
+        try:
+            step = int(query_params.get('step', DEFAULT_STEP_MINUTES))
+            duration = int(query_params['duration']) if query_params.get('duration') else None
+        except ValueError:
+            return build_error_response(400, "duration and step must be integers")
+
+        if step <= 0 or step % SLOT_MINUTES:
+            return build_error_response(400, f"step must be a positive multiple of {SLOT_MINUTES}")
+
+        service_id = query_params.get('service_id')
+        if duration is None and service_id:
+            duration = get_service_duration(service_id)
+            if duration is None:
+                return build_error_response(404, "Service not found")
+        duration = duration or 30
+
+        if duration <= 0 or duration > MAX_DURATION_MINUTES:
+            return build_error_response(400, f"duration must be between 1 and {MAX_DURATION_MINUTES} minutes")
+
+        slots = AvailabilityEngine(execute_query).free_slots(doctor_id, day, duration, step)
+
+        response_data = {
+            'doctor_id': doctor_id,
+            'date': day.isoformat(),
+            'duration_minutes': duration,
+            'step_minutes': step,
+            'slots': slots,
+            'total_slots': len(slots)
+        }
+
+        logger.info(f"Found {len(slots)} free slots for doctor {doctor_id} on {day}")
+        return build_response(200, response_data)
+
+    except Exception as e:
+        logger.error(f"Error fetching availability: {str(e)}")
+        return build_error_response(500, "Internal server error", "Failed to fetch availability")
@@ -0,0 +1,97 @@
+"""
+Lambda function finding the earliest free appointment slots across doctors
+"""
+import json
+import logging
+from typing import Dict, Any
+from datetime import datetime
+from utils.rds_utils import execute_query, get_service_duration, build_response, build_error_response
+from utils.availability import AvailabilityEngine, SLOT_MINUTES, MAX_SEARCH_DAYS, MAX_SEARCH_RESULTS
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_LIMIT = 10
+DEFAULT_STEP_MINUTES = 15
+MAX_DURATION_MINUTES = 12 * 60
+
+def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Handle Lambda event for GET /appointments/availability/search with RDS backend
+
+    Query Parameters:
+    - start_date: First day to search (YYYY-MM-DD, required)
+    - end_date: Last day to search (YYYY-MM-DD, defaults to start_date)
+    - service_id: Service whose duration_minutes the slots must fit
+    - duration: Duration in minutes (overrides the service duration, default 30)
+    - doctor_ids: Comma-separated doctors to consider (defaults to every active doctor)
+    - limit: Number of results (default 10)
+    - step: Spacing of candidate start times in minutes (multiple of 5, default 15)
+
+    Args:
+        event: Lambda event
+        context: Lambda context
+
+    Returns:
+        API Gateway response
+    """
+    logger.info(f"Received event: {json.dumps(event)}")
+
+    try:
+        query_params = event.get('queryStringParameters') or {}
+
+        try:
+            start_date = datetime.strptime(query_params.get('start_date') or '', '%Y-%m-%d').date()
+            end_date = datetime.strptime(query_params.get('end_date') or start_date.isoformat(), '%Y-%m-%d').date()
+        except ValueError:
+            return build_error_response(400, "Invalid date format. Use YYYY-MM-DD")
+
+        if end_date < start_date:
+            return build_error_response(400, "end_date must not be before start_date")
+        if (end_date - start_date).days >= MAX_SEARCH_DAYS:
+            return build_error_response(400, f"The search window cannot exceed {MAX_SEARCH_DAYS} days")
+
+        try:
+            step = int(query_params.get('step', DEFAULT_STEP_MINUTES))
+            limit = int(query_params.get('limit', DEFAULT_LIMIT))
+            duration = int(query_params['duration']) if query_params.get('duration') else None
+        except ValueError:
+            return build_error_response(400, "duration, limit and step must be integers")
+
+        if step <= 0 or step % SLOT_MINUTES:
+            return build_error_response(400, f"step must be a positive multiple of {SLOT_MINUTES}")
+        if limit <= 0 or limit > MAX_SEARCH_RESULTS:
+            return build_error_response(400, f"limit must be between 1 and {MAX_SEARCH_RESULTS}")
+
+        service_id = query_params.get('service_id')
+        if duration is None and service_id:
+            duration = get_service_duration(service_id)
+            if duration is None:
+                return build_error_response(404, "Service not found")
+        duration = duration or 30
+
+        if duration <= 0 or duration > MAX_DURATION_MINUTES:
+            return build_error_response(400, f"duration must be between 1 and {MAX_DURATION_MINUTES} minutes")
+
+        doctor_ids = [d.strip() for d in (query_params.get('doctor_ids') or '').split(',') if d.strip()]
+
+        slots = AvailabilityEngine(execute_query).earliest_slots(
+            start_date, end_date, duration, doctor_ids=doctor_ids or None, limit=limit, step_minutes=step
+        )
+
+        response_data = {
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'service_id': service_id,
+            'duration_minutes': duration,
+            'step_minutes': step,
+            'slots': slots,
+            'total_slots': len(slots)
+        }
+
+        logger.info(f"Found {len(slots)} earliest slots between {start_date} and {end_date}")
+        return build_response(200, response_data)
+
+    except Exception as e:
+        logger.error(f"Error searching availability: {str(e)}")
+        return build_error_response(500, "Internal server error", "Failed to search availability")
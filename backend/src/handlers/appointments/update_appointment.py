@@ -4,11 +4,42 @@ Lambda function to update an appointment in RDS Aurora
 import json
 import logging
 from typing import Dict, Any
-from utils.rds_utils import execute_mutation, execute_query, build_response, build_error_response
+from utils.rds_utils import (
+    execute_mutation, execute_query, execute_reservation, build_response, build_error_response,
+    release_slots_query, reserve_slots_query, SlotUnavailableError
+)
+from utils.availability import AvailabilityEngine, INACTIVE_STATUSES, invalidate_doctor_day
+from utils.appointment_times import appointment_interval, format_sql_datetime
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+SCHEDULING_FIELDS = ('patient_id', 'doctor_id', 'appointment_date', 'appointment_time', 'duration_minutes')
+# Fields that decide which appointment_slots rows an appointment holds
+SLOT_FIELDS = ('doctor_id', 'appointment_date', 'appointment_time', 'duration_minutes')
+
+def needs_availability_check(existing: Dict[str, Any], body: Dict[str, Any]) -> bool:
+    """
+    An update needs a conflict check when it moves the appointment (time, duration,
+    doctor or patient) or reactivates a cancelled/no-show appointment
+    """
+    if body.get('status', existing.get('status')) in INACTIVE_STATUSES:
+        return False
+    if any(field in body and body[field] != existing.get(field) for field in SCHEDULING_FIELDS):
+        return True
+    return 'status' in body and existing.get('status') in INACTIVE_STATUSES
+
+def moves_slots(existing: Dict[str, Any], body: Dict[str, Any]) -> bool:
+    """
+    An update moves the doctor's slot reservation when it cancels or reactivates
+    the appointment, or reschedules an active one
+    """
+    was_active = existing.get('status') not in INACTIVE_STATUSES
+    is_active = body.get('status', existing.get('status')) not in INACTIVE_STATUSES
+    if was_active != is_active:
+        return True
+    return is_active and any(field in body and body[field] != existing.get(field) for field in SLOT_FIELDS)
+
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Handle Lambda event for PUT /appointments/{id} with RDS backend
@@ -46,6 +77,26 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         if not existing_appointment:
             return build_error_response(404, "Appointment not found")
         
+        # Reject moves onto a time the patient is already booked; the doctor's side
+        # is enforced by the slot reservation below
+        merged = {**existing_appointment, **{field: body[field] for field in SCHEDULING_FIELDS if field in body}}
+        if needs_availability_check(existing_appointment, body):
+            try:
+                conflicts = AvailabilityEngine(execute_query).find_conflicts(
+                    merged['patient_id'],
+                    None,
+                    merged['appointment_date'],
+                    merged['appointment_time'],
+                    merged.get('duration_minutes') or 30,
+                    exclude_appointment_id=appointment_id
+                )
+            except ValueError:
+                return build_error_response(400, "Validation failed",
+                                          "Invalid date or time format. Use YYYY-MM-DD and HH:MM:SS")
+            if conflicts:
+                return build_error_response(409, "Time slot not available",
+                                          "The requested time slot conflicts with an existing appointment")
+        
         # Build update query dynamically based on provided fields
         update_fields = []
         params = []
@@ -63,6 +114,20 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         if not update_fields:
             return build_error_response(400, "No valid fields to update")
         
+        # Keep the indexed [start_at, end_at) span in step with date, time and duration
+        if any(field in body for field in ('appointment_date', 'appointment_time', 'duration_minutes')):
+            try:
+                start_at, end_at = appointment_interval(
+                    body.get('appointment_date', existing_appointment.get('appointment_date')),
+                    body.get('appointment_time', existing_appointment.get('appointment_time')),
+                    body.get('duration_minutes', existing_appointment.get('duration_minutes'))
+                )
+            except (TypeError, ValueError):
+                return build_error_response(400, "Validation failed",
+                                          "Invalid date or time format. Use YYYY-MM-DD and HH:MM:SS")
+            update_fields.extend(["start_at = %s", "end_at = %s"])
+            params.extend([format_sql_datetime(start_at), format_sql_datetime(end_at)])
+        
         # Add updated_at timestamp
         update_fields.append("updated_at = CURRENT_TIMESTAMP")
         params.append(appointment_id)
@@ -75,10 +140,39 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         """
         
         logger.info(f"Updating appointment {appointment_id}")
-        affected_rows = execute_mutation(query, tuple(params))
-        
-        if affected_rows == 0:
-            return build_error_response(404, "Appointment not found or no changes made")
+        if moves_slots(existing_appointment, body):
+            # Release the old slots and reserve the new ones in the same transaction
+            # as the update, so a taken slot fails it with a duplicate key
+            queries = [release_slots_query(appointment_id), (query, tuple(params))]
+            if body.get('status', existing_appointment.get('status')) not in INACTIVE_STATUSES:
+                try:
+                    start_at, end_at = appointment_interval(
+                        merged['appointment_date'], merged['appointment_time'], merged.get('duration_minutes')
+                    )
+                except (TypeError, ValueError):
+                    return build_error_response(400, "Validation failed",
+                                              "Invalid date or time format. Use YYYY-MM-DD and HH:MM:SS")
+                reservation = reserve_slots_query(appointment_id, merged['doctor_id'], start_at, end_at)
+                if reservation:
+                    queries.append(reservation)
+            try:
+                execute_reservation(queries)
+            except SlotUnavailableError:
+                return build_error_response(409, "Time slot not available",
+                                          "The requested time slot conflicts with an existing appointment")
+        else:
+            affected_rows = execute_mutation(query, tuple(params))
+            
+            if affected_rows == 0:
+                return build_error_response(404, "Appointment not found or no changes made")
+        
+        # Cached agendas hold the whole row (notes and service included), so every
+        # update makes the old and, if it moved, the new doctor-day stale
+        old_doctor, old_date = existing_appointment.get('doctor_id'), existing_appointment.get('appointment_date')
+        new_doctor, new_date = body.get('doctor_id', old_doctor), body.get('appointment_date', old_date)
+        invalidate_doctor_day(old_doctor, old_date)
+        if (new_doctor, str(new_date)) != (old_doctor, str(old_date)):
+            invalidate_doctor_day(new_doctor, new_date)
         
         # Return updated appointment data
         updated_query = """
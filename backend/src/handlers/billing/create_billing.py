@@ -8,8 +8,12 @@ from datetime import datetime
 from botocore.exceptions import ClientError
 
 # Import utility functions
-from utils.db_utils import create_item, get_item_by_id, generate_response
+from utils.db_utils import create_item, get_item_by_id, generate_response, transact_write_items, MAX_TRANSACTION_ITEMS
 from utils.responser_helper import handle_exception, build_error_response
+from utils.billing_rollups import get_rollups_table_name, rollup_deltas, rollup_update_operations
+from utils.rds_utils import execute_query, mark_appointments_billed
+from utils.batch_billing import billing_id_for
+from utils.availability import invalidate_doctor_day
 
 def lambda_handler(event, context):
     """
@@ -93,14 +97,16 @@ def lambda_handler(event, context):
                     'total': item_total
                 })
         
-        # Create billing record
-        billing_id = str(uuid.uuid4())
+        # Create billing record. An appointment's invoice has the id batch billing
+        # would give it, so the appointment can never be billed twice
+        appointment_id = body.get('appointmentId')
+        billing_id = billing_id_for(appointment_id) if appointment_id else str(uuid.uuid4())
         timestamp = datetime.utcnow().isoformat() + "Z"
         
         billing_item = {
             'id': billing_id,
             'patientId': body.get('patientId'),
-            'appointmentId': body.get('appointmentId', None),
+            'appointmentId': appointment_id,
             'items': billing_items,
             'subtotal': total_amount,
             'tax': body.get('tax', 0),
@@ -113,13 +119,43 @@ def lambda_handler(event, context):
             'updatedAt': timestamp
         }
         
-        # Create the billing record in DynamoDB
-        create_item(billing_table, billing_item)
+        # Create the billing record in DynamoDB, together with its revenue rollups when configured
+        if get_rollups_table_name():
+            billing_item['rollupsApplied'] = True
+            operations = [{'Put': {
+                'TableName': billing_table,
+                'Item': billing_item,
+                'ConditionExpression': 'attribute_not_exists(id)'
+            }}]
+            operations.extend(rollup_update_operations(rollup_deltas(billing_item, created=True)))
+            if len(operations) > MAX_TRANSACTION_ITEMS:
+                return build_error_response(400, 'Validation Error', 'Too many distinct services in one billing record', request_origin=request_origin)
+            transact_write_items(operations)
+        else:
+            create_item(billing_table, billing_item, 'attribute_not_exists(id)')
+        
+        # Link the appointment to its invoice so batch billing skips it, and drop
+        # the cached agenda of its day, which shows billing_id
+        if appointment_id and os.environ.get('DB_HOST'):
+            try:
+                if mark_appointments_billed({appointment_id: billing_id}):
+                    appointment = execute_query("SELECT doctor_id, appointment_date FROM appointments WHERE id = %s",
+                                                (appointment_id,), fetch_one=True) or {}
+                    invalidate_doctor_day(appointment.get('doctor_id'), appointment.get('appointment_date'))
+            except Exception as e:
+                print(f"Warning: could not mark appointment {appointment_id} as billed: {e}")
         
         # Return the created billing record
         return generate_response(201, billing_item)
     
     except ClientError as e:
+        error = e.response.get('Error', {}).get('Code')
+        if error == 'ConditionalCheckFailedException' or (
+                error == 'TransactionCanceledException'
+                and (e.response.get('CancellationReasons') or [{}])[0].get('Code') == 'ConditionalCheckFailed'):
+            return build_error_response(409, 'Conflict', f"Appointment {body.get('appointmentId')} is already billed", request_origin=request_origin)
+        if error == 'TransactionCanceledException':
+            return build_error_response(409, 'Conflict', 'Billing totals were modified concurrently, please retry', request_origin=request_origin)
         return handle_exception(e, request_origin)
     except Exception as e:
         print(f"Error creating billing record: {e}")
@@ -0,0 +1,91 @@
+"""
+Lambda function to generate billing records for completed appointments in bulk
+"""
+import os
+import json
+from datetime import datetime
+from botocore.exceptions import ClientError
+
+# Import utility functions
+from utils.db_utils import scan_table, generate_response
+from utils.responser_helper import handle_exception, build_error_response
+from utils.services_catalog import ServicesCatalog
+from utils.cache_invalidation import get_version_bus
+from utils.billing_rollups import get_rollups_table_name
+from utils.batch_billing import BatchBillingJob, catalog_service_lookup
+
+MAX_BATCH_DAYS = 31
+# Stop starting new pages when less than this is left of the Lambda timeout
+STOP_MARGIN_MS = 15000
+
+# Prices come from the same versioned services catalog the services API serves
+_catalog = ServicesCatalog(loader=scan_table, bus=get_version_bus())
+
+def lambda_handler(event, context):
+    """
+    Handle Lambda event for POST /billing/batch
+
+    Body:
+    - from: First day (YYYY-MM-DD, required)
+    - to: Last day, inclusive (YYYY-MM-DD, defaults to from)
+    - paymentMethod: paymentMethod of the generated invoices (default 'invoice')
+
+    Creates one pending invoice per completed appointment that has no billing
+    record yet. When the response has "complete": false, call it again with the
+    same range to pick up where it stopped.
+
+    Args:
+        event (dict): Lambda event
+        context (LambdaContext): Lambda context
+
+    Returns:
+        dict: API Gateway response
+    """
+    print(f"Received event: {json.dumps(event)}")
+
+    headers = event.get('headers') or {}
+    request_origin = headers.get('Origin') or headers.get('origin')
+
+    billing_table = os.environ.get('BILLING_TABLE')
+    services_table = os.environ.get('SERVICES_TABLE')
+    if not billing_table or not services_table:
+        return build_error_response(500, 'Configuration Error', 'Billing and services table names not configured', request_origin=request_origin)
+
+    try:
+        body = json.loads(event.get('body') or '{}')
+    except json.JSONDecodeError:
+        return build_error_response(400, 'Validation Error', 'Invalid JSON in request body', request_origin=request_origin)
+
+    try:
+        start = datetime.strptime(body.get('from') or '', '%Y-%m-%d').date()
+        end = datetime.strptime(body.get('to') or body['from'], '%Y-%m-%d').date()
+    except (KeyError, ValueError):
+        return build_error_response(400, 'Validation Error', 'from and to must be dates in YYYY-MM-DD format', request_origin=request_origin)
+
+    if end < start:
+        return build_error_response(400, 'Validation Error', 'to must not be before from', request_origin=request_origin)
+    if (end - start).days + 1 > MAX_BATCH_DAYS:
+        return build_error_response(400, 'Validation Error', f'Range cannot exceed {MAX_BATCH_DAYS} days', request_origin=request_origin)
+
+    def should_continue():
+        if context is None or not hasattr(context, 'get_remaining_time_in_millis'):
+            return True
+        return context.get_remaining_time_in_millis() > STOP_MARGIN_MS
+
+    try:
+        job = BatchBillingJob(
+            billing_table,
+            catalog_service_lookup(_catalog, services_table),
+            rollups_table=get_rollups_table_name(),
+            payment_method=body.get('paymentMethod') or 'invoice',
+            should_continue=should_continue
+        )
+        stats = job.run(start.isoformat(), end.isoformat())
+        stats.update({'from': start.isoformat(), 'to': end.isoformat()})
+        return generate_response(200, stats)
+
+    except ClientError as e:
+        return handle_exception(e, request_origin)
+    except Exception as e:
+        print(f"Error generating billing records: {e}")
+        return build_error_response(500, 'Internal Server Error', f'Error generating billing records: {str(e)}', request_origin=request_origin)
@@ -0,0 +1,59 @@
+"""
+Lambda function to summarize revenue from the billing rollups
+"""
+import json
+from datetime import datetime
+from botocore.exceptions import ClientError
+
+# Import utility functions
+from utils.db_utils import generate_response
+from utils.responser_helper import handle_exception, build_error_response
+from utils.billing_rollups import get_rollups_table_name, query_rollups, summarize_rollups, MAX_SUMMARY_DAYS
+
+def lambda_handler(event, context):
+    """
+    Handle Lambda event for GET /billing/summary
+
+    Query Parameters:
+    - from: First day (YYYY-MM-DD, required)
+    - to: Last day, inclusive (YYYY-MM-DD, defaults to from)
+
+    Only rollup items are read, so the cost grows with the number of days rather
+    than the number of invoices.
+
+    Args:
+        event (dict): Lambda event
+        context (LambdaContext): Lambda context
+
+    Returns:
+        dict: API Gateway response
+    """
+    print(f"Received event: {json.dumps(event)}")
+
+    headers = event.get('headers') or {}
+    request_origin = headers.get('Origin') or headers.get('origin')
+
+    if not get_rollups_table_name():
+        return build_error_response(500, 'Configuration Error', 'Billing rollups table name not configured', request_origin=request_origin)
+
+    query_params = event.get('queryStringParameters') or {}
+    try:
+        start = datetime.strptime(query_params.get('from') or '', '%Y-%m-%d').date()
+        end = datetime.strptime(query_params.get('to') or query_params['from'], '%Y-%m-%d').date()
+    except (KeyError, ValueError):
+        return build_error_response(400, 'Validation Error', 'from and to must be dates in YYYY-MM-DD format', request_origin=request_origin)
+
+    if end < start:
+        return build_error_response(400, 'Validation Error', 'to must not be before from', request_origin=request_origin)
+    if (end - start).days + 1 > MAX_SUMMARY_DAYS:
+        return build_error_response(400, 'Validation Error', f'Range cannot exceed {MAX_SUMMARY_DAYS} days', request_origin=request_origin)
+
+    try:
+        summary = summarize_rollups(query_rollups(start, end), start, end)
+        return generate_response(200, summary)
+
+    except ClientError as e:
+        return handle_exception(e, request_origin)
+    except Exception as e:
+        print(f"Error summarizing billing records: {e}")
+        return build_error_response(500, 'Internal Server Error', f'Error summarizing billing records: {str(e)}', request_origin=request_origin)
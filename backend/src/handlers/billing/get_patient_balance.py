@@ -0,0 +1,45 @@
+"""
+Lambda function to get a patient's running billing balance
+"""
+import json
+from botocore.exceptions import ClientError
+
+# Import utility functions
+from utils.db_utils import generate_response
+from utils.responser_helper import handle_exception, build_error_response
+from utils.billing_rollups import get_rollups_table_name, get_patient_balance
+
+def lambda_handler(event, context):
+    """
+    Handle Lambda event for GET /billing/patients/{patientId}/balance
+
+    The balance item is kept current by create_billing/update_billing, so this is
+    a single GetItem however many invoices the patient has.
+
+    Args:
+        event (dict): Lambda event
+        context (LambdaContext): Lambda context
+
+    Returns:
+        dict: API Gateway response
+    """
+    print(f"Received event: {json.dumps(event)}")
+
+    headers = event.get('headers') or {}
+    request_origin = headers.get('Origin') or headers.get('origin')
+
+    if not get_rollups_table_name():
+        return build_error_response(500, 'Configuration Error', 'Billing rollups table name not configured', request_origin=request_origin)
+
+    patient_id = (event.get('pathParameters') or {}).get('patientId')
+    if not patient_id:
+        return build_error_response(400, 'Validation Error', 'Missing patient ID', request_origin=request_origin)
+
+    try:
+        return generate_response(200, get_patient_balance(patient_id))
+
+    except ClientError as e:
+        return handle_exception(e, request_origin)
+    except Exception as e:
+        print(f"Error getting patient balance: {e}")
+        return build_error_response(500, 'Internal Server Error', f'Error getting patient balance: {str(e)}', request_origin=request_origin)
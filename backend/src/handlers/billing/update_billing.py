@@ -3,11 +3,54 @@ Lambda function to update a billing record
 """
 import os
 import json
+from datetime import datetime
 from botocore.exceptions import ClientError
 
 # Import utility functions
-from utils.db_utils import get_item_by_id, update_item, generate_response
+from utils.db_utils import get_item_by_id, update_item, generate_response, transact_write_items
 from utils.responser_helper import handle_exception, build_error_response
+from utils.billing_rollups import get_rollups_table_name, rollup_deltas, diff_rollup_deltas, rollup_update_operations
+
+def update_with_rollups(table_name, existing_billing, updates):
+    """
+    Update a billing record and move its revenue rollups in one transaction
+
+    The update is conditioned on the record's updatedAt, so a concurrent write
+    cancels the transaction instead of double counting the rollups. A record
+    written before rollups were enabled was never counted, so it adds its full
+    contribution instead of the difference and is marked rollupsApplied.
+
+    Returns:
+        dict: The updated billing record
+    """
+    updates['updatedAt'] = datetime.utcnow().isoformat() + "Z"
+    counted = bool(existing_billing.get('rollupsApplied'))
+    if not counted:
+        updates['rollupsApplied'] = True
+    updated_billing = {**existing_billing, **updates}
+
+    names = {f"#key{i}": field for i, field in enumerate(updates)}
+    values = {f":val{i}": value for i, value in enumerate(updates.values())}
+    update_params = {
+        'UpdateExpression': "SET " + ", ".join(f"#key{i} = :val{i}" for i in range(len(updates))),
+        'ExpressionAttributeNames': names,
+        'ExpressionAttributeValues': values
+    }
+    if existing_billing.get('updatedAt'):
+        names['#expectedUpdatedAt'] = 'updatedAt'
+        values[':expectedUpdatedAt'] = existing_billing['updatedAt']
+        update_params['ConditionExpression'] = '#expectedUpdatedAt = :expectedUpdatedAt'
+    else:
+        update_params['ConditionExpression'] = 'attribute_exists(id)'
+
+    operations = [{'Update': {'TableName': table_name, 'Key': {'id': existing_billing['id']}, **update_params}}]
+    if counted:
+        deltas = diff_rollup_deltas(existing_billing, updated_billing)
+    else:
+        deltas = rollup_deltas(updated_billing)
+    operations.extend(rollup_update_operations(deltas))
+    transact_write_items(operations)
+    return updated_billing
 
 def lambda_handler(event, context):
     """
@@ -62,12 +105,17 @@ def lambda_handler(event, context):
             discount = updates.get('discount', existing_billing.get('discount', 0))
             updates['total'] = subtotal + tax - discount
         
-        # Update billing record
-        updated_billing = update_item(table_name, billing_id, updates)
+        # Update billing record, together with its revenue rollups when configured
+        if get_rollups_table_name() and updates:
+            updated_billing = update_with_rollups(table_name, existing_billing, updates)
+        else:
+            updated_billing = update_item(table_name, billing_id, updates)
         
         return generate_response(200, updated_billing)
     
     except ClientError as e:
+        if e.response.get('Error', {}).get('Code') == 'TransactionCanceledException':
+            return build_error_response(409, 'Conflict', 'Billing record was modified concurrently, please retry', request_origin=request_origin)
         return handle_exception(e, request_origin)
     except Exception as e:
         print(f"Error updating billing record: {e}")
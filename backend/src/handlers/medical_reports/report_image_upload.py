@@ -0,0 +1,120 @@
+"""
+Direct-to-S3 image uploads for medical reports.
+
+POST /api/medical-reports/{id}/image-upload-url returns a presigned POST the
+browser sends the image to; POST /api/medical-reports/{id}/images with the
+returned key checks the stored object and adds it to the report's
+imageReferences. The image never passes through API Gateway or Lambda.
+"""
+
+import json
+import os
+import base64
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Any
+import boto3
+from botocore.exceptions import ClientError
+
+# Import from lambda layer
+from utils.direct_uploads import MAX_REPORT_IMAGE_BYTES, create_image_upload, verify_image_upload
+from utils.responser_helper import build_error_response, handle_exception
+from utils.cors import add_cors_headers, build_cors_preflight_response
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """Route the upload URL and completion requests of a report's images."""
+    request_origin = (event.get('headers') or {}).get('Origin')
+    if event.get('httpMethod') == 'OPTIONS':
+        return build_cors_preflight_response(request_origin)
+
+    try:
+        medical_reports_table = os.environ.get('MEDICAL_REPORTS_TABLE')
+        images_bucket = os.environ.get('MEDICAL_REPORT_IMAGES_BUCKET')
+        if not medical_reports_table or not images_bucket:
+            return build_error_response(500, 'Configuration Error', 'Missing required environment variables',
+                                        request_origin=request_origin)
+
+        report_id = (event.get('pathParameters') or {}).get('id')
+        if not report_id:
+            return build_error_response(400, 'Bad Request', 'Missing report ID in path parameters',
+                                        request_origin=request_origin)
+
+        text = event.get('body') or '{}'
+        if event.get('isBase64Encoded'):
+            text = base64.b64decode(text).decode('utf-8')
+        try:
+            request_body = json.loads(text)
+        except ValueError as e:
+            return build_error_response(400, 'Bad Request', f'Invalid JSON body: {e}', request_origin=request_origin)
+
+        table = boto3.resource('dynamodb').Table(medical_reports_table)
+        if 'Item' not in table.get_item(Key={'id': report_id}, ProjectionExpression='id'):
+            return build_error_response(404, 'Not Found', 'Medical report not found', request_origin=request_origin)
+
+        key_prefix = f"reports/{report_id}/"
+        s3_client = boto3.client('s3')
+        try:
+            if (event.get('path') or '').endswith('/image-upload-url'):
+                result = create_upload(s3_client, images_bucket, key_prefix, request_body, event)
+            else:
+                result = complete_upload(s3_client, table, images_bucket, key_prefix, report_id, request_body)
+        except (ValueError, AttributeError) as e:
+            return build_error_response(400, 'Validation Error', str(e), request_origin=request_origin)
+
+        response = {
+            'statusCode': 200,
+            'body': json.dumps(result),
+            'headers': {'Content-Type': 'application/json'}
+        }
+        return add_cors_headers(response, request_origin)
+
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') == '404':
+            return build_error_response(404, 'Not Found', 'Uploaded image not found', e, request_origin)
+        return handle_exception(e, request_origin)
+    except Exception as e:
+        return handle_exception(e, request_origin)
+
+
+def create_upload(s3_client, bucket_name: str, key_prefix: str, request_body: Dict[str, Any],
+                  event: Dict[str, Any]) -> Dict[str, Any]:
+    """Presigned POST for one image of the report."""
+    claims = (event.get('requestContext') or {}).get('authorizer', {}).get('claims', {})
+    metadata = {'uploaded-by': claims['sub']} if claims.get('sub') else None
+    return create_image_upload(bucket_name, key_prefix, request_body.get('contentType'),
+                               MAX_REPORT_IMAGE_BYTES, metadata=metadata, s3=s3_client)
+
+
+def complete_upload(s3_client, table, bucket_name: str, key_prefix: str, report_id: str,
+                    request_body: Dict[str, Any]) -> Dict[str, Any]:
+    """Verify an uploaded image and add it to the report."""
+    image = verify_image_upload(bucket_name, request_body.get('key'), key_prefix,
+                                MAX_REPORT_IMAGE_BYTES, s3_client)
+    try:
+        response = table.update_item(
+            Key={'id': report_id},
+            UpdateExpression="SET imageReferences = list_append(if_not_exists(imageReferences, :empty_list), :new_image), updatedAt = :updated_at",
+            ExpressionAttributeValues={
+                ':empty_list': [],
+                ':new_image': [image['key']],
+                ':updated_at': datetime.now(timezone.utc).isoformat()
+            },
+            ReturnValues='UPDATED_NEW'
+        )
+    except ClientError:
+        # The image is not referenced by anything; don't leave it behind
+        s3_client.delete_object(Bucket=bucket_name, Key=image['key'])
+        raise
+
+    logger.info(f"Image {image['key']} added to medical report {report_id}")
+    return {
+        'message': 'Image uploaded successfully',
+        's3ObjectKey': image['key'],
+        'imageUrl': s3_client.generate_presigned_url(
+            'get_object', Params={'Bucket': bucket_name, 'Key': image['key']}, ExpiresIn=3600),
+        'imageReferences': response.get('Attributes', {}).get('imageReferences', [])
+    }
@@ -6,8 +6,8 @@ import json
 import logging
 import boto3
 from botocore.exceptions import ClientError
-from src.utils.db_utils import generate_response
-from src.utils.responser_helper import build_error_response
+from utils.db_utils import generate_response, query_by_type_sharded, TYPE_SHARD_COUNT
+from utils.responser_helper import build_error_response
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -27,6 +27,18 @@ def lambda_handler(event, context):
         if 'last_evaluated_key' in query_params:
             exclusive_start_key = json.loads(query_params['last_evaluated_key'])
 
+        if TYPE_SHARD_COUNT:
+            # Sharded type index: fan out across all shards and merge in order
+            response = query_by_type_sharded(
+                table_name, 'patient', limit=limit, cursor=exclusive_start_key
+            )
+            patients = response['Items']
+            logger.info(f"Successfully fetched {len(patients)} patients across {TYPE_SHARD_COUNT} shards")
+            return generate_response(200, {
+                'patients': patients,
+                'last_evaluated_key': response['LastEvaluatedKey']
+            })
+
         dynamodb = boto3.resource("dynamodb")
         table = dynamodb.Table(table_name)
         
@@ -11,10 +11,28 @@ from utils.rds_utils import (
     build_response, build_error_response
 )
 from services.patient_service import PatientService
+from utils.cache_backends import SharedCache
+from utils.cache_invalidation import get_version_bus
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Patient reads shared across containers when REDIS_URL is configured. Entries
+# are keyed on the 'patients' version on the cache bus: any patient write moves
+# it, so every container stops serving cached patients within the bus's check
+# interval. One coarse entity keeps that at one version read per container.
+PATIENTS_ENTITY = 'patients'
+_patient_cache = SharedCache('patients', ttl=60)
+
+def _patient_cache_key(patient_id: str) -> str:
+    return f"{patient_id}:v{get_version_bus().current(PATIENTS_ENTITY)}"
+
+def invalidate_patient(patient_id: str) -> None:
+    """Announce a write to a patient so every container reloads cached patients"""
+    get_version_bus().bump(PATIENTS_ENTITY)
+    # Drop the entry under the current key too, in case the version store was unreachable
+    _patient_cache.delete(_patient_cache_key(patient_id))
+
 def validate_patient_data(data: Dict[str, Any]) -> Dict[str, str]:
     """
     Validate patient data and return validation errors
@@ -104,8 +122,9 @@ def handle_get_patient_by_id(event: Dict[str, Any]) -> Dict[str, Any]:
         
         logger.info(f"Fetching patient with ID: {patient_id}")
         
-        # Get patient from RDS
-        patient = get_patient_by_id(patient_id)
+        # Get patient from the cache tier, falling back to RDS
+        patient = _patient_cache.get_or_load(_patient_cache_key(patient_id),
+                                             lambda: get_patient_by_id(patient_id))
         
         if not patient:
             return build_error_response(404, "Patient not found")
@@ -238,6 +257,7 @@ def handle_update_patient(event: Dict[str, Any]) -> Dict[str, Any]:
             return build_error_response(404, "Patient not found or no changes made")
         
         # Return updated patient data
+        invalidate_patient(patient_id)
         updated_patient = get_patient_by_id(patient_id)
         
         logger.info(f"Successfully updated patient: {patient_id}")
@@ -268,6 +288,7 @@ def handle_delete_patient(event: Dict[str, Any]) -> Dict[str, Any]:
         query = "DELETE FROM patients WHERE id = %s"
         affected_rows = execute_mutation(query, (patient_id,))
         
+        invalidate_patient(patient_id)
         if affected_rows == 0:
             return build_error_response(404, "Patient not found")
         
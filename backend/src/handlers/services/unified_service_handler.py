@@ -5,7 +5,6 @@ Consolidates create, read, update, delete operations with routing logic
 import os
 import json
 import logging
-import time
 import uuid
 from datetime import datetime
 from typing import Dict, Any
@@ -18,20 +17,33 @@ from utils.db_utils import (
 from utils.responser_helper import handle_exception, build_error_response
 from utils.cors import add_cors_headers, build_cors_preflight_response
 from utils.validation import validate_service_data
+from utils.services_catalog import ServicesCatalog
+from utils.response_cache import cached_get_response
+from utils.cache_invalidation import get_version_bus
+from utils.cache_backends import SharedCache
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-# Cache for service data
-_cache = {}
-_cache_ttl_seconds = 300  # 5 minutes
-_cache_expiry_time = 0
-_cache_expiry_times = {}  # Stores {service_id: expiry_timestamp}
+# Services catalog shared by every request served by this container. With a
+# shared version table, writes from other containers are seen within the bus
+# check interval, so the snapshot itself can live much longer.
+_bus = get_version_bus()
+# Cold containers take the catalog from the shared cache tier instead of scanning
+_shared_services = SharedCache('services', ttl=3600)
 
+def _load_services(table_name: str):
+    version = _bus.current('services')
+    return _shared_services.get_or_load(f"{table_name}:v{version}", lambda: scan_table(table_name))
+
+_catalog = ServicesCatalog(ttl_seconds=3600 if _bus.is_shared else 300, loader=_load_services, bus=_bus)
+
+def _services_version():
+    return (_catalog.version, _bus.current(_catalog.entity))
+
+@cached_get_response(ttl=60, version=_services_version)
 def handle_get_services(event: Dict[str, Any]) -> Dict[str, Any]:
     """Handle GET /services - list all services with filtering"""
-    global _cache, _cache_expiry_time
-    
     headers = event.get('headers', {})
     request_origin = headers.get('Origin') or headers.get('origin')
     
@@ -47,44 +59,20 @@ def handle_get_services(event: Dict[str, Any]) -> Dict[str, Any]:
     # Get query parameters
     query_params = event.get('queryStringParameters', {}) or {}
 
-    # Only cache if no query parameters are present
-    if not query_params and 'all_services' in _cache and time.time() < _cache_expiry_time:
-        logger.info("Returning all services from cache")
-        return generate_response(200, _cache['all_services'])
-
     try:
-        # Initialize filter expression
-        filter_expressions = []
-        
-        # Add filters based on query parameters
-        if 'category' in query_params:
-            from boto3.dynamodb.conditions import Attr
-            filter_expressions.append(Attr('category').eq(query_params['category']))
-        
+        active = None
         if 'active' in query_params:
-            from boto3.dynamodb.conditions import Attr
-            is_active = query_params['active'].lower() == 'true'
-            filter_expressions.append(Attr('active').eq(is_active))
-        
-        # Combine filter expressions if any
-        kwargs = {}
-        if filter_expressions:
-            from boto3.dynamodb.conditions import Attr
-            filter_expr = filter_expressions[0]
-            for expr in filter_expressions[1:]:
-                filter_expr = filter_expr & expr
-            kwargs['FilterExpression'] = filter_expr
-        
-        # Query services
-        services = scan_table(table_name, **kwargs)
-        logger.info(f"Fetched {len(services)} services from DynamoDB")
+            active = query_params['active'].lower() == 'true'
+
+        # Every filter is answered from the in-memory catalog indexes
+        services = _catalog.list_services(
+            table_name,
+            category=query_params.get('category'),
+            active=active,
+            prefix=query_params.get('prefix')
+        )
+        logger.info(f"Returning {len(services)} services from catalog v{_catalog.version}")
 
-        # Cache the result only if no query parameters were used
-        if not query_params:
-            _cache['all_services'] = services
-            _cache_expiry_time = time.time() + _cache_ttl_seconds
-            logger.info(f"Cached all_services. New expiry: {_cache_expiry_time}")
-        
         response = generate_response(200, services)
         return response
     
@@ -97,8 +85,6 @@ def handle_get_services(event: Dict[str, Any]) -> Dict[str, Any]:
 
 def handle_get_service_by_id(event: Dict[str, Any]) -> Dict[str, Any]:
     """Handle GET /services/{id} - get specific service"""
-    global _cache, _cache_expiry_times
-    
     headers = event.get('headers', {})
     request_origin = headers.get('Origin') or headers.get('origin')
     
@@ -112,23 +98,14 @@ def handle_get_service_by_id(event: Dict[str, Any]) -> Dict[str, Any]:
     if not service_id:
         return build_error_response(400, 'Validation Error', 'Missing service ID', request_origin)
 
-    # Check cache
-    cached_service = _cache.get(service_id)
-    if cached_service and time.time() < _cache_expiry_times.get(service_id, 0):
-        logger.info(f"Returning service {service_id} from cache")
-        return generate_response(200, cached_service)
-    
     try:
-        # Get service by ID
-        service = get_item_by_id(table_name, service_id)
+        # Serve from the catalog when it is warm; a single GetItem is cheaper than loading it
+        service = _catalog.get(service_id) if _catalog.is_fresh(table_name) else None
+        if service is None:
+            service = get_item_by_id(table_name, service_id)
         
         if not service:
             return build_error_response(404, 'Not Found', f'Service with ID {service_id} not found', request_origin)
-
-        if service:  # Only cache if service was found
-            _cache[service_id] = service
-            _cache_expiry_times[service_id] = time.time() + _cache_ttl_seconds
-            logger.info(f"Cached service {service_id}. New expiry: {_cache_expiry_times[service_id]}")
         
         return generate_response(200, service)
     
@@ -188,6 +165,7 @@ def handle_create_service(event: Dict[str, Any]) -> Dict[str, Any]:
         }
         
         create_item(table_name, service_item)
+        _catalog.upsert(service_item)
         logger.info(f"Successfully created service with ID: {service_id}")
         
         return {
@@ -256,6 +234,7 @@ def handle_update_service(event: Dict[str, Any]) -> Dict[str, Any]:
             return generate_response(200, existing_service)
 
         updated_service = update_item(table_name, service_id, updates)
+        _catalog.upsert(updated_service)
         logger.info(f"Service {service_id} updated successfully.")
         return generate_response(200, updated_service)
         
@@ -293,6 +272,7 @@ def handle_delete_service(event: Dict[str, Any]) -> Dict[str, Any]:
         
         # Delete service
         delete_item(table_name, service_id)
+        _catalog.remove(service_id)
         logger.info(f"Successfully deleted service: {service_id}")
         
         return generate_response(200, {'message': f'Service with ID {service_id} deleted successfully'})
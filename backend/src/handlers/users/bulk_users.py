@@ -0,0 +1,165 @@
+# backend/src/handlers/users/bulk_users.py
+"""
+Lambda function for bulk user administration in AWS Cognito.
+Creates, enables, disables or deletes up to MAX_BULK_USERS users per request,
+given as a JSON list or as CSV, with the Cognito calls fanned out through a
+rate-limited thread pool. Every user gets its own result.
+"""
+import os
+import csv
+import json
+import base64
+import logging
+from botocore.exceptions import ClientError
+
+from utils.bulk_users import ACTIONS, MAX_BULK_USERS, BulkUserAdmin
+from utils.user_directory import record_user_changes
+from utils.user_sync import sync_users_to_aurora
+
+# Try to import CORS utilities, fallback to inline implementation if not available
+try:
+    from utils.cors import add_cors_headers, build_cors_preflight_response
+except ImportError:
+    print("Warning: Could not import CORS utilities, using fallback implementation")
+    def add_cors_headers(response, request_origin=None):
+        if 'headers' not in response:
+            response['headers'] = {}
+        response['headers']['Access-Control-Allow-Origin'] = '*'
+        response['headers']['Access-Control-Allow-Headers'] = 'Content-Type,Authorization,X-Amz-Date,X-Api-Key,X-Amz-Security-Token,X-Requested-With,Origin,Accept'
+        response['headers']['Access-Control-Allow-Methods'] = 'GET,POST,PUT,DELETE,OPTIONS'
+        return response
+
+    def build_cors_preflight_response(request_origin=None):
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': 'Content-Type,Authorization,X-Amz-Date,X-Api-Key,X-Amz-Security-Token,X-Requested-With,Origin,Accept',
+                'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
+            },
+            'body': json.dumps({'message': 'CORS preflight successful'})
+        }
+
+# Setup logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+def build_error_response(status_code, error_type, message, exception=None, request_origin=None):
+    """Build a standardized error response with CORS headers."""
+    response = {
+        'statusCode': status_code,
+        'body': json.dumps({
+            'error': error_type,
+            'message': message,
+            'exception': str(exception) if exception else None
+        }),
+        'headers': {'Content-Type': 'application/json'}
+    }
+    return add_cors_headers(response, request_origin)
+
+def handle_exception(exception, request_origin=None):
+    """Handle exceptions and return appropriate responses."""
+    if isinstance(exception, ClientError):
+        error_code = exception.response.get('Error', {}).get('Code', 'UnknownError')
+        
+        if error_code == 'UserNotFoundException':
+            return build_error_response(404, 'Not Found', f"User not found: {str(exception)}", exception, request_origin)
+        elif error_code == 'AccessDeniedException':
+            return build_error_response(403, 'Access Denied', str(exception), exception, request_origin)
+        else:
+            logger.error(f"AWS ClientError: {error_code} - {str(exception)}")
+            return build_error_response(500, 'AWS Error', str(exception), exception, request_origin)
+    else:
+        logger.error(f"Unexpected error: {str(exception)}")
+        return build_error_response(500, 'Internal Server Error', str(exception), exception, request_origin)
+
+# Stop starting new users when less than this is left of the Lambda timeout
+STOP_MARGIN_MS = 5000
+
+def parse_users(text, content_type):
+    """
+    Read the users of a request
+
+    Returns:
+        tuple: (action or None, list of user dicts)
+    """
+    if 'csv' in (content_type or ''):
+        return None, parse_csv(text)
+    request_body = json.loads(text)
+    if request_body.get('csv'):
+        users = parse_csv(request_body['csv'])
+    else:
+        users = [{'username': user} if isinstance(user, str) else user
+                 for user in request_body.get('users') or []]
+    return request_body.get('action'), users
+
+def parse_csv(text):
+    """Users from CSV with a header row, e.g. username,email,firstName,lastName,role,password"""
+    reader = csv.DictReader(text.strip().splitlines())
+    return [{(key or '').strip(): (value or '').strip() for key, value in row.items()}
+            for row in reader if any((value or '').strip() for value in row.values())]
+
+def lambda_handler(event, context):
+    """
+    Handle Lambda event for POST /users/bulk
+
+    JSON body: {"action": "create|enable|disable|delete", "users": [...]} where users
+    are usernames, or for create objects with the POST /users fields; "csv" may
+    replace "users". A text/csv body takes the action from the action query parameter.
+    """
+    logger.info(f"Received bulk users request: {event.get('httpMethod')} {event.get('path')}")
+    request_origin = (event.get('headers') or {}).get('Origin')
+
+    if event.get('httpMethod') == 'OPTIONS':
+        return build_cors_preflight_response(request_origin)
+
+    try:
+        if not event.get('body'):
+            return build_error_response(400, 'Bad Request', 'Request body is required', request_origin=request_origin)
+
+        user_pool_id = os.environ.get('USER_POOL_ID')
+        if not user_pool_id:
+            logger.error("Environment variable USER_POOL_ID not set.")
+            return build_error_response(500, 'Configuration Error', 'User pool ID not configured.', request_origin=request_origin)
+
+        text = event['body']
+        if event.get('isBase64Encoded'):
+            text = base64.b64decode(text).decode('utf-8')
+        headers = {key.lower(): value for key, value in (event.get('headers') or {}).items()}
+        try:
+            action, users = parse_users(text, headers.get('content-type'))
+        except (ValueError, csv.Error, AttributeError) as e:
+            return build_error_response(400, 'Bad Request', f'Could not parse users: {e}', request_origin=request_origin)
+        action = action or (event.get('queryStringParameters') or {}).get('action')
+
+        if action not in ACTIONS:
+            return build_error_response(400, 'Validation Error', f"action must be one of: {', '.join(ACTIONS)}", request_origin=request_origin)
+        if not users:
+            return build_error_response(400, 'Validation Error', 'At least one user is required', request_origin=request_origin)
+        if len(users) > MAX_BULK_USERS:
+            return build_error_response(400, 'Validation Error', f'At most {MAX_BULK_USERS} users per request', request_origin=request_origin)
+        if any(not isinstance(user, dict) or not user.get('username') for user in users):
+            return build_error_response(400, 'Validation Error', 'Every user needs a username', request_origin=request_origin)
+
+        def should_continue():
+            if context is None or not hasattr(context, 'get_remaining_time_in_millis'):
+                return True
+            return context.get_remaining_time_in_millis() > STOP_MARGIN_MS
+
+        result = BulkUserAdmin(user_pool_id, should_continue=should_continue).run(action, users)
+
+        # Aurora work stays on this thread; the connection is not shared across threads
+        changes = result.pop('changes')
+        record_user_changes(changes)
+        sync_users_to_aurora(changes)
+        logger.info(f"Bulk {action}: {result['succeeded']} succeeded, {result['failed']} failed, {result['skipped']} skipped")
+
+        response = {'statusCode': 200, 'body': json.dumps(result)}
+        return add_cors_headers(response, request_origin)
+
+    except ClientError as ce:
+        logger.error(f"AWS ClientError in bulk user request: {ce}")
+        return handle_exception(ce, request_origin)
+    except Exception as e:
+        logger.error(f"Unexpected error in bulk user request: {e}", exc_info=True)
+        return handle_exception(e, request_origin)
@@ -0,0 +1,140 @@
+# backend/src/handlers/users/complete_profile_image_upload.py
+"""
+Lambda function to finish a direct-to-S3 profile image upload.
+Checks the object the browser stored with the presigned POST from
+POST /users/profile-image/upload-url and makes it the user's profile image.
+Its avatar sizes are rendered by the S3 trigger (render_profile_avatars).
+"""
+import os
+import json
+import base64
+import logging
+import boto3
+from botocore.exceptions import ClientError
+
+from utils.direct_uploads import MAX_PROFILE_IMAGE_BYTES, verify_image_upload
+from utils.profile_images import presigned_image_url, record_profile_image, stored_avatar_sizes
+
+# Try to import CORS utilities, fallback to inline implementation if not available
+try:
+    from utils.cors import add_cors_headers, build_cors_preflight_response
+except ImportError:
+    print("Warning: Could not import CORS utilities, using fallback implementation")
+    def add_cors_headers(response, request_origin=None):
+        if 'headers' not in response:
+            response['headers'] = {}
+        response['headers']['Access-Control-Allow-Origin'] = '*'
+        response['headers']['Access-Control-Allow-Headers'] = 'Content-Type,Authorization,X-Amz-Date,X-Api-Key,X-Amz-Security-Token,X-Requested-With,Origin,Accept'
+        response['headers']['Access-Control-Allow-Methods'] = 'GET,POST,PUT,DELETE,OPTIONS'
+        return response
+
+    def build_cors_preflight_response(request_origin=None):
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': 'Content-Type,Authorization,X-Amz-Date,X-Api-Key,X-Amz-Security-Token,X-Requested-With,Origin,Accept',
+                'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
+            },
+            'body': json.dumps({'message': 'CORS preflight successful'})
+        }
+
+# Setup logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+def build_error_response(status_code, error_type, message, exception=None, request_origin=None):
+    """Build a standardized error response with CORS headers."""
+    response = {
+        'statusCode': status_code,
+        'body': json.dumps({
+            'error': error_type,
+            'message': message,
+            'exception': str(exception) if exception else None
+        }),
+        'headers': {'Content-Type': 'application/json'}
+    }
+    return add_cors_headers(response, request_origin)
+
+def handle_exception(exception, request_origin=None):
+    """Handle exceptions and return appropriate responses."""
+    if isinstance(exception, ClientError):
+        error_code = exception.response.get('Error', {}).get('Code', 'UnknownError')
+        
+        if error_code == 'UserNotFoundException':
+            return build_error_response(404, 'Not Found', f"User not found: {str(exception)}", exception, request_origin)
+        elif error_code in ('404', 'NoSuchKey'):
+            return build_error_response(404, 'Not Found', 'Uploaded image not found', exception, request_origin)
+        elif error_code == 'AccessDeniedException':
+            return build_error_response(403, 'Access Denied', str(exception), exception, request_origin)
+        else:
+            logger.error(f"AWS ClientError: {error_code} - {str(exception)}")
+            return build_error_response(500, 'AWS Error', str(exception), exception, request_origin)
+    else:
+        logger.error(f"Unexpected error: {str(exception)}")
+        return build_error_response(500, 'Internal Server Error', str(exception), exception, request_origin)
+
+def lambda_handler(event, context):
+    """
+    Handle Lambda event for POST /users/profile-image/complete
+
+    JSON body: {"key": "<key returned with the upload URL>"}
+    """
+    logger.info(f"Received profile image completion: {event.get('httpMethod')} {event.get('path')}")
+    request_origin = (event.get('headers') or {}).get('Origin')
+
+    if event.get('httpMethod') == 'OPTIONS':
+        return build_cors_preflight_response(request_origin)
+
+    try:
+        claims = event.get('requestContext', {}).get('authorizer', {}).get('claims', {})
+        user_sub = claims.get('sub')
+        username = claims.get('cognito:username')
+        if not user_sub or not username:
+            return build_error_response(401, 'Unauthorized', 'User identifier not found.', request_origin=request_origin)
+
+        user_pool_id = os.environ.get('USER_POOL_ID')
+        bucket_name = os.environ.get('DOCUMENTS_BUCKET')
+        if not user_pool_id or not bucket_name:
+            logger.error("Environment variable USER_POOL_ID or DOCUMENTS_BUCKET not set")
+            return build_error_response(500, 'Configuration Error', 'User pool or document storage not configured', request_origin=request_origin)
+
+        text = event.get('body') or '{}'
+        if event.get('isBase64Encoded'):
+            text = base64.b64decode(text).decode('utf-8')
+        s3 = boto3.client('s3')
+        try:
+            image = verify_image_upload(bucket_name, json.loads(text).get('key'), f"profile-images/{user_sub}/",
+                                        MAX_PROFILE_IMAGE_BYTES, s3)
+        except (ValueError, AttributeError) as e:
+            return build_error_response(400, 'Validation Error', str(e), request_origin=request_origin)
+
+        cognito = boto3.client('cognito-idp')
+        cognito.admin_update_user_attributes(
+            UserPoolId=user_pool_id,
+            Username=username,
+            UserAttributes=[{'Name': 'custom:profile_image', 'Value': image['key']}]
+        )
+        # The trigger may have finished rendering already; if not, it refreshes the record when done
+        record_profile_image(username, image['key'], contentType=image['contentType'], size=image['size'],
+                             avatars=stored_avatar_sizes(bucket_name, image['key']))
+
+        response = {
+            'statusCode': 200,
+            'body': json.dumps({
+                'success': True,
+                'message': 'Profile image uploaded successfully',
+                'imageUrl': presigned_image_url(bucket_name, image['key'], s3),
+                'imageKey': image['key']
+            }),
+            'headers': {'Content-Type': 'application/json'}
+        }
+        logger.info(f"Profile image {image['key']} set for user: {username}")
+        return add_cors_headers(response, request_origin)
+
+    except ClientError as ce:
+        logger.error(f"AWS ClientError completing profile image upload: {ce}")
+        return handle_exception(ce, request_origin)
+    except Exception as e:
+        logger.error(f"Unexpected error completing profile image upload: {e}", exc_info=True)
+        return handle_exception(e, request_origin)
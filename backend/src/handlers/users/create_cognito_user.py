@@ -10,6 +10,9 @@ import logging
 import base64
 from botocore.exceptions import ClientError
 
+from utils.user_directory import record_user_change
+from utils.user_sync import sync_user_to_aurora
+
 # Setup logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -202,6 +205,8 @@ def lambda_handler(event, context):
             'role': attributes.get('custom:role', 'user'),
             'sub': attributes.get('sub', '')
         }
+        record_user_change(user['username'], user=user)
+        sync_user_to_aurora(user['username'], user=user)
         
         # Return the formatted response
         response = {
@@ -0,0 +1,119 @@
+# backend/src/handlers/users/create_profile_image_upload.py
+"""
+Lambda function to start a direct-to-S3 profile image upload.
+Returns a presigned POST the browser sends the image to, so the image never
+passes through API Gateway or Lambda; POST /users/profile-image/complete then
+attaches it to the user.
+"""
+import os
+import json
+import base64
+import logging
+from botocore.exceptions import ClientError
+
+from utils.direct_uploads import MAX_PROFILE_IMAGE_BYTES, create_image_upload
+
+# Try to import CORS utilities, fallback to inline implementation if not available
+try:
+    from utils.cors import add_cors_headers, build_cors_preflight_response
+except ImportError:
+    print("Warning: Could not import CORS utilities, using fallback implementation")
+    def add_cors_headers(response, request_origin=None):
+        if 'headers' not in response:
+            response['headers'] = {}
+        response['headers']['Access-Control-Allow-Origin'] = '*'
+        response['headers']['Access-Control-Allow-Headers'] = 'Content-Type,Authorization,X-Amz-Date,X-Api-Key,X-Amz-Security-Token,X-Requested-With,Origin,Accept'
+        response['headers']['Access-Control-Allow-Methods'] = 'GET,POST,PUT,DELETE,OPTIONS'
+        return response
+
+    def build_cors_preflight_response(request_origin=None):
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': 'Content-Type,Authorization,X-Amz-Date,X-Api-Key,X-Amz-Security-Token,X-Requested-With,Origin,Accept',
+                'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
+            },
+            'body': json.dumps({'message': 'CORS preflight successful'})
+        }
+
+# Setup logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+def build_error_response(status_code, error_type, message, exception=None, request_origin=None):
+    """Build a standardized error response with CORS headers."""
+    response = {
+        'statusCode': status_code,
+        'body': json.dumps({
+            'error': error_type,
+            'message': message,
+            'exception': str(exception) if exception else None
+        }),
+        'headers': {'Content-Type': 'application/json'}
+    }
+    return add_cors_headers(response, request_origin)
+
+def handle_exception(exception, request_origin=None):
+    """Handle exceptions and return appropriate responses."""
+    if isinstance(exception, ClientError):
+        error_code = exception.response.get('Error', {}).get('Code', 'UnknownError')
+        
+        if error_code == 'UserNotFoundException':
+            return build_error_response(404, 'Not Found', f"User not found: {str(exception)}", exception, request_origin)
+        elif error_code == 'AccessDeniedException':
+            return build_error_response(403, 'Access Denied', str(exception), exception, request_origin)
+        else:
+            logger.error(f"AWS ClientError: {error_code} - {str(exception)}")
+            return build_error_response(500, 'AWS Error', str(exception), exception, request_origin)
+    else:
+        logger.error(f"Unexpected error: {str(exception)}")
+        return build_error_response(500, 'Internal Server Error', str(exception), exception, request_origin)
+
+def lambda_handler(event, context):
+    """
+    Handle Lambda event for POST /users/profile-image/upload-url
+
+    JSON body: {"contentType": "image/png"}. The response carries the form url
+    and fields to POST the file to, and the key to complete the upload with.
+    """
+    logger.info(f"Received profile image upload request: {event.get('httpMethod')} {event.get('path')}")
+    request_origin = (event.get('headers') or {}).get('Origin')
+
+    if event.get('httpMethod') == 'OPTIONS':
+        return build_cors_preflight_response(request_origin)
+
+    try:
+        claims = event.get('requestContext', {}).get('authorizer', {}).get('claims', {})
+        user_sub = claims.get('sub')
+        if not user_sub or not claims.get('cognito:username'):
+            return build_error_response(401, 'Unauthorized', 'User identifier not found.', request_origin=request_origin)
+
+        bucket_name = os.environ.get('DOCUMENTS_BUCKET')
+        if not bucket_name:
+            logger.error("Environment variable DOCUMENTS_BUCKET not set")
+            return build_error_response(500, 'Configuration Error', 'Document storage not configured', request_origin=request_origin)
+
+        text = event.get('body') or '{}'
+        if event.get('isBase64Encoded'):
+            text = base64.b64decode(text).decode('utf-8')
+        try:
+            request_body = json.loads(text)
+            upload = create_image_upload(bucket_name, f"profile-images/{user_sub}/", request_body.get('contentType'),
+                                         MAX_PROFILE_IMAGE_BYTES, metadata={'owner': user_sub})
+        except (ValueError, AttributeError) as e:
+            return build_error_response(400, 'Validation Error', str(e), request_origin=request_origin)
+
+        response = {
+            'statusCode': 200,
+            'body': json.dumps({'success': True, **upload}),
+            'headers': {'Content-Type': 'application/json'}
+        }
+        return add_cors_headers(response, request_origin)
+
+    except ClientError as ce:
+        logger.error(f"AWS ClientError creating profile image upload: {ce}")
+        return handle_exception(ce, request_origin)
+    except Exception as e:
+        logger.error(f"Unexpected error creating profile image upload: {e}", exc_info=True)
+        return handle_exception(e, request_origin)
@@ -9,6 +9,9 @@ import boto3
 import logging
 from botocore.exceptions import ClientError
 
+from utils.user_directory import record_user_change
+from utils.user_sync import sync_user_to_aurora
+
 # Try to import CORS utilities, fallback to inline implementation if not available
 try:
     from utils.cors import add_cors_headers, build_cors_preflight_response
@@ -94,6 +97,8 @@ def lambda_handler(event, context):
             UserPoolId=user_pool_id,
             Username=username
         )
+        record_user_change(username, enabled=True)
+        sync_user_to_aurora(username, enabled=True)
         
         response = {
             'statusCode': 200,
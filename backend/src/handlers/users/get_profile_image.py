@@ -3,10 +3,10 @@ Lambda function to get a user's profile image URL from S3.
 """
 import os
 import json
-import boto3
 import logging
 from botocore.exceptions import ClientError
 from src.utils.cors import add_cors_headers, build_cors_preflight_response
+from utils.profile_images import get_image_record, image_response, parse_avatar_request
 
 # Setup logging
 logger = logging.getLogger()
@@ -72,6 +72,9 @@ def lambda_handler(event, context):
     """
     Handle Lambda event for GET /users/profile-image (Gets a user's profile image URL)
     
+    Query parameters size (pixels) and format (webp or jpeg) select the
+    closest avatar rendition instead of the original image.
+    
     Args:
         event (dict): Lambda event
         context (LambdaContext): Lambda context
@@ -108,24 +111,20 @@ def lambda_handler(event, context):
             logger.error("Environment variable USER_POOL_ID not set")
             return build_error_response(500, 'Configuration Error', 'User pool ID not configured', None, request_origin)
         
-        # Initialize Cognito client
-        cognito = boto3.client('cognito-idp')
+        # Optional avatar size in pixels and format (webp or jpeg)
+        query_params = event.get('queryStringParameters') or {}
+        try:
+            size, image_format = parse_avatar_request(query_params.get('size'), query_params.get('format'))
+        except ValueError as e:
+            return build_error_response(400, 'Validation Error', str(e), None, request_origin)
         
-        # Get user attributes to find the profile image key
-        user_result = cognito.admin_get_user(
-            UserPoolId=user_pool_id,
-            Username=username
-        )
+        bucket_name = os.environ.get('DOCUMENTS_BUCKET')
         
-        # Extract the profile image key from user attributes
-        profile_image_key = None
-        for attr in user_result.get('UserAttributes', []):
-            if attr['Name'] == 'custom:profile_image':
-                profile_image_key = attr['Value']
-                break
+        # Image record from the shared cache, read through from Cognito on a miss
+        record = get_image_record(user_pool_id, username, bucket_name=bucket_name)
         
         # If no profile image is set, return a default response
-        if not profile_image_key:
+        if not record.get('key'):
             logger.info(f"No profile image found for user: {username}")
             response = {
                 'statusCode': 200,
@@ -140,58 +139,24 @@ def lambda_handler(event, context):
             }
             return add_cors_headers(response, request_origin)
         
-        # Get S3 bucket name from environment variable
-        bucket_name = os.environ.get('DOCUMENTS_BUCKET')
         if not bucket_name:
             logger.error("Environment variable DOCUMENTS_BUCKET not set")
             return build_error_response(500, 'Configuration Error', 'Document storage not configured', None, request_origin)
         
-        # Initialize S3 client
-        s3 = boto3.client('s3')
-        
-        # Check if the image exists in S3
-        try:
-            s3.head_object(Bucket=bucket_name, Key=profile_image_key)
-        except ClientError as e:
-            if e.response['Error']['Code'] == '404':
-                logger.warning(f"Profile image not found in S3: {profile_image_key}")
-                response = {
-                    'statusCode': 200,
-                    'body': json.dumps({
-                        'success': True,
-                        'hasImage': False,
-                        'message': 'Profile image not found in storage'
-                    }),
-                    'headers': {
-                        'Content-Type': 'application/json'
-                    }
-                }
-                return add_cors_headers(response, request_origin)
-            else:
-                raise
-        
-        # Generate a pre-signed URL for the image
-        image_url = s3.generate_presigned_url(
-            'get_object',
-            Params={'Bucket': bucket_name, 'Key': profile_image_key},
-            ExpiresIn=3600  # URL valid for 1 hour
-        )
-        
-        # Return success response with the image URL
+        # The key is only recorded once the upload is stored, so S3 is not probed;
+        # the pre-signed URL is reused until it nears expiry
         response = {
             'statusCode': 200,
             'body': json.dumps({
                 'success': True,
-                'hasImage': True,
-                'imageUrl': image_url,
-                'imageKey': profile_image_key
+                **image_response(record, bucket_name, size=size, image_format=image_format)
             }),
             'headers': {
                 'Content-Type': 'application/json'
             }
         }
         
-        logger.info(f"Profile image URL generated successfully for user: {username}")
+        logger.info(f"Profile image URL resolved for user: {username}")
         return add_cors_headers(response, request_origin)
     
     except ClientError as ce:
@@ -0,0 +1,131 @@
+# backend/src/handlers/users/get_profile_images.py
+"""
+Lambda function to resolve the profile image URLs of many users at once.
+Pages that render a list of avatars make one request instead of one
+GET /users/profile-image per user.
+"""
+import os
+import json
+import base64
+import logging
+from botocore.exceptions import ClientError
+
+from utils.profile_images import MAX_BATCH_USERNAMES, get_image_records, image_response, parse_avatar_request
+
+# Try to import CORS utilities, fallback to inline implementation if not available
+try:
+    from utils.cors import add_cors_headers, build_cors_preflight_response
+except ImportError:
+    print("Warning: Could not import CORS utilities, using fallback implementation")
+    def add_cors_headers(response, request_origin=None):
+        if 'headers' not in response:
+            response['headers'] = {}
+        response['headers']['Access-Control-Allow-Origin'] = '*'
+        response['headers']['Access-Control-Allow-Headers'] = 'Content-Type,Authorization,X-Amz-Date,X-Api-Key,X-Amz-Security-Token,X-Requested-With,Origin,Accept'
+        response['headers']['Access-Control-Allow-Methods'] = 'GET,POST,PUT,DELETE,OPTIONS'
+        return response
+
+    def build_cors_preflight_response(request_origin=None):
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': 'Content-Type,Authorization,X-Amz-Date,X-Api-Key,X-Amz-Security-Token,X-Requested-With,Origin,Accept',
+                'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
+            },
+            'body': json.dumps({'message': 'CORS preflight successful'})
+        }
+
+# Setup logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+def build_error_response(status_code, error_type, message, exception=None, request_origin=None):
+    """Build a standardized error response with CORS headers."""
+    response = {
+        'statusCode': status_code,
+        'body': json.dumps({
+            'error': error_type,
+            'message': message,
+            'exception': str(exception) if exception else None
+        }),
+        'headers': {'Content-Type': 'application/json'}
+    }
+    return add_cors_headers(response, request_origin)
+
+def handle_exception(exception, request_origin=None):
+    """Handle exceptions and return appropriate responses."""
+    if isinstance(exception, ClientError):
+        error_code = exception.response.get('Error', {}).get('Code', 'UnknownError')
+
+        if error_code == 'AccessDeniedException':
+            return build_error_response(403, 'Access Denied', str(exception), exception, request_origin)
+        else:
+            logger.error(f"AWS ClientError: {error_code} - {str(exception)}")
+            return build_error_response(500, 'AWS Error', str(exception), exception, request_origin)
+    else:
+        logger.error(f"Unexpected error: {str(exception)}")
+        return build_error_response(500, 'Internal Server Error', str(exception), exception, request_origin)
+
+def lambda_handler(event, context):
+    """
+    Handle Lambda event for POST /users/profile-images
+
+    JSON body: {"usernames": [...], "size": 48, "format": "webp"}; size and
+    format are optional and select avatar renditions. The response maps every
+    username to {hasImage, imageUrl, imageKey, avatarSize}; usernames that do
+    not exist are listed in notFound instead.
+    """
+    logger.info(f"Received profile images request: {event.get('httpMethod')} {event.get('path')}")
+    request_origin = (event.get('headers') or {}).get('Origin')
+
+    if event.get('httpMethod') == 'OPTIONS':
+        return build_cors_preflight_response(request_origin)
+
+    try:
+        text = event.get('body') or ''
+        if event.get('isBase64Encoded'):
+            text = base64.b64decode(text).decode('utf-8')
+        try:
+            request_body = json.loads(text) if text else {}
+            usernames = request_body.get('usernames')
+        except (ValueError, AttributeError) as e:
+            return build_error_response(400, 'Bad Request', f'Invalid JSON body: {e}', request_origin=request_origin)
+        try:
+            size, image_format = parse_avatar_request(request_body.get('size'), request_body.get('format'))
+        except ValueError as e:
+            return build_error_response(400, 'Validation Error', str(e), request_origin=request_origin)
+
+        if not isinstance(usernames, list) or not usernames:
+            return build_error_response(400, 'Validation Error', 'usernames must be a non-empty list', request_origin=request_origin)
+        if any(not isinstance(username, str) or not username for username in usernames):
+            return build_error_response(400, 'Validation Error', 'Every username must be a non-empty string', request_origin=request_origin)
+        # Avatars repeat on list pages; each user is resolved once
+        usernames = list(dict.fromkeys(usernames))
+        if len(usernames) > MAX_BATCH_USERNAMES:
+            return build_error_response(400, 'Validation Error', f'At most {MAX_BATCH_USERNAMES} usernames per request', request_origin=request_origin)
+
+        user_pool_id = os.environ.get('USER_POOL_ID')
+        bucket_name = os.environ.get('DOCUMENTS_BUCKET')
+        if not user_pool_id or not bucket_name:
+            logger.error("Environment variable USER_POOL_ID or DOCUMENTS_BUCKET not set")
+            return build_error_response(500, 'Configuration Error', 'User pool or document storage not configured', request_origin=request_origin)
+
+        records = get_image_records(user_pool_id, usernames, bucket_name=bucket_name)
+        images = {username: image_response(record, bucket_name, size=size, image_format=image_format)
+                  for username, record in records.items() if record is not None}
+        not_found = [username for username, record in records.items() if record is None]
+
+        response = {
+            'statusCode': 200,
+            'body': json.dumps({'success': True, 'images': images, 'notFound': not_found}),
+            'headers': {'Content-Type': 'application/json'}
+        }
+        return add_cors_headers(response, request_origin)
+
+    except ClientError as ce:
+        logger.error(f"AWS ClientError resolving profile images: {ce}")
+        return handle_exception(ce, request_origin)
+    except Exception as e:
+        logger.error(f"Unexpected error resolving profile images: {e}", exc_info=True)
+        return handle_exception(e, request_origin)
@@ -2,13 +2,19 @@
 """
 Lambda function to list all users from AWS Cognito.
 This function provides admin functionality to view all users in the system.
+Users are served from the container's cached user directory, which syncs the
+whole pool once and answers filtered, sorted pages from memory, or with
+?source=aurora from the Aurora users table kept in sync with Cognito.
 """
 import os
 import json
-import boto3
 import logging
 from botocore.exceptions import ClientError
 
+from utils.rds_utils import get_users_paginated
+from utils.user_directory import get_user_directory, SORT_FIELDS
+from utils.user_sync import row_to_user, to_aurora_role
+
 # Try to import CORS utilities, fallback to inline implementation if not available
 try:
     from utils.cors import add_cors_headers, build_cors_preflight_response
@@ -37,6 +43,9 @@ except ImportError:
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
 def build_error_response(status_code, error_type, message, exception=None, request_origin=None):
     """Build a standardized error response with CORS headers."""
     response = {
@@ -66,9 +75,33 @@ def handle_exception(exception, request_origin=None):
         logger.error(f"Unexpected error: {str(exception)}")
         return build_error_response(500, 'Internal Server Error', str(exception), exception, request_origin)
 
+def list_users_from_aurora(filters, offset, limit):
+    """Read a page of users from the Aurora users table with SQL filtering and pagination"""
+    role = None
+    if filters['role']:
+        role = to_aurora_role(filters['role'])
+        if role is None:
+            # Only staff roles are mirrored to Aurora
+            return [], 0
+    rows, total = get_users_paginated(
+        limit=limit,
+        offset=offset,
+        role=role,
+        is_active=filters['enabled'],
+        user_status=filters['status'],
+        search=filters['search'],
+        sort_by=filters['sort_by'],
+        descending=filters['descending']
+    )
+    return [row_to_user(row) for row in rows], total
+
 def lambda_handler(event, context):
     """
     Handle Lambda event for GET /users (Lists all users in Cognito)
+
+    Optional query parameters: role, enabled (true/false), status, search
+    (name/email prefix), sortBy, order (asc/desc), limit, nextToken and
+    source (cognito, the default, or aurora).
     """
     logger.info(f"Received event: {json.dumps(event)}")
     request_origin = event.get('headers', {}).get('Origin')
@@ -82,35 +115,43 @@ def lambda_handler(event, context):
             logger.error("Environment variable USER_POOL_ID not set.")
             return build_error_response(500, 'Configuration Error', 'User pool ID not configured.', request_origin=request_origin)
         
-        cognito = boto3.client('cognito-idp')
-        
-        params = {'UserPoolId': user_pool_id, 'Limit': 50}
-        
-        query_params = event.get('queryStringParameters')
-        if query_params and query_params.get('nextToken'):
-            params['PaginationToken'] = query_params['nextToken']
-        
-        logger.info(f"Calling Cognito with params: {params}")
-        result = cognito.list_users(**params)
-        logger.info(f"Cognito returned {len(result.get('Users', []))} users")
-        
-        users = []
-        for user in result.get('Users', []):
-            attributes = {attr['Name']: attr['Value'] for attr in user.get('Attributes', [])}
-            
-            users.append({
-                'username': user.get('Username'),
-                'enabled': user.get('Enabled'),
-                'userStatus': user.get('UserStatus'),
-                'userCreateDate': user.get('UserCreateDate').isoformat() if user.get('UserCreateDate') else None,
-                'userLastModifiedDate': user.get('UserLastModifiedDate').isoformat() if user.get('UserLastModifiedDate') else None,
-                'email': attributes.get('email', ''),
-                'sub': attributes.get('sub', '')
-            })
-        
+        query_params = event.get('queryStringParameters') or {}
+        try:
+            # nextToken is the offset of the next page within the filtered, sorted listing
+            offset = int(query_params.get('nextToken') or 0)
+            limit = int(query_params.get('limit') or DEFAULT_PAGE_SIZE)
+        except ValueError:
+            return build_error_response(400, 'Bad Request', 'nextToken and limit must be integers', request_origin=request_origin)
+        if offset < 0 or not 1 <= limit <= MAX_PAGE_SIZE:
+            return build_error_response(400, 'Bad Request', f"limit must be between 1 and {MAX_PAGE_SIZE}", request_origin=request_origin)
+
+        sort_by = query_params.get('sortBy') or 'username'
+        if sort_by not in SORT_FIELDS:
+            return build_error_response(400, 'Bad Request', f"sortBy must be one of: {', '.join(SORT_FIELDS)}", request_origin=request_origin)
+
+        source = query_params.get('source') or 'cognito'
+        if source not in ('cognito', 'aurora'):
+            return build_error_response(400, 'Bad Request', "source must be 'cognito' or 'aurora'", request_origin=request_origin)
+
+        enabled = query_params.get('enabled')
+        filters = {
+            'role': query_params.get('role') or None,
+            'enabled': None if enabled is None else enabled.lower() == 'true',
+            'status': query_params.get('status') or None,
+            'search': query_params.get('search') or None,
+            'sort_by': sort_by,
+            'descending': (query_params.get('order') or 'asc').lower() == 'desc'
+        }
+        if source == 'aurora':
+            users, total = list_users_from_aurora(filters, offset, limit)
+        else:
+            users, total = get_user_directory().list_users(user_pool_id, offset=offset, limit=limit, **filters)
+        logger.info(f"Users from {source} matched {total}, returning {len(users)}")
+
         response_body = {
             'users': users,
-            'nextToken': result.get('PaginationToken')
+            'total': total,
+            'nextToken': str(offset + limit) if offset + limit < total else None
         }
         
         response = {'statusCode': 200, 'body': json.dumps(response_body)}
@@ -0,0 +1,48 @@
+# backend/src/handlers/users/post_confirmation.py
+"""
+Cognito post-confirmation trigger.
+Adds a newly confirmed user to the Aurora users table and to the cached user
+directory, so listings and joins see the user without waiting for the reconciler.
+"""
+import json
+import logging
+
+from utils.user_directory import record_user_change
+from utils.user_sync import sync_user_to_aurora
+
+# Setup logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+def lambda_handler(event, context):
+    """
+    Handle the Cognito PostConfirmation trigger
+
+    The event is returned unchanged; a failure to sync must not block sign-up,
+    the reconciler repairs anything missed here.
+    """
+    logger.info(f"Received event: {json.dumps(event)}")
+
+    username = event.get('userName')
+    attributes = event.get('request', {}).get('userAttributes', {})
+    user = {
+        'username': username,
+        'enabled': True,
+        'userStatus': 'CONFIRMED',
+        'userCreateDate': None,
+        'userLastModifiedDate': None,
+        'email': attributes.get('email', ''),
+        'sub': attributes.get('sub', ''),
+        'firstName': attributes.get('given_name', ''),
+        'lastName': attributes.get('family_name', ''),
+        'phone': attributes.get('phone_number', ''),
+        'role': attributes.get('custom:role', 'user')
+    }
+
+    try:
+        sync_user_to_aurora(username, user=user)
+        record_user_change(username, user=user)
+    except Exception as e:
+        logger.error(f"Unexpected error syncing confirmed user '{username}': {e}", exc_info=True)
+
+    return event
@@ -0,0 +1,39 @@
+# backend/src/handlers/users/reconcile_users.py
+"""
+Scheduled Lambda function reconciling the Aurora users table with Cognito.
+Reads the whole user pool once, diffs it against the table and applies the
+differences in bulk. Changes found here were made outside the user handlers,
+so the cached user directories are told to resync as well.
+"""
+import os
+import json
+import logging
+
+from utils.cache_invalidation import get_version_bus
+from utils.user_directory import USERS_ENTITY
+from utils.user_sync import reconcile_users
+
+# Setup logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+def lambda_handler(event, context):
+    """
+    Handle the scheduled reconciliation event
+
+    Set "dryRun": true in the event to only report the differences.
+    """
+    logger.info(f"Received event: {json.dumps(event)}")
+
+    user_pool_id = os.environ.get('USER_POOL_ID')
+    if not user_pool_id:
+        raise ValueError("Environment variable USER_POOL_ID not set.")
+
+    dry_run = bool((event or {}).get('dryRun'))
+    stats = reconcile_users(user_pool_id, dry_run=dry_run)
+
+    if not dry_run and stats['inserted'] + stats['updated'] + stats['deactivated']:
+        # A version without a change log entry makes every directory resync
+        get_version_bus().bump(USERS_ENTITY)
+
+    return {'dryRun': dry_run, **stats}
@@ -7,6 +7,8 @@ import boto3
 import logging
 from botocore.exceptions import ClientError
 from src.utils.cors import add_cors_headers, build_cors_preflight_response
+from utils.avatars import delete_avatar_variants
+from utils.profile_images import discard_image_url, record_profile_image
 
 # Setup logging
 logger = logging.getLogger()
@@ -122,6 +124,7 @@ def lambda_handler(event, context):
                     {'Name': 'custom:profile_image', 'Value': ''}
                 ]
             )
+            record_profile_image(username)
             response = {
                 'statusCode': 200,
                 'body': json.dumps({
@@ -140,6 +143,7 @@ def lambda_handler(event, context):
         except ClientError as e:
             if e.response['Error']['Code'] != 'NoSuchKey':
                 raise
+        delete_avatar_variants(bucket_name, profile_image_key, s3)
         # Clear the profile image attribute in Cognito
         cognito.admin_update_user_attributes(
             UserPoolId=user_pool_id,
@@ -148,6 +152,8 @@ def lambda_handler(event, context):
                 {'Name': 'custom:profile_image', 'Value': ''}
             ]
         )
+        record_profile_image(username)
+        discard_image_url(bucket_name, profile_image_key)
         
         response = {
             'statusCode': 200,
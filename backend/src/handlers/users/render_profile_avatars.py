@@ -0,0 +1,81 @@
+# backend/src/handlers/users/render_profile_avatars.py
+"""
+S3-triggered Lambda function rendering the avatar sizes of new profile images.
+Runs on ObjectCreated under profile-images/, so uploads return without
+decoding the image. Once an image's renditions are stored, its owner's cached
+image record is invalidated; until then readers are served the original.
+Renditions land under the same prefix and are skipped here.
+"""
+import os
+import json
+import logging
+from urllib.parse import unquote_plus
+
+import boto3
+from botocore.exceptions import ClientError
+
+from utils.avatars import store_avatar_variants
+from utils.profile_images import invalidate_image_record
+
+# Setup logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+PROFILE_IMAGE_PREFIX = 'profile-images/'
+
+def image_owner_sub(key):
+    """The user sub of an original profile image key (profile-images/<sub>/<file>), None for anything else"""
+    parts = key.split('/')
+    if len(parts) != 3 or parts[0] + '/' != PROFILE_IMAGE_PREFIX or not parts[1] or not parts[2]:
+        return None
+    return parts[1]
+
+def username_for_sub(user_pool_id, sub, cognito):
+    """Look a user up by sub with one filtered ListUsers call"""
+    result = cognito.list_users(UserPoolId=user_pool_id, Filter=f'sub = "{sub}"', Limit=1)
+    users = result.get('Users', [])
+    return users[0]['Username'] if users else None
+
+def lambda_handler(event, context):
+    """
+    Handle the S3 ObjectCreated event of one or more profile images
+
+    Returns:
+        dict: Keys rendered and skipped
+    """
+    logger.info(f"Received event: {json.dumps(event)}")
+
+    user_pool_id = os.environ.get('USER_POOL_ID')
+    if not user_pool_id:
+        raise ValueError("Environment variable USER_POOL_ID not set.")
+
+    s3 = boto3.client('s3')
+    cognito = boto3.client('cognito-idp')
+    rendered, skipped = [], []
+    for record in event.get('Records', []):
+        bucket_name = record['s3']['bucket']['name']
+        key = unquote_plus(record['s3']['object']['key'])
+        sub = image_owner_sub(key)
+        if not sub:
+            skipped.append(key)
+            continue
+
+        try:
+            image_data = s3.get_object(Bucket=bucket_name, Key=key)['Body'].read()
+        except ClientError as e:
+            # Removed or replaced before the trigger ran
+            logger.info(f"Profile image {key} is gone, not rendering avatars: {e}")
+            skipped.append(key)
+            continue
+        if not store_avatar_variants(bucket_name, key, image_data, s3):
+            skipped.append(key)
+            continue
+        rendered.append(key)
+
+        username = username_for_sub(user_pool_id, sub, cognito)
+        if username:
+            invalidate_image_record(username)
+        else:
+            logger.warning(f"No user with sub {sub} for profile image {key}")
+
+    return {'rendered': rendered, 'skipped': skipped}
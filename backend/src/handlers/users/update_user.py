@@ -9,6 +9,9 @@ import boto3
 import logging
 from botocore.exceptions import ClientError
 
+from utils.user_directory import record_user_change
+from utils.user_sync import sync_user_to_aurora
+
 # Try to import CORS utilities, fallback to inline implementation if not available
 try:
     from utils.cors import add_cors_headers, build_cors_preflight_response
@@ -120,6 +123,15 @@ def lambda_handler(event, context):
                 logger.info(f"Disabling user: {username}")
                 cognito.admin_disable_user(UserPoolId=user_pool_id, Username=username)
 
+        changes = {field: request_body[key] for key, field in
+                   (('given_name', 'firstName'), ('family_name', 'lastName'), ('role', 'role'))
+                   if key in request_body}
+        if 'enabled' in request_body:
+            changes['enabled'] = bool(request_body['enabled'])
+        if changes:
+            record_user_change(username, **changes)
+            sync_user_to_aurora(username, **changes)
+
         response = {
             'statusCode': 200,
             'body': json.dumps({'success': True, 'message': f'User {username} updated successfully'})
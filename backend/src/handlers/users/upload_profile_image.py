@@ -10,6 +10,8 @@ import uuid
 import logging
 from botocore.exceptions import ClientError
 
+from utils.profile_images import presigned_image_url, record_profile_image
+
 # Try to import CORS utilities, fallback to inline implementation if not available
 try:
     from utils.cors import add_cors_headers, build_cors_preflight_response
@@ -215,9 +217,7 @@ def lambda_handler(event, context):
             Bucket=bucket_name, Key=filename, Body=decoded_image, ContentType=mime_type
         )
 
-        image_url = s3.generate_presigned_url(
-            'get_object', Params={'Bucket': bucket_name, 'Key': filename}, ExpiresIn=3600
-        )
+        image_url = presigned_image_url(bucket_name, filename, s3)
 
         user_pool_id = os.environ.get('USER_POOL_ID')
         if not user_pool_id:
@@ -233,6 +233,9 @@ def lambda_handler(event, context):
             Username=username,
             UserAttributes=[{'Name': 'custom:profile_image', 'Value': filename}]
         )
+        # Record the key with what is known about the object so reads need not probe S3;
+        # the S3 trigger refreshes it once the avatar renditions are stored
+        record_profile_image(username, filename, contentType=mime_type, size=len(decoded_image))
 
         response = {
             'statusCode': 200,
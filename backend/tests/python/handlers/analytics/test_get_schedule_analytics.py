@@ -0,0 +1,53 @@
+import json
+import pytest
+from unittest.mock import patch
+from src.handlers.analytics.get_schedule_analytics import lambda_handler
+
+def create_api_gateway_event(query_params=None):
+    """Helper to create a mock API Gateway event."""
+    return {
+        'httpMethod': 'GET',
+        'queryStringParameters': query_params,
+        'requestContext': {
+            'authorizer': {
+                'claims': {
+                    'sub': 'test-user-sub'
+                }
+            }
+        }
+    }
+
+@pytest.mark.usefixtures("mock_db_connection")
+class TestGetScheduleAnalytics:
+
+    @patch('utils.schedule_analytics.execute_query')
+    def test_schedule_analytics(self, mock_execute_query):
+        # Arrange
+        mock_execute_query.return_value = [
+            {'doctor_id': 'doc-a', 'start_minute': 9 * 60, 'duration_minutes': 60, 'status': 'completed'},
+            {'doctor_id': 'doc-a', 'start_minute': 10 * 60, 'duration_minutes': 30, 'status': 'no_show'},
+        ]
+        event = create_api_gateway_event({'start_date': '2030-05-06', 'end_date': '2030-05-06'})
+
+        # Act
+        response = lambda_handler(event, {})
+
+        # Assert
+        assert response['statusCode'] == 200
+        data = json.loads(response['body'])['data']
+        assert data['period'] == {'start_date': '2030-05-06', 'end_date': '2030-05-06', 'days': 1}
+        assert data['doctors'][0]['booked_minutes'] == 90
+        assert data['totals']['no_show_rate'] == 0.5
+
+    def test_period_too_long(self):
+        event = create_api_gateway_event({'start_date': '2029-01-01', 'end_date': '2030-05-06'})
+
+        response = lambda_handler(event, {})
+
+        assert response['statusCode'] == 400
+        assert 'cannot exceed' in json.loads(response['body'])['error']
+
+    def test_invalid_date(self):
+        response = lambda_handler(create_api_gateway_event({'start_date': '06/05/2030'}), {})
+
+        assert response['statusCode'] == 400
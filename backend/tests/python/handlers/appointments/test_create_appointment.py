@@ -1,7 +1,8 @@
 import json
 import pytest
 from unittest.mock import patch
-from src.handlers.appointments.create_appointment import lambda_handler
+from src.handlers.appointments.create_appointment import lambda_handler, bulk_lambda_handler
+from utils.rds_utils import SlotUnavailableError
 
 def create_api_gateway_event(body=None, path_params=None, headers=None, sub='test-user-sub'):
     """Helper to create a mock API Gateway event."""
@@ -23,7 +24,7 @@ def create_api_gateway_event(body=None, path_params=None, headers=None, sub='tes
 class TestCreateAppointment:
 
     @patch('src.handlers.appointments.create_appointment.create_appointment')
-    @patch('src.handlers.appointments.create_appointment.check_availability')
+    @patch('src.handlers.appointments.create_appointment.check_patient_availability')
     def test_create_appointment_successful(self, mock_check_availability, mock_create_appointment):
         # Arrange
         mock_check_availability.return_value = True
@@ -48,14 +49,14 @@ class TestCreateAppointment:
         assert response_body['data']['message'] == 'Appointment created successfully'
         
         mock_check_availability.assert_called_once_with(
-            "patient-001", "doctor-001", "2025-10-10", "10:30:00", 30
+            "patient-001", "2025-10-10", "10:30:00", 30
         )
         mock_create_appointment.assert_called_once()
         call_args = mock_create_appointment.call_args[0][0]
         assert call_args['patient_id'] == appointment_data['patient_id']
         assert call_args['created_by'] == 'test-user-sub'
 
-    @patch('src.handlers.appointments.create_appointment.check_availability')
+    @patch('src.handlers.appointments.create_appointment.check_patient_availability')
     def test_create_appointment_slot_not_available(self, mock_check_availability):
         # Arrange
         mock_check_availability.return_value = False
@@ -112,7 +113,7 @@ class TestCreateAppointment:
         assert "Invalid time format" in response_body['details']['appointment_time']
 
     @patch('src.handlers.appointments.create_appointment.create_appointment')
-    @patch('src.handlers.appointments.create_appointment.check_availability')
+    @patch('src.handlers.appointments.create_appointment.check_patient_availability')
     def test_create_appointment_db_error(self, mock_check_availability, mock_create_appointment):
         # Arrange
         mock_check_availability.return_value = True
@@ -132,4 +133,116 @@ class TestCreateAppointment:
         assert response['statusCode'] == 500
         response_body = json.loads(response['body'])
         assert response_body['error'] == 'Internal server error'
-        assert response_body['details'] == 'Failed to create appointment'
\ No newline at end of file
+        assert response_body['details'] == 'Failed to create appointment'
+    @patch('src.handlers.appointments.create_appointment.create_appointment')
+    @patch('src.handlers.appointments.create_appointment.check_patient_availability')
+    def test_create_appointment_doctor_slot_taken(self, mock_check_availability, mock_create_appointment):
+        # Arrange
+        mock_check_availability.return_value = True
+        mock_create_appointment.side_effect = SlotUnavailableError("The requested time slot is already reserved")
+        appointment_data = {
+            "patient_id": "patient-001",
+            "doctor_id": "doctor-001",
+            "appointment_date": "2030-10-10",
+            "appointment_time": "10:30:00",
+        }
+        event = create_api_gateway_event(appointment_data)
+
+        # Act
+        response = lambda_handler(event, {})
+
+        # Assert
+        assert response['statusCode'] == 409
+        response_body = json.loads(response['body'])
+        assert response_body['error'] == 'Time slot not available'
+
+@pytest.mark.usefixtures("mock_db_connection")
+class TestCreateAppointmentsBulk:
+
+    SERIES = {
+        "patient_id": "patient-001",
+        "doctor_id": "doctor-001",
+        "appointment_date": "2030-01-07",
+        "appointment_time": "10:00:00",
+        "duration_minutes": 45,
+        "recurrence": "FREQ=WEEKLY;COUNT=12"
+    }
+
+    @patch('src.handlers.appointments.create_appointment.create_appointments')
+    @patch('src.handlers.appointments.create_appointment.execute_query')
+    def test_weekly_series_created_in_one_transaction(self, mock_execute_query, mock_create_appointments):
+        # Arrange
+        mock_execute_query.return_value = []
+        mock_create_appointments.side_effect = lambda appointments: [f"appt-{i}" for i in range(len(appointments))]
+        event = create_api_gateway_event(self.SERIES)
+
+        # Act
+        response = bulk_lambda_handler(event, {})
+
+        # Assert
+        assert response['statusCode'] == 201
+        data = json.loads(response['body'])['data']
+        assert data['created'] == 12
+        assert data['appointments'][11] == {
+            'index': 11, 'appointment_date': '2030-03-25', 'appointment_time': '10:00:00',
+            'status': 'created', 'appointment_id': 'appt-11'
+        }
+        # One range query for the doctor and one for the patient, one insert call
+        assert mock_execute_query.call_count == 2
+        mock_create_appointments.assert_called_once()
+        assert mock_create_appointments.call_args[0][0][0]['created_by'] == 'test-user-sub'
+
+    @patch('src.handlers.appointments.create_appointment.create_appointments')
+    @patch('src.handlers.appointments.create_appointment.execute_query')
+    def test_conflict_rejects_atomic_batch(self, mock_execute_query, mock_create_appointments):
+        # Arrange
+        busy = {'id': 'appt-x', 'start_at': '2030-01-14 10:30:00', 'end_at': '2030-01-14 11:00:00'}
+        mock_execute_query.side_effect = [[busy], []]
+        event = create_api_gateway_event(self.SERIES)
+
+        # Act
+        response = bulk_lambda_handler(event, {})
+
+        # Assert
+        assert response['statusCode'] == 409
+        results = json.loads(response['body'])['details']['appointments']
+        assert results[1]['status'] == 'conflict'
+        assert results[1]['conflicts'][0]['appointment_id'] == 'appt-x'
+        assert results[0]['status'] == 'not_created'
+        mock_create_appointments.assert_not_called()
+
+    @patch('src.handlers.appointments.create_appointment.create_appointments')
+    @patch('src.handlers.appointments.create_appointment.execute_query')
+    def test_non_atomic_skips_overlapping_occurrence(self, mock_execute_query, mock_create_appointments):
+        # Arrange
+        mock_execute_query.return_value = []
+        mock_create_appointments.return_value = ['appt-a', 'appt-b']
+        event = create_api_gateway_event({
+            "patient_id": "patient-001",
+            "doctor_id": "doctor-001",
+            "appointment_time": "09:00:00",
+            "atomic": False,
+            "occurrences": [
+                {"appointment_date": "2030-01-07"},
+                {"appointment_date": "2030-01-07", "appointment_time": "09:15:00"},
+                {"appointment_date": "2030-01-08"}
+            ]
+        })
+
+        # Act
+        response = bulk_lambda_handler(event, {})
+
+        # Assert
+        assert response['statusCode'] == 201
+        data = json.loads(response['body'])['data']
+        assert [r['status'] for r in data['appointments']] == ['created', 'conflict', 'created']
+        assert data['appointments'][1]['conflicts'][0]['occurrence'] == 0
+        assert data['skipped'] == 1
+
+    def test_unbounded_recurrence_rejected(self):
+        event = create_api_gateway_event({**self.SERIES, "recurrence": "FREQ=DAILY"})
+
+        response = bulk_lambda_handler(event, {})
+
+        assert response['statusCode'] == 400
+        assert 'COUNT or UNTIL' in json.loads(response['body'])['details']
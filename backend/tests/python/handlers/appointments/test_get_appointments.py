@@ -2,7 +2,7 @@ import json
 import pytest
 from unittest.mock import patch, ANY
 from datetime import datetime, timedelta
-from src.handlers.appointments.get_appointments import lambda_handler
+from src.handlers.appointments.get_appointments import DEFAULT_LIMIT, encode_cursor, lambda_handler
 
 def create_api_gateway_event(queryStringParameters=None, method="GET"):
     """Helper to create a mock API Gateway event."""
@@ -45,24 +45,26 @@ class TestGetAppointments:
         
         start_date = str(mock_today)
         end_date = str(mock_today + timedelta(days=7))
-        mock_get_appointments.assert_called_once_with(start_date=start_date, end_date=end_date, doctor_id=None)
+        mock_get_appointments.assert_called_once_with(
+            start_date=start_date, end_date=end_date, doctor_id=None, patient_id=None,
+            statuses=None, service_id=None, limit=None, after=None
+        )
+        assert response_body['data']['next_cursor'] is None
 
     @patch('src.handlers.appointments.get_appointments.get_appointments_by_date_range')
     def test_get_appointments_with_filters(self, mock_get_appointments):
         # Arrange
-        all_appointments = [
-            {'id': 'appt1', 'appointment_date': '2025-01-01', 'patient_id': 'p1', 'doctor_id': 'd1', 'status': 'scheduled'},
-            {'id': 'appt2', 'appointment_date': '2025-01-02', 'patient_id': 'p2', 'doctor_id': 'd1', 'status': 'confirmed'},
-            {'id': 'appt3', 'appointment_date': '2025-01-03', 'patient_id': 'p1', 'doctor_id': 'd2', 'status': 'scheduled'}
+        mock_get_appointments.return_value = [
+            {'id': 'appt2', 'appointment_date': '2025-01-02', 'patient_id': 'p2', 'doctor_id': 'd1', 'status': 'confirmed'}
         ]
-        mock_get_appointments.return_value = all_appointments
         
         query_params = {
             "start_date": "2025-01-01",
             "end_date": "2025-01-03",
             "doctor_id": "d1",
             "patient_id": "p2",
-            "status": "confirmed"
+            "service_id": "s1",
+            "status": "confirmed,completed"
         }
         event = create_api_gateway_event(queryStringParameters=query_params)
 
@@ -73,13 +75,60 @@ class TestGetAppointments:
         assert response['statusCode'] == 200
         response_body = json.loads(response['body'])
         
-        mock_get_appointments.assert_called_once_with(start_date='2025-01-01', end_date='2025-01-03', doctor_id='d1')
+        # Filters are pushed down to the query rather than applied afterwards
+        mock_get_appointments.assert_called_once_with(
+            start_date='2025-01-01', end_date='2025-01-03', doctor_id='d1', patient_id='p2',
+            statuses=['confirmed', 'completed'], service_id='s1', limit=None, after=None
+        )
         
-        # Check Python-level filtering
         assert len(response_body['data']['appointments']) == 1
         assert response_body['data']['appointments'][0]['id'] == 'appt2'
         assert response_body['data']['appointments_by_date']['2025-01-02'][0]['id'] == 'appt2'
 
+    @patch('src.handlers.appointments.get_appointments.get_appointments_by_date_range')
+    def test_get_appointments_pagination(self, mock_get_appointments):
+        # Arrange
+        mock_get_appointments.return_value = [
+            {'id': f'appt{i}', 'appointment_date': '2025-01-01', 'start_at': f'2025-01-01 09:{i:02d}:00'}
+            for i in range(3)
+        ]
+        event = create_api_gateway_event(queryStringParameters={'start_date': '2025-01-01', 'limit': '2'})
+
+        # Act
+        response = lambda_handler(event, {})
+
+        # Assert
+        data = json.loads(response['body'])['data']
+        assert [a['id'] for a in data['appointments']] == ['appt0', 'appt1']
+        assert mock_get_appointments.call_args.kwargs['limit'] == 3
+
+        # The cursor resumes after the last returned row
+        mock_get_appointments.reset_mock()
+        mock_get_appointments.return_value = []
+        event = create_api_gateway_event(queryStringParameters={
+            'start_date': '2025-01-01', 'limit': '2', 'cursor': data['next_cursor']
+        })
+        response = lambda_handler(event, {})
+
+        assert response['statusCode'] == 200
+        assert mock_get_appointments.call_args.kwargs['after'] == ('2025-01-01 09:01:00', 'appt1')
+        assert json.loads(response['body'])['data']['next_cursor'] is None
+
+    @patch('src.handlers.appointments.get_appointments.get_appointments_by_date_range')
+    def test_cursor_without_limit_uses_default_page_size(self, mock_get_appointments):
+        mock_get_appointments.return_value = []
+        cursor = encode_cursor({'start_at': '2025-01-01 09:00:00', 'id': 'appt0'})
+        event = create_api_gateway_event(queryStringParameters={'start_date': '2025-01-01', 'cursor': cursor})
+
+        assert lambda_handler(event, {})['statusCode'] == 200
+        assert mock_get_appointments.call_args.kwargs['limit'] == DEFAULT_LIMIT + 1
+
+    def test_invalid_cursor(self):
+        event = create_api_gateway_event(queryStringParameters={'cursor': 'not-a-cursor'})
+        response = lambda_handler(event, {})
+        assert response['statusCode'] == 400
+        assert json.loads(response['body'])['error'] == 'Invalid cursor'
+
     def test_invalid_date_format(self):
         event = create_api_gateway_event(queryStringParameters={'start_date': '2025/01/01'})
         response = lambda_handler(event, {})
@@ -111,4 +160,51 @@ class TestGetAppointments:
         assert response['statusCode'] == 500
         response_body = json.loads(response['body'])
         assert response_body['error'] == 'Internal server error'
-        assert response_body['details'] == 'Failed to fetch appointments'
\ No newline at end of file
+        assert response_body['details'] == 'Failed to fetch appointments'
+    @patch('src.handlers.appointments.get_appointments.get_appointments_by_date_range')
+    def test_compact_and_columnar_formats(self, mock_get_appointments):
+        # Arrange
+        mock_get_appointments.return_value = [
+            {'id': 'appt1', 'appointment_date': '2025-01-01', 'status': 'scheduled'},
+            {'id': 'appt2', 'appointment_date': '2025-01-01', 'status': 'confirmed'},
+            {'id': 'appt3', 'appointment_date': '2025-01-03', 'status': 'scheduled'}
+        ]
+
+        # Act
+        compact = lambda_handler(create_api_gateway_event({'start_date': '2025-01-01', 'format': 'compact'}), {})
+        columnar = lambda_handler(create_api_gateway_event({'start_date': '2025-01-01', 'format': 'columnar'}), {})
+
+        # Assert
+        compact_data = json.loads(compact['body'])['data']
+        assert compact_data['appointments_by_date'] == {'2025-01-01': [0, 2], '2025-01-03': [2, 3]}
+        assert [a['id'] for a in compact_data['appointments']] == ['appt1', 'appt2', 'appt3']
+
+        columnar_data = json.loads(columnar['body'])['data']
+        assert columnar_data['appointments']['columns'] == ['id', 'appointment_date', 'status']
+        assert columnar_data['appointments']['rows'][1] == ['appt2', '2025-01-01', 'confirmed']
+        assert columnar_data['appointments_by_date'] == compact_data['appointments_by_date']
+
+    def test_invalid_format(self):
+        event = create_api_gateway_event(queryStringParameters={'format': 'xml'})
+        response = lambda_handler(event, {})
+        assert response['statusCode'] == 400
+        assert "format must be one of" in json.loads(response['body'])['error']
+
+    @patch('src.handlers.appointments.get_appointments.get_appointments_by_date_range')
+    @patch('src.handlers.appointments.get_appointments.get_agenda_range')
+    def test_doctor_dashboard_served_from_agenda_cache(self, mock_agenda_range, mock_get_appointments):
+        # Arrange
+        mock_agenda_range.return_value = [
+            {'id': 'appt1', 'appointment_date': '2025-01-01', 'doctor_id': 'd1', 'status': 'scheduled'}
+        ]
+        event = create_api_gateway_event({'start_date': '2025-01-01', 'end_date': '2025-01-01', 'doctor_id': 'd1'})
+
+        # Act
+        response = lambda_handler(event, {})
+
+        # Assert
+        assert response['statusCode'] == 200
+        data = json.loads(response['body'])['data']
+        assert data['appointments_by_date']['2025-01-01'][0]['id'] == 'appt1'
+        mock_agenda_range.assert_called_once()
+        mock_get_appointments.assert_not_called()
@@ -0,0 +1,102 @@
+import json
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from utils import availability
+from utils.cache_invalidation import CacheVersionBus, InMemoryVersionStore, set_version_bus
+from src.handlers.appointments.get_availability import lambda_handler
+
+def create_api_gateway_event(query_params=None):
+    """Helper to create a mock API Gateway event."""
+    return {
+        'httpMethod': 'GET',
+        'queryStringParameters': query_params,
+        'requestContext': {
+            'authorizer': {
+                'claims': {
+                    'sub': 'test-user-sub'
+                }
+            }
+        }
+    }
+
+def _span(appointment_id, start, end):
+    return {'id': appointment_id, 'start_at': datetime.fromisoformat(start), 'end_at': datetime.fromisoformat(end)}
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    availability.DAY_CACHE.clear()
+    set_version_bus(CacheVersionBus(InMemoryVersionStore(), check_interval=0))
+    yield
+    set_version_bus(None)
+
+@pytest.mark.usefixtures("mock_db_connection")
+class TestGetAvailability:
+
+    @patch('src.handlers.appointments.get_availability.execute_query')
+    def test_free_slots_skip_bookings(self, mock_execute_query):
+        # Arrange
+        mock_execute_query.return_value = [
+            _span('appt-1', '2030-05-06 08:30:00', '2030-05-06 09:00:00'),
+            _span('appt-2', '2030-05-06 09:40:00', '2030-05-06 17:50:00'),
+        ]
+        event = create_api_gateway_event({'doctor_id': 'doctor-001', 'date': '2030-05-06', 'duration': '30', 'step': '15'})
+
+        # Act
+        response = lambda_handler(event, {})
+
+        # Assert
+        assert response['statusCode'] == 200
+        data = json.loads(response['body'])['data']
+        assert [slot['start'] for slot in data['slots']] == ['08:00', '09:00']
+        assert data['slots'][1] == {'start': '09:00', 'end': '09:30'}
+        assert mock_execute_query.call_count == 1
+
+    @patch('src.handlers.appointments.get_availability.get_service_duration', return_value=600)
+    @patch('src.handlers.appointments.get_availability.execute_query')
+    def test_duration_comes_from_service(self, mock_execute_query, mock_duration):
+        # Arrange
+        mock_execute_query.return_value = []
+        event = create_api_gateway_event({'doctor_id': 'doctor-001', 'date': '2030-05-06', 'service_id': 'svc-1'})
+
+        # Act
+        response = lambda_handler(event, {})
+
+        # Assert
+        data = json.loads(response['body'])['data']
+        assert data['duration_minutes'] == 600
+        assert [slot['start'] for slot in data['slots']] == ['08:00']
+
+    @patch('src.handlers.appointments.get_availability.execute_query')
+    def test_day_is_cached_until_a_booking_changes_it(self, mock_execute_query):
+        # Arrange
+        mock_execute_query.return_value = []
+        event = create_api_gateway_event({'doctor_id': 'doctor-001', 'date': '2030-05-06'})
+
+        # Act
+        lambda_handler(event, {})
+        lambda_handler(event, {})
+        availability.invalidate_doctor_day('doctor-001', '2030-05-06')
+        lambda_handler(event, {})
+
+        # Assert
+        assert mock_execute_query.call_count == 2
+
+    @patch('src.handlers.appointments.get_availability.get_service_duration', return_value=None)
+    def test_unknown_service(self, mock_duration):
+        event = create_api_gateway_event({'doctor_id': 'doctor-001', 'date': '2030-05-06', 'service_id': 'missing'})
+
+        response = lambda_handler(event, {})
+
+        assert response['statusCode'] == 404
+
+    @pytest.mark.parametrize("query_params", [
+        {'date': '2030-05-06'},
+        {'doctor_id': 'doctor-001', 'date': '06/05/2030'},
+        {'doctor_id': 'doctor-001', 'date': '2030-05-06', 'step': '7'},
+        {'doctor_id': 'doctor-001', 'date': '2030-05-06', 'duration': 'long'},
+    ])
+    def test_invalid_parameters(self, query_params):
+        response = lambda_handler(create_api_gateway_event(query_params), {})
+
+        assert response['statusCode'] == 400
@@ -0,0 +1,73 @@
+import json
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from src.handlers.appointments.search_availability import lambda_handler
+
+def create_api_gateway_event(query_params=None):
+    """Helper to create a mock API Gateway event."""
+    return {
+        'httpMethod': 'GET',
+        'queryStringParameters': query_params,
+        'requestContext': {
+            'authorizer': {
+                'claims': {
+                    'sub': 'test-user-sub'
+                }
+            }
+        }
+    }
+
+def _booking(doctor_id, start, end):
+    return {'id': f"{doctor_id}-{start}", 'doctor_id': doctor_id, 'status': 'scheduled',
+            'start_at': datetime.fromisoformat(start), 'end_at': datetime.fromisoformat(end)}
+
+@pytest.mark.usefixtures("mock_db_connection")
+class TestSearchAvailability:
+
+    @patch('utils.availability.get_appointments_by_date_range')
+    @patch('src.handlers.appointments.search_availability.get_service_duration', return_value=60)
+    def test_earliest_slots_for_service(self, mock_duration, mock_range):
+        # Arrange
+        mock_range.return_value = [
+            _booking('doctor-001', '2030-05-06 08:00:00', '2030-05-06 18:00:00'),
+            _booking('doctor-002', '2030-05-06 08:00:00', '2030-05-06 17:00:00'),
+        ]
+        event = create_api_gateway_event({
+            'service_id': 'svc-1', 'start_date': '2030-05-06', 'end_date': '2030-05-07',
+            'doctor_ids': 'doctor-001,doctor-002', 'limit': '2'
+        })
+
+        # Act
+        response = lambda_handler(event, {})
+
+        # Assert
+        assert response['statusCode'] == 200
+        data = json.loads(response['body'])['data']
+        assert data['duration_minutes'] == 60
+        assert data['slots'] == [
+            {'doctor_id': 'doctor-002', 'date': '2030-05-06', 'start': '17:00', 'end': '18:00'},
+            {'doctor_id': 'doctor-001', 'date': '2030-05-07', 'start': '08:00', 'end': '09:00'},
+        ]
+        mock_range.assert_called_once()
+
+    def test_missing_start_date(self):
+        response = lambda_handler(create_api_gateway_event({'service_id': 'svc-1'}), {})
+
+        assert response['statusCode'] == 400
+
+    def test_window_too_long(self):
+        event = create_api_gateway_event({'start_date': '2030-05-01', 'end_date': '2030-08-01'})
+
+        response = lambda_handler(event, {})
+
+        assert response['statusCode'] == 400
+        assert 'cannot exceed' in json.loads(response['body'])['error']
+
+    @patch('src.handlers.appointments.search_availability.get_service_duration', return_value=None)
+    def test_unknown_service(self, mock_duration):
+        event = create_api_gateway_event({'service_id': 'missing', 'start_date': '2030-05-06'})
+
+        response = lambda_handler(event, {})
+
+        assert response['statusCode'] == 404
@@ -2,6 +2,9 @@ import json
 import pytest
 from unittest.mock import patch, ANY
 from src.handlers.appointments.update_appointment import lambda_handler
+from utils import agenda
+from utils.cache_invalidation import CacheVersionBus, set_version_bus
+from utils.rds_utils import SlotUnavailableError
 
 def create_api_gateway_event(body=None, path_params=None):
     """Helper to create a mock API Gateway event."""
@@ -126,4 +129,110 @@ class TestUpdateAppointment:
         assert response['statusCode'] == 500
         response_body = json.loads(response['body'])
         assert response_body['error'] == 'Internal server error'
-        assert response_body['details'] == 'Failed to update appointment'
\ No newline at end of file
+        assert response_body['details'] == 'Failed to update appointment'
+    @patch('src.handlers.appointments.update_appointment.execute_query')
+    @patch('src.handlers.appointments.update_appointment.execute_mutation')
+    def test_update_appointment_reschedule_conflict(self, mock_execute_mutation, mock_execute_query):
+        # Arrange
+        existing = {
+            'id': 'appt-1', 'patient_id': 'patient-001', 'doctor_id': 'doctor-001', 'status': 'scheduled',
+            'appointment_date': '2030-05-06', 'appointment_time': '09:00:00', 'duration_minutes': 30
+        }
+        own_span = {'id': 'appt-1', 'start_at': '2030-05-06 09:00:00', 'end_at': '2030-05-06 09:30:00'}
+        other_span = {'id': 'appt-2', 'start_at': '2030-05-06 10:00:00', 'end_at': '2030-05-06 10:30:00'}
+        # Existing appointment, then the patient's intervals
+        mock_execute_query.side_effect = [existing, [own_span, other_span]]
+        event = create_api_gateway_event(body={"appointment_time": "10:15:00"}, path_params={"id": "appt-1"})
+
+        # Act
+        response = lambda_handler(event, {})
+
+        # Assert
+        assert response['statusCode'] == 409
+        assert json.loads(response['body'])['error'] == 'Time slot not available'
+        mock_execute_mutation.assert_not_called()
+
+    @patch('src.handlers.appointments.update_appointment.execute_query')
+    @patch('src.handlers.appointments.update_appointment.execute_reservation')
+    def test_update_appointment_reschedule_into_free_slot(self, mock_execute_reservation, mock_execute_query):
+        # Arrange
+        existing = {
+            'id': 'appt-1', 'patient_id': 'patient-001', 'doctor_id': 'doctor-001', 'status': 'scheduled',
+            'appointment_date': '2030-05-06', 'appointment_time': '09:00:00', 'duration_minutes': 30
+        }
+        own_span = {'id': 'appt-1', 'start_at': '2030-05-06 09:00:00', 'end_at': '2030-05-06 09:30:00'}
+        mock_execute_query.side_effect = [existing, [own_span], {**existing, 'appointment_time': '09:15:00'}]
+        event = create_api_gateway_event(body={"appointment_time": "09:15:00"}, path_params={"id": "appt-1"})
+
+        # Act
+        response = lambda_handler(event, {})
+
+        # Assert
+        assert response['statusCode'] == 200
+        mock_execute_reservation.assert_called_once()
+        release, update, reserve = mock_execute_reservation.call_args[0][0]
+        assert release == ("DELETE FROM appointment_slots WHERE appointment_id = %s", ('appt-1',))
+        assert update[1] == ('09:15:00', '2030-05-06 09:15:00', '2030-05-06 09:45:00', 'appt-1')
+        assert reserve[1][:3] == ('doctor-001', '2030-05-06 09:15:00', 'appt-1')
+        assert len(reserve[1]) == 6 * 3
+
+    @patch('src.handlers.appointments.update_appointment.execute_query')
+    @patch('src.handlers.appointments.update_appointment.execute_reservation')
+    def test_update_appointment_doctor_slot_taken(self, mock_execute_reservation, mock_execute_query):
+        # Arrange
+        existing = {
+            'id': 'appt-1', 'patient_id': 'patient-001', 'doctor_id': 'doctor-001', 'status': 'scheduled',
+            'appointment_date': '2030-05-06', 'appointment_time': '09:00:00', 'duration_minutes': 30
+        }
+        mock_execute_query.side_effect = [existing, []]
+        mock_execute_reservation.side_effect = SlotUnavailableError("The requested time slot is already reserved")
+        event = create_api_gateway_event(body={"doctor_id": "doctor-002"}, path_params={"id": "appt-1"})
+
+        # Act
+        response = lambda_handler(event, {})
+
+        # Assert
+        assert response['statusCode'] == 409
+        assert json.loads(response['body'])['error'] == 'Time slot not available'
+
+    @patch('src.handlers.appointments.update_appointment.execute_query')
+    @patch('src.handlers.appointments.update_appointment.execute_reservation')
+    def test_cancelling_releases_slots_in_same_transaction(self, mock_execute_reservation, mock_execute_query):
+        # Arrange
+        existing = {
+            'id': 'appt-1', 'patient_id': 'patient-001', 'doctor_id': 'doctor-001', 'status': 'scheduled',
+            'appointment_date': '2030-05-06', 'appointment_time': '09:00:00', 'duration_minutes': 30
+        }
+        mock_execute_query.side_effect = [existing, {**existing, 'status': 'cancelled'}]
+        event = create_api_gateway_event(body={"status": "cancelled"}, path_params={"id": "appt-1"})
+
+        # Act
+        response = lambda_handler(event, {})
+
+        # Assert
+        assert response['statusCode'] == 200
+        release, update = mock_execute_reservation.call_args[0][0]
+        assert release[0] == "DELETE FROM appointment_slots WHERE appointment_id = %s"
+        assert update[1] == ('cancelled', 'appt-1')
+
+    @patch('utils.agenda.get_appointments_by_date_range')
+    @patch('src.handlers.appointments.update_appointment.execute_query')
+    @patch('src.handlers.appointments.update_appointment.execute_mutation')
+    def test_notes_update_refreshes_cached_agenda(self, mock_execute_mutation, mock_execute_query, mock_range):
+        agenda.AGENDA_CACHE.clear()
+        set_version_bus(CacheVersionBus(check_interval=0))
+        try:
+            existing = {'id': 'appt-1', 'doctor_id': 'doc-1', 'appointment_date': '2030-05-06',
+                        'status': 'scheduled', 'notes': 'old'}
+            mock_range.return_value = [existing]
+            assert agenda.get_agenda('doc-1', '2030-05-06')[0]['notes'] == 'old'
+
+            mock_execute_query.side_effect = [existing, {**existing, 'notes': 'new'}]
+            mock_execute_mutation.return_value = 1
+            event = create_api_gateway_event(body={'notes': 'new'}, path_params={'id': 'appt-1'})
+            assert lambda_handler(event, {})['statusCode'] == 200
+
+            mock_range.return_value = [{**existing, 'notes': 'new'}]
+            assert agenda.get_agenda('doc-1', '2030-05-06')[0]['notes'] == 'new'
+        finally:
+            set_version_bus(None)
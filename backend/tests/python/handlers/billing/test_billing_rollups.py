@@ -0,0 +1,248 @@
+import json
+import os
+import boto3
+import pytest
+from moto import mock_aws
+from unittest.mock import patch
+from utils import db_utils
+from utils.availability import doctor_day_entity
+from utils.batch_billing import billing_id_for
+from utils.cache_invalidation import CacheVersionBus, InMemoryVersionStore, get_version_bus, set_version_bus
+from src.handlers.billing.create_billing import lambda_handler as create_billing
+from src.handlers.billing.update_billing import lambda_handler as update_billing
+from src.handlers.billing.get_billing_summary import lambda_handler as get_billing_summary
+from src.handlers.billing.get_patient_balance import lambda_handler as get_patient_balance
+
+TEST_BILLING_TABLE_NAME = "clinnet-billing-test"
+TEST_ROLLUPS_TABLE_NAME = "clinnet-billing-rollups-test"
+
+@pytest.fixture(scope="function")
+def aws_credentials():
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+
+@pytest.fixture(scope="function")
+def billing_tables(aws_credentials, monkeypatch):
+    monkeypatch.setattr(db_utils, "DYNAMODB_RESOURCE", None)
+    monkeypatch.setenv("BILLING_TABLE", TEST_BILLING_TABLE_NAME)
+    monkeypatch.setenv("BILLING_ROLLUPS_TABLE", TEST_ROLLUPS_TABLE_NAME)
+    monkeypatch.delenv("SERVICES_TABLE", raising=False)
+    set_version_bus(CacheVersionBus(InMemoryVersionStore(), check_interval=0))
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        billing = dynamodb.create_table(
+            TableName=TEST_BILLING_TABLE_NAME,
+            KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        rollups = dynamodb.create_table(
+            TableName=TEST_ROLLUPS_TABLE_NAME,
+            KeySchema=[{"AttributeName": "PK", "KeyType": "HASH"}, {"AttributeName": "SK", "KeyType": "RANGE"}],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"}
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield billing, rollups
+    set_version_bus(None)
+
+def create_event(body):
+    return {'httpMethod': 'POST', 'headers': {}, 'body': json.dumps(body)}
+
+def invoice(patient_id="patient-1", status="pending", tax=0):
+    return {
+        'patientId': patient_id,
+        'paymentMethod': 'card',
+        'paymentStatus': status,
+        'tax': tax,
+        'items': [
+            {'serviceId': 'svc-consult', 'serviceName': 'Consultation', 'quantity': 1, 'price': 100},
+            {'serviceId': 'svc-xray', 'serviceName': 'X-Ray', 'quantity': 2, 'price': 40}
+        ]
+    }
+
+def summary(start, end=None):
+    params = {'from': start}
+    if end:
+        params['to'] = end
+    response = get_billing_summary({'httpMethod': 'GET', 'headers': {}, 'queryStringParameters': params}, {})
+    return response['statusCode'], json.loads(response['body'])
+
+class TestBillingRollups:
+
+    def test_create_billing_writes_rollups_in_same_transaction(self, billing_tables):
+        billing, rollups = billing_tables
+
+        response = create_billing(create_event(invoice(tax=10)), {})
+        assert response['statusCode'] == 201
+        created = json.loads(response['body'])
+        create_billing(create_event(invoice(patient_id="patient-2", status="paid")), {})
+
+        day = created['createdAt'][:10]
+        assert billing.get_item(Key={'id': created['id']})['Item']['total'] == 190
+        total = rollups.get_item(Key={'PK': f"ROLLUP#{day[:7]}", 'SK': f"{day}#TOTAL"})['Item']
+        assert total['invoices'] == 2
+        assert total['total'] == 370
+        assert total['tax'] == 10
+
+        status, body = summary(day)
+        assert status == 200
+        assert body['totals'] == {'invoices': 2, 'subtotal': 360, 'tax': 10, 'discount': 0, 'total': 370}
+        assert body['days'] == [{'date': day, 'invoices': 2, 'subtotal': 360, 'tax': 10, 'discount': 0, 'total': 370}]
+        assert body['byStatus'] == {'pending': {'invoices': 1, 'total': 190}, 'paid': {'invoices': 1, 'total': 180}}
+        assert body['byService'] == [
+            {'serviceId': 'svc-consult', 'serviceName': 'Consultation', 'quantity': 2, 'amount': 200},
+            {'serviceId': 'svc-xray', 'serviceName': 'X-Ray', 'quantity': 4, 'amount': 160}
+        ]
+
+    @patch('src.handlers.billing.create_billing.execute_query')
+    @patch('src.handlers.billing.create_billing.mark_appointments_billed')
+    def test_create_billing_bills_an_appointment_once(self, mock_mark, mock_query, billing_tables, monkeypatch):
+        monkeypatch.setenv("DB_HOST", "aurora.test")
+        mock_mark.return_value = 1
+        mock_query.return_value = {'doctor_id': 'doctor-1', 'appointment_date': '2026-03-02'}
+
+        first = create_billing(create_event(dict(invoice(), appointmentId='appt-1')), {})
+        second = create_billing(create_event(dict(invoice(), appointmentId='appt-1')), {})
+
+        assert first['statusCode'] == 201
+        assert json.loads(first['body'])['id'] == billing_id_for('appt-1')
+        assert second['statusCode'] == 409
+        mock_mark.assert_called_once_with({'appt-1': billing_id_for('appt-1')})
+        assert get_version_bus().current(doctor_day_entity('doctor-1', '2026-03-02')) == 1
+        _, body = summary(json.loads(first['body'])['createdAt'][:10])
+        assert body['totals']['invoices'] == 1
+
+    def test_create_billing_without_rollups_bills_an_appointment_once(self, billing_tables, monkeypatch):
+        monkeypatch.delenv("BILLING_ROLLUPS_TABLE")
+
+        assert create_billing(create_event(dict(invoice(), appointmentId='appt-1')), {})['statusCode'] == 201
+        assert create_billing(create_event(dict(invoice(), appointmentId='appt-1')), {})['statusCode'] == 409
+
+    def test_update_billing_moves_rollups_by_difference(self, billing_tables):
+        created = json.loads(create_billing(create_event(invoice()), {})['body'])
+
+        response = update_billing({
+            'httpMethod': 'PUT', 'headers': {},
+            'pathParameters': {'id': created['id']},
+            'body': json.dumps({'paymentStatus': 'paid', 'discount': 30})
+        }, {})
+        assert response['statusCode'] == 200
+        assert json.loads(response['body'])['total'] == 150
+
+        _, body = summary(created['createdAt'][:10])
+        assert body['totals']['invoices'] == 1
+        assert body['totals']['total'] == 150
+        assert body['totals']['discount'] == 30
+        assert body['byStatus'] == {'pending': {'invoices': 0, 'total': 0}, 'paid': {'invoices': 1, 'total': 150}}
+        # Line items did not change, so the service rollups were not touched
+        assert body['byService'][0]['amount'] == 100
+
+    def test_update_of_uncounted_billing_adds_its_full_contribution(self, billing_tables):
+        billing, rollups = billing_tables
+        # Written before rollups were enabled: no rollupsApplied flag and no counters
+        billing.put_item(Item={
+            'id': 'legacy-1', 'patientId': 'patient-1', 'paymentMethod': 'card', 'paymentStatus': 'pending',
+            'items': [{'serviceId': 'svc-consult', 'serviceName': 'Consultation', 'quantity': 1, 'unitPrice': 100, 'total': 100}],
+            'subtotal': 100, 'tax': 0, 'discount': 0, 'total': 100,
+            'createdAt': '2026-03-02T09:00:00Z', 'updatedAt': '2026-03-02T09:00:00Z'
+        })
+
+        for status in ('paid', 'pending'):
+            response = update_billing({
+                'httpMethod': 'PUT', 'headers': {},
+                'pathParameters': {'id': 'legacy-1'},
+                'body': json.dumps({'paymentStatus': status})
+            }, {})
+            assert response['statusCode'] == 200
+
+        assert billing.get_item(Key={'id': 'legacy-1'})['Item']['rollupsApplied'] is True
+        _, body = summary('2026-03-02')
+        assert body['totals']['invoices'] == 1
+        assert body['totals']['total'] == 100
+        assert body['byStatus'] == {'pending': {'invoices': 1, 'total': 100}, 'paid': {'invoices': 0, 'total': 0}}
+        assert balance('patient-1')[1]['outstanding'] == 100
+
+    def test_update_billing_conflicts_on_concurrent_write(self, billing_tables):
+        billing, _ = billing_tables
+        created = json.loads(create_billing(create_event(invoice()), {})['body'])
+        stale = billing.get_item(Key={'id': created['id']})['Item']
+        billing.update_item(Key={'id': created['id']}, UpdateExpression="SET updatedAt = :u",
+                            ExpressionAttributeValues={':u': '2099-01-01T00:00:00Z'})
+
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr("src.handlers.billing.update_billing.get_item_by_id", lambda table, item_id: stale)
+            response = update_billing({
+                'httpMethod': 'PUT', 'headers': {},
+                'pathParameters': {'id': created['id']},
+                'body': json.dumps({'paymentStatus': 'paid'})
+            }, {})
+
+        assert response['statusCode'] == 409
+        _, body = summary(created['createdAt'][:10])
+        assert body['byStatus'] == {'pending': {'invoices': 1, 'total': 180}}
+
+    def test_summary_only_reads_days_in_range(self, billing_tables):
+        _, rollups = billing_tables
+        for day, total in (('2026-01-31', 50), ('2026-02-01', 70), ('2026-02-02', 90)):
+            rollups.put_item(Item={'PK': f"ROLLUP#{day[:7]}", 'SK': f"{day}#TOTAL", 'day': day,
+                                   'dimension': 'total', 'invoices': 1, 'total': total})
+
+        status, body = summary('2026-01-31', '2026-02-01')
+        assert status == 200
+        assert [day['date'] for day in body['days']] == ['2026-01-31', '2026-02-01']
+        assert body['totals']['total'] == 120
+
+    def test_summary_validates_range(self, billing_tables):
+        assert summary('2026-02-10', '2026-02-01')[0] == 400
+        assert summary('2025-01-01', '2026-06-01')[0] == 400
+        assert summary('not-a-date')[0] == 400
+
+def balance(patient_id):
+    response = get_patient_balance({'httpMethod': 'GET', 'headers': {}, 'pathParameters': {'patientId': patient_id}}, {})
+    return response['statusCode'], json.loads(response['body'])
+
+class TestPatientBalance:
+
+    def test_balance_tracks_invoices_and_payments(self, billing_tables):
+        first = json.loads(create_billing(create_event(invoice(tax=20)), {})['body'])
+        second = json.loads(create_billing(create_event(invoice()), {})['body'])
+        create_billing(create_event(invoice(patient_id="patient-2", status="paid")), {})
+
+        status, body = balance("patient-1")
+        assert status == 200
+        assert body['invoices'] == 2
+        assert body['billed'] == 380
+        assert body['paid'] == 0
+        assert body['outstanding'] == 380
+        assert body['lastInvoiceDate'] == second['createdAt']
+
+        update_billing({
+            'httpMethod': 'PUT', 'headers': {},
+            'pathParameters': {'id': first['id']},
+            'body': json.dumps({'paymentStatus': 'paid'})
+        }, {})
+        update_billing({
+            'httpMethod': 'PUT', 'headers': {},
+            'pathParameters': {'id': second['id']},
+            'body': json.dumps({'paymentStatus': 'cancelled'})
+        }, {})
+
+        _, body = balance("patient-1")
+        assert body['invoices'] == 1
+        assert body['billed'] == 200
+        assert body['paid'] == 200
+        assert body['outstanding'] == 0
+        # Updates never move the last invoice date
+        assert body['lastInvoiceDate'] == second['createdAt']
+
+    def test_balance_of_patient_without_invoices_is_zero(self, billing_tables):
+        status, body = balance("patient-none")
+        assert status == 200
+        assert body == {'patientId': 'patient-none', 'lastInvoiceDate': None, 'updatedAt': None,
+                        'invoices': 0, 'billed': 0, 'paid': 0, 'outstanding': 0}
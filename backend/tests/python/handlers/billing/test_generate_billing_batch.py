@@ -0,0 +1,208 @@
+import json
+import os
+import boto3
+import pytest
+from moto import mock_aws
+from unittest.mock import patch, MagicMock
+from utils import db_utils
+from utils.batch_billing import BatchBillingJob, build_invoice, billing_id_for
+from utils.availability import doctor_day_entity
+from utils.cache_invalidation import CacheVersionBus, InMemoryVersionStore, get_version_bus, set_version_bus
+from src.handlers.billing import generate_billing_batch
+from src.handlers.billing.generate_billing_batch import lambda_handler
+
+TEST_BILLING_TABLE_NAME = "clinnet-billing-test"
+TEST_SERVICES_TABLE_NAME = "clinnet-services-test"
+TEST_ROLLUPS_TABLE_NAME = "clinnet-billing-rollups-test"
+
+def create_api_gateway_event(body):
+    return {'httpMethod': 'POST', 'headers': {}, 'body': json.dumps(body)}
+
+def completed(appointment_id, service_id="svc-consult", patient_id="patient-1", start_at="2030-05-06 09:00:00"):
+    return {'id': appointment_id, 'patient_id': patient_id, 'doctor_id': 'doctor-1', 'service_id': service_id,
+            'appointment_date': start_at[:10], 'start_at': start_at}
+
+@pytest.fixture(scope="function")
+def aws_credentials():
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+
+@pytest.fixture(scope="function")
+def billing_tables(aws_credentials, monkeypatch):
+    monkeypatch.setattr(db_utils, "DYNAMODB_RESOURCE", None)
+    monkeypatch.setenv("BILLING_TABLE", TEST_BILLING_TABLE_NAME)
+    monkeypatch.setenv("SERVICES_TABLE", TEST_SERVICES_TABLE_NAME)
+    monkeypatch.setenv("BILLING_ROLLUPS_TABLE", TEST_ROLLUPS_TABLE_NAME)
+    set_version_bus(CacheVersionBus(InMemoryVersionStore(), check_interval=0))
+    generate_billing_batch._catalog.invalidate()
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        tables = {}
+        for name in (TEST_BILLING_TABLE_NAME, TEST_SERVICES_TABLE_NAME):
+            tables[name] = dynamodb.create_table(
+                TableName=name,
+                KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+                AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+                BillingMode="PAY_PER_REQUEST",
+            )
+        tables[TEST_ROLLUPS_TABLE_NAME] = dynamodb.create_table(
+            TableName=TEST_ROLLUPS_TABLE_NAME,
+            KeySchema=[{"AttributeName": "PK", "KeyType": "HASH"}, {"AttributeName": "SK", "KeyType": "RANGE"}],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"}
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        tables[TEST_SERVICES_TABLE_NAME].put_item(Item={'id': 'svc-consult', 'name': 'Consultation', 'price': 120})
+        tables[TEST_SERVICES_TABLE_NAME].put_item(Item={'id': 'svc-xray', 'name': 'X-Ray', 'price': 80})
+        yield tables
+    set_version_bus(None)
+
+class TestGenerateBillingBatch:
+
+    @patch('utils.batch_billing.mark_appointments_billed')
+    @patch('utils.batch_billing.get_unbilled_appointments')
+    def test_bills_completed_appointments_in_chunks(self, mock_unbilled, mock_mark, billing_tables):
+        rows = [completed(f"appt-{i:03d}", service_id="svc-xray" if i % 2 else "svc-consult",
+                          patient_id=f"patient-{i % 3}") for i in range(60)]
+        rows += [completed("appt-no-service", service_id=None), completed("appt-retired", service_id="svc-retired")]
+        mock_unbilled.return_value = rows
+
+        response = lambda_handler(create_api_gateway_event({'from': '2030-05-06'}), None)
+
+        assert response['statusCode'] == 200
+        body = json.loads(response['body'])
+        assert body['appointments'] == 62
+        assert body['created'] == 60
+        assert body['no_service'] == 1
+        assert body['unknown_service'] == 1
+        assert body['complete'] is True
+        mock_unbilled.assert_called_once_with('2030-05-06', '2030-05-06', limit=500, after=None)
+
+        invoice = billing_tables[TEST_BILLING_TABLE_NAME].get_item(Key={'id': billing_id_for('appt-001')})['Item']
+        assert invoice['appointmentId'] == 'appt-001'
+        assert invoice['total'] == 80
+        assert invoice['items'][0]['serviceName'] == 'X-Ray'
+        assert invoice['paymentStatus'] == 'pending'
+
+        billed = mock_mark.call_args[0][0]
+        assert len(billed) == 60
+        assert billed['appt-001'] == billing_id_for('appt-001')
+
+        day = invoice['createdAt'][:10]
+        rollups = billing_tables[TEST_ROLLUPS_TABLE_NAME]
+        total = rollups.get_item(Key={'PK': f"ROLLUP#{day[:7]}", 'SK': f"{day}#TOTAL"})['Item']
+        assert total['invoices'] == 60
+        assert total['total'] == 30 * 120 + 30 * 80
+        balance = rollups.get_item(Key={'PK': 'BALANCE#patient-0', 'SK': 'BALANCE'})['Item']
+        assert balance['invoices'] == 20
+        assert balance['outstanding'] == balance['billed']
+
+    @patch('utils.batch_billing.mark_appointments_billed')
+    @patch('utils.batch_billing.get_unbilled_appointments')
+    def test_rerun_after_interruption_does_not_bill_twice(self, mock_unbilled, mock_mark, billing_tables):
+        rows = [completed(f"appt-{i:03d}") for i in range(30)]
+        mock_unbilled.return_value = rows
+        # First run wrote the invoices but died before marking the appointments in Aurora
+        mock_mark.side_effect = [RuntimeError("connection lost"), 30]
+
+        assert lambda_handler(create_api_gateway_event({'from': '2030-05-06'}), None)['statusCode'] == 500
+        response = lambda_handler(create_api_gateway_event({'from': '2030-05-06'}), None)
+
+        body = json.loads(response['body'])
+        assert body['created'] == 0
+        assert body['already_billed'] == 30
+        assert len(mock_mark.call_args[0][0]) == 30
+        assert billing_tables[TEST_BILLING_TABLE_NAME].scan()['Count'] == 30
+
+        day = billing_tables[TEST_BILLING_TABLE_NAME].scan()['Items'][0]['createdAt'][:10]
+        total = billing_tables[TEST_ROLLUPS_TABLE_NAME].get_item(
+            Key={'PK': f"ROLLUP#{day[:7]}", 'SK': f"{day}#TOTAL"})['Item']
+        assert total['invoices'] == 30
+
+    @patch('utils.batch_billing.mark_appointments_billed')
+    @patch('utils.batch_billing.get_unbilled_appointments')
+    def test_rerun_applies_rollups_a_failed_run_skipped(self, mock_unbilled, mock_mark, billing_tables):
+        mock_unbilled.return_value = [completed(f"appt-{i:03d}") for i in range(30)]
+
+        # First run wrote the invoices but the rollup update failed
+        with patch('utils.batch_billing.transact_write_items', side_effect=RuntimeError("throttled")):
+            assert lambda_handler(create_api_gateway_event({'from': '2030-05-06'}), None)['statusCode'] == 500
+        response = lambda_handler(create_api_gateway_event({'from': '2030-05-06'}), None)
+
+        body = json.loads(response['body'])
+        assert body['created'] == 0
+        assert body['rollups_resumed'] == 30
+        invoices = billing_tables[TEST_BILLING_TABLE_NAME].scan()['Items']
+        assert all(invoice['rollupsApplied'] for invoice in invoices)
+        day = invoices[0]['createdAt'][:10]
+        total = billing_tables[TEST_ROLLUPS_TABLE_NAME].get_item(
+            Key={'PK': f"ROLLUP#{day[:7]}", 'SK': f"{day}#TOTAL"})['Item']
+        assert total['invoices'] == 30
+        balance = billing_tables[TEST_ROLLUPS_TABLE_NAME].get_item(Key={'PK': 'BALANCE#patient-1', 'SK': 'BALANCE'})['Item']
+        assert balance['billed'] == 30 * 120
+
+        # A third run finds nothing left to apply
+        body = json.loads(lambda_handler(create_api_gateway_event({'from': '2030-05-06'}), None)['body'])
+        assert body['rollups_resumed'] == 0
+
+    def test_apply_rollups_skips_invoices_already_counted(self, billing_tables):
+        billing = billing_tables[TEST_BILLING_TABLE_NAME]
+        service = {'id': 'svc-consult', 'name': 'Consultation', 'price': 120}
+        invoices = [build_invoice(completed(f"appt-{i}"), service, 'invoice', '2030-05-06T12:00:00Z') for i in range(3)]
+        for invoice in invoices:
+            billing.put_item(Item=invoice)
+        # Counted meanwhile, e.g. by a concurrent run
+        billing.update_item(Key={'id': invoices[1]['id']}, UpdateExpression='SET rollupsApplied = :applied',
+                            ExpressionAttributeValues={':applied': True})
+
+        BatchBillingJob(TEST_BILLING_TABLE_NAME, lambda service_id: None, TEST_ROLLUPS_TABLE_NAME).apply_rollups(invoices)
+
+        assert all(item['rollupsApplied'] for item in billing.scan()['Items'])
+        total = billing_tables[TEST_ROLLUPS_TABLE_NAME].get_item(
+            Key={'PK': 'ROLLUP#2030-05', 'SK': '2030-05-06#TOTAL'})['Item']
+        assert total['invoices'] == 2
+
+    def test_rollup_groups_fit_in_one_transaction(self, billing_tables):
+        service = {'id': 'svc-consult', 'name': 'Consultation', 'price': 120}
+        invoices = [build_invoice(completed(f"appt-{i}", patient_id=f"patient-{i}"), service, 'invoice',
+                                  '2030-05-06T12:00:00Z') for i in range(120)]
+
+        groups = list(BatchBillingJob(TEST_BILLING_TABLE_NAME, lambda service_id: None,
+                                      TEST_ROLLUPS_TABLE_NAME).rollup_groups(invoices))
+
+        assert sum(len(group) for group in groups) == 120
+        # Each invoice adds its flag and its patient's balance item on top of three shared rollup items
+        assert all(2 * len(group) + 3 <= 100 for group in groups)
+
+    @patch('utils.batch_billing.mark_appointments_billed')
+    @patch('utils.batch_billing.get_unbilled_appointments')
+    def test_billed_doctor_days_are_invalidated(self, mock_unbilled, mock_mark, billing_tables):
+        mock_unbilled.return_value = [completed("appt-1"), completed("appt-2", start_at="2030-05-07 10:00:00")]
+
+        lambda_handler(create_api_gateway_event({'from': '2030-05-06', 'to': '2030-05-07'}), None)
+
+        bus = get_version_bus()
+        assert bus.current(doctor_day_entity('doctor-1', '2030-05-06')) == 1
+        assert bus.current(doctor_day_entity('doctor-1', '2030-05-07')) == 1
+
+    @patch('utils.batch_billing.mark_appointments_billed')
+    @patch('utils.batch_billing.get_unbilled_appointments')
+    def test_stops_between_pages_near_timeout(self, mock_unbilled, mock_mark, billing_tables):
+        context = MagicMock()
+        context.get_remaining_time_in_millis.return_value = 1000
+
+        response = lambda_handler(create_api_gateway_event({'from': '2030-05-06'}), context)
+
+        body = json.loads(response['body'])
+        assert body['complete'] is False
+        mock_unbilled.assert_not_called()
+
+    def test_validates_range(self, billing_tables):
+        assert lambda_handler(create_api_gateway_event({'from': '2030-05-06', 'to': '2030-05-01'}), None)['statusCode'] == 400
+        assert lambda_handler(create_api_gateway_event({'from': '2030-05-01', 'to': '2030-07-01'}), None)['statusCode'] == 400
+        assert lambda_handler(create_api_gateway_event({}), None)['statusCode'] == 400
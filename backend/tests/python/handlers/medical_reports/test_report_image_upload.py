@@ -0,0 +1,72 @@
+import json
+import os
+import boto3
+import pytest
+from moto import mock_aws
+from src.handlers.medical_reports.report_image_upload import lambda_handler
+
+TEST_REPORTS_TABLE = "clinnet-medical-reports-test"
+TEST_IMAGES_BUCKET = "clinnet-report-images-test"
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+def create_api_gateway_event(report_id, suffix, body=None):
+    return {
+        "httpMethod": "POST",
+        "path": f"/api/medical-reports/{report_id}/{suffix}",
+        "pathParameters": {"id": report_id},
+        "body": json.dumps(body) if body is not None else None,
+        "requestContext": {"authorizer": {"claims": {"cognito:username": "doc", "sub": "sub-doc"}}},
+        "headers": {"Origin": "http://localhost:3000"}
+    }
+
+@pytest.fixture(scope="function")
+def aws_resources(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName=TEST_REPORTS_TABLE,
+            KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST"
+        )
+        table.put_item(Item={"id": "report-1", "patientId": "patient-1"})
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket=TEST_IMAGES_BUCKET)
+        monkeypatch.setenv("MEDICAL_REPORTS_TABLE", TEST_REPORTS_TABLE)
+        monkeypatch.setenv("MEDICAL_REPORT_IMAGES_BUCKET", TEST_IMAGES_BUCKET)
+        yield table, s3
+
+class TestReportImageUpload:
+
+    def test_upload_url_then_complete(self, aws_resources):
+        table, s3 = aws_resources
+
+        response = lambda_handler(create_api_gateway_event("report-1", "image-upload-url", {"contentType": "image/png"}), None)
+        assert response["statusCode"] == 200
+        upload = json.loads(response["body"])
+        assert upload["key"].startswith("reports/report-1/")
+        assert upload["fields"]["x-amz-meta-uploaded-by"] == "sub-doc"
+
+        # The browser posts the file to S3 directly
+        s3.put_object(Bucket=TEST_IMAGES_BUCKET, Key=upload["key"], Body=PNG, ContentType="image/png")
+
+        response = lambda_handler(create_api_gateway_event("report-1", "images", {"key": upload["key"]}), None)
+        assert response["statusCode"] == 200
+        body = json.loads(response["body"])
+        assert body["s3ObjectKey"] == upload["key"]
+        assert body["imageReferences"] == [upload["key"]]
+        assert table.get_item(Key={"id": "report-1"})["Item"]["imageReferences"] == [upload["key"]]
+
+    def test_unknown_report(self, aws_resources):
+        response = lambda_handler(create_api_gateway_event("missing", "image-upload-url", {"contentType": "image/png"}), None)
+        assert response["statusCode"] == 404
+
+    def test_keys_of_other_reports_are_refused(self, aws_resources):
+        _, s3 = aws_resources
+        s3.put_object(Bucket=TEST_IMAGES_BUCKET, Key="reports/report-2/a.png", Body=PNG, ContentType="image/png")
+
+        response = lambda_handler(create_api_gateway_event("report-1", "images", {"key": "reports/report-2/a.png"}), None)
+        assert response["statusCode"] == 400
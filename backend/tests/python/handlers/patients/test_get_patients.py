@@ -146,4 +146,80 @@ class TestGetPatients:
         assert response['statusCode'] == 500
         response_body = json.loads(response['body'])
         assert response_body['error'] == 'AWS Error'
-        assert "A DynamoDB error occurred" in response_body['message']
\ No newline at end of file
+        assert "A DynamoDB error occurred" in response_body['message']
+
+@pytest.fixture(scope="function")
+def sharded_patient_records_table(aws_credentials, monkeypatch):
+    from utils import db_utils
+    monkeypatch.setattr(db_utils, "DYNAMODB_RESOURCE", None)
+    monkeypatch.setattr(db_utils, "TYPE_SHARD_COUNT", 4)
+    monkeypatch.setattr("src.handlers.patients.get_patients.TYPE_SHARD_COUNT", 4)
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName=TEST_PATIENT_RECORDS_TABLE_NAME,
+            KeySchema=[{'AttributeName': 'PK', 'KeyType': 'HASH'}, {'AttributeName': 'SK', 'KeyType': 'RANGE'}],
+            AttributeDefinitions=[
+                {'AttributeName': 'PK', 'AttributeType': 'S'},
+                {'AttributeName': 'SK', 'AttributeType': 'S'},
+                {'AttributeName': 'typeShard', 'AttributeType': 'S'}
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    'IndexName': 'type-shard-index',
+                    'KeySchema': [
+                        {'AttributeName': 'typeShard', 'KeyType': 'HASH'},
+                        {'AttributeName': 'PK', 'KeyType': 'RANGE'}
+                    ],
+                    'Projection': {'ProjectionType': 'ALL'},
+                    'ProvisionedThroughput': {'ReadCapacityUnits': 5, 'WriteCapacityUnits': 5}
+                }
+            ],
+            ProvisionedThroughput={'ReadCapacityUnits': 5, 'WriteCapacityUnits': 5}
+        )
+        yield table
+
+class TestGetPatientsSharded:
+
+    def _put_patients(self, count):
+        from utils.db_utils import put_item
+        for i in range(count):
+            put_item(TEST_PATIENT_RECORDS_TABLE_NAME, {
+                'PK': f'PATIENT#patient-{i:02d}', 'SK': 'METADATA', 'id': f'patient-{i:02d}',
+                'first_name': f'John{i}', 'last_name': 'Doe', 'type': 'patient'
+            })
+
+    def test_put_item_stamps_type_shard(self, sharded_patient_records_table, lambda_environment):
+        from utils.db_utils import type_shard_key
+        self._put_patients(1)
+
+        item = sharded_patient_records_table.get_item(Key={'PK': 'PATIENT#patient-00', 'SK': 'METADATA'})['Item']
+        assert item['typeShard'] == type_shard_key('patient', 'PATIENT#patient-00', 4)
+
+    def test_get_patients_merges_shards_in_order(self, sharded_patient_records_table, lambda_environment):
+        self._put_patients(7)
+
+        response = lambda_handler(create_api_gateway_event(), {})
+
+        assert response['statusCode'] == 200
+        body = json.loads(response['body'])
+        assert [p['id'] for p in body['patients']] == [f'patient-{i:02d}' for i in range(7)]
+        assert body['last_evaluated_key'] is None
+
+    def test_get_patients_sharded_pagination(self, sharded_patient_records_table, lambda_environment):
+        self._put_patients(7)
+
+        seen = []
+        cursor = None
+        for _ in range(10):
+            params = {"limit": "3"}
+            if cursor:
+                params["last_evaluated_key"] = json.dumps(cursor)
+            body = json.loads(lambda_handler(create_api_gateway_event(params), {})['body'])
+            assert len(body['patients']) <= 3
+            seen.extend(p['id'] for p in body['patients'])
+            cursor = body['last_evaluated_key']
+            if cursor is None:
+                break
+
+        assert seen == [f'patient-{i:02d}' for i in range(7)]
@@ -0,0 +1,74 @@
+import json
+import pytest
+from unittest.mock import patch
+from utils.cache_backends import LocalCacheBackend, set_cache_backend
+from utils.cache_invalidation import CacheVersionBus, get_version_bus, set_version_bus
+from src.handlers.patients.unified_patient_handler import lambda_handler
+
+PATIENT = {"id": "p1", "first_name": "Jane", "last_name": "Doe"}
+
+def create_api_gateway_event(method="GET", path_params=None, body=None):
+    event = {
+        "httpMethod": method,
+        "pathParameters": path_params,
+        "queryStringParameters": None,
+        "headers": {},
+    }
+    if body is not None:
+        event["body"] = json.dumps(body)
+    return event
+
+@pytest.fixture(autouse=True)
+def shared_cache():
+    set_cache_backend(LocalCacheBackend())
+    set_version_bus(CacheVersionBus(check_interval=0))
+    yield
+    set_cache_backend(None)
+    set_version_bus(None)
+
+class TestUnifiedPatientHandlerCache:
+
+    @patch("src.handlers.patients.unified_patient_handler.get_patient_by_id")
+    def test_repeated_reads_hit_cache(self, mock_get_patient):
+        mock_get_patient.return_value = dict(PATIENT)
+
+        first = lambda_handler(create_api_gateway_event(path_params={"id": "p1"}), {})
+        second = lambda_handler(create_api_gateway_event(path_params={"id": "p1"}), {})
+
+        assert first["statusCode"] == 200
+        assert second["body"] == first["body"]
+        mock_get_patient.assert_called_once_with("p1")
+
+    @patch("src.handlers.patients.unified_patient_handler.execute_mutation")
+    @patch("src.handlers.patients.unified_patient_handler.get_patient_by_id")
+    def test_update_invalidates_cached_patient(self, mock_get_patient, mock_execute_mutation):
+        mock_get_patient.return_value = dict(PATIENT)
+        mock_execute_mutation.return_value = 1
+        lambda_handler(create_api_gateway_event(path_params={"id": "p1"}), {})
+
+        mock_get_patient.return_value = {**PATIENT, "first_name": "Janet"}
+        lambda_handler(create_api_gateway_event(method="PUT", path_params={"id": "p1"}, body={"first_name": "Janet"}), {})
+        response = lambda_handler(create_api_gateway_event(path_params={"id": "p1"}), {})
+
+        assert json.loads(response["body"])["data"]["first_name"] == "Janet"
+
+    @patch("src.handlers.patients.unified_patient_handler.get_patient_by_id")
+    def test_write_in_another_container_is_seen(self, mock_get_patient):
+        mock_get_patient.return_value = dict(PATIENT)
+        lambda_handler(create_api_gateway_event(path_params={"id": "p1"}), {})
+
+        # Another container updated the patient: only the shared version moved
+        mock_get_patient.return_value = {**PATIENT, "first_name": "Janet"}
+        get_version_bus().bump("patients")
+        response = lambda_handler(create_api_gateway_event(path_params={"id": "p1"}), {})
+
+        assert json.loads(response["body"])["data"]["first_name"] == "Janet"
+        assert mock_get_patient.call_count == 2
+
+    @patch("src.handlers.patients.unified_patient_handler.get_patient_by_id")
+    def test_missing_patient_is_not_cached(self, mock_get_patient):
+        mock_get_patient.return_value = None
+
+        assert lambda_handler(create_api_gateway_event(path_params={"id": "p1"}), {})["statusCode"] == 404
+        assert lambda_handler(create_api_gateway_event(path_params={"id": "p1"}), {})["statusCode"] == 404
+        assert mock_get_patient.call_count == 2
@@ -0,0 +1,122 @@
+import json
+import os
+import boto3
+import pytest
+from moto import mock_aws
+from unittest.mock import patch
+from utils import db_utils
+from utils.services_catalog import ServicesCatalog
+from utils.response_cache import clear_response_cache
+from utils.cache_backends import LocalCacheBackend, set_cache_backend
+from src.handlers.services import unified_service_handler
+from src.handlers.services.unified_service_handler import lambda_handler
+
+TEST_SERVICES_TABLE_NAME = "clinnet-services-unified-test"
+
+def create_api_gateway_event(method="GET", path_params=None, query_params=None, body=None):
+    event = {
+        "httpMethod": method,
+        "pathParameters": path_params,
+        "queryStringParameters": query_params,
+        "headers": {},
+    }
+    if body is not None:
+        event["body"] = json.dumps(body)
+    return event
+
+@pytest.fixture(scope="function")
+def aws_credentials():
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+
+@pytest.fixture(scope="function")
+def services_table(aws_credentials, monkeypatch):
+    monkeypatch.setattr(db_utils, "DYNAMODB_RESOURCE", None)
+    monkeypatch.setattr(unified_service_handler, "_catalog", ServicesCatalog())
+    clear_response_cache()
+    set_cache_backend(LocalCacheBackend())
+    monkeypatch.setenv("SERVICES_TABLE", TEST_SERVICES_TABLE_NAME)
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName=TEST_SERVICES_TABLE_NAME,
+            KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+            ProvisionedThroughput={"ReadCapacityUnits": 1, "WriteCapacityUnits": 1},
+        )
+        table.put_item(Item={"id": "s1", "name": "General Consultation", "category": "Consultation", "active": True, "price": 100})
+        table.put_item(Item={"id": "s2", "name": "Blood Test", "category": "Laboratory", "active": True, "price": 75})
+        table.put_item(Item={"id": "s3", "name": "Blood Pressure Check", "category": "Consultation", "active": False, "price": 20})
+        yield table
+    set_cache_backend(None)
+
+def _ids(response):
+    return sorted(service["id"] for service in json.loads(response["body"]))
+
+class TestUnifiedServiceHandler:
+
+    def test_filtered_queries_are_served_from_one_load(self, services_table):
+        with patch.object(unified_service_handler._catalog, "_loader", wraps=db_utils.scan_table) as loader:
+            assert _ids(lambda_handler(create_api_gateway_event(), {})) == ["s1", "s2", "s3"]
+            assert _ids(lambda_handler(create_api_gateway_event(query_params={"category": "Consultation"}), {})) == ["s1", "s3"]
+            assert _ids(lambda_handler(create_api_gateway_event(query_params={"active": "true"}), {})) == ["s1", "s2"]
+            assert _ids(lambda_handler(create_api_gateway_event(query_params={"prefix": "blo"}), {})) == ["s2", "s3"]
+            assert _ids(lambda_handler(create_api_gateway_event(query_params={"prefix": "blood p"}), {})) == ["s3"]
+        assert loader.call_count == 1
+
+    def test_create_is_visible_without_waiting_for_expiry(self, services_table):
+        lambda_handler(create_api_gateway_event(), {})
+
+        body = {"name": "Vaccination", "description": "Routine", "price": 50, "duration": 15, "category": "Preventive"}
+        created = lambda_handler(create_api_gateway_event(method="POST", body=body), {})
+        assert created["statusCode"] == 201
+        new_id = json.loads(created["body"])["id"]
+
+        listed = _ids(lambda_handler(create_api_gateway_event(query_params={"category": "Preventive"}), {}))
+        assert listed == [new_id]
+
+    def test_update_and_delete_invalidate_catalog(self, services_table):
+        lambda_handler(create_api_gateway_event(), {})
+
+        updated = lambda_handler(create_api_gateway_event(method="PUT", path_params={"id": "s2"}, body={"active": False}), {})
+        assert updated["statusCode"] == 200
+        assert _ids(lambda_handler(create_api_gateway_event(query_params={"active": "false"}), {})) == ["s2", "s3"]
+
+        deleted = lambda_handler(create_api_gateway_event(method="DELETE", path_params={"id": "s3"}), {})
+        assert deleted["statusCode"] == 200
+        assert _ids(lambda_handler(create_api_gateway_event(), {})) == ["s1", "s2"]
+        missing = lambda_handler(create_api_gateway_event(path_params={"id": "s3"}), {})
+        assert missing["statusCode"] == 404
+
+    def test_get_service_by_id(self, services_table):
+        response = lambda_handler(create_api_gateway_event(path_params={"id": "s1"}), {})
+
+        assert response["statusCode"] == 200
+        assert json.loads(response["body"])["name"] == "General Consultation"
+
+    def test_listing_is_served_pre_serialized_with_etag(self, services_table):
+        first = lambda_handler(create_api_gateway_event(query_params={"category": "Consultation"}), {})
+        etag = first["headers"]["ETag"]
+
+        with patch("src.handlers.services.unified_service_handler.generate_response") as generate:
+            second = lambda_handler(create_api_gateway_event(query_params={"category": "Consultation"}), {})
+            not_modified = lambda_handler(
+                {**create_api_gateway_event(query_params={"category": "Consultation"}), "headers": {"If-None-Match": etag}}, {}
+            )
+        generate.assert_not_called()
+        assert second["body"] == first["body"]
+        assert not_modified["statusCode"] == 304
+
+        lambda_handler(create_api_gateway_event(method="DELETE", path_params={"id": "s3"}), {})
+        after_delete = lambda_handler(create_api_gateway_event(query_params={"category": "Consultation"}), {})
+        assert _ids(after_delete) == ["s1"]
+        assert after_delete["headers"]["ETag"] != etag
+
+    def test_oversized_catalog_is_not_kept_in_memory(self, services_table, monkeypatch):
+        monkeypatch.setattr(unified_service_handler, "_catalog", ServicesCatalog(max_items=2))
+
+        assert _ids(lambda_handler(create_api_gateway_event(query_params={"category": "Consultation"}), {})) == ["s1", "s3"]
+        assert not unified_service_handler._catalog.is_loaded
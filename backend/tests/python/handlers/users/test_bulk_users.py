@@ -0,0 +1,118 @@
+import json
+import os
+import boto3
+import pytest
+from moto import mock_aws
+from utils import bulk_users, user_directory
+from utils.cache_invalidation import CacheVersionBus, InMemoryVersionStore, set_version_bus
+from src.handlers.users.bulk_users import lambda_handler
+
+TEST_USER_POOL_NAME = "clinnet-user-pool-test-bulk"
+
+def create_api_gateway_event(body=None, query_params=None, content_type="application/json", method="POST"):
+    return {
+        "httpMethod": method,
+        "path": "/api/users/bulk",
+        "body": body if isinstance(body, str) or body is None else json.dumps(body),
+        "queryStringParameters": query_params,
+        "requestContext": {"authorizer": {"claims": {"cognito:username": "testadmin"}}},
+        "headers": {"Origin": "http://localhost:3000", "Content-Type": content_type}
+    }
+
+@pytest.fixture(scope="function")
+def aws_credentials():
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+
+@pytest.fixture(scope="function")
+def mock_aws_resources(aws_credentials):
+    with mock_aws():
+        cognito = boto3.client("cognito-idp", region_name="us-east-1")
+        pool = cognito.create_user_pool(PoolName=TEST_USER_POOL_NAME)
+        yield cognito, pool["UserPool"]["Id"]
+
+@pytest.fixture(scope="function")
+def lambda_environment(monkeypatch, mock_aws_resources):
+    _, user_pool_id = mock_aws_resources
+    monkeypatch.setenv("USER_POOL_ID", user_pool_id)
+    monkeypatch.delenv("DB_HOST", raising=False)
+    monkeypatch.setattr(user_directory, "_directory", user_directory.UserDirectory())
+    monkeypatch.setattr(bulk_users, "_buckets", {category: bulk_users.TokenBucket(1000)
+                                                 for category in bulk_users.COGNITO_QUOTAS})
+    set_version_bus(CacheVersionBus(InMemoryVersionStore(), check_interval=0))
+    yield
+    set_version_bus(None)
+
+def new_user(username, role="doctor"):
+    return {"username": username, "password": "Passw0rd!", "firstName": "Test",
+            "lastName": username.title(), "role": role, "email": f"{username}@example.com"}
+
+class TestBulkUsers:
+
+    def test_bulk_create_then_disable(self, lambda_environment, mock_aws_resources):
+        cognito, user_pool_id = mock_aws_resources
+
+        response = lambda_handler(create_api_gateway_event({
+            "action": "create",
+            "users": [new_user("amy"), new_user("ben", role="receptionist"), {"username": "bad"}]
+        }), None)
+
+        assert response["statusCode"] == 200
+        body = json.loads(response["body"])
+        assert (body["requested"], body["succeeded"], body["failed"]) == (3, 2, 1)
+        assert body["results"][1]["user"]["role"] == "frontdesk"
+        assert "Missing required fields" in body["results"][2]["error"]
+        assert cognito.admin_get_user(UserPoolId=user_pool_id, Username="amy")["UserStatus"] == "CONFIRMED"
+
+        response = lambda_handler(create_api_gateway_event({"action": "disable", "users": ["amy", "ghost"]}), None)
+
+        body = json.loads(response["body"])
+        assert [result["status"] for result in body["results"]] == ["succeeded", "failed"]
+        assert cognito.admin_get_user(UserPoolId=user_pool_id, Username="amy")["Enabled"] is False
+
+    def test_csv_body(self, lambda_environment, mock_aws_resources):
+        cognito, user_pool_id = mock_aws_resources
+        csv_body = ("username,password,firstName,lastName,role,email\n"
+                    "cara,Passw0rd!,Cara,Diaz,doctor,cara@example.com\n"
+                    "\n"
+                    "dan,Passw0rd!,Dan,Eng,admin,dan@example.com\n")
+
+        response = lambda_handler(create_api_gateway_event(csv_body, query_params={"action": "create"},
+                                                           content_type="text/csv"), None)
+
+        body = json.loads(response["body"])
+        assert body["succeeded"] == 2
+        usernames = {user["Username"] for user in cognito.list_users(UserPoolId=user_pool_id)["Users"]}
+        assert usernames == {"cara", "dan"}
+
+    def test_directory_sees_bulk_changes(self, lambda_environment, mock_aws_resources):
+        cognito, user_pool_id = mock_aws_resources
+        directory = user_directory.get_user_directory()
+        directory.ensure_loaded(user_pool_id)
+
+        lambda_handler(create_api_gateway_event({"action": "create", "users": [new_user("eve")]}), None)
+
+        assert directory.get("eve")["lastName"] == "Eve"
+        assert directory.syncs == 1
+
+    def test_validation(self, lambda_environment):
+        response = lambda_handler(create_api_gateway_event({"action": "promote", "users": ["amy"]}), None)
+        assert response["statusCode"] == 400
+
+        response = lambda_handler(create_api_gateway_event({"action": "delete", "users": []}), None)
+        assert response["statusCode"] == 400
+
+        too_many = [f"user{i}" for i in range(bulk_users.MAX_BULK_USERS + 1)]
+        response = lambda_handler(create_api_gateway_event({"action": "delete", "users": too_many}), None)
+        assert response["statusCode"] == 400
+
+        response = lambda_handler(create_api_gateway_event("not json"), None)
+        assert response["statusCode"] == 400
+
+    def test_options_request_for_cors(self, lambda_environment):
+        response = lambda_handler(create_api_gateway_event(method="OPTIONS"), None)
+        assert response["statusCode"] == 200
+        assert "Access-Control-Allow-Origin" in response["headers"]
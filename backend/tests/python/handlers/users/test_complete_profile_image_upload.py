@@ -0,0 +1,102 @@
+import json
+import os
+import boto3
+import pytest
+from moto import mock_aws
+from utils import profile_images
+from utils.cache import LRUCache
+from utils.cache_backends import LocalCacheBackend, SharedCache
+from src.handlers.users.complete_profile_image_upload import lambda_handler
+
+TEST_USER_POOL_NAME = "clinnet-user-pool-test-complete-img"
+TEST_DOCUMENTS_BUCKET_NAME = "clinnet-documents-test-bucket-complete"
+USERNAME = "uploader@example.com"
+USER_SUB = "sub-complete-123"
+JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 64
+
+def create_api_gateway_event(body=None, method="POST"):
+    return {
+        "httpMethod": method,
+        "path": "/api/users/profile-image/complete",
+        "body": json.dumps(body) if body is not None else None,
+        "requestContext": {"authorizer": {"claims": {"cognito:username": USERNAME, "sub": USER_SUB}}},
+        "headers": {"Origin": "http://localhost:3000"}
+    }
+
+@pytest.fixture(scope="function")
+def aws_credentials():
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+
+@pytest.fixture(scope="function")
+def mock_aws_resources(aws_credentials):
+    with mock_aws():
+        cognito = boto3.client("cognito-idp", region_name="us-east-1")
+        pool = cognito.create_user_pool(
+            PoolName=TEST_USER_POOL_NAME,
+            Schema=[{'Name': 'profile_image', 'AttributeDataType': 'String', 'Mutable': True}]
+        )
+        user_pool_id = pool["UserPool"]["Id"]
+        cognito.admin_create_user(UserPoolId=user_pool_id, Username=USERNAME,
+                                  UserAttributes=[{"Name": "email", "Value": USERNAME}])
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket=TEST_DOCUMENTS_BUCKET_NAME)
+        yield cognito, s3, user_pool_id
+
+@pytest.fixture(scope="function")
+def lambda_environment(monkeypatch, mock_aws_resources):
+    _, _, user_pool_id = mock_aws_resources
+    monkeypatch.setenv("USER_POOL_ID", user_pool_id)
+    monkeypatch.setenv("DOCUMENTS_BUCKET", TEST_DOCUMENTS_BUCKET_NAME)
+    monkeypatch.setattr(profile_images, "_image_records", SharedCache("profile-images", backend=LocalCacheBackend()))
+    monkeypatch.setattr(profile_images, "_presigned_urls", LRUCache(default_ttl=60))
+
+class TestCompleteProfileImageUpload:
+
+    def test_verified_upload_becomes_the_profile_image(self, lambda_environment, mock_aws_resources):
+        cognito, s3, user_pool_id = mock_aws_resources
+        key = f"profile-images/{USER_SUB}/new.jpg"
+        s3.put_object(Bucket=TEST_DOCUMENTS_BUCKET_NAME, Key=key, Body=JPEG, ContentType="image/jpeg")
+
+        response = lambda_handler(create_api_gateway_event({"key": key}), None)
+
+        assert response["statusCode"] == 200
+        body = json.loads(response["body"])
+        assert body["imageKey"] == key
+        assert key in body["imageUrl"]
+        attributes = cognito.admin_get_user(UserPoolId=user_pool_id, Username=USERNAME)["UserAttributes"]
+        assert {"Name": "custom:profile_image", "Value": key} in attributes
+        record = profile_images._image_records.get(profile_images._record_key(USERNAME))
+        assert (record["key"], record["contentType"], record["size"]) == (key, "image/jpeg", len(JPEG))
+
+    def test_invalid_upload_is_rejected_and_removed(self, lambda_environment, mock_aws_resources):
+        _, s3, _ = mock_aws_resources
+        key = f"profile-images/{USER_SUB}/fake.jpg"
+        s3.put_object(Bucket=TEST_DOCUMENTS_BUCKET_NAME, Key=key, Body=b"#!/bin/sh", ContentType="image/jpeg")
+
+        response = lambda_handler(create_api_gateway_event({"key": key}), None)
+
+        assert response["statusCode"] == 400
+        assert s3.list_objects_v2(Bucket=TEST_DOCUMENTS_BUCKET_NAME).get("KeyCount") == 0
+
+    def test_other_users_keys_are_refused(self, lambda_environment):
+        response = lambda_handler(create_api_gateway_event({"key": "profile-images/someone-else/a.jpg"}), None)
+        assert response["statusCode"] == 400
+
+    def test_missing_upload(self, lambda_environment):
+        response = lambda_handler(create_api_gateway_event({"key": f"profile-images/{USER_SUB}/never.jpg"}), None)
+        assert response["statusCode"] == 404
+
+    def test_renditions_the_trigger_already_stored_are_recorded(self, lambda_environment, mock_aws_resources):
+        _, s3, _ = mock_aws_resources
+        key = f"profile-images/{USER_SUB}/new.jpg"
+        s3.put_object(Bucket=TEST_DOCUMENTS_BUCKET_NAME, Key=key, Body=JPEG, ContentType="image/jpeg")
+        for image_format in profile_images.AVATAR_FORMATS:
+            s3.put_object(Bucket=TEST_DOCUMENTS_BUCKET_NAME, Key=profile_images.avatar_key(key, 96, image_format), Body=b"x")
+
+        assert lambda_handler(create_api_gateway_event({"key": key}), None)["statusCode"] == 200
+
+        assert profile_images._image_records.get(profile_images._record_key(USERNAME))["avatars"] == [96]
@@ -0,0 +1,53 @@
+import json
+import os
+import boto3
+import pytest
+from moto import mock_aws
+from src.handlers.users.create_profile_image_upload import lambda_handler
+
+TEST_DOCUMENTS_BUCKET_NAME = "clinnet-documents-test-bucket-upload-url"
+
+def create_api_gateway_event(body=None, sub="sub-upload-url", method="POST"):
+    return {
+        "httpMethod": method,
+        "path": "/api/users/profile-image/upload-url",
+        "body": json.dumps(body) if body is not None else None,
+        "requestContext": {"authorizer": {"claims": {"cognito:username": "uploader", "sub": sub}}},
+        "headers": {"Origin": "http://localhost:3000"}
+    }
+
+@pytest.fixture(scope="function")
+def aws_credentials():
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+
+@pytest.fixture(scope="function")
+def lambda_environment(monkeypatch, aws_credentials):
+    with mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=TEST_DOCUMENTS_BUCKET_NAME)
+        monkeypatch.setenv("DOCUMENTS_BUCKET", TEST_DOCUMENTS_BUCKET_NAME)
+        yield
+
+class TestCreateProfileImageUpload:
+
+    def test_returns_presigned_post_for_the_users_prefix(self, lambda_environment):
+        response = lambda_handler(create_api_gateway_event({"contentType": "image/jpeg"}), None)
+
+        assert response["statusCode"] == 200
+        body = json.loads(response["body"])
+        assert body["key"].startswith("profile-images/sub-upload-url/")
+        assert body["key"].endswith(".jpg")
+        assert body["fields"]["Content-Type"] == "image/jpeg"
+        assert TEST_DOCUMENTS_BUCKET_NAME in body["url"]
+        assert body["maxBytes"] > 0
+
+    def test_rejects_non_image_content_types(self, lambda_environment):
+        response = lambda_handler(create_api_gateway_event({"contentType": "application/pdf"}), None)
+        assert response["statusCode"] == 400
+
+    def test_requires_user_identity(self, lambda_environment):
+        response = lambda_handler(create_api_gateway_event({"contentType": "image/png"}, sub=None), None)
+        assert response["statusCode"] == 401
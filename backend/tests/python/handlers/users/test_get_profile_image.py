@@ -6,11 +6,14 @@ from moto import mock_aws
 from unittest.mock import patch, MagicMock
 from src.handlers.users.get_profile_image import lambda_handler
 from botocore.exceptions import ClientError
+from utils import profile_images
+from utils.cache import LRUCache
+from utils.cache_backends import LocalCacheBackend, SharedCache
 
 TEST_USER_POOL_NAME = "clinnet-user-pool-test-get-img"
 TEST_DOCUMENTS_BUCKET_NAME = "clinnet-documents-test-bucket-get"
 
-def create_api_gateway_event(username_claim=None, sub_claim=None, path_params=None):
+def create_api_gateway_event(username_claim=None, sub_claim=None, path_params=None, query_params=None):
     """Helper to create a mock API Gateway event."""
     event = {
         'httpMethod': 'GET',
@@ -24,7 +27,8 @@ def create_api_gateway_event(username_claim=None, sub_claim=None, path_params=No
             }
         },
         'headers': {},
-        'pathParameters': path_params or {}
+        'pathParameters': path_params or {},
+        'queryStringParameters': query_params
     }
     return event
 
@@ -60,6 +64,9 @@ def s3_bucket_get_img(aws_credentials):
 def lambda_environment_get_img(monkeypatch, cognito_user_pool_and_id_get_img, s3_bucket_get_img):
     monkeypatch.setenv("USER_POOL_ID", cognito_user_pool_and_id_get_img)
     monkeypatch.setenv("DOCUMENTS_BUCKET", s3_bucket_get_img)
+    # Every test starts with empty image record and URL caches
+    monkeypatch.setattr(profile_images, "_image_records", SharedCache("profile-images", backend=LocalCacheBackend()))
+    monkeypatch.setattr(profile_images, "_presigned_urls", LRUCache(default_ttl=60))
 
 @pytest.fixture(scope="function")
 def test_user_with_image(cognito_user_pool_and_id_get_img, s3_bucket_get_img):
@@ -120,7 +127,7 @@ class TestGetProfileImage:
         assert body['hasImage'] is False
         assert "No profile image set" in body['message']
 
-    def test_get_profile_image_s3_object_not_found(self, cognito_user_pool_and_id_get_img, s3_bucket_get_img, lambda_environment_get_img):
+    def test_get_profile_image_does_not_probe_s3(self, cognito_user_pool_and_id_get_img, s3_bucket_get_img, lambda_environment_get_img):
         cognito_client = boto3.client("cognito-idp", region_name="us-east-1")
         username_s3_missing = "user.s3missing@example.com"
         user_sub_s3_missing = "sub-s3missing-789"
@@ -138,8 +145,49 @@ class TestGetProfileImage:
         response = lambda_handler(event, {})
         assert response["statusCode"] == 200
         body = json.loads(response['body'])
-        assert body['hasImage'] is False
-        assert "Profile image not found in storage" in body['message']
+        # The recorded key is trusted; a missing object fails to load in the browser
+        assert body['hasImage'] is True
+        assert body['imageKey'] == s3_key_missing
+
+    def test_repeat_requests_are_served_from_cache(self, test_user_with_image, lambda_environment_get_img):
+        username, user_sub, s3_key, image_content = test_user_with_image
+        event = create_api_gateway_event(username_claim=username, sub_claim=user_sub)
+        first = json.loads(lambda_handler(event, {})["body"])
+
+        with patch('boto3.client') as mock_boto3_client:
+            second = json.loads(lambda_handler(event, {})["body"])
+
+        mock_boto3_client.assert_not_called()
+        # The same URL is handed out so browsers can cache the image
+        assert second["imageUrl"] == first["imageUrl"]
+
+    def test_size_returns_the_matching_avatar(self, test_user_with_image, s3_bucket_get_img, lambda_environment_get_img):
+        username, user_sub, s3_key, image_content = test_user_with_image
+        s3_client = boto3.client("s3", region_name="us-east-1")
+        for avatar_key in profile_images.avatar_keys(s3_key):
+            s3_client.put_object(Bucket=s3_bucket_get_img, Key=avatar_key, Body=b"avatar")
+
+        event = create_api_gateway_event(username_claim=username, sub_claim=user_sub,
+                                         query_params={"size": "90", "format": "jpeg"})
+        body = json.loads(lambda_handler(event, {})["body"])
+
+        assert body["avatarSize"] == 96
+        assert f"profile-images/{user_sub}/avatars/photo-96.jpg" in body["imageUrl"]
+        assert body["imageKey"] == s3_key
+
+    def test_size_falls_back_to_the_original_without_avatars(self, test_user_with_image, lambda_environment_get_img):
+        username, user_sub, s3_key, image_content = test_user_with_image
+        event = create_api_gateway_event(username_claim=username, sub_claim=user_sub, query_params={"size": "48"})
+
+        body = json.loads(lambda_handler(event, {})["body"])
+
+        assert "avatarSize" not in body
+        assert s3_key in body["imageUrl"]
+
+    def test_invalid_size(self, test_user_with_image, lambda_environment_get_img):
+        username, user_sub, _, _ = test_user_with_image
+        event = create_api_gateway_event(username_claim=username, sub_claim=user_sub, query_params={"size": "-1"})
+        assert lambda_handler(event, {})["statusCode"] == 400
 
     def test_get_profile_image_cognito_get_user_failure(self, monkeypatch, lambda_environment_get_img):
         username_cognito_fail = "cognitofail.getimg@example.com"
@@ -0,0 +1,109 @@
+import json
+import os
+import boto3
+import pytest
+from moto import mock_aws
+from utils import profile_images
+from utils.cache import LRUCache
+from utils.cache_backends import LocalCacheBackend, SharedCache
+from src.handlers.users.get_profile_images import lambda_handler
+
+TEST_USER_POOL_NAME = "clinnet-user-pool-test-get-imgs"
+TEST_DOCUMENTS_BUCKET_NAME = "clinnet-documents-test-bucket-get-imgs"
+
+def create_api_gateway_event(body=None, method="POST"):
+    return {
+        "httpMethod": method,
+        "path": "/api/users/profile-images",
+        "body": body if isinstance(body, str) or body is None else json.dumps(body),
+        "requestContext": {"authorizer": {"claims": {"cognito:username": "testadmin"}}},
+        "headers": {"Origin": "http://localhost:3000"}
+    }
+
+@pytest.fixture(scope="function")
+def aws_credentials():
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+
+@pytest.fixture(scope="function")
+def mock_aws_resources(aws_credentials):
+    with mock_aws():
+        cognito = boto3.client("cognito-idp", region_name="us-east-1")
+        pool = cognito.create_user_pool(
+            PoolName=TEST_USER_POOL_NAME,
+            Schema=[{'Name': 'profile_image', 'AttributeDataType': 'String', 'Mutable': True}]
+        )
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=TEST_DOCUMENTS_BUCKET_NAME)
+        yield cognito, pool["UserPool"]["Id"]
+
+@pytest.fixture(scope="function")
+def lambda_environment(monkeypatch, mock_aws_resources):
+    _, user_pool_id = mock_aws_resources
+    monkeypatch.setenv("USER_POOL_ID", user_pool_id)
+    monkeypatch.setenv("DOCUMENTS_BUCKET", TEST_DOCUMENTS_BUCKET_NAME)
+    monkeypatch.setattr(profile_images, "_image_records", SharedCache("profile-images", backend=LocalCacheBackend()))
+    monkeypatch.setattr(profile_images, "_presigned_urls", LRUCache(default_ttl=60))
+
+def create_user(cognito, user_pool_id, username, image_key=None):
+    attributes = [{"Name": "email", "Value": f"{username}@example.com"}]
+    if image_key:
+        attributes.append({"Name": "custom:profile_image", "Value": image_key})
+    cognito.admin_create_user(UserPoolId=user_pool_id, Username=username, UserAttributes=attributes)
+
+class TestGetProfileImages:
+
+    def test_resolves_many_users_in_one_request(self, lambda_environment, mock_aws_resources):
+        cognito, user_pool_id = mock_aws_resources
+        create_user(cognito, user_pool_id, "amy", "profile-images/sub-amy/a.jpg")
+        create_user(cognito, user_pool_id, "ben")
+
+        response = lambda_handler(create_api_gateway_event({"usernames": ["amy", "ben", "ghost", "amy"]}), None)
+
+        assert response["statusCode"] == 200
+        body = json.loads(response["body"])
+        assert set(body["images"]) == {"amy", "ben"}
+        assert body["images"]["amy"]["hasImage"] is True
+        assert "profile-images/sub-amy/a.jpg" in body["images"]["amy"]["imageUrl"]
+        assert body["images"]["ben"] == {"hasImage": False}
+        assert body["notFound"] == ["ghost"]
+
+    def test_uploaded_images_need_no_cognito_lookup(self, lambda_environment, mock_aws_resources):
+        cognito, user_pool_id = mock_aws_resources
+        create_user(cognito, user_pool_id, "cara")
+        profile_images.record_profile_image("cara", "profile-images/sub-cara/new.png", contentType="image/png")
+
+        body = json.loads(lambda_handler(create_api_gateway_event({"usernames": ["cara"]}), None)["body"])
+
+        assert body["images"]["cara"]["imageKey"] == "profile-images/sub-cara/new.png"
+
+    def test_avatar_size_selects_stored_renditions(self, lambda_environment, mock_aws_resources):
+        cognito, user_pool_id = mock_aws_resources
+        key = "profile-images/sub-dan/photo.jpg"
+        create_user(cognito, user_pool_id, "dan", key)
+        s3 = boto3.client("s3", region_name="us-east-1")
+        for avatar_key in profile_images.avatar_keys(key):
+            s3.put_object(Bucket=TEST_DOCUMENTS_BUCKET_NAME, Key=avatar_key, Body=b"avatar")
+
+        body = json.loads(lambda_handler(create_api_gateway_event({"usernames": ["dan"], "size": 40}), None)["body"])
+
+        assert body["images"]["dan"]["avatarSize"] == 48
+        assert "profile-images/sub-dan/avatars/photo-48.webp" in body["images"]["dan"]["imageUrl"]
+        assert body["images"]["dan"]["imageKey"] == key
+
+    def test_validation(self, lambda_environment):
+        assert lambda_handler(create_api_gateway_event({"usernames": []}), None)["statusCode"] == 400
+        assert lambda_handler(create_api_gateway_event({"usernames": [""]}), None)["statusCode"] == 400
+        assert lambda_handler(create_api_gateway_event("not json"), None)["statusCode"] == 400
+        assert lambda_handler(create_api_gateway_event({"usernames": ["amy"], "size": "big"}), None)["statusCode"] == 400
+        assert lambda_handler(create_api_gateway_event({"usernames": ["amy"], "format": "bmp"}), None)["statusCode"] == 400
+
+        too_many = [f"user{i}" for i in range(profile_images.MAX_BATCH_USERNAMES + 1)]
+        assert lambda_handler(create_api_gateway_event({"usernames": too_many}), None)["statusCode"] == 400
+
+    def test_options_request_for_cors(self, lambda_environment):
+        response = lambda_handler(create_api_gateway_event(method="OPTIONS"), None)
+        assert response["statusCode"] == 200
+        assert "Access-Control-Allow-Origin" in response["headers"]
@@ -5,6 +5,8 @@ import pytest
 from moto import mock_aws
 from src.handlers.users.list_users import lambda_handler
 from unittest.mock import patch
+from utils import user_directory
+from utils.cache_invalidation import CacheVersionBus, InMemoryVersionStore, set_version_bus
 
 # Define resource names for tests
 TEST_USER_POOL_NAME = "clinnet-user-pool-test-list"
@@ -42,6 +44,22 @@ def lambda_environment(monkeypatch, mock_aws_resources):
     _, user_pool_id = mock_aws_resources
     monkeypatch.setenv("USER_POOL_ID", user_pool_id)
     monkeypatch.setenv("ENVIRONMENT", "test")
+    # Every test starts from an empty directory so it syncs from its own pool
+    monkeypatch.setattr(user_directory, "_directory", user_directory.UserDirectory())
+    set_version_bus(CacheVersionBus(InMemoryVersionStore(), check_interval=0))
+    yield
+    set_version_bus(None)
+
+def create_user(cognito, user_pool_id, username, role="doctor", given_name=None):
+    attributes = [{"Name": "email", "Value": f"{username}@example.com"}]
+    if given_name:
+        attributes.append({"Name": "given_name", "Value": given_name})
+    cognito.admin_create_user(
+        UserPoolId=user_pool_id,
+        Username=username,
+        UserAttributes=attributes + [{"Name": "custom:role", "Value": role}],
+        MessageAction='SUPPRESS'
+    )
 
 class TestListUsers:
     def test_list_users_empty_pool(self, lambda_environment):
@@ -79,37 +97,93 @@ class TestListUsers:
         assert "user1@example.com" in retrieved_usernames
         assert "user2@example.com" in retrieved_usernames
 
-    @patch('src.handlers.users.list_users.boto3.client')
+    @patch('utils.user_directory.boto3.client')
     def test_list_users_pagination(self, mock_boto3_client, lambda_environment, mock_aws_resources):
-        # Setup mock Cognito client to return paginated results
+        # The directory reads every Cognito page once, then pages from memory
         mock_cognito = mock_boto3_client.return_value
         
         users_page1 = [{'Username': 'user1@example.com', 'Attributes': [], 'Enabled': True, 'UserStatus': 'CONFIRMED'}]
         users_page2 = [{'Username': 'user2@example.com', 'Attributes': [], 'Enabled': True, 'UserStatus': 'CONFIRMED'}]
 
-        # Configure side_effect to simulate pagination
         mock_cognito.list_users.side_effect = [
             {'Users': users_page1, 'PaginationToken': 'next-token-123'},
             {'Users': users_page2, 'PaginationToken': None}
         ]
 
         # First call (no token)
-        event1 = create_api_gateway_event()
+        event1 = create_api_gateway_event(query_params={"limit": "1"})
         response1 = lambda_handler(event1, {})
         assert response1["statusCode"] == 200
         body1 = json.loads(response1["body"])
         assert len(body1["users"]) == 1
         assert body1["users"][0]["username"] == "user1@example.com"
-        assert body1["nextToken"] == "next-token-123"
+        assert body1["total"] == 2
+        assert body1["nextToken"] == "1"
 
-        # Second call (with token)
-        event2 = create_api_gateway_event(query_params={"nextToken": "next-token-123"})
+        # Second call (with token) is served without calling Cognito again
+        event2 = create_api_gateway_event(query_params={"limit": "1", "nextToken": body1["nextToken"]})
         response2 = lambda_handler(event2, {})
         assert response2["statusCode"] == 200
         body2 = json.loads(response2["body"])
         assert len(body2["users"]) == 1
         assert body2["users"][0]["username"] == "user2@example.com"
         assert body2["nextToken"] is None
+        assert mock_cognito.list_users.call_count == 2
+
+    def test_list_users_filters_and_sorts(self, lambda_environment, mock_aws_resources):
+        cognito, user_pool_id = mock_aws_resources
+        create_user(cognito, user_pool_id, "amy", role="doctor", given_name="Zoe")
+        create_user(cognito, user_pool_id, "ben", role="doctor", given_name="Adam")
+        create_user(cognito, user_pool_id, "cat", role="nurse", given_name="Zara")
+
+        response = lambda_handler(create_api_gateway_event(query_params={"role": "doctor", "sortBy": "firstName"}), {})
+        body = json.loads(response["body"])
+        assert [user["username"] for user in body["users"]] == ["ben", "amy"]
+        assert body["users"][0]["role"] == "doctor"
+
+        response = lambda_handler(create_api_gateway_event(query_params={"search": "za"}), {})
+        body = json.loads(response["body"])
+        assert [user["username"] for user in body["users"]] == ["cat"]
+
+    def test_list_users_sees_changes_from_admin_handlers(self, lambda_environment, mock_aws_resources):
+        cognito, user_pool_id = mock_aws_resources
+        create_user(cognito, user_pool_id, "amy")
+        assert json.loads(lambda_handler(create_api_gateway_event(), {})["body"])["total"] == 1
+
+        cognito.admin_disable_user(UserPoolId=user_pool_id, Username="amy")
+        user_directory.record_user_change("amy", enabled=False)
+
+        body = json.loads(lambda_handler(create_api_gateway_event(query_params={"enabled": "false"}), {})["body"])
+        assert [user["username"] for user in body["users"]] == ["amy"]
+
+    def test_list_users_rejects_invalid_parameters(self, lambda_environment):
+        response = lambda_handler(create_api_gateway_event(query_params={"sortBy": "password"}), {})
+        assert response["statusCode"] == 400
+
+        response = lambda_handler(create_api_gateway_event(query_params={"limit": "abc"}), {})
+        assert response["statusCode"] == 400
+
+    @patch('src.handlers.users.list_users.get_users_paginated')
+    def test_list_users_from_aurora(self, mock_get_users_paginated, lambda_environment):
+        mock_get_users_paginated.return_value = ([{
+            'id': 'sub-1', 'username': 'amy', 'email': 'amy@example.com', 'first_name': 'Amy',
+            'last_name': 'Lee', 'role': 'receptionist', 'phone': None, 'is_active': 1,
+            'user_status': 'CONFIRMED', 'created_at': None, 'updated_at': None
+        }], 3)
+
+        event = create_api_gateway_event(query_params={"source": "aurora", "role": "frontdesk", "limit": "1"})
+        response = lambda_handler(event, {})
+
+        assert response["statusCode"] == 200
+        body = json.loads(response["body"])
+        assert body["users"][0]["username"] == "amy"
+        assert body["users"][0]["role"] == "frontdesk"
+        assert body["users"][0]["enabled"] is True
+        assert body["total"] == 3
+        assert body["nextToken"] == "1"
+        kwargs = mock_get_users_paginated.call_args.kwargs
+        assert kwargs["role"] == "receptionist"
+        assert (kwargs["limit"], kwargs["offset"]) == (1, 0)
 
     @patch('boto3.client')
     def test_cognito_list_users_failure(self, mock_boto3_client, lambda_environment):
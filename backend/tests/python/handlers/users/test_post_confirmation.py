@@ -0,0 +1,44 @@
+from unittest.mock import patch
+
+from src.handlers.users.post_confirmation import lambda_handler
+
+def create_trigger_event():
+    return {
+        "triggerSource": "PostConfirmation_ConfirmSignUp",
+        "userPoolId": "us-east-1_test",
+        "userName": "jane@example.com",
+        "request": {
+            "userAttributes": {
+                "sub": "sub-jane",
+                "email": "jane@example.com",
+                "given_name": "Jane",
+                "family_name": "Doe",
+                "custom:role": "doctor"
+            }
+        },
+        "response": {}
+    }
+
+class TestPostConfirmation:
+
+    @patch('src.handlers.users.post_confirmation.record_user_change')
+    @patch('src.handlers.users.post_confirmation.sync_user_to_aurora')
+    def test_confirmed_user_is_synced(self, mock_sync, mock_record):
+        event = create_trigger_event()
+
+        assert lambda_handler(event, {}) is event
+
+        username, = mock_sync.call_args[0]
+        user = mock_sync.call_args.kwargs["user"]
+        assert username == "jane@example.com"
+        assert user["sub"] == "sub-jane"
+        assert user["role"] == "doctor"
+        assert user["enabled"] is True
+        mock_record.assert_called_once_with("jane@example.com", user=user)
+
+    @patch('src.handlers.users.post_confirmation.record_user_change')
+    @patch('src.handlers.users.post_confirmation.sync_user_to_aurora', side_effect=RuntimeError("boom"))
+    def test_failure_does_not_block_sign_up(self, mock_sync, mock_record):
+        event = create_trigger_event()
+
+        assert lambda_handler(event, {}) is event
@@ -0,0 +1,80 @@
+import io
+import os
+import boto3
+import pytest
+from moto import mock_aws
+from PIL import Image
+from utils import profile_images
+from utils.cache import LRUCache
+from utils.cache_backends import LocalCacheBackend, SharedCache
+from utils.cache_invalidation import CacheVersionBus, set_version_bus
+from src.handlers.users.render_profile_avatars import image_owner_sub, lambda_handler
+
+TEST_USER_POOL_NAME = "clinnet-user-pool-test-render-avatars"
+TEST_DOCUMENTS_BUCKET_NAME = "clinnet-documents-test-bucket-avatars"
+USERNAME = "uploader@example.com"
+
+def make_jpeg(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (30, 120, 200)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+def s3_event(*keys):
+    return {'Records': [{'s3': {'bucket': {'name': TEST_DOCUMENTS_BUCKET_NAME}, 'object': {'key': key}}} for key in keys]}
+
+@pytest.fixture(scope="function")
+def aws_credentials():
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+
+@pytest.fixture(scope="function")
+def mock_aws_resources(aws_credentials, monkeypatch):
+    monkeypatch.setattr(profile_images, "_image_records", SharedCache("profile-images", backend=LocalCacheBackend()))
+    monkeypatch.setattr(profile_images, "_presigned_urls", LRUCache(default_ttl=60))
+    set_version_bus(CacheVersionBus(check_interval=0))
+    with mock_aws():
+        cognito = boto3.client("cognito-idp", region_name="us-east-1")
+        user_pool_id = cognito.create_user_pool(PoolName=TEST_USER_POOL_NAME)["UserPool"]["Id"]
+        user = cognito.admin_create_user(UserPoolId=user_pool_id, Username=USERNAME,
+                                         UserAttributes=[{"Name": "email", "Value": USERNAME}])["User"]
+        sub = next(attr["Value"] for attr in user["Attributes"] if attr["Name"] == "sub")
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket=TEST_DOCUMENTS_BUCKET_NAME)
+        monkeypatch.setenv("USER_POOL_ID", user_pool_id)
+        yield s3, sub
+    set_version_bus(None)
+
+class TestRenderProfileAvatars:
+
+    def test_renders_avatars_and_refreshes_the_cached_record(self, mock_aws_resources):
+        s3, sub = mock_aws_resources
+        key = f"profile-images/{sub}/new.jpg"
+        s3.put_object(Bucket=TEST_DOCUMENTS_BUCKET_NAME, Key=key, Body=make_jpeg(400, 300))
+        profile_images.record_profile_image(USERNAME, key)
+        stale_key = profile_images._record_key(USERNAME)
+
+        result = lambda_handler(s3_event(key), None)
+
+        assert result == {'rendered': [key], 'skipped': []}
+        stored = {obj["Key"] for obj in s3.list_objects_v2(Bucket=TEST_DOCUMENTS_BUCKET_NAME)["Contents"]}
+        assert set(profile_images.avatar_keys(key)) <= stored
+        # Readers move to a new version and refill the record with the renditions
+        assert profile_images._record_key(USERNAME) != stale_key
+
+    def test_renditions_and_missing_objects_are_skipped(self, mock_aws_resources):
+        s3, sub = mock_aws_resources
+        avatar = profile_images.avatar_key(f"profile-images/{sub}/new.jpg", 48, "webp")
+        s3.put_object(Bucket=TEST_DOCUMENTS_BUCKET_NAME, Key=avatar, Body=b"x")
+
+        result = lambda_handler(s3_event(avatar, f"profile-images/{sub}/gone.jpg"), None)
+
+        assert result == {'rendered': [], 'skipped': [avatar, f"profile-images/{sub}/gone.jpg"]}
+        assert s3.list_objects_v2(Bucket=TEST_DOCUMENTS_BUCKET_NAME)["KeyCount"] == 1
+
+    def test_image_owner_sub(self):
+        assert image_owner_sub("profile-images/sub-1/abc.jpg") == "sub-1"
+        assert image_owner_sub("profile-images/sub-1/avatars/abc-48.webp") is None
+        assert image_owner_sub("reports/sub-1/abc.jpg") is None
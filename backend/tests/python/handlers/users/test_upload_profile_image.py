@@ -6,13 +6,21 @@ from moto import mock_aws
 from src.handlers.users.upload_profile_image import lambda_handler
 import base64
 import re
+import io
 from unittest.mock import patch
+from PIL import Image
+from utils import profile_images
 
 # Define resource names for tests
 TEST_USER_POOL_NAME = "clinnet-user-pool-test-uploadimg"
 TEST_DOCUMENTS_BUCKET_NAME = "clinnet-documents-test-bucket"
 
 # Helper function to create a mock API Gateway event
+def make_png(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
 def create_api_gateway_event(method="POST", body=None, username_claim="testuser.upload", sub_claim="test-sub-upload-123"):
     event = {
         "httpMethod": method,
@@ -137,6 +145,20 @@ class TestUploadProfileImage:
         assert response["statusCode"] == 400
         assert "Invalid image format" in json.loads(response["body"])["message"]
 
+    def test_upload_leaves_avatar_renditions_to_the_s3_trigger(self, lambda_environment, mock_aws_resources, test_user):
+        s3_client, _, _ = mock_aws_resources
+        username, user_sub = test_user
+        png = base64.b64encode(make_png(600, 400)).decode('utf-8')
+        event = create_api_gateway_event(body={"image": f"data:image/png;base64,{png}"}, username_claim=username, sub_claim=user_sub)
+
+        response = lambda_handler(event, {})
+
+        s3_key = json.loads(response["body"])["imageKey"]
+        listed = s3_client.list_objects_v2(Bucket=TEST_DOCUMENTS_BUCKET_NAME, Prefix=f"profile-images/{user_sub}/")
+        assert [obj["Key"] for obj in listed["Contents"]] == [s3_key]
+        # Readers get the original until the trigger records the renditions
+        assert "avatars" not in profile_images._image_records.get(profile_images._record_key(username))
+
     @patch('boto3.client')
     def test_s3_upload_failure(self, mock_boto3_client, lambda_environment, test_user):
         # Configure the mock to raise an error only for S3's put_object
@@ -193,5 +215,6 @@ class TestUploadProfileImage:
         # (This is important for potential cleanup/reconciliation logic)
         s3_list = s3_client.list_objects_v2(Bucket=TEST_DOCUMENTS_BUCKET_NAME, Prefix=f"profile-images/{user_sub}/")
         assert 'Contents' in s3_list, "S3 object should have been created even if Cognito update failed"
-        assert len(s3_list['Contents']) == 1, "Expected one object in S3"
-        assert s3_list['Contents'][0]['Key'].endswith('.gif')
\ No newline at end of file
+        originals = [obj['Key'] for obj in s3_list['Contents'] if '/avatars/' not in obj['Key']]
+        assert len(originals) == 1, "Expected one original image in S3"
+        assert originals[0].endswith('.gif')
\ No newline at end of file
@@ -0,0 +1,78 @@
+import pytest
+from datetime import date, datetime
+from unittest.mock import MagicMock, patch
+from utils import agenda
+from utils.availability import invalidate_doctor_day
+from utils.cache_invalidation import CacheVersionBus, InMemoryVersionStore, set_version_bus
+
+def _row(appointment_id, doctor_id, day):
+    return {'id': appointment_id, 'doctor_id': doctor_id, 'appointment_date': day,
+            'start_at': datetime.combine(day, datetime.min.time()), 'patient_name': 'Jane Doe'}
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    agenda.AGENDA_CACHE.clear()
+    set_version_bus(CacheVersionBus(InMemoryVersionStore(), check_interval=0))
+    yield
+    set_version_bus(None)
+
+class TestAgendaCache:
+
+    @patch.object(agenda, 'get_appointments_by_date_range')
+    def test_agenda_is_cached_until_the_doctor_day_changes(self, mock_range):
+        mock_range.return_value = [_row('appt-1', 'doc-1', date(2030, 5, 6))]
+
+        first = agenda.get_agenda('doc-1', '2030-05-06')
+        second = agenda.get_agenda('doc-1', '2030-05-06')
+
+        assert first == second == [{'id': 'appt-1', 'doctor_id': 'doc-1', 'appointment_date': '2030-05-06',
+                                    'start_at': '2030-05-06 00:00:00', 'patient_name': 'Jane Doe'}]
+        assert mock_range.call_count == 1
+
+        invalidate_doctor_day('doc-1', '2030-05-06')
+        agenda.get_agenda('doc-1', '2030-05-06')
+        assert mock_range.call_count == 2
+
+        # Other doctor-days are unaffected
+        invalidate_doctor_day('doc-2', '2030-05-06')
+        agenda.get_agenda('doc-1', '2030-05-06')
+        assert mock_range.call_count == 2
+
+    @patch.object(agenda, 'get_appointments_by_date_range')
+    def test_prewarm_loads_every_doctor_day_with_one_query(self, mock_range):
+        today, tomorrow = date(2030, 5, 6), date(2030, 5, 7)
+        mock_range.return_value = [_row('appt-1', 'doc-1', today), _row('appt-2', 'doc-2', tomorrow)]
+
+        count = agenda.prewarm_agendas(days=[today, tomorrow], doctor_ids=['doc-1', 'doc-2'])
+
+        assert count == 4
+        mock_range.assert_called_once_with('2030-05-06', '2030-05-07', doctor_ids=['doc-1', 'doc-2'])
+        assert [row['id'] for row in agenda.get_agenda_range('doc-2', today, tomorrow)] == ['appt-2']
+        assert agenda.get_agenda('doc-1', tomorrow) == []
+        assert mock_range.call_count == 1
+
+    @patch.object(agenda, 'get_active_doctor_ids', return_value=[f'doc-{i}' for i in range(40)])
+    @patch.object(agenda, 'get_appointments_by_date_range', return_value=[])
+    def test_prewarm_runs_once_per_container_with_batched_versions(self, mock_range, mock_doctors, monkeypatch):
+        monkeypatch.setenv('DB_HOST', 'db')
+        monkeypatch.setenv('AGENDA_PREWARM', 'true')
+        monkeypatch.setattr(agenda, '_prewarmed', False)
+        store = MagicMock(wraps=InMemoryVersionStore())
+        set_version_bus(CacheVersionBus(store, check_interval=60))
+
+        assert agenda.prewarm_once() == 80
+        assert agenda.prewarm_once() == 0
+
+        mock_range.assert_called_once()
+        store.get_many.assert_called_once()
+        store.get.assert_not_called()
+        # Served from the prewarmed entries without another version read
+        assert agenda.get_agenda('doc-3', date.today()) == []
+        mock_range.assert_called_once()
+        store.get.assert_not_called()
+
+    def test_prewarm_is_opt_in(self, monkeypatch):
+        monkeypatch.setenv('DB_HOST', 'db')
+        monkeypatch.delenv('AGENDA_PREWARM', raising=False)
+        monkeypatch.setattr(agenda, '_prewarmed', False)
+        assert agenda.prewarm_once() == 0
@@ -0,0 +1,196 @@
+import random
+from datetime import date, datetime, timedelta
+from unittest.mock import patch
+from utils import availability
+from utils.availability import AvailabilityEngine, IntervalSet, appointment_interval, busy_bitmap, fitting_starts
+
+def _at(hour, minute=0):
+    return datetime(2030, 5, 6, hour, minute)
+
+class FakeAppointments:
+    """execute_query stand-in evaluating the span range query over in-memory appointments."""
+
+    def __init__(self, rows):
+        self.rows = []
+        for row in rows:
+            start, end = appointment_interval(row['appointment_date'], row['appointment_time'], row['duration_minutes'])
+            self.rows.append({**row, 'start_at': start, 'end_at': end})
+        self.queries = []
+
+    def __call__(self, query, params):
+        self.queries.append((query, params))
+        column = 'doctor_id' if 'doctor_id = %s' in query else 'patient_id'
+        owner_id, lookback, window_end, window_start = params
+        lookback, window_end, window_start = (datetime.fromisoformat(v) for v in (lookback, window_end, window_start))
+        return [
+            {'id': row['id'], 'start_at': row['start_at'], 'end_at': row['end_at']}
+            for row in self.rows
+            if row[column] == owner_id
+            and lookback <= row['start_at'] < window_end
+            and row['end_at'] > window_start
+            and row.get('status', 'scheduled') not in ('cancelled', 'no_show')
+        ]
+
+class TestIntervalSet:
+
+    def test_overlapping_respects_half_open_bounds(self):
+        intervals = IntervalSet([
+            (_at(9), _at(9, 30), 'a'),
+            (_at(10), _at(11), 'b'),
+            (_at(8), _at(12), 'long'),
+        ])
+
+        assert [item[2] for item in intervals.overlapping(_at(9, 30), _at(10))] == ['long']
+        assert [item[2] for item in intervals.overlapping(_at(9, 15), _at(10, 15))] == ['long', 'a', 'b']
+        assert intervals.is_free(_at(12), _at(13))
+        assert not intervals.is_free(_at(11, 59), _at(12, 30))
+
+    def test_add_keeps_order(self):
+        intervals = IntervalSet()
+        intervals.add(_at(14), _at(15), 'late')
+        intervals.add(_at(9), _at(10), 'early')
+
+        assert [item[2] for item in intervals] == ['early', 'late']
+        assert not intervals.is_free(_at(9, 30), _at(9, 45))
+
+class TestAvailabilityEngine:
+
+    ROWS = [
+        {'id': 'appt-1', 'doctor_id': 'doc-1', 'patient_id': 'pat-1', 'appointment_date': '2030-05-06',
+         'appointment_time': timedelta(hours=10), 'duration_minutes': 30},
+        {'id': 'appt-2', 'doctor_id': 'doc-2', 'patient_id': 'pat-2', 'appointment_date': '2030-05-06',
+         'appointment_time': '11:00:00', 'duration_minutes': 60},
+        {'id': 'appt-3', 'doctor_id': 'doc-1', 'patient_id': 'pat-3', 'appointment_date': '2030-05-05',
+         'appointment_time': '23:45:00', 'duration_minutes': 30},
+        {'id': 'appt-4', 'doctor_id': 'doc-1', 'patient_id': 'pat-4', 'appointment_date': '2030-05-06',
+         'appointment_time': '13:00:00', 'duration_minutes': 30, 'status': 'cancelled'},
+    ]
+
+    def test_doctor_and_patient_conflicts(self):
+        query = FakeAppointments(self.ROWS)
+        engine = AvailabilityEngine(query)
+
+        conflicts = engine.find_conflicts('pat-2', 'doc-1', '2030-05-06', '10:15:00', 60)
+
+        assert {(c['appointment_id'], c['conflicts_with']) for c in conflicts} == {('appt-1', 'doctor'), ('appt-2', 'patient')}
+        assert len(query.queries) == 2
+        assert all('start_at >= %s AND start_at < %s' in sql for sql, _ in query.queries)
+
+    def test_back_to_back_and_cancelled_slots_are_free(self):
+        engine = AvailabilityEngine(FakeAppointments(self.ROWS))
+
+        assert engine.is_available('pat-9', 'doc-1', '2030-05-06', '10:30:00', 30)
+        assert engine.is_available('pat-9', 'doc-1', '2030-05-06', '13:00:00', 30)
+
+    def test_appointment_running_past_midnight_blocks_next_day(self):
+        engine = AvailabilityEngine(FakeAppointments(self.ROWS))
+
+        assert not engine.is_available('pat-9', 'doc-1', '2030-05-06', '00:00:00', 15)
+
+    def test_rescheduled_appointment_does_not_conflict_with_itself(self):
+        engine = AvailabilityEngine(FakeAppointments(self.ROWS))
+
+        assert engine.is_available('pat-1', 'doc-1', '2030-05-06', '10:15:00', 30, exclude_appointment_id='appt-1')
+
+    def test_appointment_interval_normalizes_column_types(self):
+        start, end = appointment_interval(date(2030, 5, 6), timedelta(hours=9, minutes=5), None)
+
+        assert start == datetime(2030, 5, 6, 9, 5)
+        assert end == datetime(2030, 5, 6, 9, 35)
+
+class TestSlotBitmap:
+
+    def test_busy_bitmap_rounds_partial_slots_outwards(self):
+        day_start = _at(8)
+        busy = busy_bitmap([(_at(8, 7), _at(8, 11), 'a')], day_start, total_slots=12)
+
+        # 08:07-08:11 touches the 08:05 and 08:10 slots
+        assert busy == 0b110
+
+    def test_fitting_starts_requires_consecutive_free_slots(self):
+        busy = 0b0011000
+        fits = fitting_starts(busy, total_slots=7, needed_slots=2)
+
+        assert [i for i in range(7) if fits >> i & 1] == [0, 1, 5]
+
+def _booking(doctor_id, start, minutes, status='scheduled'):
+    start = datetime.fromisoformat(start)
+    return {'id': f"{doctor_id}-{start.isoformat()}", 'doctor_id': doctor_id, 'status': status,
+            'start_at': start, 'end_at': start + timedelta(minutes=minutes)}
+
+class TestEarliestSlots:
+
+    @patch.object(availability, 'get_appointments_by_date_range')
+    def test_merges_doctors_in_start_order(self, mock_range):
+        mock_range.return_value = [
+            _booking('doc-a', '2030-05-06 08:00:00', 60),
+            _booking('doc-b', '2030-05-06 08:00:00', 30),
+            _booking('doc-b', '2030-05-06 08:30:00', 30, status='cancelled'),
+        ]
+
+        slots = AvailabilityEngine().earliest_slots('2030-05-06', '2030-05-07', 30, doctor_ids=['doc-b', 'doc-a'],
+                                                    limit=3, step_minutes=15)
+
+        assert [(s['doctor_id'], s['start']) for s in slots] == [
+            ('doc-b', '08:30'), ('doc-b', '08:45'), ('doc-a', '09:00')
+        ]
+        assert slots[0] == {'doctor_id': 'doc-b', 'date': '2030-05-06', 'start': '08:30', 'end': '09:00'}
+        mock_range.assert_called_once_with('2030-05-06', '2030-05-07', doctor_ids=['doc-a', 'doc-b'])
+
+    @patch.object(availability, 'get_appointments_by_date_range')
+    def test_rolls_over_to_next_day_when_fully_booked(self, mock_range):
+        mock_range.return_value = [_booking('doc-a', '2030-05-06 08:00:00', 600)]
+
+        slots = AvailabilityEngine().earliest_slots('2030-05-06', '2030-05-08', 45, doctor_ids=['doc-a'], limit=2)
+
+        assert [(s['date'], s['start'], s['end']) for s in slots] == [
+            ('2030-05-07', '08:00', '08:45'), ('2030-05-07', '08:05', '08:50')
+        ]
+
+    @patch.object(availability, 'get_active_doctor_ids', return_value=['doc-a'])
+    @patch.object(availability, 'get_appointments_by_date_range', return_value=[])
+    def test_defaults_to_active_doctors(self, mock_range, mock_doctors):
+        slots = AvailabilityEngine().earliest_slots('2030-05-06', '2030-05-06', 30, limit=1)
+
+        assert slots == [{'doctor_id': 'doc-a', 'date': '2030-05-06', 'start': '08:00', 'end': '08:30'}]
+        mock_doctors.assert_called_once()
+
+    def test_rejects_oversized_window(self):
+        try:
+            AvailabilityEngine().earliest_slots('2030-05-01', '2030-07-01', 30, doctor_ids=['doc-a'])
+        except ValueError as e:
+            assert 'cannot exceed' in str(e)
+        else:
+            raise AssertionError("Expected ValueError")
+
+    @patch.object(availability, 'get_appointments_by_date_range')
+    def test_two_week_window_across_thirty_doctors(self, mock_range):
+        rng = random.Random(7)
+        doctors = [f"doc-{i:02d}" for i in range(30)]
+        rows = []
+        for offset in range(14):
+            day_start = datetime(2030, 5, 6, 8) + timedelta(days=offset)
+            for doctor_id in doctors:
+                # Nearly full days: only a few scattered gaps remain
+                minute = 0
+                while minute < 600:
+                    length = rng.choice((15, 30, 45, 60))
+                    if rng.random() > 0.03:
+                        start = day_start + timedelta(minutes=minute)
+                        rows.append(_booking(doctor_id, start.isoformat(), length))
+                    minute += length
+        mock_range.return_value = rows
+
+        with patch.object(availability, 'busy_bitmap', wraps=busy_bitmap) as bitmap_passes:
+            slots = AvailabilityEngine().earliest_slots('2030-05-06', '2030-05-19', 60, doctor_ids=doctors,
+                                                        limit=20, step_minutes=15)
+
+        assert len(slots) == 20
+        keys = [(s['date'], s['start'], s['doctor_id']) for s in slots]
+        assert keys == sorted(keys)
+        # One query for the window, one bitmap pass per doctor-day, and the scan
+        # stops at the last day that contributed a result
+        mock_range.assert_called_once()
+        days_scanned = (date.fromisoformat(slots[-1]['date']) - date(2030, 5, 6)).days + 1
+        assert days_scanned < 14
+        assert bitmap_passes.call_count == len(doctors) * days_scanned
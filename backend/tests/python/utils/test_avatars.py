@@ -0,0 +1,50 @@
+import io
+from unittest.mock import MagicMock
+
+from PIL import Image
+
+from utils.avatars import delete_avatar_variants, store_avatar_variants
+from utils.image_optimizer import ImageOptimizer
+from utils.profile_images import AVATAR_FORMATS, AVATAR_SIZES, avatar_keys
+
+def encoded(image, image_format):
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format)
+    return buffer.getvalue()
+
+def test_variants_are_square_crops_of_every_size_and_format():
+    photo = encoded(Image.new("RGBA", (1200, 800), (10, 120, 200, 128)), "PNG")
+
+    formats = tuple(image_format.upper() for image_format in AVATAR_FORMATS)
+    variants = ImageOptimizer().create_avatar_variants(photo, AVATAR_SIZES, formats)
+
+    assert set(variants) == {(size, image_format) for size in AVATAR_SIZES for image_format in formats}
+    small = Image.open(io.BytesIO(variants[(48, 'JPEG')]))
+    assert (small.format, small.size, small.mode) == ('JPEG', (48, 48), 'RGB')
+    assert len(variants[(256, 'WEBP')]) < len(photo)
+
+def test_large_jpegs_are_decoded_at_reduced_scale():
+    photo = encoded(Image.new("RGB", (4000, 3000), (90, 90, 90)), "JPEG")
+    variants = ImageOptimizer().create_avatar_variants(photo, sizes=(256,), formats=('JPEG',))
+    assert Image.open(io.BytesIO(variants[(256, 'JPEG')])).size == (256, 256)
+
+def test_store_puts_every_rendition():
+    s3 = MagicMock()
+    photo = encoded(Image.new("RGB", (300, 300)), "JPEG")
+
+    sizes = store_avatar_variants('bucket', 'profile-images/sub-1/abc.jpg', photo, s3)
+
+    assert sizes == list(AVATAR_SIZES)
+    stored = {call.kwargs['Key'] for call in s3.put_object.call_args_list}
+    assert stored == set(avatar_keys('profile-images/sub-1/abc.jpg'))
+
+def test_unreadable_images_store_nothing():
+    s3 = MagicMock()
+    assert store_avatar_variants('bucket', 'profile-images/sub-1/abc.jpg', b'not an image', s3) == []
+    s3.put_object.assert_not_called()
+
+def test_delete_removes_every_rendition_at_once():
+    s3 = MagicMock()
+    delete_avatar_variants('bucket', 'profile-images/sub-1/abc.jpg', s3)
+    deleted = s3.delete_objects.call_args.kwargs['Delete']['Objects']
+    assert {obj['Key'] for obj in deleted} == set(avatar_keys('profile-images/sub-1/abc.jpg'))
@@ -0,0 +1,131 @@
+import time
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+from botocore.exceptions import ClientError
+
+from utils import bulk_users
+from utils.bulk_users import BulkUserAdmin, TokenBucket, validate_create_spec
+
+def throttle():
+    return ClientError({'Error': {'Code': 'TooManyRequestsException', 'Message': 'Rate exceeded'}}, 'AdminDisableUser')
+
+def fast_buckets(rate=1000.0):
+    return {category: TokenBucket(rate) for category in bulk_users.COGNITO_QUOTAS}
+
+class TestTokenBucket:
+
+    def test_rate_is_enforced_across_threads(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+        bucket.acquire()
+        started = time.monotonic()
+
+        threads = [threading.Thread(target=bucket.acquire) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # 10 more tokens at 50/s take about 0.2s
+        assert time.monotonic() - started >= 0.18
+
+    def test_capacity_allows_an_initial_burst(self):
+        bucket = TokenBucket(rate=1, capacity=5)
+        with patch.object(bulk_users.time, 'sleep') as sleep:
+            for _ in range(5):
+                bucket.acquire()
+            sleep.assert_not_called()
+
+    def test_drain_drops_banked_tokens(self):
+        bucket = TokenBucket(rate=20, capacity=5)
+        bucket.drain()
+        started = time.monotonic()
+        bucket.acquire()
+        assert time.monotonic() - started >= 0.04
+
+class TestBulkUserAdmin:
+
+    @patch.object(bulk_users, 'THROTTLE_BASE_DELAY', 0.001)
+    def test_throttled_calls_are_retried(self):
+        cognito = MagicMock()
+        cognito.admin_disable_user.side_effect = [throttle(), throttle(), {}]
+        admin = BulkUserAdmin('pool-1', cognito=cognito, buckets=fast_buckets())
+
+        result = admin.run('disable', [{'username': 'amy'}])
+
+        assert result['succeeded'] == 1
+        assert cognito.admin_disable_user.call_count == 3
+        assert result['changes'] == [{'username': 'amy', 'fields': {'enabled': False}}]
+
+    @patch.object(bulk_users, 'THROTTLE_BASE_DELAY', 0.001)
+    def test_gives_up_after_max_retries(self):
+        cognito = MagicMock()
+        cognito.admin_delete_user.side_effect = throttle()
+        admin = BulkUserAdmin('pool-1', cognito=cognito, buckets=fast_buckets())
+
+        result = admin.run('delete', [{'username': 'amy'}])
+
+        assert result['failed'] == 1
+        assert result['results'][0]['error'].startswith('TooManyRequestsException')
+        assert cognito.admin_delete_user.call_count == bulk_users.MAX_THROTTLE_RETRIES + 1
+
+    def test_results_keep_input_order_with_per_user_errors(self):
+        cognito = MagicMock()
+
+        def enable(UserPoolId, Username):
+            time.sleep(0.01 if Username == 'first' else 0)
+            if Username == 'missing':
+                raise ClientError({'Error': {'Code': 'UserNotFoundException', 'Message': 'User does not exist.'}},
+                                  'AdminEnableUser')
+            return {}
+
+        cognito.admin_enable_user.side_effect = enable
+        admin = BulkUserAdmin('pool-1', cognito=cognito, buckets=fast_buckets())
+
+        result = admin.run('enable', [{'username': 'first'}, {'username': 'missing'}, {'username': 'last'}])
+
+        assert [r['username'] for r in result['results']] == ['first', 'missing', 'last']
+        assert [r['status'] for r in result['results']] == ['succeeded', 'failed', 'succeeded']
+        assert result['results'][1]['error'] == 'UserNotFoundException: User does not exist.'
+        assert (result['succeeded'], result['failed'], result['skipped']) == (2, 1, 0)
+
+    def test_stops_starting_users_past_the_deadline(self):
+        cognito = MagicMock()
+        admin = BulkUserAdmin('pool-1', cognito=cognito, buckets=fast_buckets(), workers=1,
+                              should_continue=lambda: cognito.admin_enable_user.call_count < 2)
+
+        result = admin.run('enable', [{'username': f"user{i}"} for i in range(4)])
+
+        assert [r['status'] for r in result['results']] == ['succeeded', 'succeeded', 'skipped', 'skipped']
+
+    def test_create_uses_the_created_record(self):
+        cognito = MagicMock()
+        cognito.admin_create_user.return_value = {'User': {
+            'Username': 'amy', 'Enabled': True, 'UserStatus': 'FORCE_CHANGE_PASSWORD',
+            'Attributes': [{'Name': 'sub', 'Value': 'sub-amy'}, {'Name': 'custom:role', 'Value': 'frontdesk'}]
+        }}
+        admin = BulkUserAdmin('pool-1', cognito=cognito, buckets=fast_buckets())
+
+        result = admin.run('create', [{'username': 'amy', 'password': 'Secret123!', 'firstName': 'Amy',
+                                       'lastName': 'Lee', 'role': 'receptionist', 'email': 'amy@example.com'}])
+
+        user = result['results'][0]['user']
+        assert user['sub'] == 'sub-amy'
+        assert user['userStatus'] == 'CONFIRMED'
+        create_kwargs = cognito.admin_create_user.call_args.kwargs
+        assert {'Name': 'custom:role', 'Value': 'frontdesk'} in create_kwargs['UserAttributes']
+        assert create_kwargs['MessageAction'] == 'SUPPRESS'
+        cognito.admin_set_user_password.assert_called_once_with(
+            UserPoolId='pool-1', Username='amy', Password='Secret123!', Permanent=True)
+        cognito.admin_get_user.assert_not_called()
+
+    def test_invalid_create_spec_fails_only_that_user(self):
+        with pytest.raises(ValueError, match='Missing required fields: password'):
+            validate_create_spec({'username': 'amy', 'firstName': 'A', 'lastName': 'B', 'role': 'doctor'})
+        with pytest.raises(ValueError, match='Invalid role'):
+            validate_create_spec({'username': 'amy', 'password': 'x', 'firstName': 'A', 'lastName': 'B', 'role': 'janitor'})
+
+    def test_unknown_action(self):
+        with pytest.raises(ValueError):
+            BulkUserAdmin('pool-1', cognito=MagicMock(), buckets=fast_buckets()).run('promote', [])
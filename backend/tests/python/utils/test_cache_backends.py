@@ -0,0 +1,136 @@
+import time
+import decimal
+import threading
+from datetime import datetime
+from utils import cache_backends
+from utils.cache_backends import LocalCacheBackend, RedisCacheBackend, SharedCache, dumps, loads
+
+class FakeRedis:
+    """Just enough of redis.Redis (get/set with px and nx/delete/register_script) for the backend."""
+
+    def __init__(self):
+        self.data = {}
+        self.scripts = []
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None or entry[1] <= time.time():
+                self.data.pop(key, None)
+                return None
+            return entry[0]
+
+    def set(self, key, value, px=None, nx=False):
+        with self.lock:
+            existing = self.data.get(key)
+            if nx and existing is not None and existing[1] > time.time():
+                return None
+            self.data[key] = (value, time.time() + px / 1000.0)
+            return True
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def register_script(self, script):
+        self.scripts.append(script)
+
+        def compare_and_delete(keys, args):
+            # Runs under the lock, as Redis runs a script atomically
+            with self.lock:
+                entry = self.data.get(keys[0])
+                if entry is not None and entry[1] > time.time() and entry[0] == args[0]:
+                    del self.data[keys[0]]
+                    return 1
+                return 0
+        return compare_and_delete
+
+class TestSerialization:
+
+    def test_round_trip_keeps_decimals_and_freshness(self):
+        value = {"price": decimal.Decimal("12.5"), "count": 3, "names": ["a", "b"], "at": datetime(2024, 1, 2, 3, 4, 5)}
+
+        decoded, fresh_until = loads(dumps(value, fresh_until=123.0))
+
+        assert fresh_until == 123.0
+        assert decoded["price"] == decimal.Decimal("12.5")
+        assert decoded["count"] == 3
+        assert decoded["names"] == ["a", "b"]
+        assert decoded["at"] == "2024-01-02 03:04:05"
+
+    def test_zlib_json_fallback_without_msgpack(self, monkeypatch):
+        monkeypatch.setattr(cache_backends, "msgpack", None)
+        data = dumps({"items": ["service"] * 100})
+
+        assert data[:1] == b"z"
+        assert len(data) < 100
+        assert loads(data)[0] == {"items": ["service"] * 100}
+
+class TestRedisCacheBackend:
+
+    def test_delete_if_equals_is_one_script_call(self):
+        client = FakeRedis()
+        backend = RedisCacheBackend(client=client)
+        backend.set("lock", b"token-a", 10)
+
+        backend.delete_if_equals("lock", b"token-b")
+        assert backend.get("lock") == b"token-a"
+        backend.delete_if_equals("lock", b"token-a")
+        assert backend.get("lock") is None
+        assert "redis.call('del', KEYS[1])" in client.scripts[0]
+
+class TestSharedCache:
+
+    def test_get_or_load_caches_across_instances_sharing_redis(self):
+        backend = RedisCacheBackend(client=FakeRedis())
+        container_a = SharedCache("services", backend=backend)
+        container_b = SharedCache("services", backend=backend)
+
+        assert container_a.get_or_load("catalog", lambda: [{"id": "s1"}]) == [{"id": "s1"}]
+        assert container_b.get_or_load("catalog", lambda: [{"id": "other"}]) == [{"id": "s1"}]
+        assert container_b.loads == 0
+
+    def test_concurrent_misses_load_once(self):
+        cache = SharedCache("patients", backend=RedisCacheBackend(client=FakeRedis()))
+        calls = []
+
+        def slow_loader():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"id": "p1"}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("p1", slow_loader))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert results == [{"id": "p1"}] * 8
+
+    def test_stale_entry_is_served_while_another_caller_refreshes(self):
+        backend = LocalCacheBackend()
+        cache = SharedCache("services", backend=backend, ttl=0.05, stale_ttl=60)
+        cache.get_or_load("catalog", lambda: "v1")
+        time.sleep(0.1)
+
+        # Someone else holds the refresh lock: the stale value is returned without loading
+        backend.add("clinnet:services:catalog:lock", b"other", 10)
+        assert cache.get_or_load("catalog", lambda: "v2") == "v1"
+
+        backend.delete("clinnet:services:catalog:lock")
+        assert cache.get_or_load("catalog", lambda: "v2") == "v2"
+
+    def test_backend_errors_fall_back_to_loader(self):
+        class BrokenBackend(LocalCacheBackend):
+            def get(self, key):
+                raise ConnectionError("cache unavailable")
+
+            def set(self, key, value, ttl):
+                raise ConnectionError("cache unavailable")
+
+        cache = SharedCache("patients", backend=BrokenBackend())
+
+        assert cache.get_or_load("p1", lambda: {"id": "p1"}) == {"id": "p1"}
@@ -0,0 +1,94 @@
+import os
+import boto3
+import pytest
+from moto import mock_aws
+from unittest.mock import MagicMock
+from utils.cache_invalidation import CacheVersionBus, DynamoDBVersionStore, InMemoryVersionStore
+from utils.services_catalog import ServicesCatalog
+
+TEST_VERSIONS_TABLE_NAME = "clinnet-cache-versions-test"
+
+@pytest.fixture(scope="function")
+def aws_credentials():
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+
+@pytest.fixture(scope="function")
+def versions_table(aws_credentials):
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        dynamodb.create_table(
+            TableName=TEST_VERSIONS_TABLE_NAME,
+            KeySchema=[{"AttributeName": "entity", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "entity", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield dynamodb
+
+class TestCacheVersionBus:
+
+    def test_dynamodb_store_counts_bumps(self, versions_table):
+        store = DynamoDBVersionStore(TEST_VERSIONS_TABLE_NAME, versions_table)
+
+        assert store.get("services") == 0
+        assert store.bump("services") == 1
+        assert store.bump("services") == 2
+        assert store.get("services") == 2
+
+    def test_dynamodb_store_reads_many_versions_in_batches(self, versions_table):
+        store = DynamoDBVersionStore(TEST_VERSIONS_TABLE_NAME, versions_table)
+        store.bump("users:amy")
+        store.bump("users:amy")
+        store.bump("users:bob")
+
+        versions = store.get_many([f"users:u{i}" for i in range(150)] + ["users:amy", "users:bob"])
+
+        assert versions["users:amy"] == 2
+        assert versions["users:bob"] == 1
+        assert versions["users:u7"] == 0
+        assert len(versions) == 152
+
+    def test_current_many_reads_only_due_entities_in_one_call(self):
+        store = MagicMock(wraps=InMemoryVersionStore())
+        bus = CacheVersionBus(store, check_interval=60)
+        bus.current("a")
+        store.bump("a")
+        store.bump("b")
+
+        assert bus.current_many(["a", "b", "c"]) == {"a": 0, "b": 1, "c": 0}
+        store.get_many.assert_called_once_with(["b", "c"])
+        assert bus.current_many(["a", "b"], force=True) == {"a": 1, "b": 1}
+
+    def test_store_is_read_at_most_once_per_interval(self):
+        store = MagicMock(wraps=InMemoryVersionStore())
+        bus = CacheVersionBus(store, check_interval=60)
+
+        bus.current("services")
+        store.bump("services")
+        assert bus.current("services") == 0
+        assert bus.current("services", force=True) == 1
+        assert store.get.call_count == 2
+
+    def test_catalog_reloads_after_write_from_other_container(self):
+        services = [{"id": "s1", "name": "Consultation", "category": "General", "active": True}]
+        store = InMemoryVersionStore()
+        loader_a = MagicMock(side_effect=lambda table: list(services))
+        loader_b = MagicMock(side_effect=lambda table: list(services))
+        catalog_a = ServicesCatalog(ttl_seconds=3600, loader=loader_a, bus=CacheVersionBus(store, check_interval=0))
+        catalog_b = ServicesCatalog(ttl_seconds=3600, loader=loader_b, bus=CacheVersionBus(store, check_interval=0))
+        catalog_a.list_services("services")
+        catalog_b.list_services("services")
+
+        # Container B handles a create: its own snapshot is patched, not reloaded
+        new_service = {"id": "s2", "name": "X-Ray", "category": "Imaging", "active": True}
+        services.append(new_service)
+        catalog_b.upsert(new_service)
+        assert [s["id"] for s in catalog_b.list_services("services", category="Imaging")] == ["s2"]
+        assert loader_b.call_count == 1
+
+        # Container A sees the bumped version and reloads despite its long TTL
+        assert [s["id"] for s in catalog_a.list_services("services", category="Imaging")] == ["s2"]
+        assert loader_a.call_count == 2
@@ -0,0 +1,105 @@
+import os
+import boto3
+import pytest
+from moto import mock_aws
+from utils import db_utils
+from utils.cache_invalidation import CacheVersionBus, InMemoryVersionStore, set_version_bus
+
+TEST_TABLE_NAME = "clinnet-item-cache-test"
+
+@pytest.fixture(scope="function")
+def aws_credentials():
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+
+@pytest.fixture(scope="function")
+def cached_table(aws_credentials, monkeypatch):
+    monkeypatch.setattr(db_utils, "DYNAMODB_RESOURCE", None)
+    monkeypatch.setattr(db_utils, "ITEM_CACHE_TTLS", {})
+    monkeypatch.setattr(db_utils, "_ITEM_CACHE_VERSIONS", {})
+    set_version_bus(CacheVersionBus(InMemoryVersionStore(), check_interval=0))
+    db_utils.ITEM_CACHE.clear()
+    db_utils.ITEM_CACHE.reset_stats()
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        table = dynamodb.create_table(
+            TableName=TEST_TABLE_NAME,
+            KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+            ProvisionedThroughput={"ReadCapacityUnits": 1, "WriteCapacityUnits": 1},
+        )
+        db_utils.set_item_cache_ttl(TEST_TABLE_NAME, 300)
+        yield table
+    db_utils.ITEM_CACHE.clear()
+    set_version_bus(None)
+
+class TestItemCache:
+
+    def test_read_through_serves_second_read_from_cache(self, cached_table):
+        cached_table.put_item(Item={"id": "svc-1", "name": "Consultation"})
+
+        assert db_utils.get_item_by_id(TEST_TABLE_NAME, "svc-1")["name"] == "Consultation"
+        # Change the item behind the cache's back: the cached copy is still served
+        cached_table.put_item(Item={"id": "svc-1", "name": "Changed"})
+        assert db_utils.get_item_by_id(TEST_TABLE_NAME, "svc-1")["name"] == "Consultation"
+
+        stats = db_utils.get_item_cache_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_cached_item_is_isolated_from_caller_mutation(self, cached_table):
+        cached_table.put_item(Item={"id": "svc-1", "name": "Consultation"})
+
+        db_utils.get_item_by_id(TEST_TABLE_NAME, "svc-1")["name"] = "Mutated"
+        assert db_utils.get_item_by_id(TEST_TABLE_NAME, "svc-1")["name"] == "Consultation"
+
+    def test_misses_are_negatively_cached_until_written(self, cached_table):
+        assert db_utils.get_item_by_id(TEST_TABLE_NAME, "missing") is None
+        assert db_utils.get_item_by_id(TEST_TABLE_NAME, "missing") is None
+        assert db_utils.get_item_cache_stats()["negative_hits"] == 1
+
+        db_utils.put_item(TEST_TABLE_NAME, {"id": "missing", "name": "Now here"})
+        assert db_utils.get_item_by_id(TEST_TABLE_NAME, "missing")["name"] == "Now here"
+
+    def test_update_and_delete_invalidate(self, cached_table):
+        db_utils.put_item(TEST_TABLE_NAME, {"id": "svc-1", "name": "Consultation"})
+        db_utils.get_item_by_id(TEST_TABLE_NAME, "svc-1")
+
+        db_utils.update_item(TEST_TABLE_NAME, "svc-1", {"name": "Follow-up"})
+        assert db_utils.get_item_by_id(TEST_TABLE_NAME, "svc-1")["name"] == "Follow-up"
+
+        db_utils.delete_item(TEST_TABLE_NAME, "svc-1")
+        assert db_utils.get_item_by_id(TEST_TABLE_NAME, "svc-1") is None
+
+    def test_tables_without_policy_are_not_cached(self, cached_table):
+        db_utils.set_item_cache_ttl(TEST_TABLE_NAME, 0)
+        cached_table.put_item(Item={"id": "svc-1", "name": "Consultation"})
+
+        db_utils.get_item_by_id(TEST_TABLE_NAME, "svc-1")
+        cached_table.put_item(Item={"id": "svc-1", "name": "Changed"})
+
+        assert db_utils.get_item_by_id(TEST_TABLE_NAME, "svc-1")["name"] == "Changed"
+        assert len(db_utils.ITEM_CACHE) == 0
+
+    def test_lru_respects_byte_bound(self):
+        cache = db_utils.LRUCache(max_entries=10, max_bytes=100)
+        cache.set("a", "x" * 60)
+        cache.set("b", "y" * 60)
+
+        assert cache.get("a") is db_utils.MISSING
+        assert cache.get("b") == "y" * 60
+        assert cache.stats()["evictions"] == 1
+
+    def test_write_from_another_container_invalidates_table(self, cached_table):
+        cached_table.put_item(Item={"id": "svc-1", "name": "Consultation"})
+        db_utils.get_item_by_id(TEST_TABLE_NAME, "svc-1")
+
+        # Another container updates the item and bumps the shared version
+        cached_table.put_item(Item={"id": "svc-1", "name": "Changed"})
+        db_utils.get_version_bus().store.bump(f"items:{TEST_TABLE_NAME}")
+
+        assert db_utils.get_item_by_id(TEST_TABLE_NAME, "svc-1")["name"] == "Changed"
@@ -0,0 +1,65 @@
+import os
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from utils.direct_uploads import create_image_upload, sniff_image_type, validate_content_type, verify_image_upload
+
+BUCKET = "clinnet-direct-uploads-test"
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+@pytest.fixture
+def s3():
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+def test_sniff_image_type():
+    assert sniff_image_type(b"\xff\xd8\xff\xe0rest") == "image/jpeg"
+    assert sniff_image_type(PNG) == "image/png"
+    assert sniff_image_type(b"GIF89a....") == "image/gif"
+    assert sniff_image_type(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "image/webp"
+    assert sniff_image_type(b"<svg xmlns=") is None
+
+def test_content_types():
+    assert validate_content_type("image/JPG") == "image/jpeg"
+    with pytest.raises(ValueError):
+        validate_content_type("image/svg+xml")
+
+def test_post_policy_pins_key_type_and_size(s3):
+    upload = create_image_upload(BUCKET, "profile-images/sub-1/", "image/png", 1024, metadata={"owner": "sub-1"}, s3=s3)
+
+    assert upload["key"].startswith("profile-images/sub-1/") and upload["key"].endswith(".png")
+    fields = upload["fields"]
+    assert fields["key"] == upload["key"]
+    assert fields["Content-Type"] == "image/png"
+    assert fields["x-amz-meta-owner"] == "sub-1"
+    assert "policy" in fields
+
+def test_verified_upload(s3):
+    key = "profile-images/sub-1/a.png"
+    s3.put_object(Bucket=BUCKET, Key=key, Body=PNG, ContentType="image/png")
+
+    assert verify_image_upload(BUCKET, key, "profile-images/sub-1/", 1024, s3) == \
+        {"key": key, "contentType": "image/png", "size": len(PNG)}
+
+def test_rejected_uploads_are_deleted(s3):
+    key = "profile-images/sub-1/fake.png"
+    s3.put_object(Bucket=BUCKET, Key=key, Body=b"<html>not an image</html>", ContentType="image/png")
+
+    with pytest.raises(ValueError, match="not a valid image"):
+        verify_image_upload(BUCKET, key, "profile-images/sub-1/", 1024, s3)
+    assert s3.list_objects_v2(Bucket=BUCKET).get("KeyCount") == 0
+
+    s3.put_object(Bucket=BUCKET, Key=key, Body=PNG, ContentType="image/png")
+    with pytest.raises(ValueError, match="larger than"):
+        verify_image_upload(BUCKET, key, "profile-images/sub-1/", 16, s3)
+
+def test_keys_of_other_owners_are_refused(s3):
+    for key in ("profile-images/sub-2/a.png", "profile-images/sub-1/../sub-2/a.png", "profile-images/sub-1/x/a.png", None):
+        with pytest.raises(ValueError, match="does not belong"):
+            verify_image_upload(BUCKET, key, "profile-images/sub-1/", 1024, s3)
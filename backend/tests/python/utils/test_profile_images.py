@@ -0,0 +1,117 @@
+import time
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from utils import profile_images
+from utils.cache import LRUCache
+from utils.cache_backends import LocalCacheBackend, SharedCache
+from utils.cache_invalidation import CacheVersionBus, InMemoryVersionStore, set_version_bus
+from utils.profile_images import get_image_record, get_image_records, presigned_image_url, record_profile_image
+
+@pytest.fixture(autouse=True)
+def fresh_caches(monkeypatch):
+    monkeypatch.setattr(profile_images, "_image_records", SharedCache("profile-images", backend=LocalCacheBackend()))
+    monkeypatch.setattr(profile_images, "_presigned_urls", LRUCache(
+        default_ttl=profile_images.PRESIGNED_URL_TTL_SECONDS - profile_images.URL_REFRESH_AHEAD_SECONDS))
+    set_version_bus(CacheVersionBus(check_interval=0))
+    yield
+    set_version_bus(None)
+
+def signer():
+    s3 = MagicMock()
+    s3.generate_presigned_url.side_effect = lambda *args, **kwargs: f"https://signed/{s3.generate_presigned_url.call_count}"
+    return s3
+
+class TestPresignedUrls:
+
+    def test_url_is_reused_then_refreshed_ahead_of_expiry(self):
+        s3 = signer()
+        assert presigned_image_url('bucket', 'a.jpg', s3) == presigned_image_url('bucket', 'a.jpg', s3)
+        assert s3.generate_presigned_url.call_count == 1
+
+        reuse_for = profile_images.PRESIGNED_URL_TTL_SECONDS - profile_images.URL_REFRESH_AHEAD_SECONDS
+        with patch('utils.cache.time.time', return_value=time.time() + reuse_for + 1):
+            assert presigned_image_url('bucket', 'a.jpg', s3) == 'https://signed/2'
+
+    def test_discarded_url_is_regenerated(self):
+        s3 = signer()
+        presigned_image_url('bucket', 'a.jpg', s3)
+        profile_images.discard_image_url('bucket', 'a.jpg')
+        presigned_image_url('bucket', 'a.jpg', s3)
+        assert s3.generate_presigned_url.call_count == 2
+
+class TestImageRecords:
+
+    def test_cognito_is_read_once(self):
+        cognito = MagicMock()
+        cognito.admin_get_user.return_value = {'UserAttributes': [{'Name': 'custom:profile_image', 'Value': 'a.jpg'}]}
+
+        assert get_image_record('pool-1', 'amy', cognito) == {'key': 'a.jpg'}
+        assert get_image_record('pool-1', 'amy', cognito) == {'key': 'a.jpg'}
+        assert cognito.admin_get_user.call_count == 1
+
+    def test_recorded_changes_replace_the_cached_record(self):
+        cognito = MagicMock()
+        record_profile_image('amy', 'b.png', contentType='image/png', size=10)
+        record = get_image_record('pool-1', 'amy', cognito)
+        assert (record['key'], record['contentType'], record['size']) == ('b.png', 'image/png', 10)
+
+        record_profile_image('amy')
+        assert get_image_record('pool-1', 'amy', cognito) == {'key': ''}
+        cognito.admin_get_user.assert_not_called()
+
+    def test_change_in_another_container_is_seen(self, monkeypatch):
+        cognito = MagicMock()
+        cognito.admin_get_user.return_value = {'UserAttributes': [{'Name': 'custom:profile_image', 'Value': 'a.jpg'}]}
+        assert get_image_record('pool-1', 'amy', cognito) == {'key': 'a.jpg'}
+
+        # The remove handler ran in a container with its own in-memory cache tier
+        local_records = profile_images._image_records
+        monkeypatch.setattr(profile_images, "_image_records", SharedCache("profile-images", backend=LocalCacheBackend()))
+        record_profile_image('amy')
+        monkeypatch.setattr(profile_images, "_image_records", local_records)
+
+        cognito.admin_get_user.return_value = {'UserAttributes': []}
+        assert get_image_record('pool-1', 'amy', cognito) == {'key': ''}
+        assert cognito.admin_get_user.call_count == 2
+
+    def test_batch_reads_versions_once_on_the_calling_thread(self):
+        store = InMemoryVersionStore()
+        set_version_bus(CacheVersionBus(store, check_interval=0))
+        record_profile_image('amy', 'a.jpg')
+        callers = []
+        store.get = MagicMock(side_effect=AssertionError('versions must be read in one batch'))
+        get_many = store.get_many
+        store.get_many = MagicMock(side_effect=lambda entities: callers.append(threading.get_ident()) or get_many(entities))
+        cognito = MagicMock()
+        cognito.admin_get_user.return_value = {'UserAttributes': []}
+
+        records = get_image_records('pool-1', ['amy', 'bob', 'cat'], cognito)
+
+        assert records['amy']['key'] == 'a.jpg'
+        assert records['bob'] == records['cat'] == {'key': ''}
+        assert callers == [threading.get_ident()]
+        assert cognito.admin_get_user.call_count == 2
+
+class TestAvatars:
+
+    def test_avatar_keys_are_deterministic(self):
+        assert profile_images.avatar_key('profile-images/sub-1/abc.png', 48, 'jpeg') == \
+            'profile-images/sub-1/avatars/abc-48.jpg'
+        assert len(profile_images.avatar_keys('profile-images/sub-1/abc.png')) == \
+            len(profile_images.AVATAR_SIZES) * len(profile_images.AVATAR_FORMATS)
+
+    def test_pick_avatar_size(self):
+        assert profile_images.pick_avatar_size([48, 96, 256], 40) == 48
+        assert profile_images.pick_avatar_size([48, 96, 256], 97) == 256
+        assert profile_images.pick_avatar_size([48, 96, 256], 1024) == 256
+        assert profile_images.pick_avatar_size([], 48) is None
+
+    def test_parse_avatar_request(self):
+        assert profile_images.parse_avatar_request(None, None) == (None, 'webp')
+        assert profile_images.parse_avatar_request('96', 'JPG') == (96, 'jpeg')
+        for size, image_format in (('0', None), ('big', None), (48, 'gif')):
+            with pytest.raises(ValueError):
+                profile_images.parse_avatar_request(size, image_format)
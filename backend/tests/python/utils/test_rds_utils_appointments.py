@@ -0,0 +1,151 @@
+import pymysql
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from utils import rds_utils
+from utils.appointment_times import recurrence_dates, reservation_slots
+
+class TestAppointmentSpanQueries:
+
+    @patch.object(rds_utils, "execute_transaction")
+    def test_create_appointment_writes_span(self, mock_execute_transaction):
+        rds_utils.create_appointment({
+            "patient_id": "patient-001",
+            "doctor_id": "doctor-001",
+            "appointment_date": "2030-05-06",
+            "appointment_time": "23:45:00",
+            "duration_minutes": 30,
+        })
+
+        (query, params), (slots_query, slots_params) = mock_execute_transaction.call_args[0][0]
+        assert "start_at, end_at" in query
+        assert params[7:9] == ("2030-05-06 23:45:00", "2030-05-07 00:15:00")
+
+        # The doctor's 5-minute slots are reserved in the same transaction
+        assert slots_query.startswith("INSERT INTO appointment_slots")
+        assert slots_params[:3] == ("doctor-001", "2030-05-06 23:45:00", params[0])
+        assert slots_params[-3:] == ("doctor-001", "2030-05-07 00:10:00", params[0])
+        assert len(slots_params) == 6 * 3
+
+    @patch.object(rds_utils, "execute_transaction")
+    def test_create_appointment_duplicate_slot_raises(self, mock_execute_transaction):
+        mock_execute_transaction.side_effect = pymysql.err.IntegrityError(1062, "Duplicate entry")
+
+        with pytest.raises(rds_utils.SlotUnavailableError):
+            rds_utils.create_appointment({
+                "patient_id": "patient-001",
+                "doctor_id": "doctor-001",
+                "appointment_date": "2030-05-06",
+                "appointment_time": "09:00:00",
+            })
+
+    @patch.object(rds_utils, "execute_transaction")
+    def test_cancelled_appointment_holds_no_slots(self, mock_execute_transaction):
+        rds_utils.create_appointment({
+            "patient_id": "patient-001",
+            "doctor_id": "doctor-001",
+            "appointment_date": "2030-05-06",
+            "appointment_time": "09:00:00",
+            "status": "cancelled",
+        })
+
+        assert len(mock_execute_transaction.call_args[0][0]) == 1
+
+    def test_reservation_slots_cover_partial_slots(self):
+        start, end = datetime(2030, 5, 6, 9, 7), datetime(2030, 5, 6, 9, 16)
+
+        assert reservation_slots(start, end) == [
+            datetime(2030, 5, 6, 9, 5), datetime(2030, 5, 6, 9, 10), datetime(2030, 5, 6, 9, 15)
+        ]
+
+    @patch.object(rds_utils, "execute_query")
+    def test_date_range_uses_half_open_start_at_range(self, mock_execute_query):
+        rds_utils.get_appointments_by_date_range("2030-05-01", "2030-05-07", doctor_id="doctor-001")
+
+        query, params = mock_execute_query.call_args[0]
+        assert "a.start_at >= %s AND a.start_at < %s" in query
+        assert params == ("2030-05-01 00:00:00", "2030-05-08 00:00:00", "doctor-001")
+
+    @patch.object(rds_utils, "execute_query")
+    def test_date_range_filters_a_set_of_doctors(self, mock_execute_query):
+        rds_utils.get_appointments_by_date_range("2030-05-01", "2030-05-14", doctor_ids=["doctor-001", "doctor-002"])
+
+        query, params = mock_execute_query.call_args[0]
+        assert "a.doctor_id IN (%s, %s)" in query
+        assert params == ("2030-05-01 00:00:00", "2030-05-15 00:00:00", "doctor-001", "doctor-002")
+
+    @patch.object(rds_utils, "execute_query")
+    def test_date_range_pushes_filters_and_keyset_into_sql(self, mock_execute_query):
+        rds_utils.get_appointments_by_date_range(
+            "2030-05-01", "2030-05-31", patient_id="patient-001", statuses=["scheduled", "confirmed"],
+            service_id="service-001", limit=51, after=("2030-05-03 09:00:00", "appt-9")
+        )
+
+        query, params = mock_execute_query.call_args[0]
+        assert "a.patient_id = %s" in query
+        assert "a.service_id = %s" in query
+        assert "a.status IN (%s, %s)" in query
+        assert "(a.start_at > %s OR (a.start_at = %s AND a.id > %s))" in query
+        assert query.rstrip().endswith("ORDER BY a.start_at, a.id LIMIT %s")
+        assert params == (
+            "2030-05-01 00:00:00", "2030-06-01 00:00:00", "patient-001", "service-001", "scheduled", "confirmed",
+            "2030-05-03 09:00:00", "2030-05-03 09:00:00", "appt-9", 51
+        )
+
+    def test_recurrence_dates_expand_rrule(self):
+        dates = recurrence_dates("RRULE:FREQ=WEEKLY;BYDAY=MO,TH;COUNT=4", "2030-05-06")
+
+        assert [d.isoformat() for d in dates] == ["2030-05-06", "2030-05-09", "2030-05-13", "2030-05-16"]
+        with pytest.raises(ValueError):
+            recurrence_dates("FREQ=DAILY;COUNT=100", "2030-05-06", max_occurrences=52)
+
+    @patch.object(rds_utils, "execute_transaction")
+    def test_create_appointments_uses_multi_row_inserts(self, mock_execute_transaction):
+        ids = rds_utils.create_appointments([
+            {"patient_id": "patient-001", "doctor_id": "doctor-001", "appointment_date": "2030-05-06",
+             "appointment_time": "09:00:00", "duration_minutes": 10},
+            {"patient_id": "patient-001", "doctor_id": "doctor-001", "appointment_date": "2030-05-13",
+             "appointment_time": "09:00:00", "duration_minutes": 10},
+        ])
+
+        (insert, params), (slots_query, slots_params) = mock_execute_transaction.call_args[0][0]
+        assert mock_execute_transaction.call_count == 1
+        assert insert.count("(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)") == 2
+        assert params[0] == ids[0] and params[12] == ids[1]
+        assert slots_params == (
+            "doctor-001", "2030-05-06 09:00:00", ids[0], "doctor-001", "2030-05-06 09:05:00", ids[0],
+            "doctor-001", "2030-05-13 09:00:00", ids[1], "doctor-001", "2030-05-13 09:05:00", ids[1],
+        )
+
+class TestBillingQueries:
+
+    @patch.object(rds_utils, "execute_query")
+    def test_unbilled_appointments_query_uses_keyset(self, mock_execute_query):
+        rds_utils.get_unbilled_appointments("2030-05-01", "2030-05-01", limit=500,
+                                            after=("2030-05-01 10:00:00", "appt-3"))
+
+        query, params = mock_execute_query.call_args[0]
+        assert "status = 'completed' AND billing_id IS NULL" in query
+        assert query.rstrip().endswith("ORDER BY start_at, id LIMIT %s")
+        assert params == ("2030-05-01 00:00:00", "2030-05-02 00:00:00",
+                          "2030-05-01 10:00:00", "2030-05-01 10:00:00", "appt-3", 500)
+
+    @patch.object(rds_utils, "execute_query")
+    def test_get_service_duration(self, mock_execute_query):
+        mock_execute_query.return_value = {"duration_minutes": 45}
+        assert rds_utils.get_service_duration("svc-1") == 45
+        mock_execute_query.return_value = None
+        assert rds_utils.get_service_duration("missing") is None
+
+    @patch.object(rds_utils, "execute_mutation")
+    def test_mark_appointments_billed_is_one_update(self, mock_execute_mutation):
+        mock_execute_mutation.return_value = 2
+
+        assert rds_utils.mark_appointments_billed({"appt-1": "bill-1", "appt-2": "bill-2"}) == 2
+
+        query, params = mock_execute_mutation.call_args[0]
+        assert query == ("UPDATE appointments SET billing_id = CASE id WHEN %s THEN %s WHEN %s THEN %s "
+                         "END WHERE id IN (%s, %s) AND billing_id IS NULL")
+        assert params == ("appt-1", "bill-1", "appt-2", "bill-2", "appt-1", "appt-2")
+        assert rds_utils.mark_appointments_billed({}) == 0
+        assert mock_execute_mutation.call_count == 1
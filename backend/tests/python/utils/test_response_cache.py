@@ -0,0 +1,76 @@
+import gzip
+import json
+import base64
+from utils.cache import LRUCache
+from utils.response_cache import cached_get_response
+
+def _event(query_params=None, headers=None, method="GET"):
+    return {"httpMethod": method, "queryStringParameters": query_params, "headers": headers or {}}
+
+def _handler_factory(payload, status_code=200):
+    calls = []
+
+    def handler(event):
+        calls.append(event)
+        return {"statusCode": status_code, "headers": {"Content-Type": "application/json"}, "body": json.dumps(payload)}
+
+    return handler, calls
+
+class TestCachedGetResponse:
+
+    def test_hit_returns_stored_body_without_calling_handler(self):
+        handler, calls = _handler_factory({"items": [1, 2, 3]})
+        cached = cached_get_response(cache=LRUCache())(handler)
+
+        first = cached(_event({"a": "1"}))
+        second = cached(_event({"a": "1"}))
+
+        assert len(calls) == 1
+        assert second["body"] == first["body"]
+        assert second["headers"]["ETag"] == first["headers"]["ETag"]
+
+    def test_query_parameters_and_version_select_entry(self):
+        handler, calls = _handler_factory({"ok": True})
+        version = {"value": 1}
+        cached = cached_get_response(cache=LRUCache(), version=lambda: version["value"])(handler)
+
+        cached(_event({"a": "1"}))
+        cached(_event({"a": "2"}))
+        cached(_event({"a": "1"}))
+        version["value"] = 2
+        cached(_event({"a": "1"}))
+
+        assert len(calls) == 3
+
+    def test_if_none_match_returns_304(self):
+        handler, _ = _handler_factory({"ok": True})
+        cached = cached_get_response(cache=LRUCache())(handler)
+        etag = cached(_event())["headers"]["ETag"]
+
+        response = cached(_event(headers={"if-none-match": etag}))
+
+        assert response["statusCode"] == 304
+        assert response["body"] == ""
+
+    def test_gzip_variant_served_when_accepted(self):
+        payload = {"items": ["service"] * 500}
+        handler, _ = _handler_factory(payload)
+        cached = cached_get_response(cache=LRUCache())(handler)
+
+        plain = cached(_event())
+        compressed = cached(_event(headers={"Accept-Encoding": "gzip, deflate"}))
+
+        assert "Content-Encoding" not in plain["headers"]
+        assert compressed["isBase64Encoded"] is True
+        assert compressed["headers"]["Content-Encoding"] == "gzip"
+        assert json.loads(gzip.decompress(base64.b64decode(compressed["body"]))) == payload
+
+    def test_errors_and_non_get_requests_are_not_cached(self):
+        handler, calls = _handler_factory({"error": "boom"}, status_code=500)
+        cached = cached_get_response(cache=LRUCache())(handler)
+
+        cached(_event())
+        cached(_event())
+        cached(_event(method="POST"))
+
+        assert len(calls) == 3
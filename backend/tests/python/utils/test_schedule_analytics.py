@@ -0,0 +1,85 @@
+import random
+from unittest.mock import MagicMock
+from utils.schedule_analytics import ScheduleArrays, analyze_schedule, load_schedule
+
+def _row(doctor_id, day, hour, minute, duration, status='completed'):
+    return {'doctor_id': doctor_id, 'start_minute': day * 1440 + hour * 60 + minute,
+            'duration_minutes': duration, 'status': status}
+
+class TestScheduleAnalytics:
+
+    def test_utilization_gaps_overlaps_and_rates(self):
+        rows = [
+            _row('doc-a', 0, 9, 0, 60),
+            _row('doc-a', 0, 9, 30, 60),                    # overlaps the first by 30 minutes
+            _row('doc-a', 0, 11, 0, 30, 'no_show'),         # 30 minute gap, still holds the slot
+            _row('doc-a', 0, 12, 0, 30, 'cancelled'),       # frees its slot
+            _row('doc-b', 1, 8, 0, 600),
+        ]
+        schedule = ScheduleArrays.from_rows(rows, '2030-05-06', '2030-05-07')  # Monday, Tuesday
+
+        result = analyze_schedule(schedule, '08:00', '18:00')
+
+        doc_a, doc_b = result['doctors']
+        assert doc_a['doctor_id'] == 'doc-a'
+        assert doc_a['booked_minutes'] == 120
+        assert doc_a['daily_utilization'] == [0.2, 0.0]
+        assert doc_a['overlaps'] == 1 and doc_a['overlap_minutes'] == 30
+        assert doc_a['gap_minutes'] == 30
+        assert doc_a['cancellation_rate'] == 0.25
+        assert doc_a['no_show_rate'] == round(1 / 3, 4)
+        assert doc_b['daily_utilization'] == [0.0, 1.0]
+        assert result['totals']['utilization'] == round(720 / 2400, 4)
+        assert result['heatmap']['counts'][0][9] == 2
+        assert result['heatmap']['counts'][0][12] == 0
+        assert result['heatmap']['counts'][1][8] == 1
+
+    def test_load_schedule_uses_one_lean_query(self):
+        query = MagicMock(return_value=[_row('doc-a', 0, 9, 0, 30)])
+
+        schedule = load_schedule('2030-05-06', '2030-05-12', ['doc-a', 'doc-z'], query=query)
+
+        sql, params = query.call_args[0]
+        assert 'TIMESTAMPDIFF(MINUTE, %s, start_at)' in sql
+        assert 'JOIN' not in sql
+        assert params == ('2030-05-06 00:00:00', '2030-05-06 00:00:00', '2030-05-13 00:00:00', 'doc-a', 'doc-z')
+        # Requested doctors without appointments are still reported
+        assert schedule.doctor_ids == ['doc-a', 'doc-z']
+        assert len(schedule) == 1
+
+    def test_year_of_multi_doctor_data_matches_a_per_row_reference(self):
+        rng = random.Random(3)
+        rows = []
+        for doctor in range(30):
+            for day in range(365):
+                minute = 8 * 60
+                while minute < 18 * 60:
+                    duration = rng.choice((15, 30, 45, 60))
+                    status = rng.choice(('completed',) * 8 + ('cancelled', 'no_show'))
+                    rows.append({'doctor_id': f'doc-{doctor:02d}', 'start_minute': day * 1440 + minute,
+                                 'duration_minutes': duration, 'status': status})
+                    minute += duration + rng.choice((0, 0, 15))
+
+        result = analyze_schedule(ScheduleArrays.from_rows(rows, '2030-01-01', '2030-12-31'))
+
+        # Plain loop over the rows: appointments never overlap here, so busy time is
+        # the sum of held durations and gaps are the idle minutes between them
+        expected = {}
+        previous_end = {}
+        for row in rows:
+            report = expected.setdefault(row['doctor_id'], {'booked_minutes': 0, 'gap_minutes': 0, 'appointments': 0})
+            report['appointments'] += 1
+            if row['status'] == 'cancelled':
+                continue
+            day = (row['doctor_id'], row['start_minute'] // 1440)
+            if day in previous_end:
+                report['gap_minutes'] += row['start_minute'] - previous_end[day]
+            previous_end[day] = row['start_minute'] + row['duration_minutes']
+            report['booked_minutes'] += row['duration_minutes']
+
+        assert result['totals']['appointments'] == len(rows)
+        assert len(result['doctors']) == 30
+        for report in result['doctors']:
+            assert {name: report[name] for name in ('booked_minutes', 'gap_minutes', 'appointments')} == \
+                expected[report['doctor_id']]
+            assert report['overlaps'] == 0
@@ -0,0 +1,235 @@
+import time
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from utils import user_directory
+from utils.cache_backends import LocalCacheBackend, SharedCache
+from utils.cache_invalidation import CacheVersionBus, InMemoryVersionStore, set_version_bus
+from utils.user_directory import (UserDirectory, USERS_ENTITY, VersionTableChangeLog, fetch_all_users,
+                                  get_change_log, normalize_user, record_user_change)
+
+def make_user(username, role='doctor', enabled=True, status='CONFIRMED', first='', last='', email=None):
+    return {
+        'username': username, 'enabled': enabled, 'userStatus': status,
+        'userCreateDate': '2024-01-01T00:00:00', 'userLastModifiedDate': '2024-01-01T00:00:00',
+        'email': email or f"{username}@example.com", 'sub': f"sub-{username}",
+        'firstName': first, 'lastName': last, 'phone': '', 'role': role
+    }
+
+USERS = [
+    make_user('alice', role='admin', first='Alice', last='Smith'),
+    make_user('bob', role='doctor', first='Bob', last='Stone', enabled=False),
+    make_user('carol', role='doctor', first='Carol', last='Smithers', status='FORCE_CHANGE_PASSWORD'),
+    make_user('dave', role='frontdesk', first='Dave', last='Jones', email='Dave.Jones@Clinic.com'),
+]
+
+@pytest.fixture
+def bus():
+    bus = CacheVersionBus(InMemoryVersionStore(), check_interval=0)
+    set_version_bus(bus)
+    yield bus
+    set_version_bus(None)
+
+@pytest.fixture
+def change_log():
+    return SharedCache('user-changes-test', backend=LocalCacheBackend())
+
+@pytest.fixture
+def loader():
+    return MagicMock(side_effect=lambda pool_id: [dict(user) for user in USERS])
+
+@pytest.fixture
+def directory(bus, change_log, loader):
+    directory = UserDirectory(loader=loader, bus=bus, change_log=change_log)
+    directory.ensure_loaded('pool-1')
+    return directory
+
+def publish(bus, change_log, change):
+    version = bus.bump(USERS_ENTITY)
+    change_log.set(str(version), change)
+
+class TestQuery:
+
+    def test_filters_use_indexes_and_combine(self, directory):
+        users, total = directory.query(role='doctor')
+        assert total == 2
+        assert [user['username'] for user in users] == ['bob', 'carol']
+
+        users, total = directory.query(role='doctor', enabled=True)
+        assert [user['username'] for user in users] == ['carol']
+
+        users, _ = directory.query(status='FORCE_CHANGE_PASSWORD')
+        assert [user['username'] for user in users] == ['carol']
+
+        users, _ = directory.query(enabled=False)
+        assert [user['username'] for user in users] == ['bob']
+
+    def test_search_matches_word_prefixes(self, directory):
+        users, _ = directory.query(search='smi')
+        assert [user['username'] for user in users] == ['alice', 'carol']
+
+        users, _ = directory.query(search='carol smith')
+        assert [user['username'] for user in users] == ['carol']
+
+        assert directory.query(search='zed') == ([], 0)
+
+    def test_sort_and_page(self, directory):
+        users, total = directory.query(sort_by='lastName', descending=True, offset=1, limit=2)
+        assert total == 4
+        assert [user['lastName'] for user in users] == ['Smithers', 'Smith']
+
+    def test_lookup_by_email_ignores_case(self, directory):
+        assert directory.get_by_email('dave.jones@clinic.com')['username'] == 'dave'
+        assert directory.get('alice')['role'] == 'admin'
+
+    def test_results_are_copies(self, directory):
+        users, _ = directory.query(role='admin')
+        users[0]['role'] = 'hacked'
+        assert directory.get('alice')['role'] == 'admin'
+
+class TestSync:
+
+    def test_loads_once_per_pool(self, directory, loader):
+        directory.ensure_loaded('pool-1')
+        directory.ensure_loaded('pool-1')
+        assert loader.call_count == 1
+
+        directory.ensure_loaded('pool-2')
+        assert loader.call_count == 2
+
+    def test_applies_change_log_without_resync(self, directory, bus, change_log, loader):
+        publish(bus, change_log, {'username': 'bob', 'user': None, 'deleted': False, 'fields': {'enabled': True}})
+        publish(bus, change_log, {'username': 'erin', 'user': make_user('erin', role='nurse'), 'deleted': False, 'fields': {}})
+        publish(bus, change_log, {'username': 'dave', 'user': None, 'deleted': True, 'fields': {}})
+
+        users, total = directory.list_users('pool-1', enabled=True)
+
+        assert loader.call_count == 1
+        assert total == 4
+        assert [user['username'] for user in users] == ['alice', 'bob', 'carol', 'erin']
+        assert directory.get_by_email('dave.jones@clinic.com') is None
+        assert [user['username'] for user in directory.query(role='nurse')[0]] == ['erin']
+
+    def test_resyncs_when_change_log_has_gaps(self, directory, bus, change_log, loader):
+        bus.bump(USERS_ENTITY)
+        publish(bus, change_log, {'username': 'bob', 'user': None, 'deleted': False, 'fields': {'enabled': True}})
+
+        directory.ensure_loaded('pool-1')
+
+        assert loader.call_count == 2
+        # The resync reflects what the loader returns, not the unapplied change
+        assert directory.get('bob')['enabled'] is False
+
+    def test_stale_snapshot_is_served_while_refreshing(self, bus, change_log):
+        started, release = [], []
+
+        def slow_loader(pool_id):
+            started.append(pool_id)
+            while len(started) > 1 and not release:
+                time.sleep(0.01)
+            return [dict(user) for user in USERS[:len(started)]]
+
+        directory = UserDirectory(ttl_seconds=0, loader=slow_loader, bus=bus, change_log=change_log)
+        directory.ensure_loaded('pool-1')
+        assert directory.query()[1] == 1
+
+        directory.ensure_loaded('pool-1')
+        assert directory.query()[1] == 1
+
+        release.append(True)
+        deadline = time.time() + 5
+        while directory.syncs < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        assert directory.query()[1] == 2
+
+class TestRecordUserChange:
+
+    def test_updates_this_container_and_publishes(self, monkeypatch, bus, loader):
+        directory = UserDirectory(loader=loader)
+        monkeypatch.setattr(user_directory, '_directory', directory)
+        directory.ensure_loaded('pool-1')
+
+        record_user_change('alice', enabled=False, role='doctor')
+
+        assert directory.get('alice')['enabled'] is False
+        assert [user['username'] for user in directory.query(role='doctor')[0]] == ['alice', 'bob', 'carol']
+        assert bus.current(USERS_ENTITY) == 1
+        directory.ensure_loaded('pool-1')
+        assert loader.call_count == 1
+
+    def test_failure_does_not_raise(self, monkeypatch, bus):
+        monkeypatch.setattr(bus, 'bump', MagicMock(side_effect=RuntimeError('down')))
+        record_user_change('alice', deleted=True)
+
+class TestVersionTableChangeLog:
+
+    @pytest.fixture
+    def table_log(self, monkeypatch):
+        monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+        monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+        monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+        with mock_aws():
+            dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+            dynamodb.create_table(
+                TableName="cache-versions-test",
+                KeySchema=[{"AttributeName": "entity", "KeyType": "HASH"}],
+                AttributeDefinitions=[{"AttributeName": "entity", "AttributeType": "S"}],
+                BillingMode="PAY_PER_REQUEST",
+            )
+            yield VersionTableChangeLog("cache-versions-test", dynamodb_resource=dynamodb)
+
+    def test_other_containers_catch_up_from_the_table(self, bus, loader, table_log):
+        directory = UserDirectory(loader=loader, bus=bus, change_log=table_log)
+        directory.ensure_loaded('pool-1')
+
+        publish(bus, table_log, {'username': 'bob', 'user': None, 'deleted': False, 'fields': {'enabled': True}})
+        directory.ensure_loaded('pool-1')
+
+        assert loader.call_count == 1
+        assert directory.get('bob')['enabled'] is True
+
+    def test_expired_entries_are_missing(self, table_log):
+        table_log.ttl = -1
+        table_log.set('1', {'username': 'bob'})
+        assert table_log.get('1') is None
+        assert table_log.get('2') is None
+
+    def test_table_is_used_without_redis(self, monkeypatch):
+        monkeypatch.setattr(user_directory, '_change_log', None)
+        monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+        monkeypatch.setenv("CACHE_VERSIONS_TABLE", "cache-versions-test")
+        monkeypatch.delenv("REDIS_URL", raising=False)
+        assert isinstance(get_change_log(), VersionTableChangeLog)
+
+        monkeypatch.setattr(user_directory, '_change_log', None)
+        monkeypatch.setenv("REDIS_URL", "redis://cache:6379")
+        assert isinstance(get_change_log(), SharedCache)
+
+class TestCognito:
+
+    def test_fetch_all_users_follows_pagination(self):
+        cognito = MagicMock()
+        cognito.list_users.side_effect = [
+            {'Users': [{'Username': 'a', 'Attributes': [{'Name': 'email', 'Value': 'a@x.com'}]}], 'PaginationToken': 't1'},
+            {'Users': [{'Username': 'b', 'Attributes': []}]}
+        ]
+
+        users = fetch_all_users('pool-1', cognito=cognito)
+
+        assert [user['username'] for user in users] == ['a', 'b']
+        assert cognito.list_users.call_args_list[1].kwargs['PaginationToken'] == 't1'
+
+    def test_normalize_user(self):
+        user = normalize_user({
+            'Username': 'jdoe', 'Enabled': True, 'UserStatus': 'CONFIRMED',
+            'UserCreateDate': datetime(2024, 5, 1, 9, 30),
+            'Attributes': [{'Name': 'given_name', 'Value': 'Jane'}, {'Name': 'custom:role', 'Value': 'nurse'}]
+        })
+        assert user['firstName'] == 'Jane'
+        assert user['role'] == 'nurse'
+        assert user['userCreateDate'] == '2024-05-01T09:30:00'
+        assert user['email'] == ''
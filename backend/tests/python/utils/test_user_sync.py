@@ -0,0 +1,202 @@
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+from utils import rds_utils, user_sync
+from utils.user_sync import reconcile_users, row_to_user, sync_user_to_aurora, sync_users_to_aurora, user_to_row
+
+def cognito_user(username, sub, role='doctor', first='Ann', last='Lee', enabled=True, status='CONFIRMED'):
+    return {
+        'username': username, 'enabled': enabled, 'userStatus': status,
+        'userCreateDate': None, 'userLastModifiedDate': None,
+        'email': f"{username}@Example.com", 'sub': sub,
+        'firstName': first, 'lastName': last, 'phone': '', 'role': role
+    }
+
+def aurora_row(user, **overrides):
+    return dict(user_to_row(user), **overrides)
+
+class TestRows:
+
+    def test_user_to_row_maps_roles_and_normalizes(self):
+        row = user_to_row(cognito_user('amy', 'sub-1', role='frontdesk'))
+
+        assert row == {
+            'id': 'sub-1', 'username': 'amy', 'email': 'amy@example.com', 'first_name': 'Ann',
+            'last_name': 'Lee', 'role': 'receptionist', 'phone': None, 'is_active': True,
+            'user_status': 'CONFIRMED'
+        }
+        assert user_to_row(cognito_user('bob', 'sub-2', role='user'))['role'] is None
+
+    def test_row_to_user_round_trips(self):
+        user = cognito_user('amy', 'sub-1', role='frontdesk')
+        row = dict(user_to_row(user), is_active=1, created_at=datetime(2024, 1, 2, 3, 4, 5), updated_at=None)
+
+        result = row_to_user(row)
+
+        assert result['role'] == 'frontdesk'
+        assert result['enabled'] is True
+        assert result['sub'] == 'sub-1'
+        assert result['userCreateDate'] == '2024-01-02T03:04:05'
+
+class TestSyncUserToAurora:
+
+    @pytest.fixture(autouse=True)
+    def db_host(self, monkeypatch):
+        monkeypatch.setenv('DB_HOST', 'aurora.local')
+
+    @patch.object(user_sync, 'upsert_users')
+    def test_full_record_is_upserted(self, mock_upsert):
+        sync_user_to_aurora('amy', user=cognito_user('amy', 'sub-1'))
+        assert mock_upsert.call_args[0][0][0]['id'] == 'sub-1'
+
+    @patch.object(user_sync, 'update_user_by_username')
+    def test_partial_change_updates_columns(self, mock_update):
+        sync_user_to_aurora('amy', enabled=False, role='frontdesk', firstName='Amy')
+        mock_update.assert_called_once_with('amy', {'is_active': False, 'role': 'receptionist', 'first_name': 'Amy'})
+
+    @patch.object(user_sync, 'update_user_by_username')
+    @patch.object(user_sync, 'upsert_users')
+    def test_non_staff_user_is_not_upserted(self, mock_upsert, mock_update):
+        sync_user_to_aurora('pat', user=cognito_user('pat', 'sub-pat', role='user'))
+
+        mock_upsert.assert_not_called()
+        mock_update.assert_called_once_with('pat', {'is_active': False})
+
+    @patch.object(user_sync, 'update_user_by_username')
+    def test_change_to_non_staff_role_deactivates(self, mock_update):
+        sync_user_to_aurora('amy', role='user', firstName='Amy')
+        mock_update.assert_called_once_with('amy', {'first_name': 'Amy', 'is_active': False})
+
+    @patch.object(user_sync, 'update_user_by_username')
+    def test_delete_deactivates(self, mock_update):
+        sync_user_to_aurora('amy', deleted=True)
+        mock_update.assert_called_once_with('amy', {'is_active': False, 'user_status': 'DELETED'})
+
+    @patch.object(user_sync, 'upsert_users', side_effect=RuntimeError('connection refused'))
+    def test_failures_are_not_raised(self, mock_upsert):
+        sync_user_to_aurora('amy', user=cognito_user('amy', 'sub-1'))
+
+    @patch.object(user_sync, 'upsert_users')
+    def test_skipped_without_database(self, mock_upsert, monkeypatch):
+        monkeypatch.delenv('DB_HOST')
+        sync_user_to_aurora('amy', user=cognito_user('amy', 'sub-1'))
+        mock_upsert.assert_not_called()
+
+    @patch.object(user_sync, 'update_users_by_username')
+    @patch.object(user_sync, 'upsert_users')
+    def test_bulk_changes_are_grouped(self, mock_upsert, mock_update):
+        sync_users_to_aurora([
+            {'username': 'new', 'user': cognito_user('new', 'sub-new')},
+            {'username': 'amy', 'fields': {'enabled': False}},
+            {'username': 'bob', 'fields': {'enabled': False}},
+            {'username': 'cat', 'deleted': True},
+            {'username': 'pat', 'user': cognito_user('pat', 'sub-pat', role='user')},
+        ])
+
+        assert len(mock_upsert.call_args[0][0]) == 1
+        assert mock_update.call_args_list[0][0] == (['amy', 'bob', 'pat'], {'is_active': False})
+        assert mock_update.call_args_list[1][0] == (['cat'], {'is_active': False, 'user_status': 'DELETED'})
+
+class TestReconcileUsers:
+
+    @patch.object(user_sync, 'deactivate_users')
+    @patch.object(user_sync, 'upsert_users')
+    @patch.object(user_sync, 'get_all_users')
+    def test_diffs_and_applies_in_bulk(self, mock_get_all, mock_upsert, mock_deactivate):
+        same = cognito_user('same', 'sub-same')
+        renamed = cognito_user('renamed', 'sub-renamed', last='Newname')
+        new = cognito_user('new', 'sub-new')
+        legacy = cognito_user('legacy', 'sub-legacy')
+        mock_get_all.return_value = [
+            aurora_row(same, is_active=1),
+            aurora_row(renamed, last_name='Oldname'),
+            # Imported before the sync: different id and no username, matched on email
+            aurora_row(legacy, id='dynamo-id', username=None),
+            aurora_row(cognito_user('gone', 'sub-gone')),
+            aurora_row(cognito_user('already-gone', 'sub-old'), is_active=0, user_status='DELETED'),
+            {'id': 'seeded-admin', 'username': None, 'email': 'admin@clinnet.com', 'is_active': 1},
+        ]
+
+        stats = reconcile_users('pool-1', loader=lambda pool_id: [same, renamed, new, legacy])
+
+        assert stats == {'cognito': 4, 'aurora': 6, 'inserted': 1, 'updated': 2, 'deactivated': 1, 'unchanged': 1,
+                         'skipped': 0}
+        upserted = mock_upsert.call_args[0][0]
+        assert [row['id'] for row in upserted] == ['sub-renamed', 'sub-new', 'dynamo-id']
+        assert upserted[2]['username'] == 'legacy'
+        mock_deactivate.assert_called_once_with(['sub-gone'], 'DELETED')
+
+    @patch.object(user_sync, 'deactivate_users')
+    @patch.object(user_sync, 'upsert_users')
+    @patch.object(user_sync, 'get_all_users')
+    def test_non_staff_users_are_skipped(self, mock_get_all, mock_upsert, mock_deactivate):
+        demoted = cognito_user('demoted', 'sub-demoted')
+        mock_get_all.return_value = [aurora_row(demoted, is_active=1)]
+
+        stats = reconcile_users('pool-1', loader=lambda pool_id: [
+            cognito_user('patient', 'sub-patient', role='user'), dict(demoted, role='user')])
+
+        assert stats['skipped'] == 2
+        assert stats['inserted'] == 0
+        assert stats['deactivated'] == 0
+        upserted = mock_upsert.call_args[0][0]
+        assert [(row['id'], row['role'], row['is_active']) for row in upserted] == [('sub-demoted', 'doctor', False)]
+        mock_deactivate.assert_not_called()
+
+    @patch.object(user_sync, 'deactivate_users')
+    @patch.object(user_sync, 'upsert_users')
+    @patch.object(user_sync, 'get_all_users', return_value=[])
+    def test_dry_run_writes_nothing(self, mock_get_all, mock_upsert, mock_deactivate):
+        stats = reconcile_users('pool-1', loader=lambda pool_id: [cognito_user('new', 'sub-new')], dry_run=True)
+
+        assert stats['inserted'] == 1
+        mock_upsert.assert_not_called()
+        mock_deactivate.assert_not_called()
+
+    @patch.object(user_sync, 'upsert_users')
+    @patch.object(user_sync, 'get_all_users', return_value=[])
+    def test_upserts_are_batched(self, mock_get_all, mock_upsert):
+        users = [cognito_user(f"user{i}", f"sub-{i}") for i in range(user_sync.UPSERT_BATCH_SIZE + 1)]
+
+        reconcile_users('pool-1', loader=lambda pool_id: users)
+
+        assert [len(call[0][0]) for call in mock_upsert.call_args_list] == [user_sync.UPSERT_BATCH_SIZE, 1]
+
+class TestUserQueries:
+
+    @patch.object(rds_utils, 'execute_mutation')
+    def test_upsert_users_is_one_statement(self, mock_execute_mutation):
+        rows = [user_to_row(cognito_user('amy', 'sub-1')), user_to_row(cognito_user('bob', 'sub-2'))]
+
+        rds_utils.upsert_users(rows)
+
+        query, params = mock_execute_mutation.call_args[0]
+        assert query.count('%s') == 2 * len(rds_utils.USER_COLUMNS)
+        assert 'ON DUPLICATE KEY UPDATE' in query
+        assert 'id = VALUES(id)' not in query
+        assert params[:2] == ('sub-1', 'amy')
+
+    @patch.object(rds_utils, 'execute_query')
+    def test_get_users_paginated_filters_in_sql(self, mock_execute_query):
+        mock_execute_query.side_effect = [{'total': 7}, [{'id': 'sub-1'}]]
+
+        rows, total = rds_utils.get_users_paginated(limit=5, offset=5, role='doctor', is_active=True,
+                                                    search='an', sort_by='lastName', descending=True)
+
+        assert (rows, total) == ([{'id': 'sub-1'}], 7)
+        count_query, count_params = mock_execute_query.call_args_list[0][0]
+        assert 'WHERE role = %s AND is_active = %s AND (first_name LIKE %s' in count_query
+        assert count_params == ('doctor', True, 'an%', 'an%', 'an%', 'an%')
+        query, params = mock_execute_query.call_args_list[1][0]
+        assert 'ORDER BY last_name DESC, id DESC' in query
+        assert params[-2:] == (5, 5)
+
+    @patch.object(rds_utils, 'execute_mutation')
+    def test_deactivate_users_keeps_rows(self, mock_execute_mutation):
+        rds_utils.deactivate_users(['sub-1', 'sub-2'])
+
+        query, params = mock_execute_mutation.call_args[0]
+        assert query == "UPDATE users SET is_active = FALSE, user_status = %s WHERE id IN (%s, %s)"
+        assert params == ('DELETED', 'sub-1', 'sub-2')
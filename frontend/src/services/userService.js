@@ -112,9 +112,14 @@ export const userService = {
       // Get the current auth token
       const idToken = await getAuthToken();
       let jsonPayload;
-      // Accept either a File or a string (data URI)
+      // Files go straight to S3 with a presigned POST; data URIs use the JSON upload
       if (imageData instanceof File) {
-        // Convert File to base64 data URI
+        const result = await this.uploadProfileImageDirect(imageData, idToken);
+        localStorage.setItem('userProfileImage', result.imageUrl);
+        return result;
+      }
+      if (imageData instanceof Blob) {
+        // Convert Blob to base64 data URI
         const base64 = await new Promise((resolve, reject) => {
           const reader = new FileReader();
           reader.readAsDataURL(imageData);
@@ -181,6 +186,46 @@ export const userService = {
     }
   },
   
+  /**
+   * Upload a profile image file directly to S3
+   * @param {File} file - Image file (JPEG, PNG, GIF or WebP)
+   * @param {string} idToken - Cognito ID token
+   * @returns {Promise<Object>} - Upload result with image URL and key
+   */
+  async uploadProfileImageDirect(file, idToken) {
+    const apiRequest = async (path, body) => {
+      const response = await fetch(`${import.meta.env.VITE_API_ENDPOINT}${path}`, {
+        method: 'POST',
+        headers: {
+          'Authorization': `Bearer ${idToken}`,
+          'Content-Type': 'application/json'
+        },
+        body: JSON.stringify(body)
+      });
+      const result = await response.json().catch(() => ({}));
+      if (!response.ok) {
+        throw new Error(`Failed to upload profile image: ${result.message || `HTTP status ${response.status}`}`);
+      }
+      return result;
+    };
+
+    const upload = await apiRequest('/users/profile-image/upload-url', { contentType: file.type });
+    if (file.size > upload.maxBytes) {
+      throw new Error(`Failed to upload profile image: file is larger than ${upload.maxBytes} bytes`);
+    }
+
+    // S3 expects the policy fields first and the file last
+    const form = new FormData();
+    Object.entries(upload.fields).forEach(([name, value]) => form.append(name, value));
+    form.append('file', file);
+    const s3Response = await fetch(upload.url, { method: 'POST', body: form });
+    if (!s3Response.ok) {
+      throw new Error(`Failed to upload profile image: storage returned HTTP status ${s3Response.status}`);
+    }
+
+    return apiRequest('/users/profile-image/complete', { key: upload.key });
+  },
+
   /**
    * Get the user's profile image URL
    * @returns {Promise<Object>} - Object containing image URL if available
@@ -244,7 +289,28 @@ export const userService = {
       throw error;
     }
   },
-  
+
+  /**
+   * Get the profile image URLs of many users in one request
+   * @param {string[]} usernames - Cognito usernames (at most 100)
+   * @returns {Promise<Object>} - { images: { [username]: { hasImage, imageUrl, imageKey } }, notFound }
+   */
+  async getProfileImages(usernames) {
+    const idToken = await getAuthToken();
+    const response = await fetch(`${import.meta.env.VITE_API_ENDPOINT}/users/profile-images`, {
+      method: 'POST',
+      headers: {
+        'Authorization': `Bearer ${idToken}`,
+        'Content-Type': 'application/json'
+      },
+      body: JSON.stringify({ usernames })
+    });
+    if (!response.ok) {
+      throw new Error(`Failed to get profile images: HTTP status ${response.status}`);
+    }
+    return response.json();
+  },
+
   /**
    * Remove the user's profile image
    * @returns {Promise<Object>} - Result of the operation